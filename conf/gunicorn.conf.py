@@ -1,7 +1,8 @@
 #  https://docs.gunicorn.org/en/stable/settings.html#config-file
 
 # APP
-bind = ["127.0.0.1:8000"]
+# TCP for nginx, unix socket (settings.API_SOCKET) for our own api clients.
+bind = ["127.0.0.1:8000", "unix:/run/rockstor-gunicorn.sock"]
 
 # WORKERS
 workers = 1
@@ -10,6 +11,8 @@ worker_connections = 100
 threads = 2
 timeout = 30
 graceful_timeout = 30
+# Hold idle keep-alive connections across our api clients' 20 second polls.
+keepalive = 30
 
 # LOGS
 accesslog = "./var/log/gunicorn.log"
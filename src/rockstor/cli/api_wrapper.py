@@ -15,29 +15,110 @@ You should have received a copy of the GNU General Public License
 along with this program. If not, see <http://www.gnu.org/licenses/>.
 """
 
+import os
+import socket
 import requests
 import time
 import json
 import base64
+from huey.contrib.djhuey import HUEY
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection
+from urllib3.connectionpool import HTTPConnectionPool
 from settings import CLIENT_SECRET
 from storageadmin.exceptions import RockStorAPIException
 from storageadmin.models import OauthApp
 from django.conf import settings
 
+# Base url of our local api via API_SOCKET, see UnixSocketAdapter.
+UNIX_URL = "http+unix://rockstor"
+
+
+class UnixHTTPConnection(HTTPConnection):
+    def __init__(self, *args, socket_path=None, **kwargs):
+        self.socket_path = socket_path
+        super(UnixHTTPConnection, self).__init__(*args, **kwargs)
+
+    def _new_conn(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        if isinstance(self.timeout, (int, float)):
+            sock.settimeout(self.timeout)
+        sock.connect(self.socket_path)
+        return sock
+
+
+class UnixHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = UnixHTTPConnection
+
+    def __init__(self, socket_path, **kwargs):
+        super(UnixHTTPConnectionPool, self).__init__(
+            "localhost", socket_path=socket_path, **kwargs
+        )
+
+
+class UnixSocketAdapter(HTTPAdapter):
+    """
+    Requests transport adapter sending every request, whatever its host, over
+    a single pool of keep-alive connections to the given unix socket.
+    """
+
+    def __init__(self, socket_path, pool_maxsize=10):
+        self.unix_pool = UnixHTTPConnectionPool(socket_path, maxsize=pool_maxsize)
+        super(UnixSocketAdapter, self).__init__(pool_maxsize=pool_maxsize)
+
+    def get_connection_with_tls_context(self, request, verify, proxies=None, cert=None):
+        return self.unix_pool
+
+    def get_connection(self, url, proxies=None):
+        return self.unix_pool
+
+    def close(self):
+        super(UnixSocketAdapter, self).close()
+        self.unix_pool.close()
+
 
 class APIWrapper(object):
+    """
+    Client of our api: over gunicorn's unix socket (API_SOCKET) when local,
+    reusing keep-alive connections via a requests Session either way. Access
+    tokens are shared by all our processes via our Huey storage.
+    """
+
     def __init__(self, client_id=None, client_secret=CLIENT_SECRET, url=None):
         self.access_token = None
         self.expiration = time.time()
         self.client_id = client_id
         self.client_secret = client_secret
-        # directly connect to gunicorn, bypassing nginx as we are on the same
-        # host.
-        # TODO: Move to unix socket.
-        self.url = "http://127.0.0.1:8000"
+        self.session = requests.Session()
         if url is not None:
             # for remote urls.
             self.url = url
+        elif os.path.exists(settings.API_SOCKET):
+            # directly connect to gunicorn, bypassing nginx as we are on the
+            # same host.
+            self.url = UNIX_URL
+            self.session.trust_env = False  # no proxies
+            self.session.mount(UNIX_URL, UnixSocketAdapter(settings.API_SOCKET))
+        else:
+            self.url = "http://127.0.0.1:8000"
+
+    def token_key(self):
+        return "api-token:{}:{}".format(
+            self.url, self.client_id or settings.OAUTH_INTERNAL_APP
+        )
+
+    def get_token(self):
+        """
+        Our current access token: from the prior one fetched by any of our
+        processes if still valid, otherwise newly requested.
+        """
+        if self.access_token is None or time.time() > self.expiration:
+            cached = HUEY.get(self.token_key(), peek=True)
+            if cached is not None and time.time() < cached[1]:
+                self.access_token, self.expiration = cached
+            else:
+                self.set_token()
+        return self.access_token
 
     def set_token(self):
         if self.client_id is None:
@@ -62,7 +143,7 @@ class APIWrapper(object):
         }
         content = None
         try:
-            response = requests.post(
+            response = self.session.post(
                 "%s/o/token/" % self.url,
                 data=token_request_data,
                 headers=auth_headers,
@@ -72,6 +153,7 @@ class APIWrapper(object):
             content = json.loads(response.content.decode("utf-8"))
             self.access_token = content["access_token"]
             self.expiration = int(time.time()) + content["expires_in"] - 600
+            HUEY.put(self.token_key(), (self.access_token, self.expiration))
         except Exception as e:
             msg = (
                 f"Exception while setting access_token for url({self.url}): {e.__str__()}. "
@@ -80,29 +162,28 @@ class APIWrapper(object):
             raise Exception(msg)
 
     def api_call(self, url, data=None, calltype="get", headers=None, save_error=True):
-        if self.access_token is None or time.time() > self.expiration:
-            self.set_token()
-
         api_auth_header = {
-            "Authorization": "Bearer " + self.access_token,
+            "Authorization": "Bearer " + self.get_token(),
         }
-        call = getattr(requests, calltype)
-        url = "%s/api/%s" % (self.url, url)
+        call = getattr(self.session, calltype)
+        api_url = "%s/api/%s" % (self.url, url)
         try:
             if headers is not None:
                 headers.update(api_auth_header)
                 if headers["content-type"] == "application/json":
-                    r = call(url, verify=False, data=json.dumps(data), headers=headers)
+                    r = call(
+                        api_url, verify=False, data=json.dumps(data), headers=headers
+                    )
                 else:
-                    r = call(url, verify=False, data=data, headers=headers)
+                    r = call(api_url, verify=False, data=data, headers=headers)
             else:
-                r = call(url, verify=False, headers=api_auth_header, data=data)
+                r = call(api_url, verify=False, headers=api_auth_header, data=data)
         except requests.exceptions.ConnectionError:
             print("Error connecting to Rockstor. Is it running?")
             raise
 
         if r.status_code == 404:
-            msg = "Invalid api end point: %s" % url
+            msg = "Invalid api end point: %s" % api_url
             raise RockStorAPIException(detail=msg)
 
         if r.status_code != 200:
@@ -140,3 +221,19 @@ class APIWrapper(object):
         except ValueError:
             ret_val = {}
         return ret_val
+
+    def api_batch(self, calls):
+        """
+        Several api calls in a single round trip, via our batch end point.
+        :param calls: list of {"url": "disks/scan", "method": "post",
+        "data": None}, method defaulting to "get" and data to None.
+        :return: list, in calls order, of {"url": url, "status": http status,
+        "data": response data}.
+        """
+        return self.api_call(
+            "batch",
+            data={"calls": calls},
+            calltype="post",
+            headers={"content-type": "application/json"},
+            save_error=False,
+        )
@@ -0,0 +1,167 @@
+"""
+Copyright (joint work) 2024 The Rockstor Project <https://rockstor.com>
+
+Rockstor is free software; you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published
+by the Free Software Foundation; either version 2 of the License,
+or (at your option) any later version.
+
+Rockstor is distributed in the hope that it will be useful, but
+WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program. If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import json
+import os
+import shutil
+import socketserver
+import tempfile
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler
+from unittest.mock import patch
+
+import requests
+from django.test.utils import override_settings
+from huey import MemoryHuey
+
+from cli.api_wrapper import APIWrapper, UNIX_URL
+
+"""
+To run the tests:
+cd /opt/rockstor/src/rockstor
+export DJANGO_SETTINGS_MODULE="settings"
+poetry run django-admin test -v 2 -p test_api_wrapper.py
+"""
+
+
+class APIServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path):
+        super().__init__(path, APIHandler)
+        self.connections = 0
+        self.token_requests = 0
+        self.calls = []
+
+
+class APITCPServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    """As per APIServer: on 127.0.0.1:<ephemeral port>, as our prior client."""
+
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), APIHandler)
+        self.connections = 0
+        self.token_requests = 0
+        self.calls = []
+
+
+class APIHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+
+    def setup(self):
+        super().setup()
+        self.server.connections += 1
+
+    def log_message(self, format, *args):
+        pass
+
+    def reply(self, data):
+        body = json.dumps(data).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        self.server.calls.append(
+            (self.command, self.path, self.headers["Authorization"])
+        )
+        self.reply({"path": self.path})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        self.rfile.read(length)
+        if self.path == "/o/token/":
+            self.server.token_requests += 1
+            self.reply({"access_token": "token-1", "expires_in": 36000})
+            return
+        self.do_GET()
+
+
+class APIWrapperTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        socket_path = os.path.join(self.tmp_dir, "gunicorn.sock")
+        self.server = APIServer(socket_path)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        settings_override = override_settings(API_SOCKET=socket_path)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        patch("cli.api_wrapper.HUEY", MemoryHuey()).start()
+
+    def tearDown(self):
+        patch.stopall()
+        self.server.shutdown()
+        self.server.server_close()
+        shutil.rmtree(self.tmp_dir)
+
+    def test_api_call(self):
+        aw = APIWrapper(client_id="cliapp", client_secret="secret")
+        self.assertEqual(aw.url, UNIX_URL)
+        for i in range(20):
+            self.assertEqual(aw.api_call("pools"), {"path": "/api/pools"})
+        aw.api_call("commands/uptime", calltype="post")
+        # One keep-alive connection, and a single access token.
+        self.assertEqual(self.server.connections, 1)
+        self.assertEqual(self.server.token_requests, 1)
+        self.assertEqual(len(self.server.calls), 21)
+        self.assertEqual(
+            self.server.calls[-1], ("POST", "/api/commands/uptime", "Bearer token-1")
+        )
+        # Another client (process): prior token shared via our Huey storage.
+        APIWrapper(client_id="cliapp", client_secret="secret").api_call("pools")
+        self.assertEqual(self.server.token_requests, 1)
+
+    def test_api_batch(self):
+        aw = APIWrapper(client_id="cliapp", client_secret="secret")
+        aw.api_batch([{"url": "disks/scan", "method": "post"}])
+        self.assertEqual(self.server.calls, [("POST", "/api/batch", "Bearer token-1")])
+
+    def test_api_call_benchmark(self):
+        """
+        Microbenchmark, calls/sec of 1,000 sequential GETs: our prior client
+        (module level requests.get over TCP: a new connection per call)
+        against APIWrapper over our unix socket (one keep-alive connection).
+        """
+        calls = 1000
+        tcp_server = APITCPServer()
+        threading.Thread(target=tcp_server.serve_forever, daemon=True).start()
+        self.addCleanup(tcp_server.server_close)
+        self.addCleanup(tcp_server.shutdown)
+        url = "http://127.0.0.1:{}/api/pools".format(tcp_server.server_address[1])
+        headers = {"Authorization": "Bearer token-1"}
+        start = time.monotonic()
+        for i in range(calls):
+            requests.get(url, verify=False, headers=headers, data=None)
+        before = calls / (time.monotonic() - start)
+        aw = APIWrapper(client_id="cliapp", client_secret="secret")
+        aw.get_token()
+        start = time.monotonic()
+        for i in range(calls):
+            aw.api_call("pools")
+        after = calls / (time.monotonic() - start)
+        self.assertEqual(tcp_server.connections, calls)
+        self.assertEqual(self.server.connections, 1)
+        self.assertLess(
+            before,
+            after,
+            msg="calls/sec before ({:.0f}), after ({:.0f})".format(before, after),
+        )
@@ -19,6 +19,8 @@ import json
 import re
 import time
 import os
+from functools import wraps
+from fs import btrfs_ioctl, btrfs_sysfs
 from system.osi import (
     run_command,
     create_tmp_dir,
@@ -30,9 +32,9 @@ from system.osi import (
     get_device_path,
     dev_mount_point,
 )
+from system.cache import invalidate
 from system.exceptions import CommandException
 from system.constants import MOUNT, UMOUNT, RMDIR, DEFAULT_MNT_DIR
-from fs.pool_scrub import PoolScrub
 from huey.contrib.djhuey import task
 from django.conf import settings
 import logging
@@ -271,6 +273,41 @@ PROFILE = {
 }
 
 
+def use_ioctl(func_name):
+    """
+    True if settings.BTRFS_BACKENDS selects our in-process ioctl backend
+    (fs/btrfs_ioctl.py) over btrfs-progs for the given function.
+    """
+    return settings.BTRFS_BACKENDS.get(func_name, "cli") == "ioctl"
+
+
+def ioctl_failed(func_name, e):
+    logger.error(
+        "btrfs ioctl backend failed for {}(), using btrfs-progs: {}".format(
+            func_name, e.__str__()
+        )
+    )
+
+
+def ioctl_backend(func):
+    """
+    Decorator: when selected via use_ioctl() call the same named function of
+    fs.btrfs_ioctl instead, falling back to the decorated btrfs-progs based
+    function should the ioctl backend fail, e.g. an older kernel.
+    """
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        if use_ioctl(func.__name__):
+            try:
+                return getattr(btrfs_ioctl, func.__name__)(*args, **kwargs)
+            except OSError as e:
+                ioctl_failed(func.__name__, e)
+        return func(*args, **kwargs)
+
+    return wrapper
+
+
 def add_pool(pool, disks):
     """
     Makes a btrfs pool (filesystem) of name 'pool' using the by-id disk names
@@ -328,6 +365,7 @@ def dev_stats_zero(target):
     return True
 
 
+@ioctl_backend
 def get_dev_io_error_stats(target, json_format=True):
     """
     Wrapper / parser for 'btrfs device stats -c target' intended to populate
@@ -421,26 +459,37 @@ def degraded_pools_found():
     :return: Number of degraded pools as indicated by any line ending in
     "missing" following an associated "Label" line.
     """
+    return len(degraded_pool_uuids())
+
+
+def degraded_pool_uuids():
+    """
+    As degraded_pools_found() but identifying each degraded pool, managed or
+    otherwise, by its btrfs uuid (Pool.uuid): for the data_collector's pool
+    health monitor to tell managed from unimported pools.
+    :return: set of uuids of pools with a "Label" line followed by a line
+    ending in "missing".
+    """
     # --raw used to minimise pre-processing of irrelevant 'used' info (units).
     cmd = [BTRFS, "fi", "show", "--raw"]
     o, e, rc = run_command(cmd)
-    degraded_pool_count = 0
-    in_pool = False
+    degraded = set()
+    uuid = None
     for line in o:
-        if not in_pool and line[0:3] == "Lab":
-            in_pool = True
+        if uuid is None and line[0:3] == "Lab":
+            # e.g. "Label: 'rock-pool'  uuid: 924d9d64-4943-4eac-a52e-1918e963a34f"
+            uuid = line.rpartition("uuid:")[2].strip()
             continue
         # Account for older and newer kernels respectively:
-        if in_pool and line.lower().endswith("missing"):
+        if uuid is not None and line.lower().endswith("missing"):
             # we are in pool details and have found a missing device
-            degraded_pool_count += 1
-            # use in_pool switch to avoid counting this pool twice if it has
-            # multiple missing as at least 1 missing dev is degraded.
-            in_pool = False
+            degraded.add(uuid)
+            # at least 1 missing dev is degraded: skip the rest of this pool.
+            uuid = None
         elif line == "":
             # pool listings delimited by blank lines
-            in_pool = False
-    return degraded_pool_count
+            uuid = None
+    return degraded
 
 
 def set_pool_label(label, dev_temp_name, root_pool=False):
@@ -941,6 +990,7 @@ def default_subvol():
     raise e
 
 
+@ioctl_backend
 def snapshot_idmap(pool_mnt_pt):
     """
     Executes 'btrfs subvol list -s pool_mnt_pt' and parses the result. Returns
@@ -984,17 +1034,15 @@ def shares_info(pool):
             return {}
         raise
     snap_idmap = snapshot_idmap(pool_mnt_pt)
+    # One read only subvol list for all snapshots, if any.
+    readonly_ids = subvol_readonly_ids(pool_mnt_pt) if snap_idmap else set()
     default_id = default_subvol().id
-    o, e, rc = run_command([BTRFS, "subvolume", "list", "-p", pool_mnt_pt])
     shares_d = {}
     share_ids = []
-    for l in o:
-        if re.match("ID ", l) is None:
-            continue
-        fields = l.split()
-        if fields[-1] in SUBVOL_EXCLUDE:
+    for vol_id, parent_id, path in subvol_list(pool_mnt_pt, "shares_info"):
+        if path in SUBVOL_EXCLUDE:
             logger.debug(
-                "Skipping system-wide excluded subvol: name=({}).".format(fields[-1])
+                "Skipping system-wide excluded subvol: name=({}).".format(path)
             )
             continue
         # Exclude root fs (in subvol) to avoid dependence on subvol name to
@@ -1007,18 +1055,16 @@ def shares_info(pool):
             # Vol/subvol auto mounted if no subvol/subvolid options are used.
             # Skipped to surface it's subvols as we only surface one layer.
             # Relevant to system rollback by booting from snapshots.
-            if fields[-1] in ROOT_SUBVOL_EXCLUDE or fields[1] == default_id:
-                logger.debug("Skipping excluded subvol: name=({}).".format(fields[-1]))
+            if path in ROOT_SUBVOL_EXCLUDE or vol_id == default_id:
+                logger.debug("Skipping excluded subvol: name=({}).".format(path))
                 continue
-        vol_id = fields[1]
         if vol_id in snap_idmap:
             # snapshot so check if is_clone:
             s_name, writable, is_clone = parse_snap_details(
-                pool_mnt_pt, snap_idmap[vol_id]
+                pool_mnt_pt, snap_idmap[vol_id], writable=vol_id not in readonly_ids
             )
             if not is_clone:
                 continue
-        parent_id = fields[5]
         if parent_id in share_ids:
             # subvol of subvol. add it so child subvols can also be ignored.
             share_ids.append(vol_id)
@@ -1026,7 +1072,7 @@ def shares_info(pool):
             # Boot to snapshot root pools are themselves a snapshot.
             # snapshot/subvol of snapshot.
             # add it so child subvols can also be ignored.
-            snap_idmap[vol_id] = fields[-1].replace("@/", "", 1)
+            snap_idmap[vol_id] = path.replace("@/", "", 1)
         else:
             # Found subvol of pool or excluded subvol-  storing for return.
             # Non snapper root rollback config:
@@ -1039,18 +1085,44 @@ def shares_info(pool):
             # vol/subvol via it's label we have /mnt2/ROOT not /mnt2/@.
             # Remove '@/' from rel path if found ie '@/home' to 'home' as then
             # pool+relative path works.
-            shares_d[fields[-1].replace("@/", "", 1)] = "0/{}".format(vol_id)
+            shares_d[path.replace("@/", "", 1)] = "0/{}".format(vol_id)
             share_ids.append(vol_id)
     return shares_d
 
 
-def parse_snap_details(pool_mnt_pt, snap_rel_path):
+def subvol_list(pool_mnt_pt, func_name):
+    """
+    Subvolumes as per "btrfs subvolume list -p pool_mnt_pt", or via our ioctl
+    backend if selected for func_name (see use_ioctl()).
+    :return: list of (id, parent id, path) string tuples, in id order.
+    """
+    if use_ioctl(func_name):
+        try:
+            return [
+                (s.id, s.parent_id, s.path) for s in btrfs_ioctl.subvolumes(pool_mnt_pt)
+            ]
+        except OSError as e:
+            ioctl_failed(func_name, e)
+    o, e, rc = run_command([BTRFS, "subvolume", "list", "-p", pool_mnt_pt])
+    subvols = []
+    for l in o:
+        if re.match("ID ", l) is None:
+            continue
+        # e.g. "ID 296 gen 4968 parent 257 top level 257 path home"
+        fields = l.split()
+        subvols.append((fields[1], fields[5], fields[-1]))
+    return subvols
+
+
+def parse_snap_details(pool_mnt_pt, snap_rel_path, writable=None):
     """
     Returns a snapshot,s name or None if that snap is deemed to be a clone.
     Clone (is_clone) = writable snapshot + direct child of pool_mnt_pt.
     All calls also return writable, and is_clone booleans.
     :param pool_mnt_pt:  Pool (vol) mount point, ie: settings.MNT_PT/pool.name
     :param snap_rel_path: Relative snapshot path .
+    :param writable: if known, e.g. via subvol_readonly_ids(), saves a
+    "btrfs property get" of the snapshot's ro property.
     :return: snap_name (None if clone), writable (Boolean), is_clone (Boolean)
     Note: is_clone is redundant but serves as a convenience boolean.
     """
@@ -1058,7 +1130,8 @@ def parse_snap_details(pool_mnt_pt, snap_rel_path):
         full_snap_path = pool_mnt_pt + snap_rel_path
     else:
         full_snap_path = pool_mnt_pt + "/" + snap_rel_path
-    writable = not get_property(full_snap_path, "ro")
+    if writable is None:
+        writable = not get_property(full_snap_path, "ro")
     snap_name = None
     is_clone = False
     if writable and (len(snap_rel_path.split("/")) == 1):
@@ -1073,56 +1146,115 @@ def snaps_info(pool_mnt_pt, share_name):
     """
     Generates a dictionary of Rockstor relevant on-pool snapshots which do not
     include clones. See parse_snap_details() for clone definition.
-    Works by analysing the varying output of differently optioned btrfs subvol
-    commands and parse_snap_details() to extract the snap name (from rel path)
-    and
+    Callers iterating over several shares of a pool should instead use a
+    single pool_snaps_info() index.
     :param pool_mnt_pt: Pool (vol) mount point, ie: settings.MNT_PT/pool.name
     :param share_name: share/snap.name
     :return: dict indexed by snap name with tuple values of:
     (qgroup, writable) where qgroup = 0/subvolid and writable = Boolean.
     """
-    # -p = show parent ID, -u = uuid of subvol, -q = parent uuid of subvol
-    o, e, rc = run_command([BTRFS, "subvolume", "list", "-u", "-p", "-q", pool_mnt_pt])
-    subvol_id = share_uuid = None
-    for l in o:
-        if re.match("ID ", l) is not None:
-            fields = l.split()
-            if fields[-1].replace("@/", "", 1) == share_name:
-                subvol_id = fields[1]
-                share_uuid = fields[12]
-    if subvol_id is None:
-        return {}
-    # addition options to above subvol list: -s = only show snapshot subvols
-    o, e, rc = run_command(
-        [BTRFS, "subvolume", "list", "-s", "-p", "-q", "-u", pool_mnt_pt]
-    )
-    snaps_d = {}
-    snap_uuids = []
-    for l in o:
-        if re.match("ID ", l) is not None:
-            fields = l.split()
-            # parent uuid must be share_uuid or another snapshot's uuid
-            if (
-                fields[7] != subvol_id
-                and fields[15] != share_uuid
-                and fields[15] not in snap_uuids
-            ):
-                continue
-            # Strip @/ prior to calling parse_snap_details, see:
-            # snapshot_idmap() for same.
-            stripped_path = fields[-1].replace("@/", "", 1)
-            snap_name, writable, is_clone = parse_snap_details(
-                pool_mnt_pt, stripped_path
-            )
-            # Redundant second clause - defence against 'None' dict index.
-            if not is_clone and snap_name is not None:
-                snaps_d[snap_name] = ("0/{}".format(fields[1]), writable)
-                # we rely on the observation that child snaps are listed after
-                # their parents, so no need to iterate through results
-                # separately. Instead, we add the uuid of a snap to the list
-                # and look up if it's a parent of subsequent entries.
-                snap_uuids.append(fields[17])
-    return snaps_d
+    return pool_snaps_info(pool_mnt_pt).get(share_name, {})
+
+
+def pool_snaps_info(pool_mnt_pt):
+    """
+    Pool level counterpart to snaps_info(): discovers the snapshots of all
+    shares/subvols of a pool at once. Works by analysing the varying output
+    of differently optioned btrfs subvol commands, a fixed three per pool,
+    with parse_snap_details() to extract the snap name (from rel path). Read
+    only flags come from "btrfs subvol list -r" rather than a "btrfs property
+    get" per snapshot. Our ioctl backend, if selected, runs no commands.
+    :param pool_mnt_pt: Pool (vol) mount point, ie: settings.MNT_PT/pool.name
+    :return: dict indexed by share/subvol name of snaps_info() results, i.e.
+    {share_name: {snap_name: (qgroup, writable)}}
+    """
+    subvols = snapshots = readonly_ids = None
+    if use_ioctl("snaps_info"):
+        try:
+            subvols = btrfs_ioctl.subvolumes(pool_mnt_pt)
+        except OSError as e:
+            ioctl_failed("snaps_info", e)
+    if subvols is not None:
+        # (id, parent id, uuid, parent uuid, path) as per the commands below.
+        snapshots = [
+            (s.id, s.parent_id, s.uuid, s.parent_uuid, s.path)
+            for s in subvols
+            if s.snapshot
+        ]
+        readonly_ids = {s.id for s in subvols if s.readonly}
+        subvols = [(s.id, s.parent_id, s.uuid, s.parent_uuid, s.path) for s in subvols]
+    else:
+        # -p = show parent ID, -u = uuid of subvol, -q = parent uuid of subvol
+        o, e, rc = run_command(
+            [BTRFS, "subvolume", "list", "-u", "-p", "-q", pool_mnt_pt]
+        )
+        subvols = [
+            (f[1], f[5], f[12], f[10], f[-1])
+            for f in (l.split() for l in o if re.match("ID ", l) is not None)
+        ]
+        if not subvols:
+            return {}
+        # addition options to above subvol list: -s = only show snapshot subvols
+        o, e, rc = run_command(
+            [BTRFS, "subvolume", "list", "-s", "-p", "-q", "-u", pool_mnt_pt]
+        )
+        snapshots = [
+            (f[1], f[7], f[17], f[15], f[-1])
+            for f in (l.split() for l in o if re.match("ID ", l) is not None)
+        ]
+        readonly_ids = subvol_readonly_ids(pool_mnt_pt)
+    # Shares are the subvols directly under the pool (vol), by path as per
+    # shares_info(): including clones and received replicas that btrfs lists
+    # as snapshots. Index their snapshots in a single pass over all snapshots.
+    shares = [sv for sv in subvols if "/" not in sv[4].replace("@/", "", 1)]
+    share_by_id = {sv[0]: sv[0] for sv in shares}
+    share_by_uuid = {sv[2]: sv[0] for sv in shares}
+    # Snapshot uuid: ids of the shares it is a snapshot of, directly or not.
+    snap_shares = {}
+    snaps_by_share = {sv[0]: {} for sv in shares}
+    for vol_id, parent_id, vol_uuid, parent_uuid, path in snapshots:
+        # parent uuid must be a share's uuid or another snapshot's uuid
+        owners = set(snap_shares.get(parent_uuid, ()))
+        for owner in (share_by_id.get(parent_id), share_by_uuid.get(parent_uuid)):
+            if owner is not None:
+                owners.add(owner)
+        if not owners:
+            continue
+        # Strip @/ prior to calling parse_snap_details, see:
+        # snapshot_idmap() for same.
+        stripped_path = path.replace("@/", "", 1)
+        snap_name, writable, is_clone = parse_snap_details(
+            pool_mnt_pt, stripped_path, writable=vol_id not in readonly_ids
+        )
+        # Redundant second clause - defence against 'None' dict index.
+        if not is_clone and snap_name is not None:
+            for owner in owners:
+                snaps_by_share[owner][snap_name] = ("0/{}".format(vol_id), writable)
+            # we rely on the observation that child snaps are listed after
+            # their parents: a snap of this snap belongs to the same shares.
+            snap_shares[vol_uuid] = owners
+    snaps_index = {}
+    for subvol_id, _, _, _, share_path in shares:
+        # As before, where share names collide the last listed subvol wins.
+        snaps_index[share_path.replace("@/", "", 1)] = snaps_by_share[subvol_id]
+    return snaps_index
+
+
+def subvol_readonly_ids(pool_mnt_pt):
+    """
+    Wrapper around "btrfs subvolume list -r pool_mnt_pt": one command in
+    place of a "btrfs property get subvol ro" per subvol, or none via our
+    ioctl backend if selected for get_property.
+    :param pool_mnt_pt: Pool (vol) mount point.
+    :return: set of the subvol ids (strings) of all read only subvols.
+    """
+    if use_ioctl("get_property"):
+        try:
+            return {s.id for s in btrfs_ioctl.subvolumes(pool_mnt_pt) if s.readonly}
+        except OSError as e:
+            ioctl_failed("get_property", e)
+    o, e, rc = run_command([BTRFS, "subvolume", "list", "-r", pool_mnt_pt])
+    return {l.split()[1] for l in o if re.match("ID ", l) is not None}
 
 
 def share_id(pool, share_name):
@@ -1261,6 +1393,7 @@ def switch_quota(pool, flag="enable"):
     cmd = [BTRFS, "quota", flag, root_mnt_pt]
     try:
         o, e, rc = run_command(cmd, log=True)
+        invalidate("quotas")
     except CommandException as e:
         # Avoid failure when attempting an enable/disable quota change if
         # our pool (vol) is ro: by catching this specific CommandException:
@@ -1310,6 +1443,7 @@ def rescan_quotas(pool):
     return o, e, rc
 
 
+@ioctl_backend
 def are_quotas_enabled(mnt_pt):
     """
     Simple wrapper around 'btrfs qgroup show -f --raw mnt_pt' intended
@@ -1345,6 +1479,18 @@ def qgroup_exists(mnt_pt, qgroup):
     :param qgroup: qgroup of the form 2015/n (intended for use with pqgroup)
     :return: True is given qgroup exists in command output, False otherwise.
     """
+    return qgroup in qgroup_ids(mnt_pt)
+
+
+@ioctl_backend
+def qgroup_ids(mnt_pt):
+    """
+    Wrapper around 'btrfs qgroup show --raw mnt_pt' to list the qgroup ids of
+    a btrfs filesystem: as these are per filesystem any mount point within it
+    will do, allowing e.g. all of a pool's shares to share one call.
+    :param mnt_pt: btrfs filesystem mount point, usually the pool.
+    :return: list of qgroup ids, empty if none could be read.
+    """
     o, e, rc = run_command([BTRFS, "qgroup", "show", "--raw", mnt_pt])
     # example output:
     # 'qgroupid         rfer         excl '
@@ -1354,12 +1500,10 @@ def qgroup_exists(mnt_pt, qgroup):
     # '2015/12             0            0 '
     if rc == 0 and len(o) > 2:
         # index from 2 to miss header lines and -1 to skip end blank line = []
-        qgroup_list = [line.split()[0] for line in o[2:-1]]
         # eg from rockstor_rockstor pool we get:
-        # qgroup_list=['0/5', '0/257', '0/258', '0/260', '2015/1', '2015/2']
-        if qgroup in qgroup_list:
-            return True
-    return False
+        # ['0/5', '0/257', '0/258', '0/260', '2015/1', '2015/2']
+        return [line.split()[0] for line in o[2:-1]]
+    return []
 
 
 def qgroup_id(pool, share_name):
@@ -1367,6 +1511,7 @@ def qgroup_id(pool, share_name):
     return "0/" + sid
 
 
+@ioctl_backend
 def qgroup_max(mnt_pt):
     """
     Parses the output of "btrfs qgroup show mnt_pt" to find the highest qgroup
@@ -1450,6 +1595,7 @@ def qgroup_create(pool, qgroup=PQGROUP_DEFAULT):
         qid = "{}/{}".format(QID, max_native_qgroup + 1)
     try:
         out, err, rc = run_command([BTRFS, "qgroup", "create", qid, mnt_pt], log=False)
+        invalidate("quotas")
     except CommandException as e:
         # ro mount options will result in o= [''], rc = 1 and e[0] =
         emsg = "ERROR: unable to create quota group: Read-only file system"
@@ -1498,7 +1644,9 @@ def qgroup_destroy(qid, mnt_pt):
         raise e
     for l in o:
         if re.match(qid, l) is not None and l.split()[0] == qid:
-            return run_command([BTRFS, "qgroup", "destroy", qid, mnt_pt], log=True)
+            out = run_command([BTRFS, "qgroup", "destroy", qid, mnt_pt], log=True)
+            invalidate("quotas")
+            return out
     return False
 
 
@@ -1671,7 +1819,41 @@ def update_quota(pool, qgroup, size_bytes):
     return out, err, rc
 
 
-def volume_usage(pool, volume_id, pvolume_id=None):
+def pool_qgroup_usage(pool):
+    """
+    Pool level counterpart to volume_usage(): a single "btrfs qgroup show"
+    against the pool mount point lists every qgroup on that pool, so we parse
+    it once and index the results by qgroupid. Intended for callers that
+    would otherwise call volume_usage() for every share and snapshot of a
+    pool, i.e. import_shares() and import_snapshots().
+    Quotas disabled or indeterminate returns an empty dict, as with
+    volume_usage() all unknown qgroups then read as zero usage.
+    :param pool: Pool object
+    :return: dict indexed by qgroupid eg '0/261' or '2015/4' with values of
+    [rfer, excl] in KiB.
+    """
+    root_pool_mnt = mount_root(pool)
+    if use_ioctl("pool_qgroup_usage"):
+        try:
+            return btrfs_ioctl.qgroup_usage(root_pool_mnt)
+        except OSError as e:
+            ioctl_failed("pool_qgroup_usage", e)
+    # Here we depend on fail through throw=False if quotas are disabled/indeterminate
+    cmd = [BTRFS, "qgroup", "show", root_pool_mnt]
+    out, err, rc = run_command(cmd, log=False, throw=False)
+    usage_map = {}
+    for line in out:
+        fields = line.split()
+        # We may index up to [2] fields (3 values) so ensure they exist.
+        if len(fields) > 2 and "/" in fields[0]:
+            usage_map[fields[0]] = [
+                convert_to_kib(fields[1]),
+                convert_to_kib(fields[2]),
+            ]
+    return usage_map
+
+
+def volume_usage(pool, volume_id, pvolume_id=None, usage_map=None):
     """
     New function to collect volumes rusage and eusage instead of share_usage
     plus parent rusage and eusage (2015/* qgroup)
@@ -1682,10 +1864,23 @@ def volume_usage(pool, volume_id, pvolume_id=None):
     :param pool: Pool object
     :param volume_id: qgroupid eg '0/261'
     :param pvolume_id: qgroupid eg '2015/4'
+    :param usage_map: optional pool_qgroup_usage() result for this pool. When
+    passed no commands are run and the usage is taken from this map instead.
     :return: list of len 2 (when pvolume_id=None) or 4 elements. The first 2
     pertain to the qgroupid=volume_id the second 2, if present, are for the
     qgroupid=pvolume_id. I.e [rfer, excl, rfer, excl]
     """
+    if usage_map is None and use_ioctl("volume_usage"):
+        # Qgroups are per filesystem: the pool's list serves all its volumes.
+        try:
+            usage_map = btrfs_ioctl.qgroup_usage(mount_root(pool))
+        except OSError as e:
+            ioctl_failed("volume_usage", e)
+    if usage_map is not None:
+        volume_id_sizes = list(usage_map.get(volume_id, [0, 0]))
+        if pvolume_id is None:
+            return volume_id_sizes
+        return volume_id_sizes + list(usage_map.get(pvolume_id, [0, 0]))
     # Obtain path to share in pool, this preserved because
     # granting pool exists
     root_pool_mnt = mount_root(pool)
@@ -1761,13 +1956,22 @@ def shares_usage(pool, share_map, snap_map):
     return usage_map
 
 
-def pool_usage(mnt_pt):
+def pool_usage(mnt_pt, fsid=None):
     """Return used space of the storage pool mounted at mnt_pt.
 
     Used space is considered to be:
     - All space currently used by data;
     - All space currently allocated for metadata and system data.
+
+    Given the pool's fsid (Pool.uuid) this is read from sysfs, see
+    fs.btrfs_sysfs.pool_usage(), falling back to 'btrfs fi usage' if
+    unavailable, e.g. pool not mounted.
     """
+    if fsid is not None:
+        try:
+            return btrfs_sysfs.pool_usage(fsid)
+        except (OSError, ValueError) as e:
+            logger.debug("No sysfs usage for pool ({}): {}.".format(fsid, e))
     cmd = [BTRFS, "fi", "usage", "-b", mnt_pt]
     out, err, rc = run_command(cmd)
 
@@ -1852,11 +2056,22 @@ def usage_bound(disk_sizes, num_devices, raid_level):
     return bound * ((chunks / data_copies) - data_parity) + new_bound
 
 
-def scrub_start(pool, force=False):
-    mnt_pt = mount_root(pool)
-    p = PoolScrub(mnt_pt, force)
-    p.start()
-    return p.pid
+def scrub_start_cmd(mnt_pt, force=False):
+    """
+    :param mnt_pt: pool mount point.
+    :param force: start even if a scrub appears to be running (-f).
+    :return: 'btrfs scrub start' command, as run by our scrub job: see
+    storageadmin/views/pool_scrub.py. Returns once the scrub has started in
+    the background.
+    """
+    cmd = [BTRFS, "scrub", "start", mnt_pt]
+    if force:
+        cmd.insert(3, "-f")
+    return cmd
+
+
+def scrub_cancel(mnt_pt):
+    return run_command([BTRFS, "scrub", "cancel", mnt_pt], throw=False, log=True)
 
 
 def btrfsprogs_legacy() -> bool:
@@ -2137,6 +2352,7 @@ def balance_status(pool):
     return stats
 
 
+@ioctl_backend
 def get_devid_usage(mnt_pt):
     """
     Extracts device usage information for a given mount point; includes
@@ -2321,6 +2537,7 @@ def set_property(mnt_pt, name, val, mount=True, force=False):
         return run_command(cmd)
 
 
+@ioctl_backend
 def get_property(mnt_pt, prop_name=None):
     """
     Convenience wrapper around 'btrfs property get prop_name mnt_pt'.
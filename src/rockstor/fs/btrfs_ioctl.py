@@ -0,0 +1,485 @@
+"""
+Copyright (joint work) 2024 The Rockstor Project <https://rockstor.com>
+
+Rockstor is free software; you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published
+by the Free Software Foundation; either version 2 of the License,
+or (at your option) any later version.
+
+Rockstor is distributed in the hope that it will be useful, but
+WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program. If not, see <https://www.gnu.org/licenses/>.
+"""
+
+"""
+In-process btrfs queries via kernel ioctls: an optional backend for a number
+of fs/btrfs.py functions, selected per function via settings.BTRFS_BACKENDS.
+Functions here return the same structures as their fs/btrfs.py namesakes but
+read the filesystem trees directly (as btrfs-progs does) rather than running
+and parsing btrfs-progs: no fork per call and no dependency on the text
+format of a given btrfs-progs version.
+All functions raise OSError on ioctl failure; fs/btrfs.py then falls back to
+btrfs-progs. As with btrfs-progs, tree searches require CAP_SYS_ADMIN.
+Structure layouts are as per the kernel's include/uapi/linux/btrfs.h and
+btrfs_tree.h (little endian hosts).
+"""
+
+import errno
+import fcntl
+import glob
+import json
+import os
+import struct
+import uuid
+from collections import namedtuple
+from contextlib import contextmanager
+
+from system.osi import get_device_path, mounts
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+BTRFS_IOCTL_MAGIC = 0x94
+
+
+def _ioc(direction, nr, size):
+    return (direction << 30) | (size << 16) | (BTRFS_IOCTL_MAGIC << 8) | nr
+
+
+def _ior(nr, size):
+    return _ioc(2, nr, size)
+
+
+def _iowr(nr, size):
+    return _ioc(3, nr, size)
+
+
+U64_MAX = 2**64 - 1
+
+# struct btrfs_ioctl_search_key, then the v2 args buf_size field.
+SEARCH_KEY_FMT = "=7Q4L4Q"
+SEARCH_ARGS_V2_FMT = SEARCH_KEY_FMT + "Q"
+SEARCH_ARGS_V2_SIZE = struct.calcsize(SEARCH_ARGS_V2_FMT)  # 112
+SEARCH_NR_ITEMS_OFFSET = 64
+# struct btrfs_ioctl_search_header: transid, objectid, offset, type, len.
+SEARCH_HEADER_FMT = "=3Q2L"
+SEARCH_HEADER_SIZE = struct.calcsize(SEARCH_HEADER_FMT)  # 32
+SEARCH_BUF_SIZE = 64 * 1024
+INO_LOOKUP_SIZE = 4096
+FS_INFO_SIZE = 1024
+DEV_INFO_SIZE = 4096
+DEV_INFO_PATH_OFFSET = 3072
+DEV_STATS_SIZE = 1032
+LABEL_SIZE = 256
+
+BTRFS_IOC_SUBVOL_GETFLAGS = _ior(25, 8)
+BTRFS_IOC_TREE_SEARCH_V2 = _iowr(17, SEARCH_ARGS_V2_SIZE)
+BTRFS_IOC_INO_LOOKUP = _iowr(18, INO_LOOKUP_SIZE)
+BTRFS_IOC_DEV_INFO = _iowr(30, DEV_INFO_SIZE)
+BTRFS_IOC_FS_INFO = _ior(31, FS_INFO_SIZE)
+BTRFS_IOC_GET_FSLABEL = _ior(49, LABEL_SIZE)
+BTRFS_IOC_GET_DEV_STATS = _iowr(52, DEV_STATS_SIZE)
+
+# Tree ids, object ids, and item key types.
+ROOT_TREE_OBJECTID = 1
+FS_TREE_OBJECTID = 5
+QUOTA_TREE_OBJECTID = 8
+FIRST_FREE_OBJECTID = 256
+LAST_FREE_OBJECTID = 2**64 - 256
+ROOT_ITEM_KEY = 132
+ROOT_BACKREF_KEY = 144
+QGROUP_STATUS_KEY = 240
+QGROUP_INFO_KEY = 242
+
+# struct btrfs_root_item offsets: after its embedded 160 byte inode item.
+ROOT_ITEM_FLAGS_OFFSET = 208
+ROOT_ITEM_UUID_OFFSET = 247
+ROOT_ITEM_PARENT_UUID_OFFSET = 263
+ROOT_SUBVOL_RDONLY = 1 << 0
+# BTRFS_IOC_SUBVOL_GETFLAGS flags.
+SUBVOL_RDONLY = 1 << 1
+QGROUP_STATUS_FLAG_ON = 1 << 0
+QGROUP_LEVEL_SHIFT = 48
+
+# As per "btrfs device stats" and get_dev_io_error_stats(), in kernel order.
+DEV_STAT_NAMES = [
+    "write_io_errs",
+    "read_io_errs",
+    "flush_io_errs",
+    "corruption_errs",
+    "generation_errs",
+]
+
+# A subvolume as per "btrfs subvolume list -p -u -q", ids as strings.
+# path is relative to the top level (5), e.g. "@/home" or ".snapshots/a/b".
+# uuid/parent_uuid are "-" if unset, snapshot as per "btrfs subvol list -s".
+Subvol = namedtuple("Subvol", "id parent_id path uuid parent_uuid snapshot readonly")
+
+
+@contextmanager
+def _open(path):
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        yield fd
+    finally:
+        os.close(fd)
+
+
+def tree_search(fd, tree_id, min_key, max_key):
+    """
+    Generator over the items of a btrfs tree via BTRFS_IOC_TREE_SEARCH_V2.
+    Keys are (objectid, type, offset) and compared as a whole, so items of
+    other types within the key range are also returned: callers filter on type.
+    :param fd: file descriptor within the filesystem.
+    :param tree_id: e.g. ROOT_TREE_OBJECTID
+    :param min_key: first (objectid, type, offset) of interest.
+    :param max_key: last (objectid, type, offset) of interest.
+    :return: (objectid, type, offset, data) for each item found.
+    """
+    min_key = tuple(min_key)
+    while True:
+        args = bytearray(SEARCH_ARGS_V2_SIZE + SEARCH_BUF_SIZE)
+        struct.pack_into(
+            SEARCH_ARGS_V2_FMT,
+            args,
+            0,
+            tree_id,
+            min_key[0],
+            max_key[0],
+            min_key[2],
+            max_key[2],
+            0,
+            U64_MAX,
+            min_key[1],
+            max_key[1],
+            4096,  # nr_items: max requested, returned count on completion.
+            0,
+            0,
+            0,
+            0,
+            0,
+            SEARCH_BUF_SIZE,
+        )
+        fcntl.ioctl(fd, BTRFS_IOC_TREE_SEARCH_V2, args)
+        (nr_items,) = struct.unpack_from("=L", args, SEARCH_NR_ITEMS_OFFSET)
+        if nr_items == 0:
+            return
+        pos = SEARCH_ARGS_V2_SIZE
+        for _ in range(nr_items):
+            transid, objectid, offset, item_type, length = struct.unpack_from(
+                SEARCH_HEADER_FMT, args, pos
+            )
+            pos += SEARCH_HEADER_SIZE
+            yield objectid, item_type, offset, bytes(args[pos : pos + length])
+            pos += length
+        # Resume from the key following the last item returned.
+        if offset < U64_MAX:
+            min_key = (objectid, item_type, offset + 1)
+        elif item_type < 255:
+            min_key = (objectid, item_type + 1, 0)
+        elif objectid < U64_MAX:
+            min_key = (objectid + 1, 0, 0)
+        else:
+            return
+        if min_key > tuple(max_key):
+            return
+
+
+def ino_lookup(fd, tree_id, objectid) -> str:
+    """
+    Path of directory objectid within subvolume tree_id, relative to the
+    subvolume root, with a trailing "/" (or "" for the root directory itself).
+    """
+    args = bytearray(INO_LOOKUP_SIZE)
+    struct.pack_into("=2Q", args, 0, tree_id, objectid)
+    fcntl.ioctl(fd, BTRFS_IOC_INO_LOOKUP, args)
+    return os.fsdecode(bytes(args[16:]).split(b"\0", 1)[0])
+
+
+def _uuid(raw) -> str:
+    if len(raw) < 16 or not any(raw):
+        return "-"
+    return str(uuid.UUID(bytes=bytes(raw)))
+
+
+def subvolumes(mnt_pt):
+    """
+    All subvolumes of the filesystem mounted at mnt_pt, in subvolume id order,
+    as per "btrfs subvolume list -p -u -q mnt_pt" (and -s via Subvol.snapshot).
+    From a single root tree search plus one ino lookup per subvolume.
+    :param mnt_pt: any mount point of the filesystem, usually the pool.
+    :return: list of Subvol
+    """
+    root_items = {}
+    backrefs = {}
+    with _open(mnt_pt) as fd:
+        for objectid, item_type, offset, data in tree_search(
+            fd,
+            ROOT_TREE_OBJECTID,
+            (FIRST_FREE_OBJECTID, ROOT_ITEM_KEY, 0),
+            (LAST_FREE_OBJECTID, ROOT_BACKREF_KEY, U64_MAX),
+        ):
+            if item_type == ROOT_ITEM_KEY:
+                # Snapshots have their creation transid as key offset.
+                root_items[objectid] = (offset, data)
+            elif item_type == ROOT_BACKREF_KEY and objectid not in backrefs:
+                # struct btrfs_root_ref: dirid, sequence, name_len, then name.
+                dirid, sequence, name_len = struct.unpack_from("=2QH", data)
+                name = os.fsdecode(data[18 : 18 + name_len])
+                backrefs[objectid] = (offset, dirid, name)
+        paths = {}
+
+        def path(subvol_id):
+            if subvol_id not in paths:
+                parent_id, dirid, name = backrefs[subvol_id]
+                rel_path = ino_lookup(fd, parent_id, dirid) + name
+                if parent_id == FS_TREE_OBJECTID:
+                    paths[subvol_id] = rel_path
+                elif parent_id in backrefs:
+                    parent_path = path(parent_id)
+                    paths[subvol_id] = (
+                        None if parent_path is None else parent_path + "/" + rel_path
+                    )
+                else:
+                    # Parent is being deleted.
+                    paths[subvol_id] = None
+            return paths[subvol_id]
+
+        subvols = []
+        for subvol_id in sorted(backrefs):
+            if subvol_id not in root_items or path(subvol_id) is None:
+                continue
+            offset, data = root_items[subvol_id]
+            (flags,) = struct.unpack_from("=Q", data, ROOT_ITEM_FLAGS_OFFSET)
+            subvols.append(
+                Subvol(
+                    id=str(subvol_id),
+                    parent_id=str(backrefs[subvol_id][0]),
+                    path=paths[subvol_id],
+                    # Root items predating 3.6 kernels have no uuids.
+                    uuid=_uuid(
+                        data[ROOT_ITEM_UUID_OFFSET : ROOT_ITEM_UUID_OFFSET + 16]
+                    ),
+                    parent_uuid=_uuid(
+                        data[
+                            ROOT_ITEM_PARENT_UUID_OFFSET : ROOT_ITEM_PARENT_UUID_OFFSET
+                            + 16
+                        ]
+                    ),
+                    snapshot=offset != 0,
+                    readonly=bool(flags & ROOT_SUBVOL_RDONLY),
+                )
+            )
+    return subvols
+
+
+def snapshot_idmap(pool_mnt_pt):
+    """See fs.btrfs.snapshot_idmap()"""
+    return {
+        s.id: s.path.replace("@/", "", 1) for s in subvolumes(pool_mnt_pt) if s.snapshot
+    }
+
+
+def qgroups(mnt_pt):
+    """
+    Reads the quota tree: the equivalent of "btrfs qgroup show --raw mnt_pt".
+    :param mnt_pt: any mount point of the filesystem, usually the pool.
+    :return: (enabled, usage) where enabled is the quota status, and usage
+    a dict indexed by qgroupid eg '0/261' or '2015/4' with values of
+    [rfer, excl] in KiB, in qgroupid order. Without a quota tree, i.e. quotas
+    disabled, (False, {}).
+    """
+    enabled = False
+    usage = {}
+    with _open(mnt_pt) as fd:
+        try:
+            for objectid, item_type, offset, data in tree_search(
+                fd,
+                QUOTA_TREE_OBJECTID,
+                (0, QGROUP_STATUS_KEY, 0),
+                (0, QGROUP_INFO_KEY, U64_MAX),
+            ):
+                if item_type == QGROUP_STATUS_KEY:
+                    # version, generation, flags, rescan
+                    flags = struct.unpack_from("=4Q", data)[2]
+                    enabled = bool(flags & QGROUP_STATUS_FLAG_ON)
+                elif item_type == QGROUP_INFO_KEY:
+                    # generation, rfer, rfer_cmpr, excl, excl_cmpr
+                    info = struct.unpack_from("=5Q", data)
+                    qgroupid = "{}/{}".format(
+                        offset >> QGROUP_LEVEL_SHIFT,
+                        offset & ((1 << QGROUP_LEVEL_SHIFT) - 1),
+                    )
+                    usage[qgroupid] = [info[1] // 1024, info[3] // 1024]
+        except OSError as e:
+            if e.errno != errno.ENOENT:
+                raise
+            return False, {}
+    return enabled, usage
+
+
+def qgroup_usage(mnt_pt):
+    """See fs.btrfs.pool_qgroup_usage()"""
+    return qgroups(mnt_pt)[1]
+
+
+def are_quotas_enabled(mnt_pt):
+    """See fs.btrfs.are_quotas_enabled()"""
+    return qgroups(mnt_pt)[0]
+
+
+def qgroup_ids(mnt_pt):
+    """See fs.btrfs.qgroup_ids()"""
+    return list(qgroups(mnt_pt)[1])
+
+
+def qgroup_max(mnt_pt):
+    """See fs.btrfs.qgroup_max()"""
+    from fs.btrfs import QID
+
+    enabled, usage = qgroups(mnt_pt)
+    if not enabled:
+        logger.info(
+            "Mount Point: {} has Quotas disabled, skipping qgroup "
+            "show.".format(mnt_pt)
+        )
+        return -1
+    res = 0
+    for qgroupid in usage:
+        level, cid = qgroupid.split("/")
+        if level == QID:
+            res = max(res, int(cid))
+    return res
+
+
+def get_property(mnt_pt, prop_name=None):
+    """
+    See fs.btrfs.get_property(): ro for subvolumes, label for mount points,
+    and compression if set.
+    """
+    properties = {}
+    with _open(mnt_pt) as fd:
+        if prop_name in (None, "ro") and os.fstat(fd).st_ino == FIRST_FREE_OBJECTID:
+            flags = bytearray(8)
+            fcntl.ioctl(fd, BTRFS_IOC_SUBVOL_GETFLAGS, flags)
+            properties["ro"] = bool(struct.unpack("=Q", flags)[0] & SUBVOL_RDONLY)
+        if prop_name in (None, "label") and os.path.ismount(mnt_pt):
+            label = bytearray(LABEL_SIZE)
+            fcntl.ioctl(fd, BTRFS_IOC_GET_FSLABEL, label)
+            properties["label"] = os.fsdecode(bytes(label).split(b"\0", 1)[0])
+    if prop_name in (None, "compression"):
+        try:
+            compression = os.getxattr(mnt_pt, "btrfs.compression")
+        except OSError as e:
+            if e.errno != errno.ENODATA:
+                raise
+        else:
+            if compression:
+                properties["compression"] = os.fsdecode(compression)
+    if prop_name is None:
+        return properties
+    return properties.get(prop_name)
+
+
+def device_mount_point(dev):
+    """
+    A mount point of the btrfs filesystem that device dev is a member of.
+    Unlike system.osi.dev_mount_point() any member of a multi-device pool will
+    do, via sysfs (/sys/fs/btrfs/<fsid>/devices/<kernel name>).
+    :param dev: device path, e.g. /dev/sda or /dev/dm-0 (no symlinks).
+    :return: mount point or None if not part of a mounted btrfs filesystem.
+    """
+    kernel_name = os.path.basename(dev)
+    for devices_dir in glob.glob("/sys/fs/btrfs/*/devices"):
+        members = os.listdir(devices_dir)
+        if kernel_name not in members:
+            continue
+        for entry in mounts.entries().values():
+            if entry.fstype != "btrfs":
+                continue
+            if os.path.basename(os.path.realpath(entry.source)) in members:
+                return entry.mnt_pt
+    return None
+
+
+def dev_infos(fd):
+    """
+    Generator of the devices within the filesystem of fd.
+    :return: (devid, bytes_used, total_bytes, path) tuples, path is "" for
+    missing (detached) devices.
+    """
+    fs_info = bytearray(FS_INFO_SIZE)
+    fcntl.ioctl(fd, BTRFS_IOC_FS_INFO, fs_info)
+    (max_id,) = struct.unpack_from("=Q", fs_info)
+    for devid in range(1, max_id + 1):
+        dev_info = bytearray(DEV_INFO_SIZE)
+        struct.pack_into("=Q", dev_info, 0, devid)
+        try:
+            fcntl.ioctl(fd, BTRFS_IOC_DEV_INFO, dev_info)
+        except OSError as e:
+            if e.errno == errno.ENODEV:  # devid gap, e.g. after a device removal.
+                continue
+            raise
+        # devid, uuid[16], bytes_used, total_bytes.
+        bytes_used, total_bytes = struct.unpack_from("=2Q", dev_info, 24)
+        path = bytes(dev_info[DEV_INFO_PATH_OFFSET:]).split(b"\0", 1)[0]
+        yield devid, bytes_used, total_bytes, os.fsdecode(path)
+
+
+def device_id(fd, dev):
+    """
+    btrfs devid of device dev within the filesystem of fd, or None.
+    :param dev: device path, no symlinks.
+    """
+    for devid, _, _, path in dev_infos(fd):
+        if path != "" and os.path.realpath(path) == dev:
+            return devid
+    return None
+
+
+def get_devid_usage(mnt_pt):
+    """
+    See fs.btrfs.get_devid_usage(): allocated is the sum of all chunks
+    allocated on each device, as per "btrfs device usage".
+    """
+    from fs.btrfs import DevUsageInfo
+
+    devid_usage_info = {}
+    with _open(mnt_pt) as fd:
+        for devid, bytes_used, total_bytes, path in dev_infos(fd):
+            devid_usage_info[devid] = DevUsageInfo(
+                temp_name=path if path != "" else "missing",
+                size=total_bytes / 1024,
+                allocated=bytes_used / 1024,
+            )
+    return devid_usage_info
+
+
+def get_dev_io_error_stats(target, json_format=True):
+    """See fs.btrfs.get_dev_io_error_stats()"""
+    dev = os.path.realpath(get_device_path(target))
+    mnt_pt = device_mount_point(dev)
+    if mnt_pt is None:
+        return None
+    with _open(mnt_pt) as fd:
+        devid = device_id(fd, dev)
+        if devid is None:
+            return None
+        args = bytearray(DEV_STATS_SIZE)
+        # devid, nr_items, flags (0 = don't reset)
+        struct.pack_into("=3Q", args, 0, devid, len(DEV_STAT_NAMES), 0)
+        fcntl.ioctl(fd, BTRFS_IOC_GET_DEV_STATS, args)
+    nr_items = struct.unpack_from("=Q", args, 8)[0]
+    values = struct.unpack_from("={}Q".format(len(DEV_STAT_NAMES)), args, 24)
+    stats = {
+        name: str(values[i]) if i < nr_items else "0"
+        for i, name in enumerate(DEV_STAT_NAMES)
+    }
+    if not json_format:
+        return stats
+    return json.dumps(stats)
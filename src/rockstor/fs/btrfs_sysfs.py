@@ -0,0 +1,123 @@
+"""
+Copyright (joint work) 2024 The Rockstor Project <https://rockstor.com>
+
+Rockstor is free software; you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published
+by the Free Software Foundation; either version 2 of the License,
+or (at your option) any later version.
+
+Rockstor is distributed in the hope that it will be useful, but
+WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program. If not, see <https://www.gnu.org/licenses/>.
+"""
+
+"""
+Readers for the per filesystem btrfs sysfs interface of mounted pools:
+/sys/fs/btrfs/<fsid>/ where fsid is our Pool.uuid. A few small file reads in
+place of running and parsing "btrfs fi usage".
+See https://btrfs.readthedocs.io/en/latest/ch-sysfs.html
+"""
+
+import os
+import threading
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+SYSFS_BTRFS = "/sys/fs/btrfs"
+ALLOCATION_TYPES = ["data", "metadata", "system"]
+
+# fsid: (generation, used)
+_usage_cache = {}
+_usage_lock = threading.Lock()
+
+
+def _read_int(path) -> int:
+    with open(path) as sfo:
+        return int(sfo.read().strip())
+
+
+def fs_generation(fsid):
+    """
+    Current transaction generation of a mounted pool, as exposed since kernel
+    5.11; None if unavailable. Unchanged generation = no committed changes.
+    """
+    try:
+        return _read_int(os.path.join(SYSFS_BTRFS, fsid, "generation"))
+    except (OSError, ValueError):
+        return None
+
+
+def allocation(fsid):
+    """
+    Per allocation type (block group) usage of a mounted pool, as reported by
+    the "Data", "Metadata" and "System" lines of "btrfs fi usage -b".
+    :param fsid: btrfs filesystem uuid, i.e. Pool.uuid
+    :return: {"data": {"total_bytes": int, "bytes_used": int}, "metadata": ...}
+    :raises OSError: if the pool is not mounted, or no such sysfs interface.
+    """
+    alloc = {}
+    for alloc_type in ALLOCATION_TYPES:
+        type_dir = os.path.join(SYSFS_BTRFS, fsid, "allocation", alloc_type)
+        alloc[alloc_type] = {
+            "total_bytes": _read_int(os.path.join(type_dir, "total_bytes")),
+            "bytes_used": _read_int(os.path.join(type_dir, "bytes_used")),
+        }
+    return alloc
+
+
+def pool_usage(fsid):
+    """
+    sysfs counterpart to fs.btrfs.pool_usage(): used space is all space used by
+    data plus all space allocated for metadata and system data.
+    Cached per pool against its generation: while no transaction has been
+    committed repeat calls read only the generation.
+    :param fsid: btrfs filesystem uuid, i.e. Pool.uuid
+    :return: used space in KB.
+    :raises OSError: if the pool is not mounted, or no such sysfs interface.
+    """
+    generation = fs_generation(fsid)
+    if generation is not None:
+        with _usage_lock:
+            cached = _usage_cache.get(fsid)
+        if cached is not None and cached[0] == generation:
+            return cached[1]
+    alloc = allocation(fsid)
+    used = (
+        alloc["data"]["bytes_used"]
+        + alloc["metadata"]["total_bytes"]
+        + alloc["system"]["total_bytes"]
+    ) / 1024
+    if generation is not None:
+        with _usage_lock:
+            _usage_cache[fsid] = (generation, used)
+    return used
+
+
+def dev_health(fsid):
+    """
+    sysfs counterpart to fs.btrfs.pool_missing_dev_count() and
+    dev_stats_zero() of a mounted pool, from its per device entries:
+    devinfo/<devid>/missing and devinfo/<devid>/error_stats (kernel 5.14+).
+    :param fsid: btrfs filesystem uuid, i.e. Pool.uuid
+    :return: (missing device count, True if all device error counters are zero)
+    :raises OSError: if the pool is not mounted, or no such sysfs interface.
+    """
+    devinfo = os.path.join(SYSFS_BTRFS, fsid, "devinfo")
+    missing = 0
+    stats_zero = True
+    for devid in os.listdir(devinfo):
+        dev_dir = os.path.join(devinfo, devid)
+        missing += _read_int(os.path.join(dev_dir, "missing"))
+        # e.g. "write_errs 0\nread_errs 0\nflush_errs 0\ncorruption_errs 0\n..."
+        with open(os.path.join(dev_dir, "error_stats")) as sfo:
+            for line in sfo:
+                fields = line.split()
+                if len(fields) == 2 and fields[1] != "0":
+                    stats_zero = False
+    return missing, stats_zero
@@ -19,14 +19,18 @@ from fs.btrfs import (
     get_pool_raid_levels,
     is_subvol,
     volume_usage,
+    pool_qgroup_usage,
     balance_status,
     share_id,
     device_scan,
     degraded_pools_found,
+    degraded_pool_uuids,
     snapshot_idmap,
     get_property,
     parse_snap_details,
     shares_info,
+    snaps_info,
+    pool_snaps_info,
     get_snap,
     dev_stats_zero,
     get_dev_io_error_stats,
@@ -52,6 +56,118 @@ poetry run django-admin test -v 3 -p test_btrfs*
 """
 
 
+# Fixtures shared with test_btrfs_ioctl.py as golden output of both backends.
+# "btrfs subvolume list -s" of a snapper rollback enabled root pool.
+SUBVOL_LIST_S_SNAPPER_ROOT = [
+    "ID 272 gen 1725 cgen 44 top level 267 otime 2018-06-02 12:40:42 path @/.snapshots/2/snapshot",
+    # noqa E501
+    "ID 283 gen 1725 cgen 84 top level 267 otime 2018-06-02 13:02:31 path @/.snapshots/13/snapshot",
+    # noqa E501
+    "ID 284 gen 1725 cgen 88 top level 267 otime 2018-06-02 13:05:55 path @/.snapshots/14/snapshot",
+    # noqa E501
+    "ID 287 gen 1725 cgen 96 top level 267 otime 2018-06-02 13:10:46 path @/.snapshots/17/snapshot",
+    # noqa E501
+    "ID 288 gen 1725 cgen 97 top level 267 otime 2018-06-02 13:11:17 path @/.snapshots/18/snapshot",
+    # noqa E501
+    "ID 289 gen 1725 cgen 1411 top level 268 otime 2018-06-03 17:21:23 path .snapshots/home/home-snap",
+    # noqa E501
+    "ID 296 gen 2644 cgen 2644 top level 268 otime 2018-06-04 20:50:32 path .snapshots/test-share/snap-test-share",
+    # noqa E501
+    "ID 297 gen 2656 cgen 2647 top level 268 otime 2018-06-04 20:51:50 path .snapshots/home/home-snap-writable",
+    # noqa E501
+    "ID 298 gen 2656 cgen 2656 top level 268 otime 2018-06-04 20:55:39 path home-snap-writable-clone",
+    # noqa E501
+    "ID 299 gen 2763 cgen 2763 top level 267 otime 2018-06-05 16:48:08 path @/.snapshots/19/snapshot",
+    # noqa E501
+    "ID 301 gen 2767 cgen 2766 top level 267 otime 2018-06-05 16:49:10 path @/.snapshots/20/snapshot",
+    # noqa E501
+    "",
+]
+SNAPSHOT_IDMAP_SNAPPER_ROOT = {
+    "301": ".snapshots/20/snapshot",
+    "289": ".snapshots/home/home-snap",
+    "288": ".snapshots/18/snapshot",
+    "272": ".snapshots/2/snapshot",
+    "298": "home-snap-writable-clone",
+    "299": ".snapshots/19/snapshot",
+    "296": ".snapshots/test-share/snap-test-share",
+    "297": ".snapshots/home/home-snap-writable",
+    "283": ".snapshots/13/snapshot",
+    "284": ".snapshots/14/snapshot",
+    "287": ".snapshots/17/snapshot",
+}
+# A system pool with some snaps / clones: home is itself a (rw) snapshot.
+SNAPSHOT_IDMAP_SYSTEM_POOL = {
+    "319": ".snapshots/home/home-snap-writable",
+    "324": ".snapshots/sys-pool-share/snap-sys-pool-share",
+    # noqa E501
+    "316": ".snapshots/home/home-snap",
+    "323": "clone-sys-pool-share",
+    "320": ".snapshots/home/home-snap-writable-visible",
+    # noqa E501
+    "321": ".snapshots/home-clone/home-clone-snap-writable",
+    # noqa E501
+    "326": ".snapshots/sys-pool-share/snap-writable-visible-sys-pool-share",
+    # noqa E501
+    "327": ".snapshots/clone-sys-pool-share/snap-clone-sys-pool-share",
+    # noqa E501
+    "298": "home-clone",
+    "325": ".snapshots/sys-pool-share/snap-writable-sys-pool-share",
+    # noqa E501
+    "296": "home",
+    "328": ".snapshots/clone-sys-pool-share/snap-clone-sys-pool-share-writable",
+    # noqa E501
+    "329": ".snapshots/clone-sys-pool-share/snap-clone-sys-pool-share-writable-visible",
+}  # noqa E501
+# "btrfs subvolume list -p" of the same.
+SUBVOL_LIST_P_SYSTEM_POOL = [
+    "ID 257 gen 4986 parent 5 top level 5 path @",
+    "ID 258 gen 4986 parent 257 top level 257 path var",
+    "ID 259 gen 4534 parent 257 top level 257 path usr/local",
+    "ID 260 gen 4986 parent 257 top level 257 path tmp",
+    "ID 261 gen 4532 parent 257 top level 257 path srv",
+    "ID 262 gen 4538 parent 257 top level 257 path root",
+    "ID 263 gen 4986 parent 257 top level 257 path opt",
+    "ID 265 gen 4056 parent 257 top level 257 path boot/grub2/x86_64-efi",
+    # noqa E501
+    "ID 266 gen 4532 parent 257 top level 257 path boot/grub2/i386-pc",
+    # noqa E501
+    "ID 296 gen 4968 parent 257 top level 257 path home",
+    "ID 298 gen 4971 parent 257 top level 257 path home-clone",
+    "ID 316 gen 4954 parent 257 top level 257 path .snapshots/home/home-snap",
+    # noqa E501
+    "ID 319 gen 4963 parent 257 top level 257 path .snapshots/home/home-snap-writable",
+    # noqa E501
+    "ID 320 gen 4966 parent 257 top level 257 path .snapshots/home/home-snap-writable-visible",
+    # noqa E501
+    "ID 321 gen 4971 parent 257 top level 257 path .snapshots/home-clone/home-clone-snap-writable",
+    # noqa E501
+    "ID 322 gen 4982 parent 257 top level 257 path sys-pool-share",
+    "ID 323 gen 4986 parent 257 top level 257 path clone-sys-pool-share",
+    # noqa E501
+    "ID 324 gen 4979 parent 257 top level 257 path .snapshots/sys-pool-share/snap-sys-pool-share",
+    # noqa E501
+    "ID 325 gen 4980 parent 257 top level 257 path .snapshots/sys-pool-share/snap-writable-sys-pool-share",
+    # noqa E501
+    "ID 326 gen 4981 parent 257 top level 257 path .snapshots/sys-pool-share/snap-writable-visible-sys-pool-share",
+    # noqa E501
+    "ID 327 gen 4984 parent 257 top level 257 path .snapshots/clone-sys-pool-share/snap-clone-sys-pool-share",
+    # noqa E501
+    "ID 328 gen 4985 parent 257 top level 257 path .snapshots/clone-sys-pool-share/snap-clone-sys-pool-share-writable",
+    # noqa E501
+    "ID 329 gen 4986 parent 257 top level 257 path .snapshots/clone-sys-pool-share/snap-clone-sys-pool-share-writable-visible",
+    # noqa E501
+    "",
+]
+# Rockstor relevant shares of the same.
+SHARES_INFO_SYSTEM_POOL = {
+    "home": "0/296",
+    "home-clone": "0/298",
+    "clone-sys-pool-share": "0/323",
+    "sys-pool-share": "0/322",
+}
+
+
 class Pool(object):
     def __init__(self, raid, name, role=None):
         self.raid = raid
@@ -686,6 +802,69 @@ class BTRFSTests(unittest.TestCase):
             msg="Failed to handle bogus pvolume_id",
         )
 
+    def test_pool_qgroup_usage(self):
+        """
+        Test pool_qgroup_usage() parsing of a single "btrfs qgroup show" and
+        that volume_usage() lookups via the resulting usage_map agree with
+        the per-volume command based results, without running any further
+        commands. Synthetic pool of 40 shares and 3000 snapshots.
+        """
+        self.mock_mount_root.return_value = "/mnt2/test-pool"
+        o = [
+            "qgroupid         rfer         excl ",
+            "--------         ----         ---- ",
+            "0/5          16.00KiB     16.00KiB ",
+        ]
+        # 40 shares (0/300 - 0/339) each with a 2015/* pqgroup.
+        for n in range(40):
+            o.append("0/{}        63.65MiB     63.65MiB ".format(300 + n))
+        # 3000 snapshots (0/1000 - 0/3999).
+        for n in range(3000):
+            o.append("0/{}       195.32MiB    496.00KiB ".format(1000 + n))
+        for n in range(40):
+            o.append("2015/{}       63.00MiB     63.00MiB ".format(n + 1))
+        o.append("")
+        self.mock_run_command.return_value = (o, [""], 0)
+        pool = Pool(raid="raid0", name="test-pool")
+        usage_map = pool_qgroup_usage(pool)
+        self.assertEqual(len(usage_map), 1 + 40 + 3000 + 40)
+        self.assertEqual(usage_map["0/301"], [65177, 65177])
+        self.assertEqual(usage_map["2015/4"], [64512, 64512])
+        # As per volume_usage() unknown qgroups, ie rogue -1/-1, are zero.
+        self.assertEqual(
+            volume_usage(pool, "0/301", "-1/-1", usage_map=usage_map),
+            [65177, 65177, 0, 0],
+        )
+        for n in range(40):
+            self.assertEqual(
+                volume_usage(
+                    pool,
+                    "0/{}".format(300 + n),
+                    "2015/{}".format(n + 1),
+                    usage_map=usage_map,
+                ),
+                volume_usage(pool, "0/{}".format(300 + n), "2015/{}".format(n + 1)),
+            )
+        self.mock_run_command.reset_mock()
+        for n in range(3000):
+            self.assertEqual(
+                volume_usage(pool, "0/{}".format(1000 + n), usage_map=usage_map),
+                [200007, 496],
+            )
+        # All 3040 lookups were served from our single pool level scan.
+        self.mock_run_command.assert_not_called()
+        # Quotas disabled: command fails (throw=False) so all usage is zero.
+        self.mock_run_command.return_value = (
+            [""],
+            ["ERROR: can't list qgroups: quotas not enabled", ""],
+            1,
+        )
+        usage_map = pool_qgroup_usage(pool)
+        self.assertEqual(usage_map, {})
+        self.assertEqual(
+            volume_usage(pool, "0/301", "2015/4", usage_map=usage_map), [0, 0, 0, 0]
+        )
+
     def test_balance_status_finished(self):
         """
         Moc return value of run_command executing btrfs balance status
@@ -2437,6 +2616,30 @@ class BTRFSTests(unittest.TestCase):
                 "count expected ({})".format(out, count),
             )
 
+    def test_degraded_pool_uuids(self):
+        """
+        Test degraded_pool_uuids() identifies each degraded pool once.
+        """
+        out = [
+            "Label: 'rock-pool-2'  uuid: 52053a67-1a53-4cb8-bf17-69abca623bef",
+            "\tTotal devices 2 FS bytes used 409600",
+            "\tdevid    1 size 5368709120 used 2155872256 path /dev/vde",
+            "\tdevid    2 size 5368709120 used 16777216 path /dev/vdd",
+            "",
+            "warning, device 3 is missing",
+            "Label: 'rock-pool'  uuid: 924d9d64-4943-4eac-a52e-1918e963a34f",
+            "\tTotal devices 4 FS bytes used 475136",
+            "\tdevid    1 size 0 used 0 path  MISSING",
+            "\tdevid    2 size 5368709120 used 1107296256 path /dev/vdc",
+            "\t*** Some devices missing",
+            "",
+            "",
+        ]
+        self.mock_run_command.return_value = (out, [""], 0)
+        self.assertEqual(
+            degraded_pool_uuids(), {"924d9d64-4943-4eac-a52e-1918e963a34f"}
+        )
+
     def test_snapshot_idmap_no_snaps(self):
         """
         Tests for empty return when no snapshots found
@@ -2541,46 +2744,10 @@ class BTRFSTests(unittest.TestCase):
         Test snapper rollback enabled root, with some Rockstor native snapshots
         """
         pool = Pool(raid="raid0", name="test-pool", role="root")
-        out = [
-            "ID 272 gen 1725 cgen 44 top level 267 otime 2018-06-02 12:40:42 path @/.snapshots/2/snapshot",
-            # noqa E501
-            "ID 283 gen 1725 cgen 84 top level 267 otime 2018-06-02 13:02:31 path @/.snapshots/13/snapshot",
-            # noqa E501
-            "ID 284 gen 1725 cgen 88 top level 267 otime 2018-06-02 13:05:55 path @/.snapshots/14/snapshot",
-            # noqa E501
-            "ID 287 gen 1725 cgen 96 top level 267 otime 2018-06-02 13:10:46 path @/.snapshots/17/snapshot",
-            # noqa E501
-            "ID 288 gen 1725 cgen 97 top level 267 otime 2018-06-02 13:11:17 path @/.snapshots/18/snapshot",
-            # noqa E501
-            "ID 289 gen 1725 cgen 1411 top level 268 otime 2018-06-03 17:21:23 path .snapshots/home/home-snap",
-            # noqa E501
-            "ID 296 gen 2644 cgen 2644 top level 268 otime 2018-06-04 20:50:32 path .snapshots/test-share/snap-test-share",
-            # noqa E501
-            "ID 297 gen 2656 cgen 2647 top level 268 otime 2018-06-04 20:51:50 path .snapshots/home/home-snap-writable",
-            # noqa E501
-            "ID 298 gen 2656 cgen 2656 top level 268 otime 2018-06-04 20:55:39 path home-snap-writable-clone",
-            # noqa E501
-            "ID 299 gen 2763 cgen 2763 top level 267 otime 2018-06-05 16:48:08 path @/.snapshots/19/snapshot",
-            # noqa E501
-            "ID 301 gen 2767 cgen 2766 top level 267 otime 2018-06-05 16:49:10 path @/.snapshots/20/snapshot",
-            # noqa E501
-            "",
-        ]
+        out = SUBVOL_LIST_S_SNAPPER_ROOT
         err = [""]
         rc = 0
-        expected_result = {
-            "301": ".snapshots/20/snapshot",
-            "289": ".snapshots/home/home-snap",
-            "288": ".snapshots/18/snapshot",
-            "272": ".snapshots/2/snapshot",
-            "298": "home-snap-writable-clone",
-            "299": ".snapshots/19/snapshot",
-            "296": ".snapshots/test-share/snap-test-share",
-            "297": ".snapshots/home/home-snap-writable",
-            "283": ".snapshots/13/snapshot",
-            "284": ".snapshots/14/snapshot",
-            "287": ".snapshots/17/snapshot",
-        }
+        expected_result = SNAPSHOT_IDMAP_SNAPPER_ROOT
         self.mock_run_command.return_value = (out, err, rc)
         self.assertEqual(
             snapshot_idmap(pool),
@@ -2682,71 +2849,12 @@ class BTRFSTests(unittest.TestCase):
         pool = Pool(raid="raid0", name="test-pool", role="root")
         # N.B. in this data set home is a snap ie has been rolled back to a rw
         # snapshot.
-        snap_idmap_return = {
-            "319": ".snapshots/home/home-snap-writable",
-            "324": ".snapshots/sys-pool-share/snap-sys-pool-share",
-            # noqa E501
-            "316": ".snapshots/home/home-snap",
-            "323": "clone-sys-pool-share",
-            "320": ".snapshots/home/home-snap-writable-visible",
-            # noqa E501
-            "321": ".snapshots/home-clone/home-clone-snap-writable",
-            # noqa E501
-            "326": ".snapshots/sys-pool-share/snap-writable-visible-sys-pool-share",
-            # noqa E501
-            "327": ".snapshots/clone-sys-pool-share/snap-clone-sys-pool-share",
-            # noqa E501
-            "298": "home-clone",
-            "325": ".snapshots/sys-pool-share/snap-writable-sys-pool-share",
-            # noqa E501
-            "296": "home",
-            "328": ".snapshots/clone-sys-pool-share/snap-clone-sys-pool-share-writable",
-            # noqa E501
-            "329": ".snapshots/clone-sys-pool-share/snap-clone-sys-pool-share-writable-visible",
-        }  # noqa E501
+        snap_idmap_return = SNAPSHOT_IDMAP_SYSTEM_POOL
         self.patch_snap_idmap = patch("fs.btrfs.snapshot_idmap")
         self.mock_snap_idmap = self.patch_snap_idmap.start()
         self.mock_snap_idmap.return_value = snap_idmap_return
         # mock 'btrfs subvol_list_-p' (via run_command) return values
-        out = [
-            "ID 257 gen 4986 parent 5 top level 5 path @",
-            "ID 258 gen 4986 parent 257 top level 257 path var",
-            "ID 259 gen 4534 parent 257 top level 257 path usr/local",
-            "ID 260 gen 4986 parent 257 top level 257 path tmp",
-            "ID 261 gen 4532 parent 257 top level 257 path srv",
-            "ID 262 gen 4538 parent 257 top level 257 path root",
-            "ID 263 gen 4986 parent 257 top level 257 path opt",
-            "ID 265 gen 4056 parent 257 top level 257 path boot/grub2/x86_64-efi",
-            # noqa E501
-            "ID 266 gen 4532 parent 257 top level 257 path boot/grub2/i386-pc",
-            # noqa E501
-            "ID 296 gen 4968 parent 257 top level 257 path home",
-            "ID 298 gen 4971 parent 257 top level 257 path home-clone",
-            "ID 316 gen 4954 parent 257 top level 257 path .snapshots/home/home-snap",
-            # noqa E501
-            "ID 319 gen 4963 parent 257 top level 257 path .snapshots/home/home-snap-writable",
-            # noqa E501
-            "ID 320 gen 4966 parent 257 top level 257 path .snapshots/home/home-snap-writable-visible",
-            # noqa E501
-            "ID 321 gen 4971 parent 257 top level 257 path .snapshots/home-clone/home-clone-snap-writable",
-            # noqa E501
-            "ID 322 gen 4982 parent 257 top level 257 path sys-pool-share",
-            "ID 323 gen 4986 parent 257 top level 257 path clone-sys-pool-share",
-            # noqa E501
-            "ID 324 gen 4979 parent 257 top level 257 path .snapshots/sys-pool-share/snap-sys-pool-share",
-            # noqa E501
-            "ID 325 gen 4980 parent 257 top level 257 path .snapshots/sys-pool-share/snap-writable-sys-pool-share",
-            # noqa E501
-            "ID 326 gen 4981 parent 257 top level 257 path .snapshots/sys-pool-share/snap-writable-visible-sys-pool-share",
-            # noqa E501
-            "ID 327 gen 4984 parent 257 top level 257 path .snapshots/clone-sys-pool-share/snap-clone-sys-pool-share",
-            # noqa E501
-            "ID 328 gen 4985 parent 257 top level 257 path .snapshots/clone-sys-pool-share/snap-clone-sys-pool-share-writable",
-            # noqa E501
-            "ID 329 gen 4986 parent 257 top level 257 path .snapshots/clone-sys-pool-share/snap-clone-sys-pool-share-writable-visible",
-            # noqa E501
-            "",
-        ]
+        out = SUBVOL_LIST_P_SYSTEM_POOL
         err = [""]
         rc = 0
         self.mock_run_command.return_value = (out, err, rc)
@@ -2769,12 +2877,7 @@ class BTRFSTests(unittest.TestCase):
                 return "arbitrary-name", True, False
 
         # From above we expect the following Rockstor relevant shares:
-        expected = {
-            "home": "0/296",
-            "home-clone": "0/298",
-            "clone-sys-pool-share": "0/323",
-            "sys-pool-share": "0/322",
-        }
+        expected = SHARES_INFO_SYSTEM_POOL
         self.mock_parse_snap_details.side_effect = parse_snap_details_return
         returned = shares_info(pool)
         self.assertEqual(
@@ -3183,6 +3286,71 @@ class BTRFSTests(unittest.TestCase):
 
     # TODO: test_shares_info_system_pool_fresh
 
+    def test_snaps_info_clone_share(self):
+        """
+        A clone share, listed by btrfs as a (writable, top level) snapshot,
+        keeps its own snapshots: as does an incrementally received replica
+        share, listed as a read only snapshot. Neither is a snapshot of its
+        origin share.
+        """
+        # "btrfs subvolume list -u -p -q"
+        out = [
+            "ID 257 gen 30 parent 5 top level 5 parent_uuid - "
+            "uuid 1f2d1f0e-0b39-2c4a-a0b5-7c1f4b3d0001 path share1",
+            "ID 258 gen 31 parent 5 top level 5 "
+            "parent_uuid 1f2d1f0e-0b39-2c4a-a0b5-7c1f4b3d0001 "
+            "uuid 1f2d1f0e-0b39-2c4a-a0b5-7c1f4b3d0002 path clone1",
+            "ID 259 gen 32 parent 5 top level 5 "
+            "parent_uuid 1f2d1f0e-0b39-2c4a-a0b5-7c1f4b3d0001 "
+            "uuid 1f2d1f0e-0b39-2c4a-a0b5-7c1f4b3d0003 path .snapshots/share1/snap1",
+            "ID 261 gen 33 parent 5 top level 5 "
+            "parent_uuid 1f2d1f0e-0b39-2c4a-a0b5-7c1f4b3d0002 "
+            "uuid 1f2d1f0e-0b39-2c4a-a0b5-7c1f4b3d0004 path .snapshots/clone1/snapA",
+            # Received: parent uuid of a since removed receive snapshot.
+            "ID 262 gen 34 parent 5 top level 5 "
+            "parent_uuid 1f2d1f0e-0b39-2c4a-a0b5-7c1f4b3d0009 "
+            "uuid 1f2d1f0e-0b39-2c4a-a0b5-7c1f4b3d0005 path replica1",
+            "ID 263 gen 35 parent 5 top level 5 "
+            "parent_uuid 1f2d1f0e-0b39-2c4a-a0b5-7c1f4b3d0005 "
+            "uuid 1f2d1f0e-0b39-2c4a-a0b5-7c1f4b3d0006 "
+            "path .snapshots/replica1/replica1_1_replication_1",
+            "",
+        ]
+        # "btrfs subvolume list -s -p -q -u": all but share1.
+        out_s = [
+            line.replace(" parent ", " cgen 10 parent ", 1).replace(
+                " parent_uuid ", " otime 2024-01-01 12:00:00 parent_uuid ", 1
+            )
+            for line in out[1:-1]
+        ] + [""]
+        # "btrfs subvolume list -r": snap1 and snapA, and our replica share.
+        out_r = [
+            "ID 259 gen 32 top level 5 path .snapshots/share1/snap1",
+            "ID 261 gen 33 top level 5 path .snapshots/clone1/snapA",
+            "ID 262 gen 34 top level 5 path replica1",
+            "",
+        ]
+        self.mock_run_command.side_effect = [
+            (out, [""], 0),
+            (out_s, [""], 0),
+            (out_r, [""], 0),
+        ] * 2
+        expected = {
+            "share1": {"snap1": ("0/259", False)},
+            "clone1": {"snapA": ("0/261", False)},
+            "replica1": {"replica1_1_replication_1": ("0/263", True)},
+        }
+        returned = pool_snaps_info("/mnt2/test-pool")
+        self.assertEqual(
+            returned,
+            expected,
+            msg="Failed clone share snapshot indexing:\n"
+            "returned {},\nexpected {}.\n".format(returned, expected),
+        )
+        self.assertEqual(
+            snaps_info("/mnt2/test-pool", "clone1"), {"snapA": ("0/261", False)}
+        )
+
     def test_get_snap_legacy(self):
         """
         Test get_snap() across various input.
@@ -0,0 +1,528 @@
+"""
+Copyright (joint work) 2024 The Rockstor Project <https://rockstor.com>
+
+Rockstor is free software; you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published
+by the Free Software Foundation; either version 2 of the License,
+or (at your option) any later version.
+
+Rockstor is distributed in the hope that it will be useful, but
+WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program. If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import errno
+import json
+import os
+import struct
+import time
+import unittest
+import uuid
+from unittest.mock import patch, MagicMock
+
+from django.test.utils import override_settings
+
+from fs import btrfs_ioctl
+from fs.btrfs import (
+    DefaultSubvol,
+    shares_info,
+    snaps_info,
+    pool_snaps_info,
+    snapshot_idmap,
+    volume_usage,
+    pool_qgroup_usage,
+    qgroup_ids,
+    qgroup_max,
+    are_quotas_enabled,
+    get_property,
+    get_dev_io_error_stats,
+    get_devid_usage,
+    DevUsageInfo,
+)
+from fs.btrfs_ioctl import (
+    ROOT_ITEM_KEY,
+    ROOT_BACKREF_KEY,
+    QGROUP_STATUS_KEY,
+    QGROUP_INFO_KEY,
+    SEARCH_ARGS_V2_SIZE,
+    SEARCH_NR_ITEMS_OFFSET,
+    SEARCH_HEADER_FMT,
+    BTRFS_IOC_TREE_SEARCH_V2,
+    BTRFS_IOC_FS_INFO,
+    BTRFS_IOC_DEV_INFO,
+    BTRFS_IOC_GET_DEV_STATS,
+    BTRFS_IOC_SUBVOL_GETFLAGS,
+    BTRFS_IOC_GET_FSLABEL,
+    DEV_INFO_PATH_OFFSET,
+    tree_search,
+)
+from fs.tests.test_btrfs import (
+    Pool,
+    SUBVOL_LIST_S_SNAPPER_ROOT,
+    SNAPSHOT_IDMAP_SNAPPER_ROOT,
+    SNAPSHOT_IDMAP_SYSTEM_POOL,
+    SUBVOL_LIST_P_SYSTEM_POOL,
+    SHARES_INFO_SYSTEM_POOL,
+)
+
+"""
+The tests in this suite can be run via the following commands:
+
+cd /opt/rockstor/src/rockstor/fs
+poetry run django-admin test -v 3 -p test_btrfs*
+"""
+
+ALL_IOCTL = {
+    name: "ioctl"
+    for name in (
+        "shares_info",
+        "snaps_info",
+        "snapshot_idmap",
+        "volume_usage",
+        "pool_qgroup_usage",
+        "qgroup_ids",
+        "qgroup_max",
+        "are_quotas_enabled",
+        "get_property",
+        "get_dev_io_error_stats",
+        "get_devid_usage",
+    )
+}
+
+
+def subvol_uuid(subvol_id) -> str:
+    return str(uuid.UUID(int=int(subvol_id)))
+
+
+def root_item(snapshot_of=None, readonly=False, subvol_id=None) -> bytes:
+    data = bytearray(439)
+    struct.pack_into("=Q", data, 208, 1 if readonly else 0)
+    data[247:263] = uuid.UUID(subvol_uuid(subvol_id)).bytes
+    if snapshot_of is not None:
+        data[263:279] = uuid.UUID(subvol_uuid(snapshot_of)).bytes
+    return bytes(data)
+
+
+def root_tree(subvols):
+    """
+    Root tree items, and the ino lookup paths, of the given subvolumes.
+    :param subvols: list of (id, parent id, path relative to parent, snapshot
+    of id or None, readonly)
+    :return: (items, dirs) for tree_search and ino_lookup mocks respectively.
+    """
+    items = []
+    dirs = {}
+    for subvol_id, parent_id, rel_path, snapshot_of, readonly in subvols:
+        dirname, name = os.path.split(rel_path)
+        dirid = 256
+        if dirname:
+            dirid = 1000 + len(dirs)
+            dirs[(int(parent_id), dirid)] = dirname + "/"
+        items.append(
+            (
+                int(subvol_id),
+                ROOT_ITEM_KEY,
+                0 if snapshot_of is None else 42,
+                root_item(snapshot_of, readonly, subvol_id),
+            )
+        )
+        ref = struct.pack("=2QH", dirid, 1, len(name)) + name.encode()
+        items.append((int(subvol_id), ROOT_BACKREF_KEY, int(parent_id), ref))
+    items.sort(key=lambda item: item[:3])
+    return items, dirs
+
+
+def listing_entries(listing):
+    # (id, parent id, path) from "btrfs subvolume list -p" or "-s" output.
+    for line in listing:
+        if line.startswith("ID "):
+            fields = line.split()
+            yield fields[1], fields[5], fields[-1]
+
+
+class BTRFSIoctlTests(unittest.TestCase):
+    def setUp(self):
+        self.patch_run_command = patch("fs.btrfs.run_command")
+        self.mock_run_command = self.patch_run_command.start()
+        self.patch_mount_root = patch("fs.btrfs.mount_root")
+        self.mock_mount_root = self.patch_mount_root.start()
+        # Any directory will do for our ioctl mocks' file descriptors.
+        self.mock_mount_root.return_value = "/"
+        self.patch_tree_search = patch("fs.btrfs_ioctl.tree_search")
+        self.mock_tree_search = self.patch_tree_search.start()
+        self.patch_ino_lookup = patch("fs.btrfs_ioctl.ino_lookup")
+        self.mock_ino_lookup = self.patch_ino_lookup.start()
+
+    def tearDown(self):
+        patch.stopall()
+
+    def set_root_tree(self, subvols):
+        items, dirs = root_tree(subvols)
+        self.mock_tree_search.side_effect = lambda *args: iter(items)
+        self.mock_ino_lookup.side_effect = lambda fd, tree_id, objectid: dirs.get(
+            (tree_id, objectid), ""
+        )
+
+    def test_tree_search(self):
+        """
+        Items are parsed from the ioctl buffer and the search resumes from the
+        key following the last item returned.
+        """
+        self.patch_tree_search.stop()
+        calls = []
+
+        def ioctl(fd, request, args):
+            self.assertEqual(request, BTRFS_IOC_TREE_SEARCH_V2)
+            min_key = struct.unpack_from("=QQQQQ", args, 0)
+            calls.append((min_key[1], min_key[3]))
+            nr_items = 0
+            if len(calls) == 1:
+                pos = SEARCH_ARGS_V2_SIZE
+                for objectid, data in ((257, b"abc"), (258, b"defg")):
+                    struct.pack_into(
+                        SEARCH_HEADER_FMT, args, pos, 9, objectid, 7, 132, len(data)
+                    )
+                    pos += 32
+                    args[pos : pos + len(data)] = data
+                    pos += len(data)
+                nr_items = 2
+            struct.pack_into("=L", args, SEARCH_NR_ITEMS_OFFSET, nr_items)
+
+        with patch("fs.btrfs_ioctl.fcntl.ioctl", side_effect=ioctl):
+            items = list(
+                tree_search(3, 1, (256, 132, 0), (2**64 - 256, 144, 2**64 - 1))
+            )
+        self.assertEqual(items, [(257, 132, 7, b"abc"), (258, 132, 7, b"defg")])
+        # (min_objectid, min_offset) of each search.
+        self.assertEqual(calls, [(256, 0), (258, 8)])
+
+    def test_snapshot_idmap_snapper_root(self):
+        """
+        Golden output as per test_btrfs.test_snapshot_idmap_snapper_root.
+        """
+        self.set_root_tree(
+            [
+                (subvol_id, "5", path, "257", True)
+                for subvol_id, parent_id, path in listing_entries(
+                    SUBVOL_LIST_S_SNAPPER_ROOT
+                )
+            ]
+            + [("257", "5", "@", None, False)]
+        )
+        with override_settings(BTRFS_BACKENDS=ALL_IOCTL):
+            self.assertEqual(snapshot_idmap("/"), SNAPSHOT_IDMAP_SNAPPER_ROOT)
+        self.mock_run_command.assert_not_called()
+        subvols = btrfs_ioctl.subvolumes("/")
+        self.assertEqual(subvols[0].path, "@")
+        self.assertFalse(subvols[0].snapshot)
+        self.assertEqual(subvols[0].parent_uuid, "-")
+        self.assertEqual(subvols[1].path, "@/.snapshots/2/snapshot")
+        self.assertEqual(subvols[1].parent_uuid, subvol_uuid(257))
+        self.assertTrue(subvols[1].readonly)
+
+    def test_shares_info_system_pool_used(self):
+        """
+        Golden output as per test_btrfs.test_shares_info_system_pool_used but
+        with no commands run: paths are nested within the "@" subvol.
+        """
+        subvols = []
+        for subvol_id, parent_id, path in listing_entries(SUBVOL_LIST_P_SYSTEM_POOL):
+            snapshot_of = "257" if subvol_id in SNAPSHOT_IDMAP_SYSTEM_POOL else None
+            subvols.append((subvol_id, parent_id, path, snapshot_of, False))
+        self.set_root_tree(subvols)
+        patch("fs.btrfs.default_subvol").start().return_value = DefaultSubvol(
+            "257", "@", False
+        )
+
+        def parse_snap_details_return(*args, **kwargs):
+            clones = ["home", "home-clone", "clone-sys-pool-share"]
+            if args[1] in clones:
+                return None, True, True
+            return "arbitrary-name", True, False
+
+        patch("fs.btrfs.parse_snap_details").start().side_effect = (
+            parse_snap_details_return
+        )
+        pool = Pool(raid="raid0", name="test-pool", role="root")
+        with override_settings(BTRFS_BACKENDS=ALL_IOCTL):
+            self.assertEqual(snapshot_idmap("/"), SNAPSHOT_IDMAP_SYSTEM_POOL)
+            returned = shares_info(pool)
+        self.assertEqual(returned, SHARES_INFO_SYSTEM_POOL)
+        self.mock_run_command.assert_not_called()
+
+    def test_snaps_info(self):
+        """
+        Both backends agree: a share, its snapshots, a snapshot of a snapshot,
+        and another share's snapshot. Discovery is once per pool with read
+        only flags from the subvol list, not a property get per snapshot.
+        """
+        subvols = [
+            ("257", "5", "share-1", None, False),
+            ("258", "5", "share-2", None, False),
+            ("259", "5", ".snapshots/share-1/snap-1", "257", True),
+            ("260", "5", ".snapshots/share-1/snap-2", "257", False),
+            ("261", "5", ".snapshots/share-1/snap-of-snap", "259", True),
+            ("262", "5", ".snapshots/share-2/snap-1", "258", True),
+        ]
+        self.set_root_tree(subvols)
+        self.patch_get_property = patch("fs.btrfs.get_property")
+        self.mock_get_property = self.patch_get_property.start()
+        expected = {
+            "snap-1": ("0/259", False),
+            "snap-2": ("0/260", True),
+            "snap-of-snap": ("0/261", False),
+        }
+        expected_index = {
+            "share-1": expected,
+            "share-2": {"snap-1": ("0/262", False)},
+        }
+        with override_settings(BTRFS_BACKENDS=ALL_IOCTL):
+            self.assertEqual(snaps_info("/", "share-1"), expected)
+            self.assertEqual(snaps_info("/", "share-3"), {})
+            self.assertEqual(pool_snaps_info("/"), expected_index)
+        self.mock_run_command.assert_not_called()
+        # "btrfs subvolume list -u -p -q", "-s -p -q -u", and "-r" of the same.
+        out = []
+        out_s = []
+        out_r = []
+        for subvol_id, parent_id, path, snapshot_of, ro in subvols:
+            parent_uuid = "-" if snapshot_of is None else subvol_uuid(snapshot_of)
+            out.append(
+                "ID {} gen 10 parent {} top level {} parent_uuid {} uuid {} "
+                "path {}".format(
+                    subvol_id,
+                    parent_id,
+                    parent_id,
+                    parent_uuid,
+                    subvol_uuid(subvol_id),
+                    path,
+                )
+            )
+            if snapshot_of is not None:
+                out_s.append(
+                    "ID {} gen 10 cgen 10 parent {} top level {} otime "
+                    "2024-01-01 12:00:00 parent_uuid {} uuid {} path {}".format(
+                        subvol_id,
+                        parent_id,
+                        parent_id,
+                        parent_uuid,
+                        subvol_uuid(subvol_id),
+                        path,
+                    )
+                )
+            if ro:
+                out_r.append(
+                    "ID {} gen 10 top level {} path {}".format(
+                        subvol_id, parent_id, path
+                    )
+                )
+        self.mock_run_command.side_effect = [
+            (out + [""], [""], 0),
+            (out_s + [""], [""], 0),
+            (out_r + [""], [""], 0),
+        ]
+        self.assertEqual(pool_snaps_info("/"), expected_index)
+        self.assertEqual(self.mock_run_command.call_count, 3)
+        self.mock_get_property.assert_not_called()
+
+    def test_pool_snaps_info_15000(self):
+        """
+        Benchmark: 40 shares with 15,000 snapshots between them, indexed in
+        a single pass over the snapshots.
+        """
+        out = []
+        out_s = []
+        for i in range(40):
+            subvol_id = 257 + i
+            out.append(
+                "ID {} gen 10 parent 5 top level 5 parent_uuid - uuid {} "
+                "path share-{}".format(subvol_id, subvol_uuid(subvol_id), i)
+            )
+        for i in range(15000):
+            subvol_id = 1000 + i
+            share_id = 257 + i % 40
+            line = (
+                "ID {} gen 10 cgen 10 parent 5 top level 5 otime 2024-01-01 "
+                "12:00:00 parent_uuid {} uuid {} path .snapshots/share-{}/snap-{}"
+            ).format(
+                subvol_id,
+                subvol_uuid(share_id),
+                subvol_uuid(subvol_id),
+                i % 40,
+                i,
+            )
+            out_s.append(line)
+            out.append(
+                line.replace(" cgen 10", "").replace(" otime 2024-01-01 12:00:00", "")
+            )
+        self.mock_run_command.side_effect = [
+            (out + [""], [""], 0),
+            (out_s + [""], [""], 0),
+            ([""], [""], 0),
+        ]
+        start = time.monotonic()
+        snaps_index = pool_snaps_info("/mnt2/test-pool")
+        elapsed = time.monotonic() - start
+        self.assertEqual(len(snaps_index), 40)
+        self.assertEqual(len(snaps_index["share-0"]), 375)
+        self.assertEqual(snaps_index["share-39"]["snap-14999"], ("0/15999", True))
+        self.assertLess(elapsed, 2.0)
+
+    def set_quota_tree(self, enabled=True):
+        items = [(0, QGROUP_STATUS_KEY, 0, struct.pack("=4Q", 1, 9, int(enabled), 0))]
+        # qgroupid: (rfer, excl) in KiB, as per test_btrfs.test_volume_usage.
+        usage = {
+            (0, 5): (16, 16),
+            (0, 261): (65177, 65177),
+            (0, 263): (200008, 496),
+            (2015, 4): (64512, 64512),
+            (2015, 12): (0, 0),
+        }
+        for (level, qid), (rfer, excl) in sorted(usage.items()):
+            items.append(
+                (
+                    0,
+                    QGROUP_INFO_KEY,
+                    (level << 48) | qid,
+                    struct.pack("=5Q", 9, rfer * 1024, 0, excl * 1024, 0),
+                )
+            )
+        self.mock_tree_search.side_effect = lambda *args: iter(items)
+
+    def test_qgroups(self):
+        self.set_quota_tree()
+        pool = Pool(raid="raid0", name="test-pool")
+        with override_settings(BTRFS_BACKENDS=ALL_IOCTL):
+            self.assertEqual(
+                volume_usage(pool, "0/261", "2015/4"), [65177, 65177, 64512, 64512]
+            )
+            self.assertEqual(volume_usage(pool, "0/261"), [65177, 65177])
+            self.assertEqual(volume_usage(pool, "0/261", "-1/-1"), [65177, 65177, 0, 0])
+            self.assertEqual(pool_qgroup_usage(pool)["0/263"], [200008, 496])
+            self.assertEqual(
+                qgroup_ids("/"), ["0/5", "0/261", "0/263", "2015/4", "2015/12"]
+            )
+            self.assertEqual(qgroup_max("/"), 12)
+            self.assertTrue(are_quotas_enabled("/"))
+            # Quotas disabled.
+            self.set_quota_tree(enabled=False)
+            self.assertFalse(are_quotas_enabled("/"))
+            self.assertEqual(qgroup_max("/"), -1)
+            # No quota tree: never enabled or since disabled.
+            self.mock_tree_search.side_effect = OSError(errno.ENOENT, "No such file")
+            self.assertFalse(are_quotas_enabled("/"))
+            self.assertEqual(qgroup_max("/"), -1)
+            self.assertEqual(qgroup_ids("/"), [])
+            self.assertEqual(volume_usage(pool, "0/261", "2015/4"), [0, 0, 0, 0])
+        self.mock_run_command.assert_not_called()
+
+    def test_get_dev_io_error_stats(self):
+        """
+        Golden output as per test_btrfs.test_get_dev_io_error_stats.
+        """
+        dev_path = os.path.realpath("/dev/disk/by-id/arbitrary_unit_test_dev_name")
+        values = [204669, 81232, 782, 2985, 47]
+
+        def ioctl(fd, request, args):
+            if request == BTRFS_IOC_FS_INFO:
+                struct.pack_into("=Q", args, 0, 3)
+            elif request == BTRFS_IOC_DEV_INFO:
+                devid = struct.unpack_from("=Q", args)[0]
+                if devid == 2:
+                    raise OSError(errno.ENODEV, "No such device")
+                path = "/dev/sdz" if devid == 1 else dev_path
+                args[DEV_INFO_PATH_OFFSET : DEV_INFO_PATH_OFFSET + len(path)] = (
+                    path.encode()
+                )
+            elif request == BTRFS_IOC_GET_DEV_STATS:
+                self.assertEqual(struct.unpack_from("=Q", args)[0], 3)
+                struct.pack_into("=7Q", args, 8, 5, 0, *values)
+
+        expected = (
+            '{"generation_errs": "47", "corruption_errs": "2985", '
+            '"read_io_errs": "81232", "write_io_errs": "204669", '
+            '"flush_io_errs": "782"}'
+        )
+        with override_settings(BTRFS_BACKENDS=ALL_IOCTL), patch(
+            "fs.btrfs_ioctl.fcntl.ioctl", side_effect=ioctl
+        ), patch("fs.btrfs_ioctl.device_mount_point") as mock_device_mount_point:
+            mock_device_mount_point.return_value = "/"
+            returned = get_dev_io_error_stats("arbitrary_unit_test_dev_name")
+            self.assertEqual(json.loads(returned), json.loads(expected))
+            # Not part of a mounted btrfs filesystem.
+            mock_device_mount_point.return_value = None
+            self.assertIsNone(get_dev_io_error_stats("arbitrary_unit_test_dev_name"))
+        self.mock_run_command.assert_not_called()
+
+    def test_get_devid_usage(self):
+        """
+        As per "btrfs device usage -b /" with devid 2 removed and devid 3
+        detached (missing).
+        """
+
+        def ioctl(fd, request, args):
+            if request == BTRFS_IOC_FS_INFO:
+                struct.pack_into("=Q", args, 0, 3)
+            elif request == BTRFS_IOC_DEV_INFO:
+                devid = struct.unpack_from("=Q", args)[0]
+                if devid == 2:
+                    raise OSError(errno.ENODEV, "No such device")
+                struct.pack_into("=2Q", args, 24, 2186280960, 5368709120)
+                if devid == 1:
+                    path = b"/dev/vda"
+                    args[DEV_INFO_PATH_OFFSET : DEV_INFO_PATH_OFFSET + len(path)] = path
+
+        expected = {
+            1: DevUsageInfo(temp_name="/dev/vda", size=5242880.0, allocated=2135040.0),
+            3: DevUsageInfo(temp_name="missing", size=5242880.0, allocated=2135040.0),
+        }
+        with override_settings(BTRFS_BACKENDS=ALL_IOCTL), patch(
+            "fs.btrfs_ioctl.fcntl.ioctl", side_effect=ioctl
+        ):
+            self.assertEqual(get_devid_usage("/"), expected)
+        self.mock_run_command.assert_not_called()
+
+    def test_get_property(self):
+        """
+        Golden output as per test_btrfs.test_get_property_all and _ro.
+        """
+        flags = {"value": 0}
+
+        def ioctl(fd, request, args):
+            if request == BTRFS_IOC_SUBVOL_GETFLAGS:
+                struct.pack_into("=Q", args, 0, flags["value"])
+            elif request == BTRFS_IOC_GET_FSLABEL:
+                args[:4] = b"test"
+
+        with override_settings(BTRFS_BACKENDS=ALL_IOCTL), patch(
+            "fs.btrfs_ioctl.fcntl.ioctl", side_effect=ioctl
+        ), patch("fs.btrfs_ioctl.os.fstat") as mock_fstat, patch(
+            "fs.btrfs_ioctl.os.getxattr"
+        ) as mock_getxattr:
+            mock_fstat.return_value = MagicMock(st_ino=256)
+            mock_getxattr.return_value = b"lzo"
+            self.assertEqual(
+                get_property("/"), {"compression": "lzo", "ro": False, "label": "test"}
+            )
+            flags["value"] = 1 << 1
+            self.assertTrue(get_property("/", "ro"))
+            mock_getxattr.side_effect = OSError(errno.ENODATA, "No data available")
+            self.assertIsNone(get_property("/", "compression"))
+        self.mock_run_command.assert_not_called()
+
+    def test_cli_fallback(self):
+        """
+        Kernels lacking an ioctl fall back to btrfs-progs.
+        """
+        self.mock_run_command.return_value = (["ro=true", ""], [""], 0)
+        with override_settings(BTRFS_BACKENDS=ALL_IOCTL), patch(
+            "fs.btrfs_ioctl.fcntl.ioctl",
+            side_effect=OSError(errno.ENOTTY, "Inappropriate ioctl for device"),
+        ), patch("fs.btrfs_ioctl.os.fstat") as mock_fstat:
+            mock_fstat.return_value = MagicMock(st_ino=256)
+            self.assertTrue(get_property("/", "ro"))
+        self.mock_run_command.assert_called_once()
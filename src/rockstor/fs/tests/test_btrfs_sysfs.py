@@ -0,0 +1,118 @@
+"""
+Copyright (joint work) 2024 The Rockstor Project <https://rockstor.com>
+
+Rockstor is free software; you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published
+by the Free Software Foundation; either version 2 of the License,
+or (at your option) any later version.
+
+Rockstor is distributed in the hope that it will be useful, but
+WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program. If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from fs import btrfs_sysfs
+from fs.btrfs import pool_usage
+
+FSID = "347d4cd6-e9c5-47ce-84be-ec972bb1c338"
+
+
+class BTRFSSysfsTests(unittest.TestCase):
+    """
+    The tests in this suite can be run via the following command:
+    cd <root dir of rockstor ie /opt/rockstor>
+    export DJANGO_SETTINGS_MODULE=settings
+    poetry run django-admin test -p test_btrfs_sysfs.py -v 2
+    """
+
+    def setUp(self):
+        self.sysfs = tempfile.mkdtemp()
+        self.patch_sysfs = patch("fs.btrfs_sysfs.SYSFS_BTRFS", self.sysfs)
+        self.patch_sysfs.start()
+        btrfs_sysfs._usage_cache.clear()
+        # "btrfs fi usage -b" of the same pool:
+        # Data,single: Size:1103101952, Used:671088640 (60.84%)
+        # Metadata,DUP: Size:268435456, Used:1622016 (0.60%)
+        # System,DUP: Size:16777216, Used:16384 (0.10%)
+        self.write_allocation("data", 1103101952, 671088640)
+        self.write_allocation("metadata", 268435456, 1622016)
+        self.write_allocation("system", 16777216, 16384)
+
+    def tearDown(self):
+        self.patch_sysfs.stop()
+        shutil.rmtree(self.sysfs)
+
+    def write(self, rel_path, value):
+        path = os.path.join(self.sysfs, FSID, rel_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as sfo:
+            sfo.write("{}\n".format(value))
+
+    def write_allocation(self, alloc_type, total_bytes, bytes_used):
+        self.write(os.path.join("allocation", alloc_type, "total_bytes"), total_bytes)
+        self.write(os.path.join("allocation", alloc_type, "bytes_used"), bytes_used)
+
+    def test_pool_usage(self):
+        expected = (671088640 + 268435456 + 16777216) / 1024
+        self.assertEqual(btrfs_sysfs.pool_usage(FSID), expected)
+        # No generation (kernel < 5.11): read afresh on each call.
+        self.write_allocation("data", 1103101952, 671088640 + 1024)
+        self.assertEqual(btrfs_sysfs.pool_usage(FSID), expected + 1)
+        # Cached while the generation is unchanged.
+        self.write("generation", 100)
+        self.assertEqual(btrfs_sysfs.pool_usage(FSID), expected + 1)
+        self.write_allocation("data", 1103101952, 671088640)
+        self.assertEqual(btrfs_sysfs.pool_usage(FSID), expected + 1)
+        self.write("generation", 101)
+        self.assertEqual(btrfs_sysfs.pool_usage(FSID), expected)
+
+    @patch("fs.btrfs.run_command")
+    def test_pool_usage_fallback(self, mock_run_command):
+        self.assertEqual(
+            pool_usage("/mnt2/test-pool", FSID),
+            (671088640 + 268435456 + 16777216) / 1024,
+        )
+        mock_run_command.assert_not_called()
+        # Not mounted, or no sysfs interface: "btrfs fi usage -b".
+        mock_run_command.return_value = (
+            [
+                "Data,single: Size:1103101952, Used:671088640 (60.84%)",
+                "Metadata,DUP: Size:268435456, Used:1622016 (0.60%)",
+                "System,DUP: Size:16777216, Used:16384 (0.10%)",
+                "",
+            ],
+            [""],
+            0,
+        )
+        self.assertEqual(
+            pool_usage("/mnt2/other-pool", "no-such-fsid"),
+            pool_usage("/mnt2/test-pool", FSID),
+        )
+        mock_run_command.assert_called_once()
+
+    def test_dev_health(self):
+        stats = "write_errs 0\nread_errs 0\nflush_errs 0\ncorruption_errs {}\n"
+        for devid in ("1", "2"):
+            self.write(os.path.join("devinfo", devid, "missing"), 0)
+            self.write(os.path.join("devinfo", devid, "error_stats"), stats.format(0))
+        self.assertEqual(btrfs_sysfs.dev_health(FSID), (0, True))
+        self.write(os.path.join("devinfo", "2", "missing"), 1)
+        self.write(os.path.join("devinfo", "1", "error_stats"), stats.format(3))
+        self.assertEqual(btrfs_sysfs.dev_health(FSID), (1, False))
+        # Kernels prior to 5.14: no error_stats.
+        os.remove(os.path.join(self.sysfs, FSID, "devinfo", "1", "error_stats"))
+        with self.assertRaises(OSError):
+            btrfs_sysfs.dev_health(FSID)
+        # Not mounted.
+        with self.assertRaises(OSError):
+            btrfs_sysfs.dev_health("00000000-0000-0000-0000-000000000000")
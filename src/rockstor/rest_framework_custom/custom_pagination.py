@@ -15,8 +15,24 @@ You should have received a copy of the GNU General Public License
 along with this program. If not, see <http://www.gnu.org/licenses/>.
 """
 
+from django.conf import settings
 from rest_framework import pagination
 
 
 class CustomPagination(pagination.PageNumberPagination):
     page_size_query_param = 'page_size'
+
+
+class KeysetPagination(pagination.CursorPagination):
+    """
+    Keyset (cursor) pagination, as selected by GenericView for a "?cursor="
+    list request (empty for the first page). Each page is a single indexed
+    range query from the last position seen, so unlike page numbers its cost
+    does not grow with depth. Ordered by the view's get_ordering().
+    """
+
+    page_size_query_param = "page_size"
+    max_page_size = settings.REST_FRAMEWORK["MAX_LIMIT"]
+
+    def get_ordering(self, request, queryset, view):
+        return view.get_ordering()
@@ -21,6 +21,8 @@ from rest_framework.authentication import (BasicAuthentication,
 from storageadmin.auth import DigestAuthentication
 from rest_framework.permissions import IsAuthenticated
 from rest_framework_custom.oauth_wrapper import RockstorOAuth2Authentication
+from rest_framework_custom.custom_pagination import KeysetPagination
+from rest_framework_custom.serializers import DynamicFieldsModelSerializer
 from contextlib import contextmanager
 from storageadmin.util import handle_exception
 from storageadmin.exceptions import RockStorAPIException
@@ -32,6 +34,51 @@ class GenericView(ListCreateAPIView):
                               BasicAuthentication,
                               RockstorOAuth2Authentication,)
     permission_classes = (IsAuthenticated, )
+    # Columns sortable via "?sortby=<column>&reverse=yes": {column: field}.
+    # Views with sort_fields also offer keyset pagination via "?cursor=".
+    sort_fields = {}
+    # Ordering when no "?sortby=" is given.
+    ordering = ("-id",)
+
+    def get_ordering(self):
+        sort_col = self.request.query_params.get("sortby", None)
+        if sort_col is None:
+            return self.ordering
+        if sort_col not in self.sort_fields:
+            e_msg = "Unsupported sort column ({}).".format(sort_col)
+            handle_exception(Exception(e_msg), self.request)
+        prefix = "-" if self.request.query_params.get("reverse", "no") == "yes" else ""
+        return (prefix + self.sort_fields[sort_col], prefix + "id")
+
+    def get_fields(self):
+        """Field names from "?fields=a,b" on list requests, else None (all)."""
+        if self.request.method != "GET":
+            return None
+        fields = self.request.query_params.get("fields", None)
+        if not fields:
+            return None
+        return [f for f in fields.split(",") if f]
+
+    def get_serializer(self, *args, **kwargs):
+        if issubclass(self.get_serializer_class(), DynamicFieldsModelSerializer):
+            kwargs.setdefault("fields", self.get_fields())
+        return super(GenericView, self).get_serializer(*args, **kwargs)
+
+    def eager_load(self, queryset):
+        """Queryset with the related objects of our serialized fields."""
+        return self.get_serializer_class().setup_eager_loading(
+            queryset, self.get_fields()
+        )
+
+    @property
+    def paginator(self):
+        if (
+            not hasattr(self, "_paginator")
+            and self.sort_fields
+            and "cursor" in self.request.query_params
+        ):
+            self._paginator = KeysetPagination()
+        return super(GenericView, self).paginator
 
     @staticmethod
     @contextmanager
@@ -67,7 +67,7 @@ def main():
             aw = APIWrapper()
             time.sleep(2)
             aw.api_call("network")
-            aw.api_call("commands/bootstrap", calltype="post")
+            timings = aw.api_call("commands/bootstrap", calltype="post")
             break
         except Exception as e:
             # Retry on every exception, primarily because of django-oauth
@@ -87,6 +87,12 @@ def main():
             time.sleep(2)
             num_attempts += 1
     print("Bootstrapping complete")
+    for stage, timing in timings.items():
+        print(
+            "Bootstrap stage ({}): {} tasks, {} failed, done at {}s".format(
+                stage, timing["tasks"], timing["failed"], timing["last"]
+            )
+        )
 
     try:
         print("Running qgroup cleanup. %s" % QGROUP_CLEAN)
@@ -15,7 +15,6 @@ You should have received a copy of the GNU General Public License
 along with this program. If not, see <https://www.gnu.org/licenses/>.
 """
 
-import time
 import sys
 import json
 from datetime import datetime
@@ -27,8 +26,17 @@ import logging
 
 logger = logging.getLogger(__name__)
 
-# List of scrub states considered terminal (non running):
-TERMINAL_SCRUB_STATES = ["error", "finished", "halted", "cancelled", "conn-reset"]
+# List of scrub states considered terminal (non running). Includes "failed",
+# as per a scrub job that failed before its scrub started: see
+# storageadmin.views.pool_scrub.PoolScrubView._scrub_status().
+TERMINAL_SCRUB_STATES = [
+    "error",
+    "finished",
+    "halted",
+    "cancelled",
+    "conn-reset",
+    "failed",
+]
 
 
 def update_state(t, pool, aw):
@@ -45,58 +53,76 @@ def update_state(t, pool, aw):
     return t.state
 
 
+def run_task(tid):
+    """
+    Start scheduled scrub task tid: see smart_manager.views.scheduler_helpers.
+    Our Task is completed by scrub_ended() once the scrub job ends.
+    """
+    tdo = TaskDefinition.objects.get(id=tid)
+    if tdo.task_type != "scrub":
+        return logger.error("task_type(%s) is not scrub." % tdo.task_type)
+    meta = json.loads(tdo.json_meta)
+    aw = APIWrapper()
+
+    if Task.objects.filter(task_def=tdo).exists():
+        ll = Task.objects.filter(task_def=tdo).order_by("-id")[0]
+        if ll.state not in TERMINAL_SCRUB_STATES:
+            logger.debug(
+                "Non terminal state(%s) for task(%d). Checking "
+                "again." % (ll.state, tid)
+            )
+            cur_state = update_state(ll, meta["pool"], aw)
+            if cur_state not in TERMINAL_SCRUB_STATES:
+                return logger.debug(
+                    "Non terminal state(%s) for task(%d). "
+                    "A new task will not be run." % (cur_state, tid)
+                )
+
+    now = datetime.utcnow().replace(second=0, microsecond=0, tzinfo=utc)
+    t = Task(task_def=tdo, state="started", start=now)
+    url = "pools/%s/scrub" % meta["pool"]
+    try:
+        aw.api_call(url, data=None, calltype="post", save_error=False)
+        logger.debug("Started scrub at %s" % url)
+        t.state = "running"
+    except Exception as e:
+        logger.error("Failed to start scrub at %s" % url)
+        t.state = "error"
+        t.end = datetime.utcnow().replace(tzinfo=utc)
+        logger.exception(e)
+    finally:
+        t.save()
+
+
+def scrub_ended(pool_id, state):
+    """
+    Complete any running scheduled scrub Task for our pool: called by
+    storageadmin.views.pool_scrub.scrub_job() as the scrub job ends, in place of
+    polling the scrub status for the duration of the scrub.
+    :param pool_id: Pool.id
+    :param state: final scrub status, as per PoolScrub.status.
+    """
+    if state not in TERMINAL_SCRUB_STATES:
+        state = "error"
+    running = Task.objects.filter(
+        task_def__task_type="scrub", state__in=("started", "running")
+    ).select_related("task_def")
+    for t in running:
+        if str(json.loads(t.task_def.json_meta).get("pool")) != str(pool_id):
+            continue
+        logger.debug("task(%d) finished with state(%s)." % (t.task_def.id, state))
+        t.state = state
+        t.end = datetime.utcnow().replace(tzinfo=utc)
+        t.save()
+
+
 def main():
     tid = int(sys.argv[1])
     cwindow = sys.argv[2] if len(sys.argv) > 2 else "*-*-*-*-*-*"
     if crontabwindow.crontab_range(cwindow):
         # Performance note: immediately check task execution time/day window
         # range to avoid other calls
-        tdo = TaskDefinition.objects.get(id=tid)
-        if tdo.task_type != "scrub":
-            return logger.error("task_type(%s) is not scrub." % tdo.task_type)
-        meta = json.loads(tdo.json_meta)
-        aw = APIWrapper()
-
-        if Task.objects.filter(task_def=tdo).exists():
-            ll = Task.objects.filter(task_def=tdo).order_by("-id")[0]
-            if ll.state not in TERMINAL_SCRUB_STATES:
-                logger.debug(
-                    "Non terminal state(%s) for task(%d). Checking "
-                    "again." % (ll.state, tid)
-                )
-                cur_state = update_state(ll, meta["pool"], aw)
-                if cur_state not in TERMINAL_SCRUB_STATES:
-                    return logger.debug(
-                        "Non terminal state(%s) for task(%d). "
-                        "A new task will not be run." % (cur_state, tid)
-                    )
-
-        now = datetime.utcnow().replace(second=0, microsecond=0, tzinfo=utc)
-        t = Task(task_def=tdo, state="started", start=now)
-        url = "pools/%s/scrub" % meta["pool"]
-        try:
-            aw.api_call(url, data=None, calltype="post", save_error=False)
-            logger.debug("Started scrub at %s" % url)
-            t.state = "running"
-        except Exception as e:
-            logger.error("Failed to start scrub at %s" % url)
-            t.state = "error"
-            logger.exception(e)
-        finally:
-            t.save()
-
-        while True:
-            cur_state = update_state(t, meta["pool"], aw)
-            if cur_state in TERMINAL_SCRUB_STATES:
-                logger.debug("task(%d) finished with state(%s)." % (tid, cur_state))
-                t.end = datetime.utcnow().replace(tzinfo=utc)
-                t.save()
-                break
-            logger.debug(
-                "pending state(%s) for scrub task(%d). Will check "
-                "again in 60 seconds." % (cur_state, tid)
-            )
-            time.sleep(60)
+        run_task(tid)
     else:
         logger.debug(
             "Cron scheduled task not executed because outside time/day window ranges"
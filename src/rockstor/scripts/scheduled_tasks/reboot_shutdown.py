@@ -87,76 +87,83 @@ def run_conditions_met(meta):
     return True
 
 
+def run_task(tid):
+    """
+    Run scheduled reboot/shutdown/suspend task tid: see
+    smart_manager.views.scheduler_helpers
+    """
+    tdo = TaskDefinition.objects.get(id=tid)
+    aw = APIWrapper()
+    if tdo.task_type not in ["reboot", "shutdown", "suspend"]:
+        logger.error(
+            "task_type({}) is not a system reboot, "
+            "shutdown or suspend.".format(tdo.task_type)
+        )
+        return
+    meta = json.loads(tdo.json_meta)
+    validate_reboot_shutdown_meta(meta)
+
+    if not run_conditions_met(meta):
+        logger.debug(
+            "Cron scheduled task not executed because the run conditions have not been met"
+        )
+        return
+
+    now = datetime.utcnow().replace(second=0, microsecond=0, tzinfo=timezone.utc)
+    schedule = now + timedelta(minutes=3)
+    t = Task(task_def=tdo, state="scheduled", start=now, end=schedule)
+
+    try:
+        # set default command url before checking if it's a shutdown
+        # and if we have an rtc wake up
+        url = "commands/{}".format(tdo.task_type)
+
+        # if task_type is shutdown and rtc wake up true
+        # parse crontab hour & minute vs rtc hour & minute to state
+        # if wake will occur same day or next day, finally update
+        # command url adding wake up epoch time
+        if tdo.task_type in ["shutdown", "suspend"] and meta["wakeup"]:
+            crontab_fields = tdo.crontab.split()
+            crontab_time = int(crontab_fields[1]) * 60 + int(crontab_fields[0])
+            wakeup_time = meta["rtc_hour"] * 60 + meta["rtc_minute"]
+            # rtc wake up requires UTC epoch, but users on WebUI set time
+            # thinking to localtime, so first we set wake up time,
+            # update it if wake up is on next day, finally move it to UTC
+            # and get its epoch
+            epoch = datetime.now().replace(
+                hour=int(meta["rtc_hour"]),
+                minute=int(meta["rtc_minute"]),
+                second=0,
+                microsecond=0,
+            )
+            # if wake up < crontab time wake up will run next day
+            if crontab_time > wakeup_time:
+                epoch += timedelta(days=1)
+
+            epoch = epoch.strftime("%s")
+            url = "{}/{}".format(url, epoch)
+
+        aw.api_call(url, data=None, calltype="post", save_error=False)
+        logger.debug("System {} scheduled".format(tdo.task_type))
+        t.state = "finished"
+
+    except Exception as e:
+        t.state = "failed"
+        logger.error("Failed to schedule system {}".format(tdo.task_type))
+        logger.exception(e)
+
+    finally:
+        # t.end = datetime.utcnow().replace(tzinfo=utc)
+        t.save()
+
+
 def main():
     tid = int(sys.argv[1])
     cwindow = sys.argv[2] if len(sys.argv) > 2 else "*-*-*-*-*-*"
     if crontabwindow.crontab_range(cwindow):
         # Performance note: immediately check task execution time/day window
         # range to avoid other calls
-        tdo = TaskDefinition.objects.get(id=tid)
-        aw = APIWrapper()
-        if tdo.task_type not in ["reboot", "shutdown", "suspend"]:
-            logger.error(
-                "task_type({}) is not a system reboot, "
-                "shutdown or suspend.".format(tdo.task_type)
-            )
-            return
-        meta = json.loads(tdo.json_meta)
-        validate_reboot_shutdown_meta(meta)
-
-        if not run_conditions_met(meta):
-            logger.debug(
-                "Cron scheduled task not executed because the run conditions have not been met"
-            )
-            return
-
-        now = datetime.utcnow().replace(second=0, microsecond=0, tzinfo=timezone.utc)
-        schedule = now + timedelta(minutes=3)
-        t = Task(task_def=tdo, state="scheduled", start=now, end=schedule)
-
-        try:
-            # set default command url before checking if it's a shutdown
-            # and if we have an rtc wake up
-            url = "commands/{}".format(tdo.task_type)
-
-            # if task_type is shutdown and rtc wake up true
-            # parse crontab hour & minute vs rtc hour & minute to state
-            # if wake will occur same day or next day, finally update
-            # command url adding wake up epoch time
-            if tdo.task_type in ["shutdown", "suspend"] and meta["wakeup"]:
-                crontab_fields = tdo.crontab.split()
-                crontab_time = int(crontab_fields[1]) * 60 + int(crontab_fields[0])
-                wakeup_time = meta["rtc_hour"] * 60 + meta["rtc_minute"]
-                # rtc wake up requires UTC epoch, but users on WebUI set time
-                # thinking to localtime, so first we set wake up time,
-                # update it if wake up is on next day, finally move it to UTC
-                # and get its epoch
-                epoch = datetime.now().replace(
-                    hour=int(meta["rtc_hour"]),
-                    minute=int(meta["rtc_minute"]),
-                    second=0,
-                    microsecond=0,
-                )
-                # if wake up < crontab time wake up will run next day
-                if crontab_time > wakeup_time:
-                    epoch += timedelta(days=1)
-
-                epoch = epoch.strftime("%s")
-                url = "{}/{}".format(url, epoch)
-
-            aw.api_call(url, data=None, calltype="post", save_error=False)
-            logger.debug("System {} scheduled".format(tdo.task_type))
-            t.state = "finished"
-
-        except Exception as e:
-            t.state = "failed"
-            logger.error("Failed to schedule system {}".format(tdo.task_type))
-            logger.exception(e)
-
-        finally:
-            # t.end = datetime.utcnow().replace(tzinfo=utc)
-            t.save()
-
+        run_task(tid)
     else:
         logger.debug(
             "Cron scheduled task not executed because outside time/day window ranges"
@@ -83,72 +83,79 @@ def delete(aw, share, snap_type, prefix, max_count):
     return True
 
 
+def run_task(tid):
+    """
+    Run scheduled snapshot task tid: see smart_manager.views.scheduler_helpers
+    """
+    tdo = TaskDefinition.objects.get(id=tid)
+    stype = "task_scheduler"
+    aw = APIWrapper()
+    if tdo.task_type != "snapshot":
+        logger.error("task_type(%s) is not snapshot." % tdo.task_type)
+        return
+    meta = json.loads(tdo.json_meta)
+    validate_snap_meta(meta)
+
+    # to keep backwards compatibility, allow for share to be either
+    # name or id and migrate the metadata. To be removed in #1854
+    try:
+        share = Share.objects.get(id=meta["share"])
+    except ValueError:
+        share = Share.objects.get(name=meta["share"])
+        meta["share"] = share.id
+        tdo.json_meta = json.dumps(meta)
+        tdo.save()
+
+    max_count = int(float(meta["max_count"]))
+    prefix = "%s_" % meta["prefix"]
+
+    now = datetime.utcnow().replace(second=0, microsecond=0, tzinfo=utc)
+    t = Task(task_def=tdo, state="started", start=now)
+
+    snap_created = False
+    t.state = "error"
+    try:
+        name = "%s_%s" % (
+            meta["prefix"],
+            datetime.now().strftime(settings.SNAP_TS_FORMAT),
+        )
+        url = "shares/{}/snapshots/{}".format(share.id, name)
+        # only create a new snap if there's no overflow situation. This
+        # prevents runaway snapshot creation beyond max_count+1.
+        if delete(aw, share, stype, prefix, max_count):
+            data = {
+                "snap_type": stype,
+                "uvisible": meta["visible"],
+                "writable": meta["writable"],
+            }
+            headers = {"content-type": "application/json"}
+            aw.api_call(
+                url, data=data, calltype="post", headers=headers, save_error=False
+            )
+            logger.debug("created snapshot at %s" % url)
+            t.state = "finished"
+            snap_created = True
+    except Exception as e:
+        logger.error("Failed to create snapshot at %s" % url)
+        logger.exception(e)
+    finally:
+        t.end = datetime.utcnow().replace(tzinfo=utc)
+        t.save()
+
+    # best effort pruning without erroring out. If deletion fails, we'll
+    # have max_count+1 number of snapshots and it would be dealt with on
+    # the next round.
+    if snap_created:
+        delete(aw, share, stype, prefix, max_count)
+
+
 def main():
     tid = int(sys.argv[1])
     cwindow = sys.argv[2] if len(sys.argv) > 2 else "*-*-*-*-*-*"
     if crontabwindow.crontab_range(cwindow):
         # Performance note: immediately check task execution time/day window
         # range to avoid other calls
-        tdo = TaskDefinition.objects.get(id=tid)
-        stype = "task_scheduler"
-        aw = APIWrapper()
-        if tdo.task_type != "snapshot":
-            logger.error("task_type(%s) is not snapshot." % tdo.task_type)
-            return
-        meta = json.loads(tdo.json_meta)
-        validate_snap_meta(meta)
-
-        # to keep backwards compatibility, allow for share to be either
-        # name or id and migrate the metadata. To be removed in #1854
-        try:
-            share = Share.objects.get(id=meta["share"])
-        except ValueError:
-            share = Share.objects.get(name=meta["share"])
-            meta["share"] = share.id
-            tdo.json_meta = json.dumps(meta)
-            tdo.save()
-
-        max_count = int(float(meta["max_count"]))
-        prefix = "%s_" % meta["prefix"]
-
-        now = datetime.utcnow().replace(second=0, microsecond=0, tzinfo=utc)
-        t = Task(task_def=tdo, state="started", start=now)
-
-        snap_created = False
-        t.state = "error"
-        try:
-            name = "%s_%s" % (
-                meta["prefix"],
-                datetime.now().strftime(settings.SNAP_TS_FORMAT),
-            )
-            url = "shares/{}/snapshots/{}".format(share.id, name)
-            # only create a new snap if there's no overflow situation. This
-            # prevents runaway snapshot creation beyond max_count+1.
-            if delete(aw, share, stype, prefix, max_count):
-                data = {
-                    "snap_type": stype,
-                    "uvisible": meta["visible"],
-                    "writable": meta["writable"],
-                }
-                headers = {"content-type": "application/json"}
-                aw.api_call(
-                    url, data=data, calltype="post", headers=headers, save_error=False
-                )
-                logger.debug("created snapshot at %s" % url)
-                t.state = "finished"
-                snap_created = True
-        except Exception as e:
-            logger.error("Failed to create snapshot at %s" % url)
-            logger.exception(e)
-        finally:
-            t.end = datetime.utcnow().replace(tzinfo=utc)
-            t.save()
-
-        # best effort pruning without erroring out. If deletion fails, we'll
-        # have max_count+1 number of snapshots and it would be dealt with on
-        # the next round.
-        if snap_created:
-            delete(aw, share, stype, prefix, max_count)
+        run_task(tid)
     else:
         logger.debug(
             "Cron scheduled task not executed because outside time/day window ranges"
@@ -169,6 +169,7 @@ MIDDLEWARE = (
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "storageadmin.middleware.ProdExceptionMiddleware",
+    "storageadmin.middleware.SystemCacheMiddleware",
     # Uncomment the next line for simple clickjacking protection:
     # 'django.middleware.clickjacking.XFrameOptionsMiddleware',
 )
@@ -360,6 +361,17 @@ REPLICATION = {
     "max_send_attempts": 10,
     "max_snap_retain": 2,
     "listener_port": 10002,
+    # Credit window: max btrfs send stream chunks in flight before the Sender
+    # waits on the Receiver. Avoids throughput being bound by round-trip time.
+    "send_window": 32,
+    # Inline btrfs send stream compression offered by the Sender: None
+    # (disabled), "zlib", or "zstd" (requires the optional zstandard module).
+    "compression": None,
+    # Resumable transfers: the Receiver spools the btrfs send stream to disk,
+    # checkpointing its size, and only runs btrfs receive once the stream is
+    # complete. A retried Sender then skips the already received part.
+    # Trades Receiver disk space and IO for not re-sending over the network.
+    "resume_spool": False,
 }
 
 SHARE_REGEX = r"[A-Za-z0-9_.-]+"
@@ -372,6 +384,35 @@ ROOT_DIR = BASE_DIR + "/"
 MAX_TS_RECORDS = 40000
 MAX_TS_MULTIPLIER = 3
 
+# On-box Dashboard metrics history (data_collector), stored as fixed size ring
+# buffer files per metric instance. Rollups: name: (step seconds, slots).
+METRICS_HISTORY = {
+    "enabled": True,
+    "path": "{}/var/metrics".format(BASE_DIR),
+    "rollups": {
+        "1s": (1, 3600),  # 1 hour
+        "1m": (60, 10080),  # 7 days
+        "1h": (3600, 8784),  # 366 days
+    },
+}
+
+# Always on NFS server call history (data_collector) from /proc/net/rpc/nfsd:
+# seconds between samples, samples per bulk insert, and days of history kept.
+NFSD_STATS = {
+    "interval": 10,
+    "batch": 6,
+    "retention": 30,
+}
+
+# Pool health monitor (data_collector) feeding the Web-UI degraded pool and
+# device error alerts: seconds between sysfs reads of mounted pools' devices,
+# and between "btrfs fi show" rescans for unmounted or unimported pools
+# (also run on udev block device events).
+POOL_HEALTH = {
+    "interval": 30,
+    "scan_interval": 600,
+}
+
 # various system binaries used by lower level code.
 COMMANDS = {
     "ntpdate": "/usr/sbin/ntpdate",
@@ -411,6 +452,8 @@ OAUTH2_PROVIDER = {
 }
 
 OAUTH_INTERNAL_APP = "cliapp"
+# gunicorn's unix socket (conf/gunicorn.conf.py bind), used by our api clients.
+API_SOCKET = "/run/rockstor-gunicorn.sock"
 OAUTH2_PROVIDER_APPLICATION_MODEL = "oauth2_provider.Application"
 
 # Django 3.2 onwards requires explicitly AutoField defined:
@@ -467,6 +510,58 @@ HUEY = SqliteHuey(filename="{}/rockstor-tasks-huey.db".format(BASE_DIR))
 
 TASK_SCHEDULER = {"max_log": 100}  # max number of task log entries to keep
 
+# Job engine (storageadmin/views/job_helpers.py), run by our Huey workers:
+# poll_interval: seconds between progress/cancellation checks of a running job.
+# retry_delay: seconds before a job waiting on a busy target (pool/disk) retries.
+JOBS = {"poll_interval": 5, "retry_delay": 30}
+
+# Error log archive (logs/error.tgz), built by our Huey workers on request
+# exceptions (storageadmin/views/error_archive_helpers.py):
+# interval: minimum seconds between archives, requests meanwhile are coalesced.
+# max_size: cap in bytes on the (uncompressed) changed log files archived.
+ERROR_ARCHIVE = {"interval": 600, "max_size": 50 * 1024 * 1024}
+
+# Bootstrap (POST commands/bootstrap, see storageadmin/views/command.py):
+# workers: threads mounting pools, shares and snapshots in parallel.
+BOOTSTRAP = {"workers": 4}
+
+# SMART refresh of all disks (POST disks/smart/refresh, see
+# storageadmin/views/disk_smart.py):
+# workers: threads running smartctl, one disk each, in parallel.
+SMART_REFRESH = {"workers": 8}
+
+# SMART attribute history (storageadmin/views/smart_history_helpers.py):
+# workers: threads of our hourly collector, which skips disks in standby.
+# retention: days of attribute history kept.
+# info_retention: days of full SMART refreshes (SMARTInfo) kept, bar the
+# latest of each disk, before being rolled up into attribute history.
+# trend_days: window of our trend evaluator, whose latter half growth of more
+# than trend_factor times that of its former half raises an alert.
+SMART_HISTORY = {
+    "workers": 2,
+    "retention": 730,
+    "info_retention": 30,
+    "trend_days": 14,
+    "trend_factor": 2,
+}
+
+# Per function backend for fs/btrfs.py queries: "cli" runs and parses btrfs-progs,
+# "ioctl" reads the filesystem in-process (fs/btrfs_ioctl.py) with no forks,
+# falling back to "cli" on failure. Unlisted functions use "cli".
+BTRFS_BACKENDS = {
+    "shares_info": "cli",
+    "snaps_info": "cli",
+    "snapshot_idmap": "cli",
+    "volume_usage": "cli",
+    "pool_qgroup_usage": "cli",
+    "qgroup_ids": "cli",
+    "qgroup_max": "cli",
+    "are_quotas_enabled": "cli",
+    "get_property": "cli",
+    "get_dev_io_error_stats": "cli",
+    "get_devid_usage": "cli",
+}
+
 # Establish our OS base id, name, and version:
 # Use id for code path decisions. Others are for Web-UI display purposes.
 # Examples given are for CentOS Rockstor variant, Leap 15, and Tumblweed.
@@ -317,6 +317,8 @@ class ReplicaTrailAdmin(admin.ModelAdmin):
         "replica",
         "snap_name",
         "kb_sent",
+        "kb_sent_compressed",
+        "compression",
         "snapshot_created",
         "snapshot_failed",
         "send_pending",
@@ -363,6 +365,8 @@ class ReceiveTrailAdmin(admin.ModelAdmin):
         "rshare",
         "snap_name",
         "kb_received",
+        "kb_received_compressed",
+        "compression",
         "receive_pending",
         "receive_succeeded",
         "receive_failed",
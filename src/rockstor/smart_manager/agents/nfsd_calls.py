@@ -27,12 +27,14 @@ from smart_manager.models import (
 
 
 def get_datetime(ts):
-    return datetime.datetime.utcfromtimestamp(float(ts)).replace(tzinfo=timezone.utc)
+    return datetime.fromtimestamp(float(ts), tz=timezone.utc)
 
 
 def process_nfsd_calls(output, rid, l):
 
     ro = SProbe.objects.get(id=rid)
+    calls = []
+    clients = []
     for line in output.split("\n"):
         if line == "":
             continue
@@ -41,7 +43,6 @@ def process_nfsd_calls(output, rid, l):
             l.info("ignoring incomplete sprobe output: %s" % repr(fields))
             continue
         fields[0] = get_datetime(fields[0])
-        no = None
         if len(fields) == 10:
             no = NFSDClientDistribution(
                 rid=ro,
@@ -56,6 +57,7 @@ def process_nfsd_calls(output, rid, l):
                 sum_read=fields[8],
                 sum_write=fields[9],
             )
+            clients.append(no)
         else:
             no = NFSDCallDistribution(
                 rid=ro,
@@ -69,12 +71,15 @@ def process_nfsd_calls(output, rid, l):
                 sum_read=fields[7],
                 sum_write=fields[8],
             )
-        no.save()
+            calls.append(no)
+    NFSDClientDistribution.objects.bulk_create(clients)
+    NFSDCallDistribution.objects.bulk_create(calls)
 
 
 def share_distribution(output, rid, l):
 
     ro = SProbe.objects.get(id=rid)
+    rows = []
     for line in output.split("\n"):
         if line == "":
             continue
@@ -95,12 +100,14 @@ def share_distribution(output, rid, l):
             sum_read=fields[8],
             sum_write=fields[9],
         )
-        no.save()
+        rows.append(no)
+    NFSDShareDistribution.objects.bulk_create(rows)
 
 
 def share_client_distribution(output, rid, l):
 
     ro = SProbe.objects.get(id=rid)
+    rows = []
     for line in output.split("\n"):
         if line == "":
             continue
@@ -122,12 +129,14 @@ def share_client_distribution(output, rid, l):
             sum_read=fields[9],
             sum_write=fields[10],
         )
-        no.save()
+        rows.append(no)
+    NFSDShareClientDistribution.objects.bulk_create(rows)
 
 
 def nfs_uid_gid_distribution(output, rid, l):
 
     ro = SProbe.objects.get(id=rid)
+    rows = []
     for line in output.split("\n"):
         if line == "":
             continue
@@ -151,4 +160,5 @@ def nfs_uid_gid_distribution(output, rid, l):
             sum_read=fields[11],
             sum_write=fields[12],
         )
-        no.save()
+        rows.append(no)
+    NFSDUidGidDistribution.objects.bulk_create(rows)
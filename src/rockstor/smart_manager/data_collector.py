@@ -22,13 +22,8 @@ from tempfile import mkstemp
 
 from gevent import monkey
 
-from system.constants import BLOCK_DEV_EXCLUDE
-
 monkey.patch_all()
 
-from fs.btrfs import degraded_pools_found
-
-import psutil  # noqa E402
 import re  # noqa E402
 import json  # noqa E402
 import gevent  # noqa E402
@@ -55,11 +50,16 @@ from system.pinmanager import (
     generate_otp,
 )
 
-from system.osi import uptime, kernel_info, get_byid_name_map, run_command  # noqa E402
+from system.osi import uptime, kernel_info, run_command  # noqa E402
 from datetime import datetime, timedelta  # noqa E402
 import time  # noqa E402
-from django.utils.timezone import utc  # noqa E402
-from storageadmin.models import Disk, Pool  # noqa E402
+from smart_manager.proc.sampler import sampler  # noqa E402
+from smart_manager.proc.history import MetricsHistory  # noqa E402
+from smart_manager.proc.nfsd import nfsd_sampler  # noqa E402
+from smart_manager.proc.pool_health import pool_health  # noqa E402
+from smart_manager.proc.job_progress import job_progress  # noqa E402
+from smart_manager.proc.smart_trends import smart_trends  # noqa E402
+from system.udev import UdevMonitor, block_event_devices  # noqa E402
 from smart_manager.models import Service  # noqa E402
 from system.services import service_status  # noqa E402
 from cli.api_wrapper import APIWrapper  # noqa E402
@@ -71,6 +71,63 @@ logger = logging.getLogger(__name__)
 
 JOURNALCTL = "/usr/bin/journalctl"
 DMESG_LOG = "/var/log/dmesg"
+# Full disks/scan interval: a rare consistency check while udev events drive
+# incremental rescans, or our polling interval if udev events are unavailable.
+DISK_RESCAN_INTERVAL = 600
+DISK_POLL_INTERVAL = 20
+# Seconds over which to coalesce a burst of udev block device events.
+UDEV_SETTLE = 2
+
+
+class DiskEventListener(object):
+    """
+    Incremental disks/scan of only those devices named in udev block device
+    events, coalescing bursts of events into a single rescan.
+    """
+
+    def __init__(self):
+        self.monitor = None
+        self.aw = None
+
+    @property
+    def active(self) -> bool:
+        return self.monitor is not None
+
+    def start(self):
+        try:
+            self.monitor = UdevMonitor()
+        except OSError as e:
+            logger.error(
+                f"Unable to monitor udev events, polling for disk changes: {e.__str__()}"
+            )
+            return
+        self.aw = APIWrapper()
+        gevent.spawn(self.run)
+
+    def run(self):
+        while True:
+            changed = set(block_event_devices(self.monitor.receive()))
+            if not changed:
+                continue
+            with gevent.Timeout(UDEV_SETTLE, False):
+                while True:
+                    changed.update(block_event_devices(self.monitor.receive()))
+            logger.debug(f"Udev block device events: rescanning {sorted(changed)}")
+            sampler.invalidate()
+            pool_health.invalidate()
+            try:
+                self.aw.api_call(
+                    "disks/scan",
+                    data={"devices": sorted(changed)},
+                    calltype="post",
+                    headers={"content-type": "application/json"},
+                    save_error=False,
+                )
+            except Exception as e:
+                logger.error(f"Failed to update disk state. exception: {e.__str__()}")
+
+
+disk_events = DiskEventListener()
 
 
 class RockstorIO(socketio.Namespace):
@@ -592,300 +649,42 @@ class LogManagerNamespace(RockstorIO):
         self.spawn(file_size, sid, logfile)
 
 
-class DisksWidgetNamespace(RockstorIO):
-
-    switch = False
-    byid_disk_map = {}
-
-    def on_connect(self, sid, environ):
-
-        self.byid_disk_map = get_byid_name_map()
-        self.switch = True
-        self.spawn(self.send_top_disks, sid)
-
-    def on_disconnect(self, sid):
-
-        self.cleanup(sid)
-        self.switch = False
-
-    def send_top_disks(self):
-        def disk_stats(prev_stats):
-
-            disks_stats = []
-            # invoke body of disk_stats with empty cur_stats
-            stats_file_path = "/proc/diskstats"
-            cur_stats = {}
-            interval = 1
-            # TODO: Consider refactoring the following to use Disk.temp_name or
-            #  building byid_disk_map from the same. Ideally we would have
-            #  performance testing in place prior to this move.
-            # Build a list of our db's disk names, now in by-id type format.
-            disks = [d.name for d in Disk.objects.all()]
-            # Older Leap kernels: /proc/diskstats has lines of the following form:
-            #  8      64 sde 1034 0 9136 702 0 0 0 0 0 548 702
-            #  8      65 sde1 336 0 2688 223 0 0 0 0 0 223 223
-            # TW (2024): more fields, and loop block device entries.
-            #  8       0 sda 2507 0 101712 388 0 0 0 0 0 264 388 0 0 0 0 0 0
-            #  7       0 loop0 0 0 0 0 0 0 0 0 0 0 0 0 0 0 0 0 0
-            with open(stats_file_path) as stats_file:
-                for line in stats_file.readlines():
-                    fields = line.split()
-                    # Sanity check: available fields and block device blacklist
-                    if len(fields) < 14 or fields[0] in BLOCK_DEV_EXCLUDE:
-                        continue
-                    # As the /proc/diskstats lines contain transient type names
-                    # we need to convert those to our by-id db names.
-                    byid_name = self.byid_disk_map[fields[2]]
-                    if byid_name not in disks:
-                        # the disk name in this line is not one in our db so
-                        # ignore it and move to the next line.
-                        continue
-                    cur_stats[byid_name] = fields[3:]
-            for disk in cur_stats.keys():
-                if disk in prev_stats:
-                    prev = prev_stats[disk]
-                    cur = cur_stats[disk]
-                    data = []
-                    for i in range(0, len(prev)):
-                        if i == 8:
-                            avg_ios = (float(cur[i]) + float(prev[i])) / 2
-                            data.append(avg_ios)
-                            continue
-                        datum = None
-                        if cur[i] < prev[i]:
-                            datum = float(cur[i]) / interval
-                        else:
-                            datum = (float(cur[i]) - float(prev[i])) / interval
-                        data.append(datum)
-                    disks_stats.append(
-                        {
-                            "name": disk,
-                            "reads_completed": data[0],
-                            "reads_merged": data[1],
-                            "sectors_read": data[2],
-                            "ms_reading": data[3],
-                            "writes_completed": data[4],
-                            "writes_merged": data[5],
-                            "sectors_written": data[6],
-                            "ms_writing": data[7],
-                            "ios_progress": data[8],
-                            "ms_ios": data[9],
-                            "weighted_ios": data[10],
-                            "ts": str(
-                                datetime.utcnow().replace(tzinfo=utc).isoformat()
-                            ),  # noqa E501
-                        }
-                    )
-
-            self.emit("top_disks", {"key": "diskWidget:top_disks", "data": disks_stats})
-            return cur_stats
-
-        def get_stats():
-            cur_disk_stats = {}
-            while self.switch:
-                cur_disk_stats = disk_stats(cur_disk_stats)
-                gevent.sleep(1)
+class SampledWidgetNamespace(RockstorIO):
+    """
+    Dashboard widget namespace fed by the shared ProcSampler: subscribed while
+    it has connected clients, regardless of how many.
+    """
 
-        # Kick things off
-        get_stats()
-
-
-class CPUWidgetNamespace(RockstorIO):
-
-    send_cpu = False
+    stream = None
 
     def on_connect(self, sid, environ):
 
-        # Switch for emitting cpu data
-        self.send_cpu = True
-        self.spawn(self.send_cpu_data, sid)
+        sampler.subscribe(self.stream, self, sid)
 
     def on_disconnect(self, sid):
 
         self.cleanup(sid)
-        self.send_cpu = False
-
-    def send_cpu_data(self):
-
-        while self.send_cpu:
-            cpu_stats = {}
-            cpu_stats["results"] = []
-            vals = psutil.cpu_times_percent(percpu=True)
-            ts = datetime.utcnow().replace(tzinfo=utc).isoformat()
-            for i, val in enumerate(vals):
-                name = "cpu%d" % i
-                cpu_stats["results"].append(
-                    {
-                        "name": name,
-                        "umode": val.user,
-                        "umode_nice": val.nice,
-                        "smode": val.system,
-                        "idle": val.idle,
-                        "ts": str(ts),
-                    }
-                )
-            self.emit("cpudata", {"key": "cpuWidget:cpudata", "data": cpu_stats})
-            gevent.sleep(1)
-
-
-class NetworkWidgetNamespace(RockstorIO):
-
-    send = False
-
-    def on_connect(self, sid, environ):
+        sampler.unsubscribe(self.stream, self, sid)
 
-        self.send = True
-        self.spawn(self.network_stats, sid)
 
-    def on_disconnect(self, sid):
-
-        self.cleanup(sid)
-        self.send = False
-
-    def network_stats(self):
-
-        from storageadmin.models import NetworkDevice
-
-        def retrieve_network_stats(prev_stats):
-
-            interfaces = [i.name for i in NetworkDevice.objects.all()]
-            interval = 1
-            cur_stats = {}
-            with open("/proc/net/dev") as sfo:
-                sfo.readline()
-                sfo.readline()
-                for line in sfo.readlines():
-                    fields = line.split()
-                    if fields[0][:-1] not in interfaces:
-                        continue
-                    cur_stats[fields[0][:-1]] = fields[1:]
-            ts = datetime.utcnow().replace(tzinfo=utc).isoformat()
-            if isinstance(prev_stats, dict):
-                results = []
-                for interface in cur_stats.keys():
-                    if interface in prev_stats:
-                        data = list(
-                            map(
-                                lambda x, y: float(x) / interval
-                                if x < y
-                                else (float(x) - float(y)) / interval,
-                                cur_stats[interface],
-                                prev_stats[interface],
-                            )
-                        )
-                        results.append(
-                            {
-                                "device": interface,
-                                "kb_rx": data[0],
-                                "packets_rx": data[1],
-                                "errs_rx": data[2],
-                                "drop_rx": data[3],
-                                "fifo_rx": data[4],
-                                "frame": data[5],
-                                "compressed_rx": data[6],
-                                "multicast_rx": data[7],
-                                "kb_tx": data[8],
-                                "packets_tx": data[9],
-                                "errs_tx": data[10],
-                                "drop_tx": data[11],
-                                "fifo_tx": data[12],
-                                "colls": data[13],
-                                "carrier": data[14],
-                                "compressed_tx": data[15],
-                                "ts": str(ts),
-                            }
-                        )
-                if len(results) > 0:
-                    self.emit(
-                        "network",
-                        {"key": "networkWidget:network", "data": {"results": results}},
-                    )
-            return cur_stats
+class DisksWidgetNamespace(SampledWidgetNamespace):
 
-        def send_network_stats():
+    stream = "disks"
 
-            cur_stats = {}
-            while self.send:
-                cur_stats = retrieve_network_stats(cur_stats)
-                gevent.sleep(1)
 
-        send_network_stats()
+class CPUWidgetNamespace(SampledWidgetNamespace):
 
+    stream = "cpu"
 
-class MemoryWidgetNamespace(RockstorIO):
 
-    switch = False
+class NetworkWidgetNamespace(SampledWidgetNamespace):
 
-    def on_connect(self, sid, environ):
+    stream = "network"
 
-        self.switch = True
-        self.spawn(self.send_meminfo_data, sid)
 
-    def on_disconnect(self, sid):
+class MemoryWidgetNamespace(SampledWidgetNamespace):
 
-        self.cleanup(sid)
-        self.switch = False
-
-    def send_meminfo_data(self):
-
-        while self.switch:
-            stats_file = "/proc/meminfo"
-            (
-                total,
-                free,
-                buffers,
-                cached,
-                swap_total,
-                swap_free,
-                active,
-                inactive,
-                dirty,
-            ) = (None,) * 9
-            with open(stats_file) as sfo:
-                for l in sfo.readlines():
-                    if re.match("MemTotal:", l) is not None:
-                        total = int(l.split()[1])
-                    elif re.match("MemFree:", l) is not None:
-                        free = int(l.split()[1])
-                    elif re.match("Buffers:", l) is not None:
-                        buffers = int(l.split()[1])
-                    elif re.match("Cached:", l) is not None:
-                        cached = int(l.split()[1])
-                    elif re.match("SwapTotal:", l) is not None:
-                        swap_total = int(l.split()[1])
-                    elif re.match("SwapFree:", l) is not None:
-                        swap_free = int(l.split()[1])
-                    elif re.match("Active:", l) is not None:
-                        active = int(l.split()[1])
-                    elif re.match("Inactive:", l) is not None:
-                        inactive = int(l.split()[1])
-                    elif re.match("Dirty:", l) is not None:
-                        dirty = int(l.split()[1])
-                        break  # no need to look at lines after dirty.
-            ts = datetime.utcnow().replace(tzinfo=utc).isoformat()
-            self.emit(
-                "memory",
-                {
-                    "key": "memoryWidget:memory",
-                    "data": {
-                        "results": [
-                            {
-                                "total": total,
-                                "free": free,
-                                "buffers": buffers,
-                                "cached": cached,
-                                "swap_total": swap_total,
-                                "swap_free": swap_free,
-                                "active": active,
-                                "inactive": inactive,
-                                "dirty": dirty,
-                                "ts": str(ts),
-                            }
-                        ]
-                    },
-                },
-            )
-            gevent.sleep(1)
+    stream = "memory"
 
 
 class ServicesNamespace(RockstorIO):
@@ -922,6 +721,22 @@ class ServicesNamespace(RockstorIO):
             gevent.sleep(15)
 
 
+class JobsNamespace(RockstorIO):
+    """
+    Streams job engine progress (storageadmin/views/job_helpers.py): on
+    connect all active jobs, then each job as its status or progress changes.
+    Fed by our shared JobProgressMonitor.
+    """
+
+    def on_connect(self, sid, environ):
+        self.emit("connected", {"key": "jobs:connected", "data": "connected"})
+        job_progress.subscribe(self, sid)
+
+    def on_disconnect(self, sid):
+        self.cleanup(sid)
+        job_progress.unsubscribe(self, sid)
+
+
 class SysinfoNamespace(RockstorIO):
 
     start = False
@@ -942,13 +757,15 @@ class SysinfoNamespace(RockstorIO):
         self.spawn(self.send_uptime, sid)
         self.spawn(self.send_distroinfo, sid)
         self.spawn(self.shutdown_status, sid)
-        self.spawn(self.pool_degraded_status, sid)
-        self.spawn(self.pool_dev_stats, sid)
+        pool_health.subscribe(self, sid)
+        smart_trends.subscribe(self, sid)
 
     # Run on every disconnect
     def on_disconnect(self, sid):
 
         self.cleanup(sid)
+        pool_health.unsubscribe(self, sid)
+        smart_trends.unsubscribe(self, sid)
         self.start = False
 
     def send_uptime(self):
@@ -983,15 +800,25 @@ class SysinfoNamespace(RockstorIO):
             logger.error("Exception while gathering kernel info: %s" % e.__str__())
 
     def update_storage_state(self):
-        # update storage state once a minute as long as
-        # there is a client connected.
+        # update storage state every 20 seconds as long as there is a client
+        # connected. Full disk scans are far less frequent while udev events
+        # drive incremental disk rescans: see DiskEventListener.
+        last_disk_scan = 0
         while self.start:
-            resources = [
-                {
-                    "url": "disks/scan",
-                    "success": "Disk state updated successfully",
-                    "error": "Failed to update disk state.",
-                },
+            resources = []
+            disk_scan_interval = (
+                DISK_RESCAN_INTERVAL if disk_events.active else DISK_POLL_INTERVAL
+            )
+            if time.time() - last_disk_scan >= disk_scan_interval:
+                last_disk_scan = time.time()
+                resources.append(
+                    {
+                        "url": "disks/scan",
+                        "success": "Disk state updated successfully",
+                        "error": "Failed to update disk state.",
+                    }
+                )
+            resources += [
                 {
                     "url": "commands/refresh-pool-state",
                     "success": "Pool state updated successfully",
@@ -1008,13 +835,18 @@ class SysinfoNamespace(RockstorIO):
                     "error": "Failed to update snapshot state.",
                 },
             ]
-            for r in resources:
-                try:
-                    self.aw.api_call(
-                        r["url"], data=None, calltype="post", save_error=False
-                    )
-                except Exception as e:
-                    logger.error(f"{r['error']}. exception: {e.__str__()}")
+            # One round trip for all, in order.
+            try:
+                results = self.aw.api_batch(
+                    [{"url": r["url"], "method": "post"} for r in resources]
+                )
+                for r, result in zip(resources, results):
+                    if result["status"] != 200:
+                        logger.error(f"{r['error']}. exception: {result['data']}")
+            except Exception as e:
+                logger.error(
+                    f"Failed to update storage state. exception: {e.__str__()}"
+                )
             gevent.sleep(20)
 
     def update_check(self):
@@ -1075,61 +907,6 @@ class SysinfoNamespace(RockstorIO):
 
             gevent.sleep(30)
 
-    def pool_degraded_status(self):
-
-        # Examples of data.message:
-        # "Pools found degraded: (2) unimported"
-        # "Pools found degraded: (rock-pool)"
-        # "Pools found degraded: (rock-pool, rock-pool-3)"
-        # "Pools found degraded: (rock-pool, rock-pool-3), plus (1) unimported"
-        while self.start:
-            data = {"status": "OK"}
-            deg_pools_count = degraded_pools_found()
-            if deg_pools_count > 0:
-                data["status"] = "degraded"
-                data["message"] = "Pools found degraded: "
-                labels = []
-                for p in Pool.objects.all():
-                    if p.has_missing_dev:
-                        deg_pools_count -= 1
-                        labels.append(p.name)
-                if labels != []:
-                    data["message"] += "({})".format(", ".join(labels))
-                if deg_pools_count > 0:
-                    # we have degraded un-managed pools, add this info
-                    if labels != []:
-                        data["message"] += ", plus "
-                    data["message"] += "({}) unimported".format(deg_pools_count)
-
-            self.emit(
-                "pool_degraded_status",
-                {"key": "sysinfo:pool_degraded_status", "data": data},
-            )
-
-            gevent.sleep(30)
-
-    def pool_dev_stats(self):
-
-        # Examples of data.message:
-        # "Pools found with device errors: (rock-pool)"
-        # "Pools found with device errors: (rock-pool, rock-pool-3)"
-        # TODO: Consider blending into the existing pool_degraded_status()
-        # TODO: to reduce overheads of looping through pools again.
-        # TODO: The combined emitter could be called pool_health_status().
-        while self.start:
-            data = {"status": "OK"}
-            labels = []
-            for p in Pool.objects.all():
-                if not p.dev_stats_ok:
-                    labels.append(p.name)
-            if labels != []:
-                data["status"] = "errors"
-                data["message"] = "Pools found with device errors: "
-                data["message"] += "({})".format(", ".join(labels))
-            self.emit("pool_dev_stats", {"key": "sysinfo:pool_dev_stats", "data": data})
-
-            gevent.sleep(30)
-
 
 def main():
 
@@ -1147,10 +924,19 @@ def main():
         DisksWidgetNamespace("/disk_widget"),
         LogManagerNamespace("/logmanager"),
         PincardManagerNamespace("/pincardmanager"),
+        JobsNamespace("/jobs"),
     ]
     # async_mode "threading" invokes simple-websocket.
     # https://python-socketio.readthedocs.io/en/latest/server.html#standard-threads
     # This did not allow us to removes gevent's monkey patching.
+    disk_events.start()
+    if settings.METRICS_HISTORY["enabled"]:
+        sampler.enable_history(
+            MetricsHistory(
+                settings.METRICS_HISTORY["path"], settings.METRICS_HISTORY["rollups"]
+            )
+        )
+    nfsd_sampler.start()
     sio_server = socketio.Server(async_mode="threading", cors_allowed_origins='*', logger=False, engineio_logger=False)
     for namespace in sio_namespaces:
         sio_server.register_namespace(namespace)
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.30 on 2026-10-18 17:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("smart_manager", "0003_auto_20230810_1143"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="receivetrail",
+            name="compression",
+            field=models.CharField(max_length=10, null=True),
+        ),
+        migrations.AddField(
+            model_name="receivetrail",
+            name="kb_received_compressed",
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="replicatrail",
+            name="compression",
+            field=models.CharField(max_length=10, null=True),
+        ),
+        migrations.AddField(
+            model_name="replicatrail",
+            name="kb_sent_compressed",
+            field=models.BigIntegerField(default=0),
+        ),
+    ]
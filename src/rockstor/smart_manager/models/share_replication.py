@@ -50,6 +50,10 @@ class ReplicaTrail(models.Model):
     replica = models.ForeignKey(Replica, on_delete=models.CASCADE)
     snap_name = models.CharField(max_length=1024)
     kb_sent = models.BigIntegerField(default=0)
+    """on the wire size of kb_sent (btrfs send stream) after compression"""
+    kb_sent_compressed = models.BigIntegerField(default=0)
+    """negotiated stream compression mode: None = uncompressed"""
+    compression = models.CharField(max_length=10, null=True)
     snapshot_created = models.DateTimeField(null=True)
     snapshot_failed = models.DateTimeField(null=True)
     send_pending = models.DateTimeField(null=True)
@@ -94,6 +98,10 @@ class ReceiveTrail(models.Model):
     rshare = models.ForeignKey(ReplicaShare, on_delete=models.CASCADE)
     snap_name = models.CharField(max_length=1024)
     kb_received = models.BigIntegerField(default=0)
+    """on the wire size of kb_received (btrfs send stream) when compressed"""
+    kb_received_compressed = models.BigIntegerField(default=0)
+    """negotiated stream compression mode: None = uncompressed"""
+    compression = models.CharField(max_length=10, null=True)
     receive_pending = models.DateTimeField(null=True)
     receive_succeeded = models.DateTimeField(null=True)
     receive_failed = models.DateTimeField(null=True)
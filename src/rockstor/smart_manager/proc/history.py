@@ -0,0 +1,288 @@
+"""
+Copyright (joint work) 2024 The Rockstor Project <https://rockstor.com>
+
+Rockstor is free software; you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published
+by the Free Software Foundation; either version 2 of the License,
+or (at your option) any later version.
+
+Rockstor is distributed in the hope that it will be useful, but
+WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program. If not, see <https://www.gnu.org/licenses/>.
+"""
+
+"""
+On-box time-series store for Dashboard metrics: round-robin style fixed size
+ring buffer files, one per metric instance (e.g. a disk) and rollup
+resolution, under settings.METRICS_HISTORY["path"]:
+
+    <path>/<metric>/<instance>.<rollup>
+
+Each slot is a little-endian int64 timestamp (bucket start) followed by one
+float64 per metric field. The slot for a timestamp is (ts // step) % slots, so
+a write never needs a head pointer and a slot whose stored timestamp does not
+match the expected bucket is simply a gap. Coarser rollups are the average of
+the finer samples within each bucket, flushed when a bucket completes.
+"""
+
+import logging
+import math
+import os
+import re
+import struct
+import time
+
+logger = logging.getLogger(__name__)
+
+DISK_STAT_FIELDS = [
+    "reads_completed",
+    "reads_merged",
+    "sectors_read",
+    "ms_reading",
+    "writes_completed",
+    "writes_merged",
+    "sectors_written",
+    "ms_writing",
+    "ios_progress",
+    "ms_ios",
+    "weighted_ios",
+]
+
+NET_STAT_FIELDS = [
+    "kb_rx",
+    "packets_rx",
+    "errs_rx",
+    "drop_rx",
+    "fifo_rx",
+    "frame",
+    "compressed_rx",
+    "multicast_rx",
+    "kb_tx",
+    "packets_tx",
+    "errs_tx",
+    "drop_tx",
+    "fifo_tx",
+    "colls",
+    "carrier",
+    "compressed_tx",
+]
+
+CPU_FIELDS = ["umode", "umode_nice", "smode", "idle"]
+
+MEMORY_FIELDS = [
+    "total",
+    "free",
+    "buffers",
+    "cached",
+    "swap_total",
+    "swap_free",
+    "active",
+    "inactive",
+    "dirty",
+]
+
+METRICS = {
+    "disk": DISK_STAT_FIELDS,
+    "network": NET_STAT_FIELDS,
+    "cpu": CPU_FIELDS,
+    "memory": MEMORY_FIELDS,
+}
+
+# By-id disk names, interface names, cpuN: no path separators or dot files.
+INSTANCE_REGEX = r"[A-Za-z0-9_:@+-][A-Za-z0-9_.:@+-]*"
+
+
+class RingBuffer(object):
+    """Fixed size file of (timestamp, fields...) slots, one per step seconds."""
+
+    def __init__(self, file_path: str, step: int, slots: int, num_fields: int):
+        self.file_path = file_path
+        self.step = step
+        self.slots = slots
+        self.record = struct.Struct(f"<q{num_fields}d")
+        self.fd = None
+
+    def _open(self):
+        if self.fd is None:
+            os.makedirs(os.path.dirname(self.file_path), exist_ok=True)
+            self.fd = os.open(self.file_path, os.O_RDWR | os.O_CREAT, 0o644)
+            size = self.slots * self.record.size
+            if os.fstat(self.fd).st_size != size:
+                # New, or retention changed: start afresh (sparse file).
+                os.ftruncate(self.fd, 0)
+                os.ftruncate(self.fd, size)
+        return self.fd
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+    def write(self, bucket: int, values: list[float]):
+        offset = (bucket % self.slots) * self.record.size
+        os.pwrite(self._open(), self.record.pack(bucket * self.step, *values), offset)
+
+    def read(self, first: int, last: int) -> list[list]:
+        """
+        :param first: first bucket (ts // step), inclusive.
+        :param last: last bucket, inclusive. At most slots buckets are read.
+        :return: [ts, field values...] rows in time order, gaps omitted.
+        """
+        if not os.path.exists(self.file_path):
+            return []
+        first = max(first, last - self.slots + 1)
+        with open(self.file_path, "rb") as fo:
+            data = fo.read()
+        if len(data) != self.slots * self.record.size:
+            return []
+        rows = []
+        for bucket in range(first, last + 1):
+            row = self.record.unpack_from(
+                data, (bucket % self.slots) * self.record.size
+            )
+            if row[0] == bucket * self.step:
+                rows.append(list(row))
+        return rows
+
+
+class MetricsHistory(object):
+    """
+    Writer and reader of the Dashboard metrics history. Writing is expected
+    from a single process (data_collector); reading from any.
+    """
+
+    def __init__(self, path: str, rollups: dict):
+        self.path = path
+        # Finest resolution first.
+        self.rollups = sorted(rollups.items(), key=lambda r: r[1][0])
+        self.buffers = {}
+        # (metric, instance, rollup): [bucket, sums, count] of coarse rollups.
+        self.pending = {}
+
+    def _buffer(self, metric: str, instance: str, rollup: str) -> RingBuffer:
+        key = (metric, instance, rollup)
+        if key not in self.buffers:
+            step, slots = dict(self.rollups)[rollup]
+            file_path = os.path.join(self.path, metric, f"{instance}.{rollup}")
+            self.buffers[key] = RingBuffer(file_path, step, slots, len(METRICS[metric]))
+        return self.buffers[key]
+
+    def record(self, metric: str, instance: str, sample: dict, ts: float = None):
+        """
+        Add a sample to the finest rollup, accumulating it into the coarser
+        ones which are written as their buckets complete.
+        :param sample: dict with METRICS[metric] keys, missing fields are NaN.
+        """
+        if re.fullmatch(INSTANCE_REGEX, instance) is None:
+            logger.debug(f"Skipping metrics history of ({metric}/{instance}).")
+            return
+        if ts is None:
+            ts = time.time()
+        values = [
+            float(sample[f]) if sample.get(f) is not None else math.nan
+            for f in METRICS[metric]
+        ]
+        for n, (rollup, (step, slots)) in enumerate(self.rollups):
+            bucket = int(ts // step)
+            if n == 0:
+                self._buffer(metric, instance, rollup).write(bucket, values)
+                continue
+            key = (metric, instance, rollup)
+            acc = self.pending.get(key)
+            if acc is not None and acc[0] != bucket:
+                self._buffer(metric, instance, rollup).write(
+                    acc[0], [s / acc[2] for s in acc[1]]
+                )
+                acc = None
+            if acc is None:
+                self.pending[key] = [bucket, list(values), 1]
+            else:
+                acc[1] = [s + v for s, v in zip(acc[1], values)]
+                acc[2] += 1
+
+    def close(self):
+        for buffer in self.buffers.values():
+            buffer.close()
+
+    def instances(self) -> dict:
+        """:return: {metric: [instance, ...]} of those with history on file."""
+        found = {}
+        for metric in METRICS:
+            metric_dir = os.path.join(self.path, metric)
+            if not os.path.isdir(metric_dir):
+                continue
+            names = {f.rsplit(".", 1)[0] for f in os.listdir(metric_dir)}
+            found[metric] = sorted(names)
+        return found
+
+    def query(
+        self,
+        metric: str,
+        instance: str,
+        start: float,
+        end: float,
+        rollup: str = None,
+        max_points: int = None,
+    ) -> dict:
+        """
+        Ranged query, from the finest rollup whose retention covers start
+        unless one is specified, further downsampled (averaged) to at most
+        max_points rows.
+        :return: dict of rollup, step (seconds per row), fields, and points:
+        [[ts, field values...], ...] in time order, None for unknown values.
+        """
+        if metric not in METRICS or re.fullmatch(INSTANCE_REGEX, instance) is None:
+            raise ValueError(f"Unknown metric instance ({metric}/{instance}).")
+        rollups = dict(self.rollups)
+        if rollup not in rollups and rollup is not None:
+            raise ValueError(
+                f"Unknown rollup ({rollup}), available: {list(rollups.keys())}."
+            )
+        if rollup is None:
+            now = time.time()
+            rollup = self.rollups[-1][0]
+            for name, (step, slots) in self.rollups:
+                if start >= now - step * slots:
+                    rollup = name
+                    break
+        step, slots = rollups[rollup]
+        points = self._buffer(metric, instance, rollup).read(
+            int(start // step), int(end // step)
+        )
+        if max_points is not None and len(points) > max_points > 0:
+            group = math.ceil(((end - start) / step) / max_points)
+            step *= group
+            points = downsample(points, step)
+        # NaN is not valid JSON.
+        points = [
+            [None if isinstance(v, float) and math.isnan(v) else v for v in row]
+            for row in points
+        ]
+        return {
+            "rollup": rollup,
+            "step": step,
+            "fields": METRICS[metric],
+            "points": points,
+        }
+
+
+def downsample(points: list[list], step: int) -> list[list]:
+    """Average time ordered [ts, values...] rows into step second buckets."""
+    result = []
+    bucket = acc = None
+    for row in points:
+        row_bucket = int(row[0] // step)
+        if row_bucket != bucket:
+            if acc is not None:
+                result.append([bucket * step] + [s / acc[1] for s in acc[0]])
+            bucket, acc = row_bucket, [list(row[1:]), 1]
+        else:
+            acc[0] = [s + v for s, v in zip(acc[0], row[1:])]
+            acc[1] += 1
+    if acc is not None:
+        result.append([bucket * step] + [s / acc[1] for s in acc[0]])
+    return result
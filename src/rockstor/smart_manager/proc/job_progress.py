@@ -0,0 +1,91 @@
+"""
+Copyright (joint work) 2024 The Rockstor Project <https://rockstor.com>
+
+Rockstor is free software; you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published
+by the Free Software Foundation; either version 2 of the License,
+or (at your option) any later version.
+
+Rockstor is distributed in the hope that it will be useful, but
+WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program. If not, see <https://www.gnu.org/licenses/>.
+"""
+
+"""
+Job engine progress (storageadmin/views/job_helpers.py) for all data_collector
+JobsNamespace clients from a single poller: one db query per interval
+regardless of the number of connected clients.
+"""
+
+import logging
+
+from django.db.models import Q
+
+from smart_manager.proc.monitor import BroadcastMonitor
+
+logger = logging.getLogger(__name__)
+
+
+class JobProgressMonitor(BroadcastMonitor):
+    """
+    Broadcasts each job as its status or progress changes. A newly connected
+    client is sent all active jobs on its own.
+    """
+
+    prefix = "jobs"
+    # Seconds between job progress checks.
+    interval = 2
+
+    def __init__(self):
+        super(JobProgressMonitor, self).__init__()
+        # job id: (status, percent_done, message) as last broadcast.
+        self.sent = {}
+
+    def reset(self):
+        super(JobProgressMonitor, self).reset()
+        self.sent = {}
+
+    def current(self) -> list:
+        from storageadmin.models import Job
+        from storageadmin.models.job import ACTIVE_JOB_STATES
+        from storageadmin.serializers import JobSerializer
+
+        data = [
+            JobSerializer(job).data
+            for job in Job.objects.filter(status__in=ACTIVE_JOB_STATES)
+        ]
+        return [("job_progress", data)] if data else []
+
+    def tick(self):
+        try:
+            data = self.changed_jobs()
+        except Exception as e:
+            logger.error(f"Exception while checking job progress: {e.__str__()}")
+            return
+        if len(data) > 0:
+            self.broadcast("job_progress", data)
+
+    def changed_jobs(self) -> list:
+        from storageadmin.models import Job
+        from storageadmin.models.job import ACTIVE_JOB_STATES
+        from storageadmin.serializers import JobSerializer
+
+        data = []
+        for job in Job.objects.filter(
+            Q(status__in=ACTIVE_JOB_STATES) | Q(id__in=list(self.sent))
+        ):
+            state = (job.status, job.percent_done, job.message)
+            if self.sent.get(job.id) != state:
+                data.append(JobSerializer(job).data)
+            if job.active:
+                self.sent[job.id] = state
+            else:
+                self.sent.pop(job.id, None)
+        return data
+
+
+job_progress = JobProgressMonitor()
@@ -0,0 +1,106 @@
+"""
+Copyright (joint work) 2024 The Rockstor Project <https://rockstor.com>
+
+Rockstor is free software; you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published
+by the Free Software Foundation; either version 2 of the License,
+or (at your option) any later version.
+
+Rockstor is distributed in the hope that it will be useful, but
+WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program. If not, see <https://www.gnu.org/licenses/>.
+"""
+
+"""
+Base of the data_collector's shared monitors: one loop per monitor, not per
+connected client, whose changes are broadcast to every subscribed namespace.
+"""
+
+import logging
+
+import gevent
+
+logger = logging.getLogger(__name__)
+
+
+class BroadcastMonitor(object):
+    """
+    One gevent loop, alive while at least one namespace has a connected
+    client, assessing state every interval seconds. Only events whose data
+    changed are broadcast: a newly connected client is sent the current
+    state on its own.
+    Subclasses define prefix, interval and assess().
+    """
+
+    # Web-UI key prefix of our events: e.g. "sysinfo" for "sysinfo:<event>".
+    prefix = None
+    interval = None
+
+    def __init__(self):
+        # namespace: set of sids
+        self.subscribers = {}
+        self.thread = None
+        # event: data as last broadcast.
+        self.state = {}
+
+    def assess(self) -> dict:
+        """:return: {event: data} of our current state."""
+        raise NotImplementedError
+
+    def reset(self):
+        """Once our loop ends: our next subscriber gets a fresh assessment."""
+        self.state = {}
+
+    def current(self) -> list:
+        """:return: [(event, data), ...] to send a newly connected client."""
+        return list(self.state.items())
+
+    def payload(self, event: str, data) -> dict:
+        return {"key": "{}:{}".format(self.prefix, event), "data": data}
+
+    def subscribe(self, namespace, sid: str):
+        self.subscribers.setdefault(namespace, set()).add(sid)
+        for event, data in self.current():
+            namespace.emit(event, self.payload(event, data), to=sid)
+        if self.thread is None:
+            self.thread = gevent.spawn(self.run)
+
+    def unsubscribe(self, namespace, sid: str):
+        sids = self.subscribers.get(namespace)
+        if sids is None:
+            return
+        sids.discard(sid)
+        if not sids:
+            del self.subscribers[namespace]
+
+    def run(self):
+        try:
+            while self.subscribers:
+                self.tick()
+                gevent.sleep(self.interval)
+        finally:
+            self.thread = None
+            self.reset()
+
+    def tick(self):
+        try:
+            state = self.assess()
+        except Exception as e:
+            logger.error(
+                f"Exception in {self.__class__.__name__}.assess(): {e.__str__()}"
+            )
+            return
+        for event, data in state.items():
+            if self.state.get(event) == data:
+                continue
+            self.state[event] = data
+            self.broadcast(event, data)
+
+    def broadcast(self, event: str, data):
+        # Namespace level emit is a broadcast to all of its clients.
+        for namespace in list(self.subscribers):
+            namespace.emit(event, self.payload(event, data))
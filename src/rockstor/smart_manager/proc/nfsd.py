@@ -0,0 +1,149 @@
+"""
+Copyright (joint work) 2024 The Rockstor Project <https://rockstor.com>
+
+Rockstor is free software; you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published
+by the Free Software Foundation; either version 2 of the License,
+or (at your option) any later version.
+
+Rockstor is distributed in the hope that it will be useful, but
+WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program. If not, see <https://www.gnu.org/licenses/>.
+"""
+
+"""
+Always on NFS server call history from the kernel's own nfsd counters
+(/proc/net/rpc/nfsd), in place of the SystemTap "nfs-1" probe. Each sample
+is the per interval delta of those counters, stored as NFSDCallDistribution
+rows of a single non smart (smart=False) SProbe named "nfs-1", as served by
+our NFSDistribView. Rows are written in batches via bulk_create, and those
+older than NFSD_STATS["retention"] days are pruned on each write.
+"""
+
+import logging
+from datetime import timedelta
+
+import gevent
+from django.conf import settings
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+NFSD_STATS = "/proc/net/rpc/nfsd"
+PROBE_NAME = "nfs-1"
+
+CALL_FIELDS = (
+    "num_lookup",
+    "num_read",
+    "num_write",
+    "num_create",
+    "num_commit",
+    "num_remove",
+)
+
+# /proc/net/rpc/nfsd "procN" line label: indexes, within that line's
+# per procedure counters, of our CALL_FIELDS. By NFS version:
+# v2/v3 procedure, and v4 operation, numbers (RFCs 1094, 1813 and 7530).
+PROC_INDEXES = {
+    "proc2": (4, 6, 8, 9, None, 10),
+    "proc3": (3, 6, 7, 8, 21, 12),
+    "proc4ops": (15, 25, 38, 6, 5, 28),
+}
+
+
+def read_nfsd_stats(path=None) -> list[int] | None:
+    """
+    :return: cumulative counters of CALL_FIELDS followed by bytes read and
+    written, summed over all NFS versions. None if nfsd is not loaded.
+    """
+    counters = [0] * (len(CALL_FIELDS) + 2)
+    try:
+        with open(path or NFSD_STATS) as sfo:
+            for line in sfo:
+                fields = line.split()
+                if not fields:
+                    continue
+                if fields[0] == "io":
+                    counters[-2] += int(fields[1])
+                    counters[-1] += int(fields[2])
+                elif fields[0] in PROC_INDEXES:
+                    # procN <count> <counter of procedure 0> ...
+                    values = fields[2:]
+                    for i, index in enumerate(PROC_INDEXES[fields[0]]):
+                        if index is not None and index < len(values):
+                            counters[i] += int(values[index])
+    except FileNotFoundError:
+        return None
+    return counters
+
+
+class NFSDSampler(object):
+    """
+    One gevent loop sampling nfsd counters every NFSD_STATS["interval"]
+    seconds, buffering NFSDCallDistribution rows and flushing them every
+    NFSD_STATS["batch"] samples.
+    """
+
+    def __init__(self):
+        self.prev = None
+        self.rows = []
+        self.probe = None
+
+    def start(self):
+        gevent.spawn(self.run)
+
+    def run(self):
+        while True:
+            gevent.sleep(settings.NFSD_STATS["interval"])
+            try:
+                self.tick()
+            except Exception as e:
+                logger.error(f"Exception while sampling nfsd stats: {e.__str__()}")
+
+    def get_probe(self):
+        from smart_manager.models import SProbe
+
+        if self.probe is None:
+            self.probe = SProbe.objects.filter(name=PROBE_NAME, smart=False).first()
+            if self.probe is None:
+                self.probe = SProbe.objects.create(
+                    name=PROBE_NAME,
+                    display_name="NFS calls (nfsd)",
+                    smart=False,
+                    state="running",
+                )
+        return self.probe
+
+    def tick(self):
+        from smart_manager.models import NFSDCallDistribution
+
+        cur = read_nfsd_stats()
+        prev, self.prev = self.prev, cur
+        if cur is None or prev is None:
+            return
+        # A counter lower than its previous value has been reset (nfsd
+        # restart, or module reload).
+        deltas = [c if c < p else c - p for c, p in zip(cur, prev)]
+        row = dict(zip(CALL_FIELDS, deltas))
+        row["sum_read"] = deltas[-2] // 1024
+        row["sum_write"] = deltas[-1] // 1024
+        self.rows.append(
+            NFSDCallDistribution(rid=self.get_probe(), ts=timezone.now(), **row)
+        )
+        if len(self.rows) >= settings.NFSD_STATS["batch"]:
+            self.flush()
+
+    def flush(self):
+        from smart_manager.models import NFSDCallDistribution
+
+        rows, self.rows = self.rows, []
+        NFSDCallDistribution.objects.bulk_create(rows)
+        cutoff = timezone.now() - timedelta(days=settings.NFSD_STATS["retention"])
+        NFSDCallDistribution.objects.filter(rid=self.probe, ts__lt=cutoff).delete()
+
+
+nfsd_sampler = NFSDSampler()
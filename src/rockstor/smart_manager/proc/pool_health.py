@@ -0,0 +1,148 @@
+"""
+Copyright (joint work) 2024 The Rockstor Project <https://rockstor.com>
+
+Rockstor is free software; you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published
+by the Free Software Foundation; either version 2 of the License,
+or (at your option) any later version.
+
+Rockstor is distributed in the hope that it will be useful, but
+WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program. If not, see <https://www.gnu.org/licenses/>.
+"""
+
+"""
+Single pool health monitor shared by all data_collector SysinfoNamespace
+clients, in place of per client pool degraded and device error loops. Each
+tick reads the sysfs device entries of every mounted pool (missing devices
+and device error counters), and only on start, udev block device events, or
+every POOL_HEALTH["scan_interval"] seconds runs "btrfs fi show" for unmounted
+and unimported pools. Only changed states are broadcast: a newly connected
+client is sent the current state on its own.
+"""
+
+import logging
+import os
+import time
+
+from django.conf import settings
+
+from fs import btrfs_sysfs
+from fs.btrfs import degraded_pool_uuids
+from smart_manager.proc.monitor import BroadcastMonitor
+
+logger = logging.getLogger(__name__)
+
+
+class PoolHealthMonitor(BroadcastMonitor):
+    """
+    Assesses all pools every POOL_HEALTH["interval"] seconds.
+    """
+
+    prefix = "sysinfo"
+
+    def __init__(self):
+        super(PoolHealthMonitor, self).__init__()
+        # Degraded pool uuids per "btrfs fi show", and its monotonic time.
+        self.scan = set()
+        self.scanned = None
+        # Pool uuids with sysfs device entries as of our last tick.
+        self.mounted = set()
+
+    @property
+    def interval(self):
+        return settings.POOL_HEALTH["interval"]
+
+    def invalidate(self):
+        """Rescan with "btrfs fi show" on our next tick: disks have changed."""
+        self.scanned = None
+
+    def reset(self):
+        super(PoolHealthMonitor, self).reset()
+        self.scanned = None
+        self.mounted = set()
+
+    def assess(self) -> dict:
+        """
+        :return: {"pool_degraded_status": data, "pool_dev_stats": data} as
+        previously emitted by each SysinfoNamespace client's own loops.
+        """
+        from storageadmin.models import Pool
+
+        pools = dict(Pool.objects.values_list("uuid", "name"))
+        health = {}
+        for uuid in pools:
+            if uuid is None:
+                continue
+            try:
+                health[uuid] = btrfs_sysfs.dev_health(uuid)
+            except (OSError, ValueError):
+                # Unmounted, or a kernel prior to 5.14.
+                continue
+        now = time.monotonic()
+        if (
+            self.scanned is None
+            or now - self.scanned >= settings.POOL_HEALTH["scan_interval"]
+            # Unmounted since our last tick: no longer covered by sysfs.
+            or not self.mounted.issubset(health)
+        ):
+            self.scan = degraded_pool_uuids()
+            self.scanned = now
+        self.mounted = set(health)
+        degraded = set(self.scan)
+        stats_ok = {}
+        for uuid, (missing, zero) in health.items():
+            # A mounted pool's sysfs entries supersede our last scan.
+            if missing:
+                degraded.add(uuid)
+            else:
+                degraded.discard(uuid)
+            stats_ok[uuid] = zero
+        # Mounted on a kernel prior to 5.14: no devinfo error_stats.
+        fallback = [
+            u
+            for u in pools
+            if u is not None
+            and u not in health
+            and os.path.isdir(os.path.join(btrfs_sysfs.SYSFS_BTRFS, u))
+        ]
+        if fallback:
+            for p in Pool.objects.filter(uuid__in=fallback):
+                # Pool.dev_stats_ok: via "btrfs device stats".
+                stats_ok[p.uuid] = p.dev_stats_ok
+
+        # Examples of data.message:
+        # "Pools found degraded: (2) unimported"
+        # "Pools found degraded: (rock-pool)"
+        # "Pools found degraded: (rock-pool, rock-pool-3)"
+        # "Pools found degraded: (rock-pool, rock-pool-3), plus (1) unimported"
+        degraded_status = {"status": "OK"}
+        if degraded:
+            labels = sorted(pools[u] for u in degraded if u in pools)
+            unimported = len(degraded) - len(labels)
+            degraded_status["status"] = "degraded"
+            degraded_status["message"] = "Pools found degraded: "
+            if labels:
+                degraded_status["message"] += "({})".format(", ".join(labels))
+            if unimported > 0:
+                if labels:
+                    degraded_status["message"] += ", plus "
+                degraded_status["message"] += "({}) unimported".format(unimported)
+
+        # Examples of data.message:
+        # "Pools found with device errors: (rock-pool)"
+        # "Pools found with device errors: (rock-pool, rock-pool-3)"
+        dev_stats = {"status": "OK"}
+        labels = sorted(pools[u] for u, ok in stats_ok.items() if not ok)
+        if labels:
+            dev_stats["status"] = "errors"
+            dev_stats["message"] = "Pools found with device errors: "
+            dev_stats["message"] += "({})".format(", ".join(labels))
+        return {"pool_degraded_status": degraded_status, "pool_dev_stats": dev_stats}
+
+
+pool_health = PoolHealthMonitor()
@@ -0,0 +1,315 @@
+"""
+Copyright (joint work) 2024 The Rockstor Project <https://rockstor.com>
+
+Rockstor is free software; you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published
+by the Free Software Foundation; either version 2 of the License,
+or (at your option) any later version.
+
+Rockstor is distributed in the hope that it will be useful, but
+WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program. If not, see <https://www.gnu.org/licenses/>.
+"""
+
+"""
+Single /proc sampler shared by the Dashboard widget namespaces of the
+data_collector. Each tick reads only the sources that have subscribers, once,
+computes the deltas once, and broadcasts the result to every subscribed
+namespace. Dashboard cost is thereby independent of the number of connected
+browser tabs. When metrics history is enabled every source is sampled, with
+or without subscribers, and each sample is also recorded.
+"""
+
+import logging
+import time
+from datetime import datetime, timezone
+
+import gevent
+import psutil
+
+from smart_manager.proc.history import DISK_STAT_FIELDS, NET_STAT_FIELDS
+from system.constants import BLOCK_DEV_EXCLUDE
+from system.osi import get_byid_name_map
+
+logger = logging.getLogger(__name__)
+
+DISKSTATS = "/proc/diskstats"
+NET_DEV = "/proc/net/dev"
+MEMINFO = "/proc/meminfo"
+
+# stream: (event, key) as emitted to the Web-UI.
+STREAMS = {
+    "disks": ("top_disks", "diskWidget:top_disks"),
+    "cpu": ("cpudata", "cpuWidget:cpudata"),
+    "network": ("network", "networkWidget:network"),
+    "memory": ("memory", "memoryWidget:memory"),
+}
+
+# stream: (history metric, sample field holding the instance name)
+HISTORY = {
+    "disks": ("disk", "name"),
+    "cpu": ("cpu", "name"),
+    "network": ("network", "device"),
+    "memory": ("memory", None),
+}
+
+MEMINFO_FIELDS = {
+    "MemTotal:": "total",
+    "MemFree:": "free",
+    "Buffers:": "buffers",
+    "Cached:": "cached",
+    "SwapTotal:": "swap_total",
+    "SwapFree:": "swap_free",
+    "Active:": "active",
+    "Inactive:": "inactive",
+    "Dirty:": "dirty",
+}
+
+
+def _ts() -> str:
+    return str(datetime.now(timezone.utc).isoformat())
+
+
+def _deltas(cur: list[int], prev: list[int], interval: int) -> list[float]:
+    # A counter lower than its previous value has wrapped or been reset.
+    return [
+        float(c) / interval if c < p else float(c - p) / interval
+        for c, p in zip(cur, prev)
+    ]
+
+
+class ProcSampler(object):
+    """
+    One gevent loop, alive while at least one namespace has a connected client
+    or metrics history is enabled, sampling /proc/diskstats, /proc/net/dev, /proc/meminfo and
+    psutil.cpu_times_percent() every interval seconds.
+
+    Our db Disk and NetworkDevice name lists (and the by-id disk name map) are
+    cached. They are refreshed when the set of kernel device names in
+    /proc changes (hot plug/unplug, new interface), on invalidate(), or
+    otherwise every names_ttl seconds to pick up db only changes.
+    """
+
+    interval = 1
+    names_ttl = 60
+
+    def __init__(self):
+        # stream: {namespace: set(sid)}
+        self.subscribers = {stream: {} for stream in STREAMS}
+        self.thread = None
+        self.history = None
+        self.prev_disk_stats = {}
+        self.prev_net_stats = {}
+        # Device name caches: (kernel names seen in /proc, refresh time)
+        self.byid_disk_map = {}
+        self.disk_names = set()
+        self.disk_names_key = None
+        self.interfaces = set()
+        self.interfaces_key = None
+
+    def subscribe(self, stream: str, namespace, sid: str):
+        self.subscribers[stream].setdefault(namespace, set()).add(sid)
+        if self.thread is None:
+            self.thread = gevent.spawn(self.run)
+
+    def unsubscribe(self, stream: str, namespace, sid: str):
+        sids = self.subscribers[stream].get(namespace)
+        if sids is None:
+            return
+        sids.discard(sid)
+        if not sids:
+            del self.subscribers[stream][namespace]
+            if self.history is not None or self.subscribers[stream]:
+                return
+            # Drop stale counters so a later subscriber starts afresh.
+            if stream == "disks":
+                self.prev_disk_stats = {}
+            elif stream == "network":
+                self.prev_net_stats = {}
+
+    def enable_history(self, history):
+        """
+        Record every tick's samples in a MetricsHistory, sampling continuously.
+        """
+        self.history = history
+        if self.thread is None:
+            self.thread = gevent.spawn(self.run)
+
+    def invalidate(self):
+        """Force a refresh of the cached device name lists on the next tick."""
+        self.disk_names_key = self.interfaces_key = None
+
+    def active(self) -> bool:
+        return self.history is not None or any(self.subscribers.values())
+
+    def run(self):
+        try:
+            while self.active():
+                self.tick()
+                gevent.sleep(self.interval)
+        finally:
+            self.thread = None
+
+    def tick(self):
+        samplers = {
+            "disks": self.sample_disks,
+            "cpu": self.sample_cpu,
+            "network": self.sample_network,
+            "memory": self.sample_memory,
+        }
+        for stream, namespaces in self.subscribers.items():
+            if not namespaces and self.history is None:
+                continue
+            try:
+                data = samplers[stream]()
+            except Exception as e:
+                logger.error(f"Exception while sampling {stream} stats: {e.__str__()}")
+                continue
+            if data is None:
+                continue
+            if self.history is not None:
+                self.record(stream, data)
+            event, key = STREAMS[stream]
+            # Namespace level emit is a broadcast to all of its clients.
+            for namespace in list(namespaces):
+                namespace.emit(event, {"key": key, "data": data})
+
+    def record(self, stream: str, data):
+        metric, name_field = HISTORY[stream]
+        samples = data["results"] if isinstance(data, dict) else data
+        try:
+            for sample in samples:
+                instance = "system" if name_field is None else sample[name_field]
+                self.history.record(metric, instance, sample)
+        except Exception as e:
+            logger.error(f"Exception while recording {metric} history: {e.__str__()}")
+
+    def _names_stale(self, cache_key, kernel_names: frozenset) -> bool:
+        if cache_key is None:
+            return True
+        names, refreshed = cache_key
+        return names != kernel_names or (time.time() - refreshed) > self.names_ttl
+
+    def refresh_disk_names(self, kernel_names: frozenset):
+        from storageadmin.models import Disk
+
+        # TODO: Consider refactoring to use Disk.temp_name or building
+        #  byid_disk_map from the same.
+        self.byid_disk_map = get_byid_name_map()
+        self.disk_names = set(Disk.objects.values_list("name", flat=True))
+        self.disk_names_key = (kernel_names, time.time())
+
+    def refresh_interfaces(self, kernel_names: frozenset):
+        from storageadmin.models import NetworkDevice
+
+        self.interfaces = set(NetworkDevice.objects.values_list("name", flat=True))
+        self.interfaces_key = (kernel_names, time.time())
+
+    def sample_disks(self) -> list[dict]:
+        # Older Leap kernels: /proc/diskstats has lines of the following form:
+        #  8      64 sde 1034 0 9136 702 0 0 0 0 0 548 702
+        #  8      65 sde1 336 0 2688 223 0 0 0 0 0 223 223
+        # TW (2024): more fields, and loop block device entries.
+        #  8       0 sda 2507 0 101712 388 0 0 0 0 0 264 388 0 0 0 0 0 0
+        #  7       0 loop0 0 0 0 0 0 0 0 0 0 0 0 0 0 0 0 0 0
+        raw_stats = {}
+        with open(DISKSTATS) as stats_file:
+            for line in stats_file:
+                fields = line.split()
+                # Sanity check: available fields and block device blacklist
+                if len(fields) < 14 or fields[0] in BLOCK_DEV_EXCLUDE:
+                    continue
+                raw_stats[fields[2]] = fields[3:14]
+        kernel_names = frozenset(raw_stats)
+        if self._names_stale(self.disk_names_key, kernel_names):
+            self.refresh_disk_names(kernel_names)
+        # As the /proc/diskstats lines contain transient type names we convert
+        # those to our by-id db names, ignoring those not in our db.
+        cur_stats = {}
+        for kname, fields in raw_stats.items():
+            byid_name = self.byid_disk_map.get(kname)
+            if byid_name in self.disk_names:
+                cur_stats[byid_name] = [int(f) for f in fields]
+        disks_stats = []
+        ts = _ts()
+        for disk, cur in cur_stats.items():
+            prev = self.prev_disk_stats.get(disk)
+            if prev is None:
+                continue
+            data = _deltas(cur, prev, self.interval)
+            # ios currently in progress is a gauge, not a counter.
+            data[8] = (float(cur[8]) + float(prev[8])) / 2
+            stats = dict(zip(DISK_STAT_FIELDS, data))
+            stats["name"] = disk
+            stats["ts"] = ts
+            disks_stats.append(stats)
+        self.prev_disk_stats = cur_stats
+        return disks_stats
+
+    def sample_cpu(self) -> dict:
+        results = []
+        ts = _ts()
+        for i, val in enumerate(psutil.cpu_times_percent(percpu=True)):
+            results.append(
+                {
+                    "name": "cpu%d" % i,
+                    "umode": val.user,
+                    "umode_nice": val.nice,
+                    "smode": val.system,
+                    "idle": val.idle,
+                    "ts": ts,
+                }
+            )
+        return {"results": results}
+
+    def sample_network(self) -> dict | None:
+        raw_stats = {}
+        with open(NET_DEV) as sfo:
+            # Skip the two header lines.
+            sfo.readline()
+            sfo.readline()
+            for line in sfo:
+                fields = line.split()
+                raw_stats[fields[0][:-1]] = fields[1:17]
+        kernel_names = frozenset(raw_stats)
+        if self._names_stale(self.interfaces_key, kernel_names):
+            self.refresh_interfaces(kernel_names)
+        cur_stats = {
+            name: [int(f) for f in fields]
+            for name, fields in raw_stats.items()
+            if name in self.interfaces
+        }
+        results = []
+        ts = _ts()
+        for interface, cur in cur_stats.items():
+            prev = self.prev_net_stats.get(interface)
+            if prev is None:
+                continue
+            stats = dict(zip(NET_STAT_FIELDS, _deltas(cur, prev, self.interval)))
+            stats["device"] = interface
+            stats["ts"] = ts
+            results.append(stats)
+        self.prev_net_stats = cur_stats
+        if len(results) == 0:
+            return None
+        return {"results": results}
+
+    def sample_memory(self) -> dict:
+        stats = dict.fromkeys(MEMINFO_FIELDS.values())
+        with open(MEMINFO) as sfo:
+            for line in sfo:
+                fields = line.split()
+                if fields and fields[0] in MEMINFO_FIELDS:
+                    stats[MEMINFO_FIELDS[fields[0]]] = int(fields[1])
+                    if fields[0] == "Dirty:":
+                        break  # no need to look at lines after dirty.
+        stats["ts"] = _ts()
+        return {"results": [stats]}
+
+
+# Module level instance shared by all data_collector namespaces.
+sampler = ProcSampler()
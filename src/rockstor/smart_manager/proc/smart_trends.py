@@ -0,0 +1,65 @@
+"""
+Copyright (joint work) 2024 The Rockstor Project <https://rockstor.com>
+
+Rockstor is free software; you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published
+by the Free Software Foundation; either version 2 of the License,
+or (at your option) any later version.
+
+Rockstor is distributed in the hope that it will be useful, but
+WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program. If not, see <https://www.gnu.org/licenses/>.
+"""
+
+"""
+Alerts of our hourly SMART trend evaluator (see
+storageadmin/views/smart_history_helpers.py) for all data_collector
+SysinfoNamespace clients from a single reader of its Huey result.
+"""
+
+import logging
+
+from huey.contrib.djhuey import HUEY
+
+from smart_manager.proc.monitor import BroadcastMonitor
+from storageadmin.views.smart_history_helpers import TREND_ALERTS_KEY
+
+logger = logging.getLogger(__name__)
+
+
+class SMARTTrendMonitor(BroadcastMonitor):
+    """
+    Broadcasts "smart_trend_alerts" as our evaluator's alerts change. Example
+    data.message: "Disks with accelerating SMART failure indicators:
+    (ata-WDC_WD40EFRX_WD-1 Reallocated_Sector_Ct +8)"
+    """
+
+    prefix = "sysinfo"
+    # Seconds between reads of our evaluator's latest alerts.
+    interval = 60
+
+    def assess(self) -> dict:
+        data = {"status": "OK"}
+        try:
+            alerts = HUEY.get(TREND_ALERTS_KEY, peek=True) or []
+        except Exception as e:
+            logger.error(f"Failed to read SMART trend alerts: {e.__str__()}")
+            alerts = []
+        if alerts:
+            data["status"] = "warning"
+            data["message"] = "Disks with accelerating SMART failure indicators: "
+            data["message"] += "({})".format(
+                ", ".join(
+                    "{} {} +{}".format(a["disk"], a["name"], a["recent"])
+                    for a in alerts
+                )
+            )
+            data["alerts"] = alerts
+        return {"smart_trend_alerts": data}
+
+
+smart_trends = SMARTTrendMonitor()
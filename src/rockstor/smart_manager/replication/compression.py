@@ -0,0 +1,122 @@
+"""
+Copyright (joint work) 2024 The Rockstor Project <https://rockstor.com>
+
+Rockstor is free software; you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published
+by the Free Software Foundation; either version 2 of the License,
+or (at your option) any later version.
+
+Rockstor is distributed in the hope that it will be useful, but
+WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program. If not, see <https://www.gnu.org/licenses/>.
+"""
+
+"""
+Inline stream compression for replication payloads (btrfs send stream).
+Each fsdata chunk is compressed within a single stream per replication, and
+flushed per chunk, so every message can be decompressed on arrival while
+retaining the inter-chunk compression history.
+
+zlib is always available (Python standard library). zstd is used only when
+the optional "zstandard" module is installed on both Sender and Receiver.
+"""
+
+import zlib
+import logging
+
+logger = logging.getLogger(__name__)
+
+try:
+    import zstandard
+except ModuleNotFoundError:
+    zstandard = None
+
+# Supported modes in order of preference.
+COMPRESSION_MODES = ["zstd", "zlib"] if zstandard is not None else ["zlib"]
+
+
+class ZlibCompressor(object):
+    def __init__(self):
+        self.cobj = zlib.compressobj(level=1)
+
+    def compress(self, data: bytes) -> bytes:
+        return self.cobj.compress(data) + self.cobj.flush(zlib.Z_SYNC_FLUSH)
+
+
+class ZlibDecompressor(object):
+    def __init__(self):
+        self.dobj = zlib.decompressobj()
+
+    def decompress(self, data: bytes) -> bytes:
+        return self.dobj.decompress(data)
+
+
+class ZstdCompressor(object):
+    def __init__(self):
+        self.cobj = zstandard.ZstdCompressor(level=3).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        return self.cobj.compress(data) + self.cobj.flush(
+            zstandard.COMPRESSOBJ_FLUSH_BLOCK
+        )
+
+
+class ZstdDecompressor(object):
+    def __init__(self):
+        self.dobj = zstandard.ZstdDecompressor().decompressobj()
+
+    def decompress(self, data: bytes) -> bytes:
+        return self.dobj.decompress(data)
+
+
+COMPRESSORS = {
+    "zlib": (ZlibCompressor, ZlibDecompressor),
+    "zstd": (ZstdCompressor, ZstdDecompressor),
+}
+
+
+def compression_offer(preferred: str | None) -> list[str]:
+    """
+    Sender side list of compression modes to offer the Receiver.
+    :param preferred: settings.REPLICATION["compression"]: None (disabled),
+    "zstd" or "zlib".
+    :return: list of locally supported modes, preferred first. Empty list if
+    compression is disabled.
+    """
+    if preferred is None:
+        return []
+    if preferred not in COMPRESSION_MODES:
+        logger.error(
+            f"Replication compression ({preferred}) unsupported on this system, "
+            f"supported modes are: {COMPRESSION_MODES}."
+        )
+    offer = [preferred] if preferred in COMPRESSION_MODES else []
+    return offer + [m for m in COMPRESSION_MODES if m not in offer]
+
+
+def negotiate_compression(offered: list[str]) -> str | None:
+    """
+    Receiver side selection of the first offered mode we also support.
+    :param offered: Sender's compression_offer() list.
+    :return: selected mode or None for no compression.
+    """
+    for mode in offered:
+        if mode in COMPRESSION_MODES:
+            return mode
+    return None
+
+
+def get_compressor(mode: str | None):
+    if mode is None:
+        return None
+    return COMPRESSORS[mode][0]()
+
+
+def get_decompressor(mode: str | None):
+    if mode is None:
+        return None
+    return COMPRESSORS[mode][1]()
@@ -26,10 +26,15 @@ from django.conf import settings
 from django import db
 from contextlib import contextmanager
 from smart_manager.replication.util import ReplicationMixin
+from smart_manager.replication.compression import (
+    negotiate_compression,
+    get_decompressor,
+)
 from fs.btrfs import (
     get_oldest_snap,
     remove_share,
     set_property,
+    get_property,
     is_subvol,
     mount_share,
     BTRFS,
@@ -59,8 +64,29 @@ class Receiver(ReplicationMixin, Process):
         self.incremental = self.meta["incremental"]
         self.snap_name = self.meta["snap"]
         self.sender_id = self.meta["uuid"]
+        # Sender's credit window (chunks in flight): absent from the greeting
+        # of Senders that wait on a send-more per chunk.
+        self.window = max(1, int(self.meta.get("window", 1)))
+        # Grant credit in batches of up to half the window to cut replies.
+        self.credit_batch = max(1, self.window // 2)
+        self.credit_owed = 0
+        # Compression offer: absent from the greeting of Senders that predate
+        # compression, who also expect only a snapshot name in receiver-ready.
+        self.compression_offer = self.meta.get("compression")
+        self.compression = None
+        if self.compression_offer is not None:
+            self.compression = negotiate_compression(self.compression_offer)
+        self.decompressor = get_decompressor(self.compression)
+        self.total_bytes_received_compressed = 0
         self.sname = f"{self.sender_id}_{self.src_share}"
         self.snap_dir = f"{settings.MNT_PT}{self.dest_pool}/.snapshots/{self.sname}"
+        # Resumable (spooled) transfer: only when requested by the Sender.
+        self.resume = self.meta.get("resume", False) is True
+        self.spool_dir = (
+            f"{settings.MNT_PT}{self.dest_pool}/.replication_resume/{self.sname}"
+        )
+        self.spool_fp = f"{self.spool_dir}/{self.snap_name}.stream"
+        self.spool = None
         self.ppid = os.getpid()
         self.kb_received = 0
         self.rid = None
@@ -80,6 +106,9 @@ class Receiver(ReplicationMixin, Process):
         super(Receiver, self).__init__()
 
     def _sys_exit(self, code):
+        if self.spool is not None and not self.spool.closed:
+            # Retain what we have as our checkpoint for a resumed transfer.
+            self.spool.close()
         if self.rp is not None and self.rp.returncode is None:
             try:
                 self.rp.terminate()
@@ -158,6 +187,39 @@ class Receiver(ReplicationMixin, Process):
         logger.debug(f"remote message: {rmsg}")
         return rcommand, rmsg
 
+    def _grant_credit(self):
+        """
+        Return credit owed, for fsdata chunks consumed, to the Sender.
+        """
+        self.dealer.send_multipart(
+            [b"send-more", f"{self.credit_owed}".encode("utf-8")]
+        )
+        self.credit_owed = 0
+
+    def _open_spool(self) -> int:
+        """
+        Open, or re-open, our btrfs send stream spool file and prune spools of
+        prior snapshots for this share as these can no longer be resumed.
+        :return: byte offset of our checkpoint, i.e. stream already received.
+        """
+        run_command(["/usr/bin/mkdir", "-p", self.spool_dir])
+        for f in os.listdir(self.spool_dir):
+            if f"{self.spool_dir}/{f}" != self.spool_fp:
+                logger.debug(f"Id: {self.identity}. Removing stale spool: {f}")
+                os.remove(f"{self.spool_dir}/{f}")
+        self.spool = open(self.spool_fp, "ab")
+        return self.spool.tell()
+
+    def _checkpoint_spool(self):
+        self.spool.flush()
+        os.fsync(self.spool.fileno())
+
+    def _discard_spool(self):
+        if self.spool is not None:
+            self.spool.close()
+        if os.path.isfile(self.spool_fp):
+            os.remove(self.spool_fp)
+
     def _latest_snap_name(self, rso) -> str | None:
         for snap in ReceiveTrail.objects.filter(
             rshare=rso, status="succeeded"
@@ -269,6 +331,18 @@ class Receiver(ReplicationMixin, Process):
             run_command(["/usr/bin/mkdir", "-p", self.snap_dir])
             snap_fp = f"{self.snap_dir}/{self.snap_name}"
 
+            # A writable received snapshot is the partial leftover of an
+            # interrupted btrfs receive (which sets ro only on completion):
+            # remove it so we can receive it again.
+            if is_subvol(snap_fp) and not get_property(snap_fp, "ro"):
+                logger.info(
+                    f"Id: {self.identity}. Removing partially received snapshot ({snap_fp})."
+                )
+                self.msg = f"Failed to remove partially received snapshot ({snap_fp}).".encode(
+                    "utf-8"
+                )
+                run_command([BTRFS, "subvolume", "delete", snap_fp])
+
             # If the snapshot already exists, presumably from the previous
             # attempt and the sender tries to send the same, reply back with
             # snap_exists and do not start the btrfs-receive
@@ -279,17 +353,30 @@ class Receiver(ReplicationMixin, Process):
                 self._send_recv(b"snap-exists")
                 self._sys_exit(0)
 
-            cmd = [BTRFS, "receive", self.snap_dir]
-            self.msg = f"Failed to start the low level btrfs receive command({cmd}). Aborting.".encode(
-                "utf-8"
-            )
-            self.rp = subprocess.Popen(
-                cmd,
-                shell=False,
-                stdin=subprocess.PIPE,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-            )
+            resume_offset = 0
+            if self.resume:
+                # Spool the stream, btrfs receive is run from this on completion.
+                cmd = [BTRFS, "receive", "-f", self.spool_fp, self.snap_dir]
+                self.msg = f"Failed to open spool file ({self.spool_fp}).".encode(
+                    "utf-8"
+                )
+                resume_offset = self._open_spool()
+                if resume_offset > 0:
+                    logger.info(
+                        f"Id: {self.identity}. Resuming receive of {self.snap_name} at byte offset {resume_offset}."
+                    )
+            else:
+                cmd = [BTRFS, "receive", self.snap_dir]
+                self.msg = f"Failed to start the low level btrfs receive command({cmd}). Aborting.".encode(
+                    "utf-8"
+                )
+                self.rp = subprocess.Popen(
+                    cmd,
+                    shell=False,
+                    stdin=subprocess.PIPE,
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.PIPE,
+                )
 
             self.msg = b"Failed to send receiver-ready"
             # Previously our second parameter was (latest_snap or b"")
@@ -297,6 +384,15 @@ class Receiver(ReplicationMixin, Process):
                 snap_name = b""
             else:
                 snap_name = latest_snap.encode("utf8")
+            if self.compression_offer is not None or self.resume:
+                snap_name = json.dumps(
+                    {
+                        "snap": snap_name.decode("utf8"),
+                        "compression": self.compression,
+                        "offset": resume_offset,
+                    }
+                ).encode("utf8")
+            logger.debug(f"Id: {self.identity}. Compression: {self.compression}.")
             rcommand, rmsg = self._send_recv(b"receiver-ready", snap_name)
             if rcommand == b"":
                 logger.error(
@@ -308,6 +404,10 @@ class Receiver(ReplicationMixin, Process):
             num_msgs = 0
             start_time = time.time()
             while True:
+                if self.credit_owed > 0 and not self.poller.poll(timeout=0):
+                    # Nothing queued behind our last chunk: grant any
+                    # outstanding credit now rather than await a full batch.
+                    self._grant_credit()
                 events = dict(self.poller.poll(timeout=6000))  # 6 seconds
                 logger.debug(f"Events dict = {events}")
                 if events.get(self.dealer) == zmq.POLLIN:
@@ -318,8 +418,26 @@ class Receiver(ReplicationMixin, Process):
                         # this command concludes fsdata transfer. After this,
                         # btrfs-recev process should be
                         # terminated(.communicate).
+                        if self.resume:
+                            # Receive our now complete spooled stream.
+                            self.spool.close()
+                            self.msg = f"Failed to receive spooled stream ({self.spool_fp}).".encode(
+                                "utf-8"
+                            )
+                            try:
+                                run_command(cmd)
+                            except Exception:
+                                # Spool is unusable, don't resume from it.
+                                self._discard_spool()
+                                if is_subvol(snap_fp):
+                                    run_command(
+                                        [BTRFS, "subvolume", "delete", snap_fp],
+                                        throw=False,
+                                    )
+                                raise
+                            self._discard_spool()
                         # poll() returns None while process is running: rc otherwise.
-                        if self.rp.poll() is None:
+                        elif self.rp.poll() is None:
                             self.msg = b"Failed to terminate btrfs-recv command"
                             out, err = self.rp.communicate()
                             out = out.split(b"\n")
@@ -327,7 +445,7 @@ class Receiver(ReplicationMixin, Process):
                             logger.debug(
                                 f"Id: {self.identity}. Terminated btrfs-recv. cmd = {cmd} out = {out} err: {err} rc: {self.rp.returncode}"
                             )
-                        if self.rp.returncode != 0:
+                        if not self.resume and self.rp.returncode != 0:
                             self.msg = f"btrfs-recv exited with unexpected exitcode({self.rp.returncode}).".encode(
                                 "utf-8"
                             )
@@ -336,6 +454,10 @@ class Receiver(ReplicationMixin, Process):
                         data = {
                             "status": "succeeded",
                             "kb_received": total_kb_received,
+                            "kb_received_compressed": int(
+                                self.total_bytes_received_compressed / 1024
+                            ),
+                            "compression": self.compression,
                         }
                         self.msg = f"Failed to update receive trail for rtid: {self.rtid}".encode(
                             "utf-8"
@@ -354,10 +476,14 @@ class Receiver(ReplicationMixin, Process):
                         )
                         self._sys_exit(0)
 
+                    if command == b"btrfs-send-resume-error":
+                        # Sender's stream did not reproduce our spooled part.
+                        self._discard_spool()
                     if (
                         command == b"btrfs-send-init-error"
                         or command == b"btrfs-send-unexpected-termination-error"
                         or command == b"btrfs-send-nonzero-termination-error"
+                        or command == b"btrfs-send-resume-error"
                     ):
                         self.msg = f"Terminal command({command}) received from the sender. Aborting.".encode(
                             "utf-8"
@@ -365,19 +491,32 @@ class Receiver(ReplicationMixin, Process):
                         raise Exception(self.msg)
 
                     # poll() returns None while process is running: return code otherwise.
-                    if self.rp.poll() is None:
-                        self.rp.stdin.write(message)
-                        self.rp.stdin.flush()
-                        # @todo: implement advanced credit request system.
-                        self.dealer.send_multipart([b"send-more", b""])
+                    if self.resume or self.rp.poll() is None:
+                        self.total_bytes_received_compressed += len(message)
+                        if self.decompressor is not None:
+                            message = self.decompressor.decompress(message)
+                        if self.resume:
+                            self.spool.write(message)
+                        else:
+                            self.rp.stdin.write(message)
+                            self.rp.stdin.flush()
+                        self.credit_owed += 1
+                        if self.credit_owed >= self.credit_batch:
+                            self._grant_credit()
                         num_msgs += 1
                         self.total_bytes_received += len(message)
                         if num_msgs == 1000:
                             num_msgs = 0
+                            if self.resume:
+                                self._checkpoint_spool()
                             total_kb_received = int(self.total_bytes_received / 1024)
                             data = {
                                 "status": "pending",
                                 "kb_received": total_kb_received,
+                                "kb_received_compressed": int(
+                                    self.total_bytes_received_compressed / 1024
+                                ),
+                                "compression": self.compression,
                             }
                             self.update_receive_trail(self.rtid, data)
 
@@ -25,6 +25,7 @@ import time
 from django.conf import settings
 from contextlib import contextmanager
 from smart_manager.replication.util import ReplicationMixin
+from smart_manager.replication.compression import compression_offer, get_compressor
 from fs.btrfs import get_oldest_snap, is_subvol, BTRFS
 from smart_manager.models import ReplicaTrail
 from cli import APIWrapper
@@ -68,6 +69,21 @@ class Sender(ReplicationMixin, Process):
         self.total_bytes_sent = 0
         self.ppid = os.getpid()
         self.max_snap_retain = settings.REPLICATION.get("max_snap_retain")
+        # Credit based flow control: number of fsdata chunks we may send
+        # before waiting for the Receiver to grant more (via send-more).
+        self.send_window = max(1, settings.REPLICATION.get("send_window", 1))
+        self.credit = self.send_window
+        # Compression modes offered in our greeting, and the Receiver's choice.
+        self.compression_offer = compression_offer(
+            settings.REPLICATION.get("compression")
+        )
+        self.compression = None
+        self.compressor = None
+        self.total_bytes_sent_compressed = 0
+        # Resumable transfer: Receiver spools our stream and, on a retry of
+        # the same snapshot, returns the byte offset it already holds.
+        self.resume = settings.REPLICATION.get("resume_spool", False)
+        self.resume_offset = 0
         db.close_old_connections()
         super(Sender, self).__init__()
 
@@ -113,6 +129,9 @@ class Sender(ReplicationMixin, Process):
             "snap": self.snap_name,
             "incremental": self.rt is not None,
             "uuid": self.uuid,
+            "window": self.send_window,
+            "compression": self.compression_offer,
+            "resume": self.resume,
         }
         msg_str = json.dumps(msg)
         msg = msg_str.encode("utf-8")
@@ -151,6 +170,70 @@ class Sender(ReplicationMixin, Process):
             )
         return rcommand, rmsg
 
+    def _wait_for_credit(self, timeout: int = 60000):
+        """
+        Block until the Receiver grants more credit via a send-more reply.
+        Credit granted is the integer in the reply message; an empty message,
+        as sent per chunk by Receivers predating the credit window, counts as
+        a single credit.
+        :param timeout: milliseconds to wait for a reply.
+        """
+        rcommand = rmsg = b""
+        events = dict(self.poller.poll(timeout))
+        if events.get(self.send_req) == zmq.POLLIN:
+            rcommand, rmsg = self.send_req.recv_multipart()
+        if rcommand != b"send-more":
+            # rcommand is EMPTY when the remote side vanishes.
+            self.msg = (
+                f"Got EMPTY or error command ({rcommand}) message ({rmsg}) "
+                "from the Receiver while transmitting fsdata. Aborting."
+            ).encode("utf-8")
+            raise Exception(rmsg)
+        self.credit += int(rmsg) if rmsg != b"" else 1
+
+    def _send_fsdata(self, btrfs_send_stream: bytes):
+        """
+        Send a btrfs send stream chunk without waiting on a reply, unless all
+        our credit is in flight. This keeps up to send_window chunks in the
+        pipe so throughput is not bound by the round-trip time per chunk.
+        """
+        while self.credit <= 0:
+            self._wait_for_credit()
+        self._send_recv(b"", btrfs_send_stream, send_only=True)
+        self.credit -= 1
+
+    def _drain_credit(self):
+        """
+        Wait for all in-flight chunks to be acknowledged by the Receiver so
+        that our following command reply is not confused with send-more.
+        """
+        while self.credit < self.send_window:
+            self._wait_for_credit()
+
+    def _parse_receiver_ready(self, reply: bytes) -> str:
+        """
+        Receivers reply to a compression offer, or resume request, with a json
+        object of the latest snapshot, the selected compression mode, and the
+        byte offset to resume from. Receivers predating these, or when neither
+        was requested, reply with just the latest snapshot name.
+        :param reply: receiver-ready message.
+        :return: latest snapshot name on the Receiver, "" if none.
+        """
+        if len(self.compression_offer) > 0 or self.resume:
+            try:
+                reply_d = json.loads(reply)
+            except ValueError:
+                reply_d = None
+            if isinstance(reply_d, dict):
+                self.compression = reply_d.get("compression")
+                if self.compression not in self.compression_offer:
+                    self.compression = None
+                self.compressor = get_compressor(self.compression)
+                if self.resume:
+                    self.resume_offset = int(reply_d.get("offset", 0))
+                return reply_d.get("snap", "")
+        return reply.decode("utf-8")
+
     def _delete_old_snaps(self, share_path: str):
         logger.debug(f"Sender _delete_old_snaps(share_path={share_path})")
         oldest_snap = get_oldest_snap(
@@ -254,9 +337,9 @@ class Sender(ReplicationMixin, Process):
                 self.rt = self._refresh_rt()
 
             #  create a snapshot only if it's not already from a previous
-            #  failed attempt.
-            # TODO: If one does exist we fail which seems harsh as we may be
-            #  able to pickup where we left of depending on the failure.
+            #  failed attempt. An existing one is re-used (see create_snapshot)
+            #  as a retry keeps our snap_name, so with resume_spool the
+            #  Receiver can continue from its checkpoint of the same stream.
             self.msg = f"Failed to create snapshot: {self.snap_name}. Aborting.".encode(
                 "utf-8"
             )
@@ -281,8 +364,13 @@ class Sender(ReplicationMixin, Process):
                     command, reply = self.send_req.recv_multipart()
                     logger.debug(f"command = {command}")
                     if command == b"receiver-ready":
+                        rlatest_snap = self._parse_receiver_ready(reply)
+                        logger.debug(
+                            f"Id: {self.identity}. Compression: {self.compression}. "
+                            f"Resume offset: {self.resume_offset}."
+                        )
                         if self.rt is not None:
-                            self.rlatest_snap = reply.decode("utf-8")
+                            self.rlatest_snap = rlatest_snap
                             self.rt = self._refresh_rt()
                         logger.debug(
                             f"Id: {self.identity}. command({command}) & message({reply}) received. "
@@ -405,8 +493,28 @@ class Sender(ReplicationMixin, Process):
                     "utf-8"
                 )
                 self.update_trail = True
-                command, message = self._send_recv(b"", btrfs_send_stream)
+                if self.resume_offset > 0:
+                    # Skip the part of the stream the Receiver already holds.
+                    skip = min(self.resume_offset, len(btrfs_send_stream))
+                    btrfs_send_stream = btrfs_send_stream[skip:]
+                    self.resume_offset -= skip
+                    if alive and len(btrfs_send_stream) == 0:
+                        continue
+                    if not alive and self.resume_offset > 0:
+                        # Our stream is shorter than that already received.
+                        self.msg = (
+                            f"Regenerated btrfs send stream for {self.snap_id} does not "
+                            "match the Receiver's resume checkpoint. Aborting."
+                        ).encode("utf-8")
+                        self._send_recv(b"btrfs-send-resume-error", self.msg)
+                        raise Exception(self.msg)
+                if self.compressor is not None:
+                    payload = self.compressor.compress(btrfs_send_stream)
+                else:
+                    payload = btrfs_send_stream
+                self._send_fsdata(payload)
                 self.total_bytes_sent += len(btrfs_send_stream)
+                self.total_bytes_sent_compressed += len(payload)
                 num_msgs += 1
                 if num_msgs == 1000:
                     num_msgs = 0
@@ -414,15 +522,9 @@ class Sender(ReplicationMixin, Process):
                     logger.debug(
                         f"Id: {self.identity} Sender alive. Data transferred: {dsize}. Rate: {drate}/sec."
                     )
-                if command == b"" or command == b"receiver-error":
-                    # command is EMPTY when the remote side vanishes.
-                    self.msg = (
-                        f"Got EMPTY or error command ({command}) message ({message}) "
-                        "from the Receiver while transmitting fsdata. Aborting."
-                    ).encode("utf-8")
-                    raise Exception(message)
 
                 if not alive:
+                    self._drain_credit()
                     if self.sp.returncode != 0:
                         # do we mark failed?
                         command, message = self._send_recv(
@@ -442,6 +544,8 @@ class Sender(ReplicationMixin, Process):
             data = {
                 "status": "succeeded",
                 "kb_sent": total_kb_sent,
+                "kb_sent_compressed": int(self.total_bytes_sent_compressed / 1024),
+                "compression": self.compression,
             }
             self.msg = f"Failed to update final replica status for {self.snap_id}. Aborting.".encode(
                 "utf-8"
@@ -0,0 +1,93 @@
+"""
+Copyright (joint work) 2024 The Rockstor Project <https://rockstor.com>
+
+Rockstor is free software; you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published
+by the Free Software Foundation; either version 2 of the License,
+or (at your option) any later version.
+
+Rockstor is distributed in the hope that it will be useful, but
+WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program. If not, see <https://www.gnu.org/licenses/>.
+"""
+
+from unittest.mock import patch, MagicMock
+
+from django.test import TestCase
+
+from smart_manager.proc.job_progress import JobProgressMonitor
+from storageadmin.models import Job
+
+"""
+To run the tests:
+cd /opt/rockstor/src/rockstor
+export DJANGO_SETTINGS_MODULE="settings"
+poetry run django-admin test -v 2 -p test_job_progress.py
+"""
+
+
+class JobProgressMonitorTests(TestCase):
+    def setUp(self):
+        self.mock_spawn = patch("smart_manager.proc.monitor.gevent.spawn").start()
+        self.monitor = JobProgressMonitor()
+        self.running = Job.objects.create(
+            name="test_progress", targets="pool:2", status="running"
+        )
+        Job.objects.create(name="test_progress", targets="pool:3", status="finished")
+
+    def tearDown(self):
+        patch.stopall()
+
+    @staticmethod
+    def sent(namespace) -> list:
+        jobs = []
+        for c in namespace.emit.mock_calls:
+            jobs += [
+                (j["id"], j["status"], j["percent_done"]) for j in c.args[1]["data"]
+            ]
+        namespace.emit.reset_mock()
+        return jobs
+
+    def test_progress(self):
+        tabs = [MagicMock(), MagicMock()]
+        for i, namespace in enumerate(tabs):
+            self.monitor.subscribe(namespace, "sid-{}".format(i))
+            # Each client is sent all active jobs on connecting.
+            namespace.emit.assert_called_once()
+            self.assertEqual(
+                namespace.emit.call_args.kwargs, {"to": "sid-{}".format(i)}
+            )
+            self.assertEqual(self.sent(namespace), [(self.running.id, "running", 0)])
+        # One poller for all clients.
+        self.mock_spawn.assert_called_once_with(self.monitor.run)
+        self.monitor.tick()
+        for namespace in tabs:
+            self.sent(namespace)
+        # Unchanged: nothing sent.
+        self.monitor.tick()
+        self.assertEqual(self.sent(tabs[0]), [])
+        Job.objects.filter(id=self.running.id).update(percent_done=50)
+        self.monitor.tick()
+        for namespace in tabs:
+            self.assertEqual(self.sent(namespace), [(self.running.id, "running", 50)])
+        # A job's end is sent once.
+        Job.objects.filter(id=self.running.id).update(status="finished")
+        self.monitor.tick()
+        self.monitor.tick()
+        self.assertEqual(self.sent(tabs[1]), [(self.running.id, "finished", 50)])
+        self.assertEqual(self.monitor.sent, {})
+
+    def test_unsubscribe(self):
+        namespace = MagicMock()
+        self.monitor.subscribe(namespace, "sid-1")
+        self.monitor.tick()
+        self.monitor.unsubscribe(namespace, "sid-1")
+        self.assertEqual(self.monitor.subscribers, {})
+        # Our loop ends with no subscribers left, forgetting sent jobs.
+        self.monitor.run()
+        self.assertEqual(self.monitor.sent, {})
+        self.assertIsNone(self.monitor.thread)
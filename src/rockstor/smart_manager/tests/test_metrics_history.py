@@ -0,0 +1,141 @@
+"""
+Copyright (joint work) 2024 The Rockstor Project <https://rockstor.com>
+
+Rockstor is free software; you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published
+by the Free Software Foundation; either version 2 of the License,
+or (at your option) any later version.
+
+Rockstor is distributed in the hope that it will be useful, but
+WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program. If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from django.test import override_settings
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from smart_manager.proc.history import MetricsHistory, downsample
+
+"""
+To run the tests:
+cd /opt/rockstor/src/rockstor
+export DJANGO_SETTINGS_MODULE="settings"
+poetry run django-admin test -v 2 -p test_metrics_history.py
+"""
+
+ROLLUPS = {"1s": (1, 120), "1m": (60, 60), "1h": (3600, 24)}
+# Aligned to all of the above rollups.
+T0 = 1700006400
+
+
+def fill(history, seconds, t0=T0):
+    # Memory "free" ramps 0, 1, 2, ...; "total" is constant.
+    for n in range(seconds):
+        history.record("memory", "system", {"total": 100, "free": n}, ts=t0 + n)
+
+
+class MetricsHistoryTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.history = MetricsHistory(self.tmp.name, ROLLUPS)
+
+    def tearDown(self):
+        self.history.close()
+        self.tmp.cleanup()
+
+    def test_rollups(self):
+        fill(self.history, 3 * 60 + 1)
+        end = T0 + 3 * 60
+        with patch("smart_manager.proc.history.time.time", return_value=end):
+            # Only the last 120 seconds are retained at 1s resolution.
+            result = self.history.query("memory", "system", T0, end, rollup="1s")
+            self.assertEqual(len(result["points"]), 120)
+            self.assertEqual(result["points"][-1][:3], [end, 100.0, 180.0])
+            self.assertEqual(result["fields"][1], "free")
+            # Minute averages of the three completed minutes.
+            result = self.history.query("memory", "system", T0, end, rollup="1m")
+            self.assertEqual(result["step"], 60)
+            self.assertEqual([p[2] for p in result["points"]], [29.5, 89.5, 149.5])
+            # Unknown fields (e.g. dirty) are null, not NaN.
+            self.assertIsNone(result["points"][0][-1])
+            # Range beyond the 1s retention: finest covering rollup chosen.
+            result = self.history.query("memory", "system", T0, end)
+            self.assertEqual(result["rollup"], "1m")
+            result = self.history.query("memory", "system", end - 60, end)
+            self.assertEqual(result["rollup"], "1s")
+
+    def test_ring_wraps(self):
+        fill(self.history, 120)
+        fill(self.history, 30, t0=T0 + 1000)
+        with patch("smart_manager.proc.history.time.time", return_value=T0 + 1029):
+            result = self.history.query("memory", "system", T0, T0 + 1029, "1s")
+        # Slots overwritten by the later samples no longer match their
+        # expected bucket, and the earlier ones are out of retention.
+        self.assertEqual(len(result["points"]), 30)
+        self.assertEqual(result["points"][0][0], T0 + 1000)
+
+    def test_downsample(self):
+        fill(self.history, 100)
+        end = T0 + 99
+        result = self.history.query("memory", "system", T0, end, "1s", max_points=10)
+        self.assertEqual(result["step"], 10)
+        self.assertEqual(len(result["points"]), 10)
+        self.assertEqual(result["points"][0][2], 4.5)
+        self.assertEqual(downsample([], 10), [])
+
+    def test_invalid_instance(self):
+        self.history.record("memory", "../../etc", {"total": 1}, ts=T0)
+        self.assertEqual(self.history.instances(), {})
+        with self.assertRaises(ValueError):
+            self.history.query("memory", "../../etc", T0, T0 + 1)
+        with self.assertRaises(ValueError):
+            self.history.query("memory", "system", T0, T0 + 1, rollup="1d")
+
+
+class MetricsHistoryViewTests(APITestCase):
+    databases = "__all__"
+    fixtures = ["scheduled_tasks.json"]
+    BASE_URL = "/api/sm/sprobes/history"
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        history = MetricsHistory(self.tmp.name, ROLLUPS)
+        fill(history, 100)
+        history.close()
+        self.client.login(username="admin", password="admin")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_get(self):
+        with override_settings(
+            METRICS_HISTORY={"path": self.tmp.name, "rollups": ROLLUPS}
+        ):
+            response = self.client.get(self.BASE_URL)
+            self.assertEqual(response.status_code, status.HTTP_200_OK, msg=response)
+            self.assertEqual(response.data, {"memory": ["system"]})
+            response = self.client.get(
+                f"{self.BASE_URL}/memory/system",
+                {"t1": T0, "t2": T0 + 99, "rollup": "1s", "points": 20},
+            )
+            self.assertEqual(response.status_code, status.HTTP_200_OK, msg=response)
+            self.assertEqual(len(response.data["points"]), 20)
+            response = self.client.get(
+                f"{self.BASE_URL}/memory/system", {"t1": "yesterday"}
+            )
+            self.assertEqual(
+                response.status_code, status.HTTP_400_BAD_REQUEST, msg=response
+            )
+            response = self.client.get(f"{self.BASE_URL}/foo/system")
+            self.assertEqual(
+                response.status_code, status.HTTP_400_BAD_REQUEST, msg=response
+            )
@@ -0,0 +1,103 @@
+"""
+Copyright (joint work) 2024 The Rockstor Project <https://rockstor.com>
+
+Rockstor is free software; you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published
+by the Free Software Foundation; either version 2 of the License,
+or (at your option) any later version.
+
+Rockstor is distributed in the hope that it will be useful, but
+WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program. If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import os
+import tempfile
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.test import TestCase
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from smart_manager.models import NFSDCallDistribution, SProbe
+from smart_manager.proc.nfsd import NFSDSampler, read_nfsd_stats
+
+"""
+To run the tests:
+cd /opt/rockstor/src/rockstor
+export DJANGO_SETTINGS_MODULE="settings"
+poetry run django-admin test -v 2 -p test_nfsd_sampler.py
+"""
+
+# proc3: lookup 40, read 100, write 200, create 3, commit 5, remove 2
+# proc4ops: lookup 10, read 50, write 60, create 1, commit 4, remove 1
+NFSD_STATS = """rc 0 57 2048
+fh 0 0 0 0 0
+io {read} {write}
+th 8 0 0.000 0.000 0.000 0.000 0.000 0.000 0.000 0.000 0.000 0.000
+ra 32 0 0 0 0 0 0 0 0 0 0 0
+net 2105 0 2105 10
+rpc 2105 0 0 0 0
+proc3 22 2 300 10 40 80 0 100 200 3 1 0 0 2 0 1 0 0 20 2 2 1 5
+proc4 2 1 1000
+proc4ops 72 0 0 0 20 0 4 1 0 0 1000 300 0 0 0 0 10 0 0 30 0 0 0 0 0 0 50 0 30 1 0 0 0 0 0 0 0 0 0 60
+"""
+
+
+class NFSDSamplerTests(TestCase):
+    databases = "__all__"
+
+    def setUp(self):
+        fh, self.path = tempfile.mkstemp()
+        os.close(fh)
+        self.write_stats(read=1048576, write=4194304)
+        patch("smart_manager.proc.nfsd.NFSD_STATS", self.path).start()
+        settings_override = override_settings(
+            NFSD_STATS={"interval": 10, "batch": 2, "retention": 30}
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def tearDown(self):
+        patch.stopall()
+        os.remove(self.path)
+
+    def write_stats(self, **kwargs):
+        with open(self.path, "w") as sfo:
+            sfo.write(NFSD_STATS.format(**kwargs))
+
+    def test_read_nfsd_stats(self):
+        self.assertEqual(read_nfsd_stats(), [50, 150, 260, 4, 9, 3, 1048576, 4194304])
+        self.assertIsNone(read_nfsd_stats("/no/such/nfsd"))
+
+    def test_tick(self):
+        sampler = NFSDSampler()
+        sampler.tick()  # first sample, no deltas yet.
+        self.assertEqual(sampler.rows, [])
+        self.write_stats(read=1048576 + 8192, write=4194304 + 2048)
+        sampler.tick()
+        self.assertEqual(len(sampler.rows), 1)
+        self.assertEqual(NFSDCallDistribution.objects.count(), 0)
+        row = sampler.rows[0]
+        self.assertEqual((row.num_read, row.sum_read, row.sum_write), (0, 8, 2))
+        # Counter reset (nfsd restart): deltas from 0.
+        self.write_stats(read=1024, write=0)
+        stale = NFSDCallDistribution.objects.create(
+            rid=sampler.get_probe(), ts=timezone.now() - timedelta(days=31)
+        )
+        # Batch full: one bulk insert, and older than retention pruned.
+        with self.assertNumQueries(2, using="smart_manager"):
+            sampler.tick()
+        self.assertEqual(sampler.rows, [])
+        rows = NFSDCallDistribution.objects.order_by("ts")
+        self.assertEqual(len(rows), 2)
+        self.assertNotIn(stale.id, [r.id for r in rows])
+        self.assertEqual((rows[1].num_lookup, rows[1].sum_read), (0, 1))
+        probe = SProbe.objects.get(name="nfs-1")
+        self.assertFalse(probe.smart)
+        self.assertEqual(probe.state, "running")
@@ -0,0 +1,140 @@
+"""
+Copyright (joint work) 2024 The Rockstor Project <https://rockstor.com>
+
+Rockstor is free software; you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published
+by the Free Software Foundation; either version 2 of the License,
+or (at your option) any later version.
+
+Rockstor is distributed in the hope that it will be useful, but
+WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program. If not, see <https://www.gnu.org/licenses/>.
+"""
+
+from unittest.mock import patch, MagicMock
+
+from django.test import TestCase, override_settings
+
+from smart_manager.proc.pool_health import PoolHealthMonitor
+from storageadmin.models import Pool
+
+"""
+To run the tests:
+cd /opt/rockstor/src/rockstor
+export DJANGO_SETTINGS_MODULE="settings"
+poetry run django-admin test -v 2 -p test_pool_health.py
+"""
+
+UUID1 = "924d9d64-4943-4eac-a52e-1918e963a34f"
+UUID2 = "52053a67-1a53-4cb8-bf17-69abca623bef"
+UNIMPORTED = "b3d201a8-b497-4365-a90d-a50c50b8e808"
+
+
+@override_settings(POOL_HEALTH={"interval": 30, "scan_interval": 600})
+class PoolHealthMonitorTests(TestCase):
+    def setUp(self):
+        patch("storageadmin.models.pool.pool_missing_dev_count").start()
+        patch("storageadmin.models.pool.dev_stats_zero").start()
+        Pool.objects.create(name="rock-pool", raid="raid1", uuid=UUID1)
+        Pool.objects.create(name="rock-pool-2", raid="single", uuid=UUID2)
+        self.mock_scan = patch(
+            "smart_manager.proc.pool_health.degraded_pool_uuids", return_value=set()
+        ).start()
+        # Both pools mounted, healthy: uuid: (missing devices, stats zero)
+        self.sysfs = {UUID1: (0, True), UUID2: (0, True)}
+        patch(
+            "smart_manager.proc.pool_health.btrfs_sysfs.dev_health",
+            side_effect=self.dev_health,
+        ).start()
+        self.mock_spawn = patch("smart_manager.proc.monitor.gevent.spawn").start()
+        self.monitor = PoolHealthMonitor()
+        self.namespace = MagicMock()
+        self.monitor.subscribe(self.namespace, "sid-1")
+
+    def tearDown(self):
+        patch.stopall()
+
+    def dev_health(self, fsid):
+        if fsid not in self.sysfs:
+            raise FileNotFoundError(fsid)
+        return self.sysfs[fsid]
+
+    def emitted(self) -> dict:
+        events = {c.args[0]: c.args[1]["data"] for c in self.namespace.emit.mock_calls}
+        self.namespace.emit.reset_mock()
+        return events
+
+    def test_edge_triggered(self):
+        self.mock_spawn.assert_called_once_with(self.monitor.run)
+        self.monitor.tick()
+        self.assertEqual(
+            self.emitted(),
+            {
+                "pool_degraded_status": {"status": "OK"},
+                "pool_dev_stats": {"status": "OK"},
+            },
+        )
+        # Unchanged: nothing sent, and no further "btrfs fi show".
+        for i in range(10):
+            self.monitor.tick()
+        self.assertEqual(self.emitted(), {})
+        self.mock_scan.assert_called_once()
+        # Device errors on one pool: only that event is sent.
+        self.sysfs[UUID2] = (0, False)
+        self.monitor.tick()
+        self.assertEqual(
+            self.emitted(),
+            {
+                "pool_dev_stats": {
+                    "status": "errors",
+                    "message": "Pools found with device errors: (rock-pool-2)",
+                }
+            },
+        )
+        # A later client is sent the current state on its own.
+        self.monitor.subscribe(self.namespace, "sid-2")
+        self.assertEqual(len(self.namespace.emit.mock_calls), 2)
+        for c in self.namespace.emit.mock_calls:
+            self.assertEqual(c.kwargs, {"to": "sid-2"})
+        self.mock_spawn.assert_called_once()
+
+    def test_degraded(self):
+        # An unimported degraded pool, found by our initial scan.
+        self.mock_scan.return_value = {UNIMPORTED}
+        self.sysfs[UUID1] = (1, True)
+        self.monitor.tick()
+        self.assertEqual(
+            self.emitted()["pool_degraded_status"],
+            {
+                "status": "degraded",
+                "message": "Pools found degraded: (rock-pool), plus (1) unimported",
+            },
+        )
+        # Unmounted: rescanned, as no longer covered by sysfs.
+        self.mock_scan.return_value = {UNIMPORTED, UUID1}
+        del self.sysfs[UUID1]
+        self.monitor.tick()
+        self.assertEqual(self.mock_scan.call_count, 2)
+        self.assertEqual(self.emitted(), {})
+        # Udev block device events: rescanned on our next tick.
+        self.mock_scan.return_value = {UUID1}
+        self.monitor.invalidate()
+        self.monitor.tick()
+        self.assertEqual(
+            self.emitted()["pool_degraded_status"]["message"],
+            "Pools found degraded: (rock-pool)",
+        )
+
+    def test_unsubscribe(self):
+        self.monitor.unsubscribe(self.namespace, "sid-1")
+        self.monitor.unsubscribe(self.namespace, "sid-unknown")
+        self.assertEqual(self.monitor.subscribers, {})
+        # Our loop ends with no subscribers left, resetting its state.
+        self.monitor.state = {"pool_dev_stats": {"status": "OK"}}
+        self.monitor.run()
+        self.assertEqual(self.monitor.state, {})
+        self.assertIsNone(self.monitor.thread)
@@ -0,0 +1,206 @@
+"""
+Copyright (joint work) 2024 The Rockstor Project <https://rockstor.com>
+
+Rockstor is free software; you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published
+by the Free Software Foundation; either version 2 of the License,
+or (at your option) any later version.
+
+Rockstor is distributed in the hope that it will be useful, but
+WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program. If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import builtins
+import time
+import unittest
+from unittest.mock import patch, MagicMock
+
+from smart_manager.proc.sampler import ProcSampler
+
+"""
+To run the tests:
+cd /opt/rockstor/src/rockstor
+export DJANGO_SETTINGS_MODULE="settings"
+poetry run django-admin test -v 2 -p test_proc_sampler.py
+"""
+
+DISKSTATS = [
+    "   8       0 sda 2507 0 101712 388 0 0 0 0 0 264 388 0 0 0 0 0 0\n",
+    "   8      16 sdb 1034 0 9136 702 10 0 80 5 0 548 702 0 0 0 0 0 0\n",
+    "   7       0 loop0 0 0 0 0 0 0 0 0 0 0 0 0 0 0 0 0 0\n",
+]
+
+NET_DEV = [
+    "Inter-|   Receive                                                |  Transmit\n",
+    " face |bytes    packets errs drop fifo frame compressed multicast|"
+    "bytes    packets errs drop fifo colls carrier compressed\n",
+    "    lo: 1000 10 0 0 0 0 0 0 1000 10 0 0 0 0 0 0\n",
+    "  eth0: 5000 50 0 0 0 0 0 0 2000 20 0 0 0 0 0 0\n",
+]
+
+MEMINFO = [
+    "MemTotal:        8000000 kB\n",
+    "MemFree:         4000000 kB\n",
+    "MemAvailable:    6000000 kB\n",
+    "Buffers:           10000 kB\n",
+    "Cached:           200000 kB\n",
+    "SwapCached:            0 kB\n",
+    "Active:           300000 kB\n",
+    "Inactive:         400000 kB\n",
+    "SwapTotal:       1000000 kB\n",
+    "SwapFree:        1000000 kB\n",
+    "Dirty:               100 kB\n",
+    "Writeback:             0 kB\n",
+]
+
+
+class ProcSamplerTests(unittest.TestCase):
+    def setUp(self):
+        self.proc = {
+            "/proc/diskstats": DISKSTATS,
+            "/proc/net/dev": NET_DEV,
+            "/proc/meminfo": MEMINFO,
+        }
+        self.reads = []
+        real_open = builtins.open
+
+        # File like iterator: readline() support for the /proc/net/dev header.
+        class Lines(object):
+            def __init__(self, lines):
+                self.lines = iter(lines)
+
+            def __iter__(self):
+                return self.lines
+
+            def readline(self):
+                return next(self.lines, "")
+
+        def fake_open_lines(file, *args, **kwargs):
+            if file in self.proc:
+                self.reads.append(file)
+                cm = MagicMock()
+                cm.__enter__.return_value = Lines(self.proc[file])
+                return cm
+            return real_open(file, *args, **kwargs)
+
+        self.patch_open = patch("builtins.open", side_effect=fake_open_lines)
+        self.patch_open.start()
+        self.patch_byid = patch(
+            "smart_manager.proc.sampler.get_byid_name_map",
+            return_value={"sda": "ata-disk-a", "sdb": "ata-disk-b"},
+        )
+        self.mock_byid = self.patch_byid.start()
+        self.patch_spawn = patch("smart_manager.proc.sampler.gevent.spawn")
+        self.patch_spawn.start()
+        self.sampler = ProcSampler()
+        self.sampler.refresh_disk_names = MagicMock(
+            side_effect=self._refresh_disk_names
+        )
+        self.sampler.refresh_interfaces = MagicMock(
+            side_effect=self._refresh_interfaces
+        )
+
+    def tearDown(self):
+        patch.stopall()
+
+    def _refresh_disk_names(self, kernel_names):
+        self.sampler.byid_disk_map = self.mock_byid()
+        self.sampler.disk_names = {"ata-disk-a", "ata-disk-b"}
+        self.sampler.disk_names_key = (kernel_names, time.time())
+
+    def _refresh_interfaces(self, kernel_names):
+        self.sampler.interfaces = {"eth0"}
+        self.sampler.interfaces_key = (kernel_names, time.time())
+
+    def _subscribe_tabs(self, num_tabs):
+        namespaces = {stream: MagicMock() for stream in self.sampler.subscribers}
+        for stream, namespace in namespaces.items():
+            for tab in range(num_tabs):
+                self.sampler.subscribe(stream, namespace, f"sid-{tab}")
+        return namespaces
+
+    @patch("smart_manager.proc.sampler.time.time", return_value=0)
+    @patch("smart_manager.proc.sampler.psutil.cpu_times_percent", return_value=[])
+    def test_tick_cost_independent_of_tabs(self, mock_cpu, mock_time):
+        """
+        However many browser tabs are connected, each tick reads each /proc
+        source once, and each namespace receives one (broadcast) emit.
+        """
+        namespaces = self._subscribe_tabs(num_tabs=25)
+        for tick in range(3):
+            self.sampler.tick()
+        self.assertEqual(len(self.reads), 3 * 3)
+        self.assertEqual(mock_cpu.call_count, 3)
+        self.assertEqual(namespaces["disks"].emit.call_count, 3)
+        self.assertEqual(namespaces["memory"].emit.call_count, 3)
+        # Network only emits once we have deltas (second tick on).
+        self.assertEqual(namespaces["network"].emit.call_count, 2)
+        # Device name lists are cached across ticks.
+        self.assertEqual(self.sampler.refresh_disk_names.call_count, 1)
+        self.assertEqual(self.sampler.refresh_interfaces.call_count, 1)
+
+    @patch("smart_manager.proc.sampler.time.time", return_value=0)
+    @patch("smart_manager.proc.sampler.psutil.cpu_times_percent", return_value=[])
+    def test_deltas_and_name_invalidation(self, mock_cpu, mock_time):
+        namespaces = self._subscribe_tabs(num_tabs=1)
+        self.sampler.tick()
+        self.proc["/proc/diskstats"] = [
+            "   8       0 sda 2517 0 101812 388 0 0 0 0 2 264 388 0 0 0 0 0 0\n",
+            "   8      16 sdb 1034 0 9136 702 10 0 80 5 0 548 702 0 0 0 0 0 0\n",
+            "   7       0 loop0 0 0 0 0 0 0 0 0 0 0 0 0 0 0 0 0 0\n",
+        ]
+        self.sampler.tick()
+        data = namespaces["disks"].emit.call_args[0][1]["data"]
+        stats = {d["name"]: d for d in data}
+        self.assertEqual(stats["ata-disk-a"]["reads_completed"], 10.0)
+        self.assertEqual(stats["ata-disk-a"]["sectors_read"], 100.0)
+        self.assertEqual(stats["ata-disk-a"]["ios_progress"], 1.0)
+        self.assertEqual(stats["ata-disk-b"]["writes_completed"], 0.0)
+        memory = namespaces["memory"].emit.call_args[0][1]["data"]["results"][0]
+        self.assertEqual(memory["total"], 8000000)
+        self.assertEqual(memory["dirty"], 100)
+        self.assertEqual(self.sampler.refresh_disk_names.call_count, 1)
+        # Hot unplug of sdb: the kernel device set changed, refresh names.
+        self.proc["/proc/diskstats"] = self.proc["/proc/diskstats"][:1]
+        self.sampler.tick()
+        self.assertEqual(self.sampler.refresh_disk_names.call_count, 2)
+        # Db only changes are picked up after names_ttl.
+        mock_time.return_value = self.sampler.names_ttl + 1
+        self.sampler.tick()
+        self.assertEqual(self.sampler.refresh_disk_names.call_count, 3)
+        self.assertEqual(self.sampler.refresh_interfaces.call_count, 2)
+
+    def test_subscription_lifecycle(self):
+        namespace = MagicMock()
+        self.sampler.subscribe("cpu", namespace, "sid-1")
+        self.sampler.subscribe("cpu", namespace, "sid-2")
+        self.sampler.unsubscribe("cpu", namespace, "sid-1")
+        self.assertTrue(self.sampler.active())
+        self.sampler.unsubscribe("cpu", namespace, "sid-2")
+        self.assertFalse(self.sampler.active())
+        # Unknown sid/namespace is a no-op.
+        self.sampler.unsubscribe("cpu", namespace, "sid-3")
+
+    @patch("smart_manager.proc.sampler.time.time", return_value=0)
+    @patch("smart_manager.proc.sampler.psutil.cpu_times_percent", return_value=[])
+    def test_history_without_subscribers(self, mock_cpu, mock_time):
+        history = MagicMock()
+        self.sampler.enable_history(history)
+        self.assertTrue(self.sampler.active())
+        self.sampler.tick()
+        self.sampler.tick()
+        recorded = {(c[0][0], c[0][1]) for c in history.record.call_args_list}
+        self.assertEqual(
+            recorded,
+            {
+                ("disk", "ata-disk-a"),
+                ("disk", "ata-disk-b"),
+                ("network", "eth0"),
+                ("memory", "system"),
+            },
+        )
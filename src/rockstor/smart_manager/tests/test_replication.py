@@ -0,0 +1,246 @@
+"""
+Copyright (joint work) 2024 The Rockstor Project <https://rockstor.com>
+
+Rockstor is free software; you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published
+by the Free Software Foundation; either version 2 of the License,
+or (at your option) any later version.
+
+Rockstor is distributed in the hope that it will be useful, but
+WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program. If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import json
+import os
+import tempfile
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+import zmq
+
+from smart_manager.replication.sender import Sender
+from smart_manager.replication.receiver import Receiver
+from smart_manager.replication.compression import (
+    COMPRESSION_MODES,
+    compression_offer,
+    negotiate_compression,
+    get_compressor,
+    get_decompressor,
+)
+
+"""
+To run the tests:
+cd /opt/rockstor/src/rockstor
+export DJANGO_SETTINGS_MODULE="settings"
+poetry run django-admin test -v 2 -p test_replication.py
+"""
+
+
+class Replica(object):
+    def __init__(self, id, share, data_port=10002):
+        self.id = id
+        self.share = share
+        self.data_port = data_port
+
+
+class LatentReceiver(threading.Thread):
+    """
+    Minimal Receiver stand-in on a ZMQ loopback (inproc) ROUTER socket.
+    Grants one credit (send-more) per fsdata chunk received, but only after
+    an injected round-trip latency, emulating a WAN link.
+    """
+
+    def __init__(self, ctx, endpoint, rtt, num_chunks):
+        super(LatentReceiver, self).__init__(daemon=True)
+        self.router = ctx.socket(zmq.ROUTER)
+        self.router.bind(endpoint)
+        self.rtt = rtt
+        self.num_chunks = num_chunks
+        self.received = []
+
+    def run(self):
+        pending = []  # (due time, address)
+        poller = zmq.Poller()
+        poller.register(self.router, zmq.POLLIN)
+        while len(self.received) < self.num_chunks or pending:
+            if dict(poller.poll(1)).get(self.router) == zmq.POLLIN:
+                address, command, msg = self.router.recv_multipart()
+                self.received.append(msg)
+                pending.append((time.time() + self.rtt, address))
+            now = time.time()
+            while pending and pending[0][0] <= now:
+                address = pending.pop(0)[1]
+                self.router.send_multipart([address, b"send-more", b"1"])
+        self.router.close(linger=0)
+
+
+class SenderCreditWindowTests(unittest.TestCase):
+    def _replicate(self, window, num_chunks=40, rtt=0.02):
+        sender = Sender("sender-uuid", "127.0.0.1", Replica(1, "share1"))
+        sender.send_window = sender.credit = window
+        endpoint = f"inproc://test-replication-{window}"
+        receiver = LatentReceiver(sender.ctx, endpoint, rtt, num_chunks)
+        receiver.start()
+        sender.poller = zmq.Poller()
+        sender.send_req = sender.ctx.socket(zmq.DEALER)
+        sender.send_req.setsockopt_string(zmq.IDENTITY, sender.identity)
+        sender.send_req.connect(endpoint)
+        sender.poller.register(sender.send_req, zmq.POLLIN)
+        chunks = [f"chunk-{n}".encode("utf-8") for n in range(num_chunks)]
+        start_time = time.time()
+        for chunk in chunks:
+            sender._send_fsdata(chunk)
+        sender._drain_credit()
+        elapsed = time.time() - start_time
+        receiver.join(timeout=10)
+        sender.send_req.close(linger=0)
+        sender.ctx.destroy(linger=0)
+        self.assertEqual(receiver.received, chunks)
+        self.assertEqual(sender.credit, window)
+        return elapsed
+
+    def test_credit_window_not_rtt_bound(self):
+        """
+        With a window of 1 every chunk costs a round trip; with a window of N
+        up to N chunks are in flight per round trip. Benchmark both over a
+        ZMQ loopback with 20 ms injected latency and 40 chunks.
+        """
+        serial = self._replicate(window=1)
+        windowed = self._replicate(window=10)
+        self.assertGreaterEqual(serial, 40 * 0.02)
+        self.assertLess(
+            windowed,
+            serial / 3,
+            msg=f"credit window 1: {serial:.3f}s, credit window 10: {windowed:.3f}s",
+        )
+
+    def test_wait_for_credit_legacy_receiver(self):
+        """
+        Receivers predating the credit window reply with an empty send-more
+        message per chunk: this must count as a single credit. Any other
+        reply aborts.
+        """
+        sender = Sender("sender-uuid", "127.0.0.1", Replica(1, "share1"))
+        sender.credit = 0
+        sender.poller = zmq.Poller()
+        router = sender.ctx.socket(zmq.ROUTER)
+        router.bind("inproc://test-replication-legacy")
+        sender.send_req = sender.ctx.socket(zmq.DEALER)
+        sender.send_req.setsockopt_string(zmq.IDENTITY, sender.identity)
+        sender.send_req.connect("inproc://test-replication-legacy")
+        sender.poller.register(sender.send_req, zmq.POLLIN)
+        address = sender.identity.encode("utf-8")
+        router.send_multipart([address, b"send-more", b""])
+        sender._wait_for_credit(timeout=1000)
+        self.assertEqual(sender.credit, 1)
+        router.send_multipart([address, b"send-more", b"16"])
+        sender._wait_for_credit(timeout=1000)
+        self.assertEqual(sender.credit, 17)
+        router.send_multipart([address, b"receiver-error", b"btrfs-recv died"])
+        with self.assertRaises(Exception):
+            sender._wait_for_credit(timeout=1000)
+        router.close(linger=0)
+        sender.send_req.close(linger=0)
+        sender.ctx.destroy(linger=0)
+
+
+class CompressionTests(unittest.TestCase):
+    def test_negotiation(self):
+        self.assertEqual(compression_offer(None), [])
+        self.assertEqual(compression_offer("zlib")[0], "zlib")
+        self.assertEqual(negotiate_compression([]), None)
+        self.assertEqual(negotiate_compression(["lzma", "zlib"]), "zlib")
+        self.assertEqual(negotiate_compression(["lzma"]), None)
+        self.assertIsNone(get_compressor(None))
+        self.assertIsNone(get_decompressor(None))
+
+    def test_stream_round_trip(self):
+        """
+        Each compressed chunk must decompress on arrival, in order, to its
+        original; and compressible (text like) streams must shrink.
+        """
+        chunks = [
+            b"",
+            b"btrfs-stream " * 5000,
+            bytes(range(256)) * 100,
+            b"btrfs-stream " * 5000,
+            b"",
+        ]
+        for mode in COMPRESSION_MODES:
+            compressor = get_compressor(mode)
+            decompressor = get_decompressor(mode)
+            raw = compressed = 0
+            for chunk in chunks:
+                payload = compressor.compress(chunk)
+                self.assertEqual(decompressor.decompress(payload), chunk)
+                raw += len(chunk)
+                compressed += len(payload)
+            self.assertLess(compressed, raw / 4, msg=f"mode: {mode}")
+
+    def test_parse_receiver_ready(self):
+        sender = Sender("sender-uuid", "127.0.0.1", Replica(1, "share1"))
+        # Legacy Receiver, or no compression offered: plain snapshot name.
+        sender.compression_offer = []
+        self.assertEqual(
+            sender._parse_receiver_ready(b"share1_1_replication_1"),
+            "share1_1_replication_1",
+        )
+        sender.compression_offer = ["zlib"]
+        self.assertEqual(sender._parse_receiver_ready(b""), "")
+        self.assertIsNone(sender.compressor)
+        reply = b'{"snap": "share1_1_replication_1", "compression": "zlib"}'
+        self.assertEqual(sender._parse_receiver_ready(reply), "share1_1_replication_1")
+        self.assertEqual(sender.compression, "zlib")
+        self.assertIsNotNone(sender.compressor)
+        sender.ctx.destroy(linger=0)
+
+
+class ResumeTests(unittest.TestCase):
+    def test_parse_receiver_ready_offset(self):
+        sender = Sender("sender-uuid", "127.0.0.1", Replica(1, "share1"))
+        sender.compression_offer = []
+        sender.resume = True
+        reply = b'{"snap": "", "compression": null, "offset": 4096}'
+        self.assertEqual(sender._parse_receiver_ready(reply), "")
+        self.assertEqual(sender.resume_offset, 4096)
+        self.assertIsNone(sender.compressor)
+        sender.ctx.destroy(linger=0)
+
+    @patch("smart_manager.replication.receiver.run_command")
+    def test_spool_checkpoint(self, mock_run_command):
+        """
+        A Receiver re-opening the spool of the same snapshot resumes from the
+        already received size, and spools of prior snapshots are pruned.
+        """
+        meta = {
+            "pool": "pool1",
+            "share": "share1",
+            "snap": "share1_1_replication_2",
+            "incremental": True,
+            "uuid": "sender-uuid",
+            "resume": True,
+        }
+        with tempfile.TemporaryDirectory() as spool_dir:
+            receiver = Receiver(b"sender-uuid-1", json.dumps(meta).encode("utf-8"))
+            self.assertTrue(receiver.resume)
+            receiver.spool_dir = spool_dir
+            receiver.spool_fp = f"{spool_dir}/{receiver.snap_name}.stream"
+            stale = f"{spool_dir}/share1_1_replication_1.stream"
+            open(stale, "wb").close()
+            self.assertEqual(receiver._open_spool(), 0)
+            self.assertFalse(os.path.exists(stale))
+            receiver.spool.write(b"x" * 1000)
+            receiver._checkpoint_spool()
+            # Interrupted transfer: the spool is retained on exit.
+            receiver.spool.close()
+            self.assertEqual(receiver._open_spool(), 1000)
+            receiver._discard_spool()
+            self.assertFalse(os.path.exists(receiver.spool_fp))
+            receiver.ctx.destroy(linger=0)
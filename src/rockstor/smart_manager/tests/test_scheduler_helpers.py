@@ -0,0 +1,140 @@
+"""
+Copyright (joint work) 2024 The Rockstor Project <https://rockstor.com>
+
+Rockstor is free software; you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published
+by the Free Software Foundation; either version 2 of the License,
+or (at your option) any later version.
+
+Rockstor is distributed in the hope that it will be useful, but
+WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program. If not, see <https://www.gnu.org/licenses/>.
+"""
+
+from datetime import datetime
+from unittest.mock import patch, MagicMock
+
+from django.test import TestCase
+from django.utils import timezone
+from huey import MemoryHuey
+
+from scripts.scheduled_tasks.pool_scrub import scrub_ended, run_task
+from smart_manager.models import Task, TaskDefinition
+from smart_manager.views.scheduler_helpers import (
+    cron_schedule,
+    due_tasks,
+    run_scheduled_task,
+    run_scheduled_tasks,
+    LAST_MINUTE_KEY,
+)
+
+
+class SchedulerTests(TestCase):
+    """
+    To run the tests:
+    cd /opt/rockstor/src/rockstor
+    export DJANGO_SETTINGS_MODULE="settings"
+    poetry run django-admin test -v 2 -p test_scheduler_helpers.py
+    """
+
+    databases = "__all__"
+    fixtures = ["scheduled_tasks.json"]
+
+    def setUp(self):
+        TaskDefinition.objects.update(enabled=True)
+        self.patch_crontab_range = patch(
+            "smart_manager.views.scheduler_helpers.crontabwindow.crontab_range"
+        )
+        self.mock_crontab_range = self.patch_crontab_range.start()
+        self.mock_crontab_range.return_value = True
+
+    def tearDown(self):
+        patch.stopall()
+
+    def test_cron_schedule(self):
+        friday = datetime(2024, 3, 1, 3, 42)
+        self.assertTrue(cron_schedule("42 3 * * 5")(friday))
+        self.assertFalse(cron_schedule("42 3 * * 0")(friday))
+        self.assertTrue(cron_schedule("*/6 3 1-7 * *")(friday))
+        self.assertFalse(cron_schedule("0 * * * *")(friday))
+        with self.assertRaises(ValueError):
+            cron_schedule("42 3 * *")
+        with self.assertRaises(ValueError):
+            cron_schedule("42 3 * * fri")
+
+    def test_due_tasks(self):
+        # Friday 1st March, 03:42: all but the 1st January shutdown and the
+        # on the hour suspend.
+        friday = datetime(2024, 3, 1, 3, 42)
+        with self.assertNumQueries(1, using="smart_manager"):
+            due = due_tasks(friday)
+        self.assertEqual(sorted(td.id for td in due), [10, 15, 16])
+        # Disabled, or invalid schedule.
+        TaskDefinition.objects.filter(id=15).update(enabled=False)
+        TaskDefinition.objects.filter(id=16).update(crontab="42 3 1 * mon")
+        self.assertEqual([td.id for td in due_tasks(friday)], [10])
+        # Outside of execution window.
+        self.mock_crontab_range.return_value = False
+        self.assertEqual(due_tasks(friday), [])
+
+    def test_run_scheduled_tasks(self):
+        huey = MemoryHuey()
+        patch("smart_manager.views.scheduler_helpers.HUEY", huey).start()
+        mock_datetime = patch("smart_manager.views.scheduler_helpers.datetime").start()
+        mock_run_task = patch(
+            "smart_manager.views.scheduler_helpers.run_scheduled_task"
+        ).start()
+
+        def run_at(*minute) -> list:
+            mock_datetime.now.return_value = datetime(*minute, 17)
+            mock_run_task.reset_mock()
+            run_scheduled_tasks.call_local()
+            return sorted(c.args[0] for c in mock_run_task.mock_calls)
+
+        # Our first run: the current minute only.
+        self.assertEqual(run_at(2024, 3, 1, 3, 43), [])
+        # Run late, at 03:43 rather than 03:42: 03:42 tasks are not skipped.
+        huey.put(LAST_MINUTE_KEY, datetime(2024, 3, 1, 3, 40))
+        self.assertEqual(run_at(2024, 3, 1, 3, 43), [10, 15, 16])
+        # Nor run again by another late run in the same minute.
+        self.assertEqual(run_at(2024, 3, 1, 3, 43), [])
+        self.assertEqual(run_at(2024, 3, 1, 4, 0), [18])
+        # Clock set back: the current minute only.
+        self.assertEqual(run_at(2024, 3, 1, 3, 42), [10, 15, 16])
+
+    def test_run_scheduled_task(self):
+        mock_run_task = MagicMock()
+        with patch.dict(
+            "smart_manager.views.scheduler_helpers.TASK_RUNNERS",
+            {"snapshot": mock_run_task},
+        ):
+            run_scheduled_task.call_local(15, "snapshot")
+        mock_run_task.assert_called_once_with(15)
+
+    def test_scrub_ended(self):
+        td = TaskDefinition.objects.get(id=10)  # pool "3"
+        now = timezone.now()
+        t = Task.objects.create(task_def=td, state="running", start=now)
+        scrub_ended(4, "finished")
+        t.refresh_from_db()
+        self.assertEqual(t.state, "running")
+        scrub_ended(3, "halted")
+        t.refresh_from_db()
+        self.assertEqual(t.state, "halted")
+        self.assertIsNotNone(t.end)
+
+    def test_scrub_after_failed_job(self):
+        td = TaskDefinition.objects.get(id=10)  # pool "3"
+        now = timezone.now()
+        # As per PoolScrubView: our scrub job failed before its scrub started.
+        Task.objects.create(task_def=td, state="failed", start=now, end=now)
+        with patch("scripts.scheduled_tasks.pool_scrub.APIWrapper") as mock_aw:
+            run_task(10)
+        mock_aw.return_value.api_call.assert_called_once_with(
+            "pools/3/scrub", data=None, calltype="post", save_error=False
+        )
+        self.assertEqual(Task.objects.filter(task_def=td).latest("id").state, "running")
@@ -0,0 +1,84 @@
+"""
+Copyright (joint work) 2024 The Rockstor Project <https://rockstor.com>
+
+Rockstor is free software; you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published
+by the Free Software Foundation; either version 2 of the License,
+or (at your option) any later version.
+
+Rockstor is distributed in the hope that it will be useful, but
+WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program. If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import unittest
+from unittest.mock import patch, MagicMock
+
+from smart_manager.proc.smart_trends import SMARTTrendMonitor
+
+"""
+To run the tests:
+cd /opt/rockstor/src/rockstor
+export DJANGO_SETTINGS_MODULE="settings"
+poetry run django-admin test -v 2 -p test_smart_trends.py
+"""
+
+ALERT = {"disk": "ata-WDC_WD40EFRX_WD-1", "name": "Reallocated_Sector_Ct", "recent": 8}
+
+
+class SMARTTrendMonitorTests(unittest.TestCase):
+    def setUp(self):
+        self.mock_huey = patch("smart_manager.proc.smart_trends.HUEY").start()
+        self.mock_huey.get.return_value = None
+        self.mock_spawn = patch("smart_manager.proc.monitor.gevent.spawn").start()
+        self.monitor = SMARTTrendMonitor()
+
+    def tearDown(self):
+        patch.stopall()
+
+    @staticmethod
+    def emitted(namespace) -> list:
+        events = [c.args[1] for c in namespace.emit.mock_calls]
+        namespace.emit.reset_mock()
+        return events
+
+    def test_broadcast(self):
+        tabs = [MagicMock(), MagicMock()]
+        for i, namespace in enumerate(tabs):
+            self.monitor.subscribe(namespace, "sid-{}".format(i))
+        # One reader for all clients.
+        self.mock_spawn.assert_called_once_with(self.monitor.run)
+        self.monitor.tick()
+        for namespace in tabs:
+            self.assertEqual(
+                self.emitted(namespace),
+                [{"key": "sysinfo:smart_trend_alerts", "data": {"status": "OK"}}],
+            )
+        # Unchanged: nothing sent.
+        self.monitor.tick()
+        self.assertEqual(self.emitted(tabs[0]), [])
+        self.mock_huey.get.return_value = [ALERT]
+        self.monitor.tick()
+        data = self.emitted(tabs[1])[0]["data"]
+        self.assertEqual(data["status"], "warning")
+        self.assertEqual(
+            data["message"],
+            "Disks with accelerating SMART failure indicators: "
+            "(ata-WDC_WD40EFRX_WD-1 Reallocated_Sector_Ct +8)",
+        )
+        # A later client is sent the current alerts on its own.
+        late = MagicMock()
+        self.monitor.subscribe(late, "sid-late")
+        late.emit.assert_called_once()
+        self.assertEqual(late.emit.call_args.kwargs, {"to": "sid-late"})
+        self.assertEqual(self.emitted(late)[0]["data"], data)
+
+    def test_read_failure(self):
+        self.mock_huey.get.side_effect = Exception("database is locked")
+        self.assertEqual(
+            self.monitor.assess(), {"smart_trend_alerts": {"status": "OK"}}
+        )
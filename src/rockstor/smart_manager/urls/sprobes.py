@@ -16,6 +16,7 @@ along with this program. If not, see <http://www.gnu.org/licenses/>.
 """
 
 from django.urls import re_path
+from smart_manager.proc.history import INSTANCE_REGEX
 from smart_manager.views import (
     MemInfoView,
     NetStatView,
@@ -27,6 +28,7 @@ from smart_manager.views import (
     CPUMetricView,
     NFSDUidGidDistributionView,
     LoadAvgView,
+    MetricsHistoryView,
     SProbeMetadataView,
     SProbeMetadataDetailView,
 )
@@ -46,6 +48,13 @@ urlpatterns = [
     re_path(r"^netstat/$", NetStatView.as_view(), name="netstat-view"),
     re_path(r"^cpumetric/$", CPUMetricView.as_view(), name="cpumetric-view"),
     re_path(r"^loadavg$", LoadAvgView.as_view(), name="loadavg-view"),
+    # Metrics history
+    re_path(r"^history$", MetricsHistoryView.as_view(), name="history-view"),
+    re_path(
+        r"^history/(?P<metric>[a-z]+)/(?P<instance>%s)$" % INSTANCE_REGEX,
+        MetricsHistoryView.as_view(),
+        name="history-view",
+    ),
     # Advanced smart probes
     re_path(r"^nfs-1$", NFSDistribView.as_view(), name="nfsdistrib-view"),
     re_path(r"^nfs-1/(?P<pid>[0-9]+)$", NFSDistribView.as_view(), name="nfsdistrib-view"),
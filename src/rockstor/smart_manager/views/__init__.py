@@ -25,6 +25,7 @@ from smart_manager.views.nfs_share_client_distrib import NFSDShareClientDistribV
 from smart_manager.views.cpu_util import CPUMetricView  # noqa E501
 from smart_manager.views.nfs_uid_gid import NFSDUidGidDistributionView  # noqa E501
 from smart_manager.views.load_avg import LoadAvgView  # noqa E501
+from smart_manager.views.metrics_history import MetricsHistoryView  # noqa E501
 from smart_manager.views.sprobe_metadata import SProbeMetadataView, SProbeMetadataDetailView  # noqa E501
 from smart_manager.views.base_service import BaseServiceView, BaseServiceDetailView  # noqa E501
 from smart_manager.views.nis_service import NISServiceView  # noqa E501
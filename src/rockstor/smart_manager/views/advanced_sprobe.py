@@ -140,6 +140,12 @@ class AdvancedSProbeView(rfc.GenericView):
                 handle_exception(Exception(e_msg), request)
             if command == "status":
                 return self._paginated_response((ro,), request)
+            if not ro.smart:
+                e_msg = (
+                    "Probe: %s with id: %s is collected continuously. It "
+                    "cannot be stopped." % (pname, pid)
+                )
+                handle_exception(Exception(e_msg), request)
             if ro.state == "stopped" or ro.state == "error":
                 e_msg = (
                     "Probe: %s with id: %s already in state: %s. It "
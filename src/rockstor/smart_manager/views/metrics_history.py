@@ -0,0 +1,70 @@
+"""
+Copyright (joint work) 2024 The Rockstor Project <https://rockstor.com>
+
+Rockstor is free software; you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published
+by the Free Software Foundation; either version 2 of the License,
+or (at your option) any later version.
+
+Rockstor is distributed in the hope that it will be useful, but
+WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program. If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import time
+
+from django.conf import settings
+from rest_framework.response import Response
+import rest_framework_custom as rfc
+from smart_manager.proc.history import MetricsHistory
+from storageadmin.util import handle_exception
+
+
+class MetricsHistoryView(rfc.GenericView):
+    """
+    Dashboard metrics history as recorded by the data_collector.
+    GET sprobes/history: {metric: [instance, ...]}
+    GET sprobes/history/<metric>/<instance>: ranged query with optional
+    parameters t1 and t2 (epoch seconds, default the last hour), rollup
+    (e.g. "1m", default the finest covering t1) and points (max rows).
+    """
+
+    def _history(self):
+        return MetricsHistory(
+            settings.METRICS_HISTORY["path"], settings.METRICS_HISTORY["rollups"]
+        )
+
+    def get(self, request, *args, **kwargs):
+        with self._handle_exception(request):
+            history = self._history()
+            if "metric" not in kwargs:
+                return Response(history.instances())
+            params = request.query_params
+            try:
+                t2 = float(params.get("t2", time.time()))
+                t1 = float(params.get("t1", t2 - 3600))
+                points = params.get("points", None)
+                if points is not None:
+                    points = int(points)
+            except ValueError as e:
+                e_msg = f"Invalid metrics history query parameter: {e.__str__()}."
+                handle_exception(Exception(e_msg), request, status_code=400)
+            if t1 > t2:
+                e_msg = f"Invalid metrics history range: t1 ({t1}) > t2 ({t2})."
+                handle_exception(Exception(e_msg), request, status_code=400)
+            try:
+                result = history.query(
+                    kwargs["metric"],
+                    kwargs["instance"],
+                    t1,
+                    t2,
+                    rollup=params.get("rollup", None),
+                    max_points=points,
+                )
+            except ValueError as e:
+                handle_exception(e, request, status_code=400)
+            return Response(result)
@@ -84,6 +84,10 @@ class ReceiveTrailDetailView(rfc.GenericView):
             rt.status = request.data.get("status", rt.status)
             rt.error = request.data.get("error", rt.error)
             rt.kb_received = request.data.get("kb_received", rt.kb_received)
+            rt.kb_received_compressed = request.data.get(
+                "kb_received_compressed", rt.kb_received_compressed
+            )
+            rt.compression = request.data.get("compression", rt.compression)
             if rt.status in ("succeeded", "failed",):
                 rt.end_ts = ts
                 rt.receive_succeeded = ts
@@ -85,6 +85,10 @@ class ReplicaTrailDetailView(rfc.GenericView):
                 rt.error = request.data["error"]
             if "kb_sent" in request.data:
                 rt.kb_sent = request.data["kb_sent"]
+            if "kb_sent_compressed" in request.data:
+                rt.kb_sent_compressed = request.data["kb_sent_compressed"]
+            if "compression" in request.data:
+                rt.compression = request.data["compression"]
             if rt.status in ("failed", "succeeded",):
                 ts = datetime.utcnow().replace(tzinfo=timezone.utc)
                 rt.end_ts = ts
@@ -0,0 +1,126 @@
+"""
+Copyright (joint work) 2024 The Rockstor Project <https://rockstor.com>
+
+Rockstor is free software; you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published
+by the Free Software Foundation; either version 2 of the License,
+or (at your option) any later version.
+
+Rockstor is distributed in the hope that it will be useful, but
+WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program. If not, see <https://www.gnu.org/licenses/>.
+"""
+
+"""
+Resident scheduler for our scheduled tasks (TaskDefinition): a Huey periodic
+task, run every minute by our Huey consumer, evaluates all enabled task
+schedules (crontab) and execution windows (crontabwindow) in memory and
+enqueues those due on our Huey workers. This replaces one cron launched
+process (Python + Django start-up) per scheduled task per fire. Schedules are
+evaluated for every minute since our last run, not only the current one, so
+that late runs (e.g. all workers busy) neither skip nor repeat a minute.
+Scheduled scrub completion is event driven: see
+scripts.scheduled_tasks.pool_scrub.scrub_ended().
+"""
+
+import threading
+from datetime import datetime, timedelta
+from functools import lru_cache
+
+from huey import crontab
+from huey.contrib.djhuey import db_periodic_task, db_task, HUEY
+
+from scripts.scheduled_tasks import crontabwindow, snapshot, pool_scrub
+from scripts.scheduled_tasks import reboot_shutdown
+from smart_manager.models import TaskDefinition
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+# task_type: function accepting a TaskDefinition id.
+TASK_RUNNERS = {
+    "snapshot": snapshot.run_task,
+    "scrub": pool_scrub.run_task,
+    "reboot": reboot_shutdown.run_task,
+    "shutdown": reboot_shutdown.run_task,
+    "suspend": reboot_shutdown.run_task,
+}
+# Huey storage key of the last minute evaluated by run_scheduled_tasks().
+LAST_MINUTE_KEY = "scheduled-tasks-minute"
+# Most minutes evaluated by one run: after a longer consumer outage, e.g. a
+# powered off system, older minutes are skipped rather than run all at once.
+MAX_CATCH_UP = 60
+# Serialises run_scheduled_tasks() between the threads of our Huey consumer.
+minute_lock = threading.Lock()
+
+
+@lru_cache(maxsize=1024)
+def cron_schedule(cron_str):
+    """
+    :param cron_str: 5 field crontab schedule, e.g. "42 3 * * 5".
+    :return: function accepting a datetime, True if it is within schedule.
+    :raises ValueError: on invalid or unsupported schedules.
+    """
+    fields = cron_str.split()
+    if len(fields) != 5:
+        raise ValueError("Expected 5 crontab fields, got ({}).".format(cron_str))
+    minute, hour, day, month, day_of_week = fields
+    return crontab(minute, hour, day, month, day_of_week, strict=True)
+
+
+def due_tasks(now, since=None):
+    """
+    :param now: local datetime, to the minute.
+    :param since: local datetime, to the minute, of our last evaluation.
+    :return: list of enabled TaskDefinitions due at now, or at any minute
+    since (exclusive) and now: once each.
+    """
+    minutes = [now]
+    if since is not None and since < now:
+        gap = min(int((now - since).total_seconds() // 60), MAX_CATCH_UP)
+        minutes = [now - timedelta(minutes=m) for m in range(gap - 1, -1, -1)]
+    due = []
+    for td in TaskDefinition.objects.filter(enabled=True, crontab__isnull=False):
+        if td.task_type not in TASK_RUNNERS:
+            continue
+        try:
+            schedule = cron_schedule(td.crontab)
+            if not any(schedule(minute) for minute in minutes):
+                continue
+        except ValueError as e:
+            logger.error("Scheduled task ({}) skipped: {}".format(td.name, e))
+            continue
+        if td.crontabwindow is None:
+            logger.error("missing crontab window value")
+            continue
+        if not crontabwindow.crontab_range(td.crontabwindow):
+            logger.debug(
+                "Scheduled task ({}) not executed because outside time/day "
+                "window ranges".format(td.name)
+            )
+            continue
+        due.append(td)
+    return due
+
+
+@db_periodic_task(crontab(minute="*"))
+def run_scheduled_tasks():
+    now = datetime.now().replace(second=0, microsecond=0)
+    with minute_lock:
+        since = HUEY.get(LAST_MINUTE_KEY, peek=True)
+        if since == now:
+            # Already evaluated, e.g. by a prior late run.
+            return
+        HUEY.put(LAST_MINUTE_KEY, now)
+    for td in due_tasks(now, since):
+        run_scheduled_task(td.id, td.task_type)
+
+
+@db_task()
+def run_scheduled_task(tid, task_type):
+    TASK_RUNNERS[task_type](tid)
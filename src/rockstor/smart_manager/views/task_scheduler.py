@@ -22,7 +22,6 @@ import shutil
 import stat
 from tempfile import mkstemp
 
-from django.conf import settings
 from django.db import transaction
 from rest_framework.response import Response
 
@@ -100,41 +99,10 @@ class TaskSchedulerMixin(object):
             cfo.write("MAILTO=root\n")
             if mail_from is not None:
                 cfo.write("MAILFROM={}\n".format(mail_from))
+            # Scheduled tasks are now run by our resident scheduler, see
+            # smart_manager/views/scheduler_helpers.py: re-writing without
+            # entries removes those of prior versions.
             cfo.write("# These entries are auto generated by Rockstor. Do not edit.\n")
-            for td in TaskDefinition.objects.filter(enabled=True):
-                if td.crontab is not None:
-                    tab = "{} root".format(td.crontab)
-                    if td.task_type == "snapshot":
-                        tab = "{} {}.venv/bin/st-snapshot {}".format(
-                            tab,
-                            settings.ROOT_DIR,
-                            td.id,
-                        )
-                    elif td.task_type == "scrub":
-                        tab = "{} {}.venv/bin/st-pool-scrub {}".format(
-                            tab,
-                            settings.ROOT_DIR,
-                            td.id,
-                        )
-                    elif td.task_type in ["reboot", "shutdown", "suspend"]:
-                        tab = "{} {}.venv/bin/st-system-power {}".format(
-                            tab,
-                            settings.ROOT_DIR,
-                            td.id,
-                        )
-                    else:
-                        logger.error(
-                            "ignoring unknown task_type: {}".format(td.task_type)
-                        )
-                        continue
-                    if td.crontabwindow is not None:
-                        # add crontabwindow as 2nd arg to task script, new line
-                        # moved here
-                        tab = "{} \{}\n".format(tab, td.crontabwindow)
-                    else:
-                        logger.error("missing crontab window value")
-                        continue
-                    cfo.write(tab)
         # Set file to rw- --- --- (600) via stat constants.
         os.chmod(npath, stat.S_IRUSR | stat.S_IWUSR)
         shutil.move(npath, "/etc/cron.d/rockstortab")
@@ -15,8 +15,8 @@ You should have received a copy of the GNU General Public License
 along with this program. If not, see <https://www.gnu.org/licenses/>.
 """
 
-from system.osi import run_command
-from django.conf import settings
+from system.cache import invalidate_all
+from storageadmin.views.error_archive_helpers import request_error_archive
 from django.utils.deprecation import MiddlewareMixin
 
 import logging
@@ -26,19 +26,20 @@ logger = logging.getLogger(__name__)
 
 class ProdExceptionMiddleware(MiddlewareMixin):
     def process_exception(self, request, exception):
-        """just log the exception"""
+        """log the exception, and have our error log archive updated"""
         e_msg = (
             "Exception occurred while processing a request. Path: {} method: {}"
         ).format(request.path, request.method)
         logger.error(e_msg)
         logger.exception(exception)
-        run_command(
-            [
-                "/usr/bin/tar",
-                "-c",
-                "-z",
-                "-f",
-                settings.ROOT_DIR + "src/rockstor/logs/error.tgz",
-                settings.ROOT_DIR + "var/log",
-            ]
-        )
+        request_error_archive()
+
+
+class SystemCacheMiddleware(MiddlewareMixin):
+    def process_request(self, request):
+        """
+        Start each request with empty system state caches (see system/cache.py)
+        so model properties read state at most once per request, and never
+        state cached by this worker prior to a change made by another process.
+        """
+        invalidate_all()
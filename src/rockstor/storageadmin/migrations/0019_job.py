@@ -0,0 +1,51 @@
+# Generated by Django 4.2 on 2026-10-18 12:00
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("storageadmin", "0018_auto_20231009_1827"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Job",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("name", models.CharField(max_length=64)),
+                ("targets", models.CharField(max_length=4096)),
+                ("args", models.TextField(default="{}")),
+                ("status", models.CharField(default="queued", max_length=10)),
+                ("tid", models.CharField(max_length=36, null=True)),
+                ("pid", models.IntegerField(null=True)),
+                ("percent_done", models.IntegerField(default=0)),
+                ("message", models.CharField(max_length=1024, null=True)),
+                ("queued_time", models.DateTimeField(auto_now_add=True)),
+                ("start_time", models.DateTimeField(null=True)),
+                ("end_time", models.DateTimeField(null=True)),
+            ],
+            options={
+                "ordering": ["-id"],
+            },
+        ),
+        migrations.AddField(
+            model_name="poolscrub",
+            name="job",
+            field=models.ForeignKey(
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                to="storageadmin.job",
+            ),
+        ),
+    ]
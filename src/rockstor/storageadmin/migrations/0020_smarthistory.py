@@ -0,0 +1,46 @@
+# Generated by Django 4.2 on 2026-10-18 19:00
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("storageadmin", "0019_job"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SMARTHistory",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("aid", models.IntegerField()),
+                ("name", models.CharField(max_length=256)),
+                ("first_ts", models.BigIntegerField()),
+                ("first_raw", models.BigIntegerField()),
+                ("last_ts", models.BigIntegerField()),
+                ("last_raw", models.BigIntegerField()),
+                ("count", models.IntegerField(default=1)),
+                ("samples", models.BinaryField(default=b"")),
+                (
+                    "disk",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="storageadmin.disk",
+                    ),
+                ),
+            ],
+            options={
+                "unique_together": {("disk", "aid")},
+            },
+        ),
+    ]
@@ -34,6 +34,7 @@ from storageadmin.models.user import User  # noqa E501
 from storageadmin.models.samba_share import SambaShare  # noqa E501
 from storageadmin.models.samba_custom import SambaCustomConfig  # noqa E501
 from storageadmin.models.posix_acls import PosixACLs  # noqa E501
+from storageadmin.models.job import Job  # noqa E501
 from storageadmin.models.scrub import PoolScrub  # noqa E501
 from storageadmin.models.setup import Setup  # noqa E501
 from storageadmin.models.sftp import SFTP  # noqa E501
@@ -48,7 +49,7 @@ from storageadmin.models.rockon import (RockOn, DImage, DContainer, DPort, DVolu
                     DContainerLabel, DContainerNetwork)  # noqa E501
 from storageadmin.models.smart import (SMARTAttribute, SMARTCapability, SMARTErrorLog,  # noqa E501
                    SMARTErrorLogSummary, SMARTTestLog, SMARTTestLogDetail,  # noqa E501
-                   SMARTIdentity, SMARTInfo)  # noqa E501
+                   SMARTIdentity, SMARTInfo, SMARTHistory)  # noqa E501
 from storageadmin.models.config_backup import ConfigBackup  # noqa E501
 from storageadmin.models.email import EmailClient  # noqa E501
 from storageadmin.models.update_subscription import UpdateSubscription  # noqa E501
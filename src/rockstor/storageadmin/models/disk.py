@@ -19,6 +19,7 @@ import json
 from django.db import models
 from fs.btrfs import get_dev_io_error_stats
 from storageadmin.models import Pool
+from system.cache import ttl_cache
 from system.osi import (
     get_disk_power_status,
     read_hdparm_setting,
@@ -27,6 +28,27 @@ from system.osi import (
 )
 
 
+# Per device caches of our hdparm/btrfs property lookups, see system/cache.py.
+@ttl_cache(10, tags=("disks",))
+def cached_power_status(dev_byid):
+    return get_disk_power_status(dev_byid)
+
+
+@ttl_cache(10, tags=("disks",))
+def cached_hdparm_setting(dev_byid):
+    return read_hdparm_setting(dev_byid)
+
+
+@ttl_cache(10, tags=("disks",))
+def cached_apm_level(dev_byid):
+    return get_disk_APM_level(dev_byid)
+
+
+@ttl_cache(10, tags=("disks",))
+def cached_io_error_stats(target):
+    return get_dev_io_error_stats(target)
+
+
 class AttachedManager(models.Manager):
     """Manager subclass to return only attached disks"""
 
@@ -94,21 +116,21 @@ class Disk(models.Model):
     @property
     def power_state(self, *args, **kwargs):
         try:
-            return get_disk_power_status(str(self.name))
+            return cached_power_status(str(self.name))
         except:
             return None
 
     @property
     def hdparm_setting(self, *args, **kwargs):
         try:
-            return read_hdparm_setting(str(self.name))
+            return cached_hdparm_setting(str(self.name))
         except:
             return None
 
     @property
     def apm_level(self, *args, **kwargs):
         try:
-            return get_disk_APM_level(str(self.name))
+            return cached_apm_level(str(self.name))
         except:
             return None
 
@@ -116,7 +138,7 @@ class Disk(models.Model):
     def io_error_stats(self, *args, **kwargs):
         # json charfield format
         try:
-            return get_dev_io_error_stats(str(self.target_name))
+            return cached_io_error_stats(str(self.target_name))
         except:
             return None
 
@@ -0,0 +1,54 @@
+"""
+Copyright (joint work) 2024 The Rockstor Project <https://rockstor.com>
+
+Rockstor is free software; you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published
+by the Free Software Foundation; either version 2 of the License,
+or (at your option) any later version.
+
+Rockstor is distributed in the hope that it will be useful, but
+WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program. If not, see <https://www.gnu.org/licenses/>.
+"""
+
+from django.db import models
+
+ACTIVE_JOB_STATES = ("queued", "running", "cancelling")
+
+
+class Job(models.Model):
+    """
+    Long-running storage command run by our Huey workers, see
+    storageadmin/views/job_helpers.py
+    """
+
+    # Registered job type, e.g. "scrub", "smart_test".
+    name = models.CharField(max_length=64)
+    # Space separated resources, e.g. "pool:2 disk:ata-WDC_...": only one
+    # running job may hold any given resource.
+    targets = models.CharField(max_length=4096)
+    # json encoded keyword arguments of the job function.
+    args = models.TextField(default="{}")
+    # queued|running|cancelling|cancelled|finished|failed
+    status = models.CharField(max_length=10, default="queued")
+    # huey uuid
+    tid = models.CharField(max_length=36, null=True)
+    # pid of the Huey consumer running this job.
+    pid = models.IntegerField(null=True)
+    percent_done = models.IntegerField(default=0)
+    message = models.CharField(max_length=1024, null=True)
+    queued_time = models.DateTimeField(auto_now_add=True)
+    start_time = models.DateTimeField(null=True)
+    end_time = models.DateTimeField(null=True)
+
+    @property
+    def active(self, *args, **kwargs):
+        return self.status in ACTIVE_JOB_STATES
+
+    class Meta:
+        app_label = "storageadmin"
+        ordering = ["-id"]
@@ -26,11 +26,40 @@ from fs.btrfs import (
     default_subvol,
     PROFILE,
 )
+from system.cache import ttl_cache
 from system.osi import mount_status
 
 RETURN_BOOLEAN = True
 
 
+# Cached lookups behind our properties and __init__: serializing N pools would
+# otherwise run each of these commands N times per request.
+# See system/cache.py and storageadmin.middleware.SystemCacheMiddleware.
+@ttl_cache(10, tags=("pools", "disks"))
+def cached_missing_dev_count(label):
+    return pool_missing_dev_count(label)
+
+
+@ttl_cache(10, tags=("pools",))
+def cached_dev_stats_zero(mnt_pt):
+    return dev_stats_zero(mnt_pt)
+
+
+@ttl_cache(30, tags=("pools",))
+def cached_default_subvol():
+    return default_subvol()
+
+
+@ttl_cache(5, tags=("pools", "usage"))
+def cached_pool_usage(mnt_pt, fsid):
+    return pool_usage(mnt_pt, fsid)
+
+
+@ttl_cache(10, tags=("quotas",))
+def cached_quotas_enabled(mnt_pt):
+    return are_quotas_enabled(mnt_pt)
+
+
 class Pool(models.Model):
     # Name of the pool
     name = models.CharField(max_length=4096, unique=True)
@@ -57,7 +86,7 @@ class Pool(models.Model):
         # May be updated during instance life by calling this method again,
         # or by directly setting the instance variables.
         try:
-            self.missing_dev_count = pool_missing_dev_count(self.name)
+            self.missing_dev_count = cached_missing_dev_count(self.name)
         except:
             self.missing_dev_count = 0
 
@@ -86,7 +115,7 @@ class Pool(models.Model):
         # this serves as a mechanism by which we can 'special case' our ROOT/system
         # pool and avoid mounting it again at the usual /mnt2/pool-name as it is already
         # mounted (or it's boot to snapshot instance) at "/".
-        if self.role == "root" and not default_subvol().boot_to_snap:
+        if self.role == "root" and not cached_default_subvol().boot_to_snap:
             self.mnt_pt_var = "/"
         else:
             self.mnt_pt_var = "{}{}".format(settings.MNT_PT, self.name)
@@ -101,7 +130,7 @@ class Pool(models.Model):
         # calling this method again or directly setting the field.
         try:
             if self.is_mounted:
-                self.dev_stats_zero = dev_stats_zero(self.mnt_pt_var)
+                self.dev_stats_zero = cached_dev_stats_zero(self.mnt_pt_var)
             else:
                 self.dev_stats_zero = True
         except:
@@ -118,7 +147,11 @@ class Pool(models.Model):
         # less code. For share usage, this type of logic could slow things
         # down quite a bit because there can be 100's of Shares, but number
         # of Pools even on a large instance is usually no more than a few.
-        return self.size - pool_usage(self.mnt_pt_var)
+        return self.size - self.cur_usage()
+
+    def cur_usage(self):
+        """Used space in KB: from sysfs where available, see pool_usage()."""
+        return cached_pool_usage(self.mnt_pt_var, self.uuid)
 
     @property
     def reclaimable(self, *args, **kwargs):
@@ -151,7 +184,7 @@ class Pool(models.Model):
     def quotas_enabled(self, *args, **kwargs):
         # Calls are_quotas_enabled for boolean response
         try:
-            return are_quotas_enabled(self.mnt_pt_var)
+            return cached_quotas_enabled(self.mnt_pt_var)
         except:
             return False
 
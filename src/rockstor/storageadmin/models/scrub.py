@@ -16,7 +16,7 @@ along with this program. If not, see <http://www.gnu.org/licenses/>.
 """
 
 from django.db import models
-from storageadmin.models import Pool
+from storageadmin.models import Pool, Job
 
 
 class PoolScrub(models.Model):
@@ -26,6 +26,8 @@ class PoolScrub(models.Model):
     status = models.CharField(max_length=10, default="started")
     # pid is the process id of a scrub job
     pid = models.IntegerField()
+    # Job running our scrub, see storageadmin/views/pool_scrub.py scrub_job()
+    job = models.ForeignKey(Job, null=True, on_delete=models.SET_NULL)
     start_time = models.DateTimeField(auto_now=True)
     end_time = models.DateTimeField(null=True)
     time_left = models.BigIntegerField(default=0)
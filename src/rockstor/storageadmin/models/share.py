@@ -18,13 +18,19 @@ along with this program. If not, see <http://www.gnu.org/licenses/>.
 from django.conf import settings
 from django.db import models
 
-from fs.btrfs import qgroup_exists
+from fs.btrfs import qgroup_ids
 from storageadmin.models import Pool
+from system.cache import ttl_cache
 from system.osi import mount_status
 
 RETURN_BOOLEAN = True
 
 
+@ttl_cache(10, tags=("quotas",))
+def cached_qgroup_ids(mnt_pt):
+    return qgroup_ids(mnt_pt)
+
+
 class Share(models.Model):
     # pool that this share is part of
     pool = models.ForeignKey(Pool, on_delete=models.CASCADE)
@@ -94,7 +100,8 @@ class Share(models.Model):
             if str(self.pqgroup) == "-1/-1":
                 return False
             else:
-                return qgroup_exists(self.mnt_pt_var, "{}".format(self.pqgroup))
+                # qgroups are per pool: one lookup serves all of its shares.
+                return str(self.pqgroup) in cached_qgroup_ids(self.pool.mnt_pt)
         except:
             return False
 
@@ -156,3 +156,27 @@ class SMARTInfo(models.Model):
 
     def testlogdetail(self):
         return SMARTTestLogDetail.objects.filter(info=self).order_by("id")
+
+
+class SMARTHistory(models.Model):
+    """
+    Raw value time-series of one SMART attribute of one disk, see
+    storageadmin/views/smart_history_helpers.py. From its first sample
+    (first_ts, first_raw) samples holds each following sample as a pair of
+    zigzag varints: seconds since, and raw value change since, the prior one.
+    """
+
+    disk = models.ForeignKey(Disk, on_delete=models.CASCADE)
+    aid = models.IntegerField()
+    name = models.CharField(max_length=256)
+    # Epoch seconds, and raw value, of our first and last samples.
+    first_ts = models.BigIntegerField()
+    first_raw = models.BigIntegerField()
+    last_ts = models.BigIntegerField()
+    last_raw = models.BigIntegerField()
+    count = models.IntegerField(default=1)
+    samples = models.BinaryField(default=b"")
+
+    class Meta:
+        app_label = "storageadmin"
+        unique_together = ("disk", "aid")
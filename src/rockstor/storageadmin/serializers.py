@@ -16,6 +16,7 @@ along with this program. If not, see <http://www.gnu.org/licenses/>.
 """
 
 from rest_framework import serializers
+from rest_framework_custom.serializers import DynamicFieldsModelSerializer
 from storageadmin.models import (
     Disk,
     Pool,
@@ -38,6 +39,7 @@ from storageadmin.models import (
     OauthApp,
     Group,
     PoolBalance,
+    Job,
     SambaCustomConfig,
     TLSCertificate,
     RockOn,
@@ -78,7 +80,7 @@ class DiskInfoSerializer(serializers.ModelSerializer):
         fields = "__all__"
 
 
-class PoolInfoSerializer(serializers.ModelSerializer):
+class PoolInfoSerializer(DynamicFieldsModelSerializer):
     disks = DiskInfoSerializer(many=True, source="disk_set")
     free = serializers.IntegerField()
     reclaimable = serializers.IntegerField()
@@ -92,13 +94,14 @@ class PoolInfoSerializer(serializers.ModelSerializer):
     data_raid = serializers.CharField()
     metadata_raid = serializers.CharField()
 
+    eager_loading = {"disks": ((), ("disk_set",))}
 
     class Meta:
         model = Pool
         fields = "__all__"
 
 
-class SnapshotSerializer(serializers.ModelSerializer):
+class SnapshotSerializer(DynamicFieldsModelSerializer):
     class Meta:
         model = Snapshot
         fields = "__all__"
@@ -189,7 +192,7 @@ class SharePoolSerializer(serializers.ModelSerializer):
         fields = "__all__"
 
 
-class ShareSerializer(serializers.ModelSerializer):
+class ShareSerializer(DynamicFieldsModelSerializer):
     snapshots = SnapshotSerializer(many=True, source="snapshot_set")
     pool = PoolInfoSerializer()
     nfs_exports = NFSExportSerializer(many=True, source="nfsexport_set")
@@ -197,6 +200,12 @@ class ShareSerializer(serializers.ModelSerializer):
     is_mounted = serializers.BooleanField()
     pqgroup_exist = serializers.BooleanField()
 
+    eager_loading = {
+        "pool": (("pool",), ("pool__disk_set",)),
+        "snapshots": ((), ("snapshot_set",)),
+        "nfs_exports": ((), ("nfsexport_set",)),
+    }
+
     class Meta:
         model = Share
         fields = "__all__"
@@ -257,6 +266,14 @@ class PoolBalanceSerializer(serializers.ModelSerializer):
         fields = "__all__"
 
 
+class JobSerializer(serializers.ModelSerializer):
+    active = serializers.BooleanField()
+
+    class Meta:
+        model = Job
+        exclude = ("args", "pid")
+
+
 class SetupSerializer(serializers.ModelSerializer):
     class Meta:
         model = Setup
@@ -1035,6 +1035,22 @@ $(document).ready(function() {
         }
     };
 
+    var displaySmartTrends = function (data) {
+        var html = '';
+        if (data.status === 'warning') {
+            html += '<i class="fa fa-warning fa-inverse" style="color: orange;"> SMART Trend Alert </i>';
+            $('#smart-trends').fadeOut(1500, function(){
+                $('#smart-trends').attr('title', data.message);
+                $('#smart-trends').html(html).fadeIn(1500);
+            });
+        } else {
+            $('#smart-trends').fadeOut(1500, function() {
+                $('#smart-trends').attr('title', '');
+                $('#smart-trends').empty();
+            });
+        }
+    };
+
 
     var displayLoadAvg = function(data) {
         var n = parseInt(data);
@@ -1144,6 +1160,7 @@ $(document).ready(function() {
     RockStorSocket.addListener(displayShutdownStatus, this, 'sysinfo:shutdown_status');
     RockStorSocket.addListener(displayPoolDegradedStatus, this, 'sysinfo:pool_degraded_status');
     RockStorSocket.addListener(displayPoolDevStats, this, 'sysinfo:pool_dev_stats');
+    RockStorSocket.addListener(displaySmartTrends, this, 'sysinfo:smart_trend_alerts');
 
     //insert pagination partial helper functions here
     Handlebars.registerHelper('pagination', function() {
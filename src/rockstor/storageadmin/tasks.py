@@ -38,6 +38,17 @@ from smart_manager.views.ztask_helpers import restart_rockstor
 from storageadmin.views.rockon_helpers import start, stop, update, install, uninstall
 from storageadmin.views.config_backup import restore_config, restore_rockons
 from storageadmin.views.pool_balance import update_end_time
+from storageadmin.views.job_helpers import run_job  # noqa F401
+from storageadmin.views.error_archive_helpers import archive_error_logs  # noqa F401
+from smart_manager.views.scheduler_helpers import run_scheduled_tasks  # noqa F401
+from storageadmin.views.smart_history_helpers import (  # noqa F401
+    collect_smart_history,
+    rollup_smart_history,
+)
+
+# Job types, see storageadmin/views/job_helpers.py
+import storageadmin.views.pool_scrub  # noqa F401
+import storageadmin.views.disk_smart  # noqa F401
 
 import logging
 
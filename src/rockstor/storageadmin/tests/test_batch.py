@@ -0,0 +1,77 @@
+"""
+Copyright (joint work) 2024 The Rockstor Project <https://rockstor.com>
+
+Rockstor is free software; you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published
+by the Free Software Foundation; either version 2 of the License,
+or (at your option) any later version.
+
+Rockstor is distributed in the hope that it will be useful, but
+WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program. If not, see <https://www.gnu.org/licenses/>.
+"""
+
+from rest_framework import status
+from unittest.mock import patch
+
+from storageadmin.tests.test_api import APITestMixin
+
+"""
+To run the tests:
+cd /opt/rockstor/src/rockstor
+export DJANGO_SETTINGS_MODULE="settings"
+poetry run django-admin test -v 2 -p test_batch.py
+"""
+
+
+class BatchTests(APITestMixin):
+    fixtures = ["test_api.json"]
+    BASE_URL = "/api/batch"
+
+    @classmethod
+    def setUpClass(cls):
+        super(BatchTests, cls).setUpClass()
+
+        cls.patch_uptime = patch("storageadmin.views.command.uptime")
+        cls.mock_uptime = cls.patch_uptime.start()
+        cls.mock_uptime.return_value = 1234
+
+        cls.patch_kernel_info = patch("storageadmin.views.command.kernel_info")
+        cls.mock_kernel_info = cls.patch_kernel_info.start()
+        cls.mock_kernel_info.side_effect = Exception("no kernel")
+
+    def test_post(self):
+        calls = [
+            {"url": "commands/uptime", "method": "post"},
+            {"url": "commands/kernel", "method": "post"},
+            {"url": "no-such-endpoint"},
+            {"url": "jobs?page_size=1"},
+            {"url": "batch", "method": "post", "data": {"calls": []}},
+        ]
+        response = self.client.post(self.BASE_URL, {"calls": calls}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK, msg=response.data)
+        results = response.data
+        self.assertEqual([r["url"] for r in results], [c["url"] for c in calls])
+        self.assertEqual([r["status"] for r in results], [200, 500, 404, 200, 500])
+        self.assertEqual(results[0]["data"], 1234)
+        self.assertEqual(results[1]["data"][0], "no kernel")
+        self.assertIn("results", results[3]["data"])
+
+    def test_post_invalid(self):
+        response = self.client.post(self.BASE_URL, {"calls": "uptime"}, format="json")
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_500_INTERNAL_SERVER_ERROR,
+            msg=response.data,
+        )
+        # Unauthenticated: no calls run.
+        self.client.force_authenticate(user=None)
+        calls = [{"url": "commands/uptime", "method": "post"}]
+        response = self.client.post(self.BASE_URL, {"calls": calls}, format="json")
+        self.assertEqual(
+            response.status_code, status.HTTP_403_FORBIDDEN, msg=response.data
+        )
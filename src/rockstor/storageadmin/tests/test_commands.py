@@ -84,6 +84,16 @@ class CommandTests(APITestMixin):
         )
         cls.mock_import_snapshots = cls.patch_import_snapshots.start()
 
+        cls.patch_pool_qgroup_usage = patch(
+            "storageadmin.views.command.pool_qgroup_usage"
+        )
+        cls.mock_pool_qgroup_usage = cls.patch_pool_qgroup_usage.start()
+        cls.mock_pool_qgroup_usage.return_value = {}
+
+        cls.patch_pool_snaps_info = patch("storageadmin.views.command.pool_snaps_info")
+        cls.mock_pool_snaps_info = cls.patch_pool_snaps_info.start()
+        cls.mock_pool_snaps_info.return_value = {}
+
         cls.patch_get_unlocked_luks_containers_uuids = patch(
             "storageadmin.views.disk.get_unlocked_luks_containers_uuids"
         )
@@ -105,6 +115,18 @@ class CommandTests(APITestMixin):
         response = self.client.post("{}/bootstrap".format(self.BASE_URL))
         self.assertEqual(response.status_code, status.HTTP_200_OK, msg=response.data)
 
+    @patch("storageadmin.views.command.HUEY")
+    @patch("storageadmin.views.command.get_dev_pool_info")
+    @patch("storageadmin.views.command.get_device_mapper_map")
+    @patch("storageadmin.views.command.CommandView._update_disk_state")
+    def test_bootstrap_stages(self, mock_disks, mock_dm, mock_dev_info, mock_huey):
+        # Per stage timings of our bootstrap task graph, returned and kept.
+        response = self.client.post("{}/bootstrap".format(self.BASE_URL))
+        self.assertEqual(response.status_code, status.HTTP_200_OK, msg=response.data)
+        self.assertEqual(response.data["sftp"]["tasks"], 1)
+        self.assertEqual(response.data["nfs"]["failed"], 0)
+        mock_huey.put.assert_called_once_with("bootstrap-timings", response.data)
+
     def test_utcnow_command(self):
         # utcnow command
         response = self.client.post("{}/utcnow".format(self.BASE_URL))
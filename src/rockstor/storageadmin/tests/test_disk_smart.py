@@ -18,6 +18,7 @@ from unittest.mock import patch
 from rest_framework import status
 
 from storageadmin.tests.test_api import APITestMixin
+from system.smart import SMART
 
 
 class DiskSmartTests(APITestMixin):
@@ -118,3 +119,30 @@ class DiskSmartTests(APITestMixin):
         # happy path
         response = self.client.post("{}/info/{}".format(self.BASE_URL, diskId))
         self.assertEqual(response.status_code, status.HTTP_200_OK, msg=response.data)
+
+    def test_refresh(self):
+        # All SMART enabled disks, skipping those in standby.
+        with patch("storageadmin.views.disk_smart.all_info") as mock_all_info:
+            mock_all_info.return_value = None
+            response = self.client.post(
+                "{}/refresh".format(self.BASE_URL), data={"skip_standby": True}
+            )
+            self.assertEqual(
+                response.status_code, status.HTTP_200_OK, msg=response.data
+            )
+            mock_all_info.assert_called_once_with(
+                "ata-QEMU_HARDDISK_QM00003", None, True
+            )
+        self.assertEqual(
+            response.data,
+            {"refreshed": [], "standby": ["ata-QEMU_HARDDISK_QM00003"], "failed": {}},
+        )
+        # As per info command: one smartctl run per disk.
+        self.mock_run_test.reset_mock()
+        response = self.client.post("{}/refresh".format(self.BASE_URL))
+        self.assertEqual(response.status_code, status.HTTP_200_OK, msg=response.data)
+        self.assertEqual(response.data["refreshed"], ["ata-QEMU_HARDDISK_QM00003"])
+        self.assertEqual(self.mock_run_test.call_count, 1)
+        self.assertEqual(
+            self.mock_run_test.call_args.args[0][:3], [SMART, "-x", "--json"]
+        )
@@ -16,9 +16,12 @@ along with this program. If not, see <https://www.gnu.org/licenses/>.
 """
 from unittest import mock
 from unittest.mock import patch
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from rest_framework import status
 
 from storageadmin.models import Disk
+from system.osi import Disk as OsiDisk
 from storageadmin.tests.test_api import APITestMixin
 
 
@@ -71,6 +74,14 @@ class DiskTests(APITestMixin):
         cls.patch_import_shares = patch("storageadmin.views.disk.import_shares")
         cls.mock_import_shares = cls.patch_import_shares.start()
 
+        cls.patch_pool_qgroup_usage = patch("storageadmin.views.disk.pool_qgroup_usage")
+        cls.mock_pool_qgroup_usage = cls.patch_pool_qgroup_usage.start()
+        cls.mock_pool_qgroup_usage.return_value = {}
+
+        cls.patch_pool_snaps_info = patch("storageadmin.views.disk.pool_snaps_info")
+        cls.mock_pool_snaps_info = cls.patch_pool_snaps_info.start()
+        cls.mock_pool_snaps_info.return_value = {}
+
         # TODO: maybe patch as storageadmin.views.disk.smart.toggle_smart
         cls.patch_toggle_smart = patch("system.smart.toggle_smart")
         cls.mock_toggle_smart = cls.patch_toggle_smart.start()
@@ -98,6 +109,126 @@ class DiskTests(APITestMixin):
         )
         self.assertEqual(response.status_code, status.HTTP_200_OK)
 
+    @mock.patch("storageadmin.views.disk.smart.available")
+    @mock.patch("storageadmin.views.disk.get_dev_pool_info")
+    @mock.patch("storageadmin.views.disk.get_crypttab_entries")
+    @mock.patch("storageadmin.views.disk.get_byid_name_map")
+    @mock.patch("storageadmin.views.disk.get_dev_byid_name")
+    def test_disk_scan_incremental(
+        self, mock_byid, mock_byid_map, mock_crypttab, mock_pool_info, mock_smart
+    ):
+        """
+        A udev event driven scan of named devices only updates those, and
+        any not previously known as attached or now missing.
+        """
+        mock_byid.side_effect = lambda name, remove_path: (
+            f"ata-{name.split('/')[-1]}",
+            True,
+        )
+        mock_byid_map.return_value = {}
+        mock_crypttab.return_value = {}
+        mock_pool_info.return_value = {}
+        mock_smart.return_value = (True, True)
+        attached = [
+            OsiDisk(
+                name=f"/dev/sd{x}",
+                model=None,
+                serial=f"serial-{x}",
+                size=10485760,
+                transport="sata",
+                vendor=None,
+                hctl=None,
+                type="disk",
+                fstype=None,
+                label=None,
+                uuid=None,
+                partitions={f"/dev/sd{x}1": "ext4"} if x == "c" else {},
+            )
+            for x in "abc"
+        ]
+        self.mock_scan_disks.return_value = attached
+        url = f"{self.BASE_URL}/scan"
+        response = self.client.post(url, data=None, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(mock_smart.call_count, 3)
+        # Partition change event on sdc.
+        mock_smart.reset_mock()
+        data = {"devices": ["/dev/sdc1"]}
+        response = self.client.post(url, data=data, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([c[0][0] for c in mock_smart.call_args_list], ["ata-sdc"])
+        # Removal of sdb (its own remove event naming it).
+        mock_smart.reset_mock()
+        self.mock_scan_disks.return_value = [attached[0], attached[2]]
+        data = {"devices": ["/dev/sdb"]}
+        response = self.client.post(url, data=data, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(mock_smart.call_count, 0)
+        self.assertTrue(Disk.objects.get(serial="serial-b").offline)
+        self.assertEqual(Disk.objects.get(serial="serial-a").name, "ata-sda")
+        self.mock_scan_disks.reset_mock(return_value=True)
+
+    @mock.patch("storageadmin.views.disk.smart.available")
+    @mock.patch("storageadmin.views.disk.get_dev_pool_info")
+    @mock.patch("storageadmin.views.disk.get_crypttab_entries")
+    @mock.patch("storageadmin.views.disk.get_byid_name_map")
+    @mock.patch("storageadmin.views.disk.get_dev_byid_name")
+    def test_disk_scan_query_count(
+        self, mock_byid, mock_byid_map, mock_crypttab, mock_pool_info, mock_smart
+    ):
+        """
+        A disk rescan costs a constant number of DB queries regardless of the
+        number of attached, or detached, drives.
+        """
+        mock_byid.side_effect = lambda name, remove_path: (
+            f"ata-{name.split('/')[-1]}",
+            True,
+        )
+        mock_byid_map.return_value = {}
+        mock_crypttab.return_value = {}
+        mock_pool_info.return_value = {}
+        mock_smart.return_value = (True, True)
+
+        def attached(count):
+            return [
+                OsiDisk(
+                    name=f"/dev/sd{n}",
+                    model=None,
+                    serial=f"serial-{n}",
+                    size=10485760,
+                    transport="sata",
+                    vendor=None,
+                    hctl=None,
+                    type="disk",
+                    fstype=None,
+                    label=None,
+                    uuid=None,
+                )
+                for n in range(count)
+            ]
+
+        def rescan_queries(count):
+            self.mock_scan_disks.return_value = attached(count)
+            # First scan of this set of drives: may create Disk entries.
+            self.client.post(f"{self.BASE_URL}/scan", data=None, format="json")
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.post(
+                    f"{self.BASE_URL}/scan", data=None, format="json"
+                )
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(len(response.data), max(count, 60))
+            return len(queries)
+
+        many = rescan_queries(60)
+        # 60 attached of which the last 57 are now detached.
+        self.assertEqual(rescan_queries(3), many)
+        self.assertEqual(
+            Disk.objects.filter(offline=True).count(), 57, msg="detached drives"
+        )
+        # Of the order of the atomic transaction, reads, and bulk writes.
+        self.assertLessEqual(many, 10)
+        self.mock_scan_disks.reset_mock(return_value=True)
+
     def test_invalid_disk_wipe(self):
         fake_dId = 99999
         url = "{}/{}/wipe".format(self.BASE_URL, fake_dId)
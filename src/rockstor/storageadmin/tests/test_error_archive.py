@@ -0,0 +1,105 @@
+"""
+Copyright (joint work) 2024 The Rockstor Project <https://rockstor.com>
+
+Rockstor is free software; you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published
+by the Free Software Foundation; either version 2 of the License,
+or (at your option) any later version.
+
+Rockstor is distributed in the hope that it will be useful, but
+WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program. If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import os
+import shutil
+import tarfile
+import tempfile
+import time
+import unittest
+from unittest.mock import patch
+
+from django.test.utils import override_settings
+from huey import MemoryHuey
+
+from storageadmin.views.error_archive_helpers import (
+    request_error_archive,
+    archive_error_logs,
+    error_archive_path,
+    ARCHIVE_LAST_KEY,
+)
+
+"""
+To run the tests:
+cd /opt/rockstor/src/rockstor
+export DJANGO_SETTINGS_MODULE="settings"
+poetry run django-admin test -v 2 -p test_error_archive.py
+"""
+
+
+class ErrorArchiveTests(unittest.TestCase):
+    def setUp(self):
+        self.root_dir = tempfile.mkdtemp() + "/"
+        os.makedirs(self.root_dir + "var/log/nginx")
+        settings_override = override_settings(
+            ROOT_DIR=self.root_dir,
+            ERROR_ARCHIVE={"interval": 600, "max_size": 1000},
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.huey = MemoryHuey()
+        patch("storageadmin.views.error_archive_helpers.HUEY", self.huey).start()
+        self.mock_schedule = patch(
+            "storageadmin.views.error_archive_helpers.archive_error_logs.schedule"
+        ).start()
+
+    def tearDown(self):
+        patch.stopall()
+        shutil.rmtree(self.root_dir)
+
+    def write_log(self, rel_path, size, age=0):
+        path = self.root_dir + "var/log/" + rel_path
+        with open(path, "w") as lfo:
+            lfo.write("x" * size)
+        mtime = time.time() - age
+        os.utime(path, (mtime, mtime))
+
+    def archived(self):
+        with tarfile.open(error_archive_path()) as tar:
+            return sorted(tar.getnames())
+
+    def test_request_error_archive(self):
+        # First request: immediately, following ones coalesced while pending.
+        for i in range(10):
+            request_error_archive()
+        self.mock_schedule.assert_called_once_with(delay=0)
+        # Once run: the next is no sooner than interval after the last.
+        self.write_log("rockstor.log", 10)
+        archive_error_logs.call_local()
+        self.mock_schedule.reset_mock()
+        request_error_archive()
+        request_error_archive()
+        self.mock_schedule.assert_called_once()
+        self.assertAlmostEqual(
+            self.mock_schedule.call_args.kwargs["delay"], 600, delta=5
+        )
+
+    def test_archive_error_logs(self):
+        self.write_log("rockstor.log", 400, age=10)
+        self.write_log("nginx/access.log", 500, age=20)
+        self.write_log("huey.log", 300, age=30)  # over our size cap.
+        archive_error_logs.call_local()
+        self.assertEqual(
+            self.archived(), ["var/log/nginx/access.log", "var/log/rockstor.log"]
+        )
+        # Incremental: only logs changed since the last archive.
+        self.huey.put(ARCHIVE_LAST_KEY, time.time() - 15)
+        archive_error_logs.call_local()
+        self.assertEqual(self.archived(), ["var/log/rockstor.log"])
+        # No changes: prior archive kept.
+        archive_error_logs.call_local()
+        self.assertEqual(self.archived(), ["var/log/rockstor.log"])
@@ -0,0 +1,249 @@
+"""
+Copyright (joint work) 2024 The Rockstor Project <https://rockstor.com>
+
+Rockstor is free software; you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published
+by the Free Software Foundation; either version 2 of the License,
+or (at your option) any later version.
+
+Rockstor is distributed in the hope that it will be useful, but
+WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program. If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import os
+from unittest.mock import patch
+
+from rest_framework import status
+
+from storageadmin.models import Job
+from storageadmin.tests.test_api import APITestMixin
+from storageadmin.views.job_helpers import (
+    JobCancelled,
+    job_type,
+    job_poll,
+    submit_job,
+    cancel_job,
+    run_job,
+    poll_job,
+)
+from system.smart import self_test_remaining
+
+"""
+To run the tests:
+cd /opt/rockstor/src/rockstor
+export DJANGO_SETTINGS_MODULE="settings"
+poetry run django-admin test -v 2 -p test_jobs.py
+"""
+
+
+@job_type("test_progress")
+def progress_job(ctx, fail=False):
+    ctx.progress(50, "half way")
+    if fail:
+        raise Exception("failed half way")
+
+
+@job_type("test_cancel")
+def cancel_test_job(ctx):
+    # As per cancel_job() called via the API during our run.
+    Job.objects.filter(id=ctx.job_id).update(status="cancelling")
+    ctx.run(["sleep", "10"], interval=0.05)
+
+
+@job_type("test_detached")
+def detached_job(ctx, polls=2):
+    ctx.progress(0, "started")
+
+
+@job_poll("test_detached", interval=60)
+def detached_poll(ctx, polls=2):
+    if ctx.cancelled():
+        raise JobCancelled()
+    job = Job.objects.get(id=ctx.job_id)
+    ctx.progress(job.percent_done + 100 // polls)
+    return job.percent_done + 100 // polls >= 100
+
+
+class JobTests(APITestMixin):
+    fixtures = ["test_api.json"]
+    BASE_URL = "/api/jobs"
+
+    @classmethod
+    def setUpClass(cls):
+        super(JobTests, cls).setUpClass()
+
+        cls.patch_enqueue_job = patch("storageadmin.views.job_helpers.enqueue_job")
+        cls.mock_enqueue_job = cls.patch_enqueue_job.start()
+
+        cls.patch_revoke_by_id = patch(
+            "storageadmin.views.job_helpers.HUEY.revoke_by_id"
+        )
+        cls.mock_revoke_by_id = cls.patch_revoke_by_id.start()
+
+    def setUp(self):
+        super(JobTests, self).setUp()
+        self.mock_enqueue_job.reset_mock()
+
+    def submit(self, name, targets=("pool:2",), **kwargs):
+        with self.captureOnCommitCallbacks(execute=True):
+            job = submit_job(name, list(targets), **kwargs)
+        self.mock_enqueue_job.assert_called_once_with(job.id)
+        self.mock_enqueue_job.reset_mock()
+        return job
+
+    def test_run_job(self):
+        with self.assertRaises(Exception):
+            submit_job("no_such_job", ["pool:2"])
+        job = self.submit("test_progress")
+        self.assertEqual(job.status, "queued")
+        run_job.call_local(job.id)
+        job.refresh_from_db()
+        self.assertEqual(job.status, "finished")
+        self.assertEqual(job.percent_done, 100)
+        self.assertEqual(job.message, "half way")
+        self.assertIsNotNone(job.end_time)
+        # Failure, with the exception recorded.
+        job = self.submit("test_progress", fail=True)
+        run_job.call_local(job.id)
+        job.refresh_from_db()
+        self.assertEqual(job.status, "failed")
+        self.assertEqual(job.percent_done, 50)
+        self.assertEqual(job.message, "failed half way")
+        # Already ended jobs are not re-run.
+        run_job.call_local(job.id)
+        job.refresh_from_db()
+        self.assertEqual(job.status, "failed")
+
+    def test_detached(self):
+        job = self.submit("test_detached", targets=["disk:sda"])
+        with patch("storageadmin.views.job_helpers.poll_job.schedule") as mock_poll:
+            # Our job function returns once started, freeing our worker.
+            run_job.call_local(job.id)
+            job.refresh_from_db()
+            self.assertEqual(job.status, "running")
+            self.assertEqual(job.message, "started")
+            mock_poll.assert_called_once_with(args=(job.id,), delay=60)
+            # Each poll a short task: re-scheduled until done.
+            poll_job.call_local(job.id)
+            job.refresh_from_db()
+            self.assertEqual(job.status, "running")
+            self.assertEqual(job.percent_done, 50)
+            self.assertEqual(mock_poll.call_count, 2)
+            # Still holding our targets meanwhile.
+            waiting = self.submit("test_progress", targets=["disk:sda"])
+            run_job.call_local(waiting.id)
+            waiting.refresh_from_db()
+            self.assertEqual(waiting.status, "queued")
+            self.mock_enqueue_job.assert_called_once_with(waiting.id, delay=30)
+            self.mock_enqueue_job.reset_mock()
+            poll_job.call_local(job.id)
+            job.refresh_from_db()
+            self.assertEqual(job.status, "finished")
+            self.assertIsNotNone(job.end_time)
+            self.assertEqual(mock_poll.call_count, 2)
+            # Cancelled between polls.
+            job = self.submit("test_detached")
+            run_job.call_local(job.id)
+            self.assertEqual(cancel_job(job), "cancelling")
+            poll_job.call_local(job.id)
+            job.refresh_from_db()
+            self.assertEqual(job.status, "cancelled")
+            # Polls of ended jobs do nothing.
+            poll_job.call_local(job.id)
+            self.assertEqual(mock_poll.call_count, 3)
+
+    def test_busy_targets(self):
+        running = Job.objects.create(
+            name="test_progress",
+            targets="disk:sda pool:2",
+            status="running",
+            pid=os.getpid(),
+        )
+        job = self.submit("test_progress", targets=["pool:3", "disk:sda"])
+        run_job.call_local(job.id)
+        job.refresh_from_db()
+        self.assertEqual(job.status, "queued")
+        self.mock_enqueue_job.assert_called_once_with(job.id, delay=30)
+        # Jobs left running by a prior consumer process no longer hold targets.
+        Job.objects.filter(id=running.id).update(pid=os.getpid() + 1)
+        run_job.call_local(job.id)
+        job.refresh_from_db()
+        running.refresh_from_db()
+        self.assertEqual(job.status, "finished")
+        self.assertEqual(running.status, "failed")
+
+    def test_cancel(self):
+        job = self.submit("test_progress")
+        job.tid = "d8e5a9b2"
+        job.save()
+        self.assertEqual(cancel_job(job), "cancelled")
+        self.mock_revoke_by_id.assert_called_once_with("d8e5a9b2")
+        run_job.call_local(job.id)
+        job.refresh_from_db()
+        self.assertEqual(job.status, "cancelled")
+        with self.assertRaises(Exception):
+            cancel_job(job)
+        # Running jobs: their command is terminated.
+        job = self.submit("test_cancel")
+        run_job.call_local(job.id)
+        job.refresh_from_db()
+        self.assertEqual(job.status, "cancelled")
+        self.assertIsNotNone(job.end_time)
+
+    def test_api(self):
+        finished = self.submit("test_progress")
+        run_job.call_local(finished.id)
+        queued = self.submit("test_progress")
+        response = self.client.get(self.BASE_URL)
+        self.assertEqual(response.status_code, status.HTTP_200_OK, msg=response.data)
+        self.assertEqual(response.data["count"], 2)
+        response = self.client.get(self.BASE_URL, {"active": "yes"})
+        self.assertEqual(
+            [j["id"] for j in response.data["results"]], [queued.id], msg=response.data
+        )
+        self.assertTrue(response.data["results"][0]["active"])
+        response = self.client.get("{}/{}".format(self.BASE_URL, finished.id))
+        self.assertEqual(response.status_code, status.HTTP_200_OK, msg=response.data)
+        self.assertEqual(response.data["status"], "finished")
+        # Cancel.
+        response = self.client.post("{}/{}/cancel".format(self.BASE_URL, queued.id))
+        self.assertEqual(response.status_code, status.HTTP_200_OK, msg=response.data)
+        self.assertEqual(response.data["status"], "cancelled")
+        response = self.client.post("{}/{}/cancel".format(self.BASE_URL, finished.id))
+        self.assertEqual(
+            response.status_code, status.HTTP_400_BAD_REQUEST, msg=response.data
+        )
+        response = self.client.post("{}/{}/pause".format(self.BASE_URL, queued.id))
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_500_INTERNAL_SERVER_ERROR,
+            msg=response.data,
+        )
+        response = self.client.get("{}/99999".format(self.BASE_URL))
+        self.assertEqual(
+            response.status_code, status.HTTP_404_NOT_FOUND, msg=response.data
+        )
+
+    def test_self_test_remaining(self):
+        with patch("system.smart.capabilities") as mock_capabilities:
+            mock_capabilities.return_value = {
+                "Self-test execution status": [
+                    "249",
+                    "Self-test routine in progress...\n90% of test remaining.",
+                ]
+            }
+            self.assertEqual(self_test_remaining("ata-disk"), 90)
+            mock_capabilities.return_value = {
+                "Self-test execution status": [
+                    "0",
+                    "The previous self-test routine completed\nwithout error.",
+                ]
+            }
+            self.assertIsNone(self_test_remaining("ata-disk"))
+            mock_capabilities.return_value = {}
+            self.assertIsNone(self_test_remaining("nvme-disk"))
@@ -14,6 +14,7 @@ General Public License for more details.
 You should have received a copy of the GNU General Public License
 along with this program. If not, see <https://www.gnu.org/licenses/>.
 """
+
 from django.conf import settings
 from rest_framework import status
 from unittest.mock import patch
@@ -136,6 +137,23 @@ class PoolTests(APITestMixin):
         response = self.client.get("{}/{}".format(self.BASE_URL, pId))
         self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND, msg=response)
 
+    def test_get_sort_by_usage(self):
+        usage = {
+            "475bbc39-01c8-4cdd-bb22-de07b40f7e13": 200,
+            "347d4cd6-e9c5-47ce-84be-ec972bb1c338": 100,
+        }
+        self.mock_pool_usage.side_effect = lambda mnt_pt, fsid: usage[fsid]
+        response = self.client.get(self.BASE_URL, {"sortby": "usage"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK, msg=response.data)
+        self.assertEqual(
+            [p["name"] for p in response.data["results"]], ["existing-pool", "ROOT"]
+        )
+        response = self.client.get(self.BASE_URL, {"sortby": "usage", "reverse": "yes"})
+        self.assertEqual(
+            [p["name"] for p in response.data["results"]], ["ROOT", "existing-pool"]
+        )
+        self.mock_pool_usage.side_effect = None
+
     def test_invalid_post_requests_name_clash(self):
         """
         invalid pool api operations
@@ -751,11 +769,7 @@ class PoolTests(APITestMixin):
         pId = temp_pool.id
 
         # remove 1 of 1 disks from single pool - reducing below minimum dev count of 1
-        data = {
-            "disks": (
-                "{}".format(virtio_2_id),
-            )
-        }
+        data = {"disks": ("{}".format(virtio_2_id),)}
         response3 = self.client.put(
             "{}/{}/remove".format(self.BASE_URL, pId), data=data
         )
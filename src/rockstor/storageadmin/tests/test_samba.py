@@ -14,15 +14,18 @@ General Public License for more details.
 You should have received a copy of the GNU General Public License
 along with this program. If not, see <https://www.gnu.org/licenses/>.
 """
+import os
+import tempfile
 from unittest import mock
 from unittest.mock import patch
 
 from rest_framework import status
 
 from storageadmin.exceptions import RockStorAPIException
-from storageadmin.models import Pool, Share, SambaShare, User
+from storageadmin.models import Pool, Share, SambaShare, User, SambaCustomConfig
 from storageadmin.tests.test_api import APITestMixin
 from storageadmin.views.samba import SambaListView
+from system import samba
 
 """
 fixture with:
@@ -85,8 +88,8 @@ class SambaTests(APITestMixin, SambaListView):
         cls.mock_status = cls.patch_status.start()
         cls.mock_status.return_value = "out", "err", 0
 
-        cls.patch_restart_samba = patch("storageadmin.views.samba.restart_samba")
-        cls.mock_status = cls.patch_restart_samba.start()
+        cls.patch_reload_samba = patch("storageadmin.views.samba.reload_samba")
+        cls.mock_reload_samba = cls.patch_reload_samba.start()
 
         cls.patch_refresh_smb_config = patch(
             "storageadmin.views.samba.refresh_smb_config"
@@ -610,3 +613,40 @@ class SambaTests(APITestMixin, SambaListView):
         smb_id = 1
         response = self.client.delete("{}/{}".format(self.BASE_URL, smb_id))
         self.assertEqual(response.status_code, status.HTTP_200_OK, msg=response.data)
+
+    def test_refresh_smb_config(self):
+        """
+        Rockstor section rendered with a constant number of queries, and
+        smb.conf only re-written when changed.
+        """
+        smbo = SambaShare.objects.get(id=1)
+        User.objects.get(id=1).smb_shares.add(smbo)
+        SambaCustomConfig.objects.create(
+            smb_share=smbo, custom_config="hide dot files = no"
+        )
+        fh, smb_config = tempfile.mkstemp()
+        with os.fdopen(fh, "w") as sfo:
+            sfo.write("[global]\n    log level = 3\n\n")
+        self.addCleanup(os.remove, smb_config)
+        with patch("system.samba.SMB_CONFIG", smb_config), patch(
+            "system.samba.test_parm"
+        ) as mock_test_parm:
+            # SambaShares, then share, admin users and custom config for all.
+            with self.assertNumQueries(4):
+                self.assertTrue(
+                    samba.refresh_smb_config(list(SambaShare.objects.all()))
+                )
+            mock_test_parm.assert_called_once()
+            with open(smb_config) as sfo:
+                config = sfo.read()
+            self.assertTrue(config.startswith("[global]\n    log level = 3\n\n"))
+            self.assertIn("[share-smb]\n", config)
+            self.assertIn("    comment = Samba-Export\n", config)
+            self.assertIn("    path = /mnt2/share-smb\n", config)
+            self.assertIn("    admin users = admin \n", config)
+            self.assertIn("    hide dot files = no\n", config)
+            self.assertTrue(config.endswith("{}\n".format(samba.RS_SHARES_FOOTER)))
+            # Unchanged
+            mock_test_parm.reset_mock()
+            self.assertFalse(samba.refresh_smb_config(list(SambaShare.objects.all())))
+            mock_test_parm.assert_not_called()
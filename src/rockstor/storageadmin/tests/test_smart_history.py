@@ -0,0 +1,162 @@
+"""
+Copyright (joint work) 2024 The Rockstor Project <https://rockstor.com>
+
+Rockstor is free software; you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published
+by the Free Software Foundation; either version 2 of the License,
+or (at your option) any later version.
+
+Rockstor is distributed in the hope that it will be useful, but
+WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program. If not, see <https://www.gnu.org/licenses/>.
+"""
+
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch
+
+from django.test import TestCase, override_settings
+from huey import MemoryHuey
+
+from storageadmin.models import Disk, SMARTAttribute, SMARTHistory, SMARTInfo
+from storageadmin.views.smart_history_helpers import (
+    collect_smart_history,
+    history_samples,
+    pack_deltas,
+    record_history,
+    rollup_smart_history,
+    trend_alerts,
+    TREND_ALERTS_KEY,
+    unpack_deltas,
+)
+from system.smart import SMARTData
+
+DAY = 86400
+NOW = 1700000000
+
+
+@override_settings(
+    SMART_HISTORY={
+        "workers": 2,
+        "retention": 730,
+        "info_retention": 30,
+        "trend_days": 14,
+        "trend_factor": 2,
+    }
+)
+class SMARTHistoryTests(TestCase):
+    """
+    The tests in this suite can be run via the following command:
+    cd /opt/rockstor/src/rockstor
+    export DJANGO_SETTINGS_MODULE=settings
+    poetry run django-admin test -p test_smart_history.py -v 2
+    """
+
+    def setUp(self):
+        self.disk = Disk.objects.create(
+            name="ata-disk1", parted=False, smart_available=True, smart_enabled=True
+        )
+        self.huey = MemoryHuey()
+        patch("storageadmin.views.smart_history_helpers.HUEY", self.huey).start()
+
+    def tearDown(self):
+        patch.stopall()
+
+    def test_pack_deltas(self):
+        deltas = [(3600, 0), (3601, -1), (7200, 300), (0, -(2**40))]
+        data = pack_deltas(deltas)
+        self.assertEqual(unpack_deltas(data), deltas)
+        # Typical hourly samples of an unchanged value: 3 bytes each.
+        self.assertEqual(len(pack_deltas([(3600, 0)] * 24)), 72)
+
+    def test_record_history(self):
+        for hour in range(3):
+            record_history(
+                self.disk,
+                NOW + hour * 3600,
+                [
+                    (5, "Reallocated_Sector_Ct", str(hour)),
+                    (194, "Temp", "36 (Min/Max)"),
+                ],
+            )
+        h = SMARTHistory.objects.get(disk=self.disk, aid=5)
+        self.assertEqual(h.count, 3)
+        self.assertEqual(
+            history_samples(h), [(NOW, 0), (NOW + 3600, 1), (NOW + 7200, 2)]
+        )
+        # Backfilled (e.g. rolled up) samples merge in order; repeats ignored.
+        record_history(self.disk, NOW - 3600, [(5, "Reallocated_Sector_Ct", "0")])
+        record_history(self.disk, NOW + 3600, [(5, "Reallocated_Sector_Ct", "9")])
+        h.refresh_from_db()
+        self.assertEqual(h.count, 4)
+        self.assertEqual(history_samples(h)[:2], [(NOW - 3600, 0), (NOW, 0)])
+        self.assertEqual((h.last_ts, h.last_raw), (NOW + 7200, 2))
+        temp = SMARTHistory.objects.get(disk=self.disk, aid=194)
+        self.assertEqual(temp.last_raw, 36)
+
+    def record_days(self, disk, aid, values):
+        for day, value in enumerate(values):
+            ts = NOW - (len(values) - 1 - day) * DAY
+            record_history(disk, ts, [(aid, "attr{}".format(aid), str(value))])
+
+    def test_trend_alerts(self):
+        steady = Disk.objects.create(name="ata-disk2", parted=False)
+        # Pending sectors: flat for a week, then climbing fast.
+        self.record_days(self.disk, 197, [1] * 8 + [2, 4, 8, 16, 32, 64, 128])
+        # Steady linear growth, and an untracked attribute: no alerts.
+        self.record_days(steady, 5, range(0, 30, 2))
+        self.record_days(self.disk, 9, [0, 100, 1000, 100000])
+        alerts = trend_alerts(NOW)
+        self.assertEqual(len(alerts), 1)
+        self.assertEqual(alerts[0]["disk"], "ata-disk1")
+        self.assertEqual(alerts[0]["aid"], 197)
+        self.assertEqual(alerts[0]["raw"], 128)
+        self.assertGreater(alerts[0]["recent"], 2 * alerts[0]["previous"])
+
+    def test_collect_smart_history(self):
+        standby = Disk.objects.create(
+            name="ata-disk2", parted=False, smart_available=True, smart_enabled=True
+        )
+        data = SMARTData(
+            [],
+            {"Reallocated_Sector_Ct": [5, "Reallocated_Sector_Ct"] + [""] * 7 + ["8"]},
+            {},
+            {},
+            [],
+            {},
+            [],
+        )
+
+        def all_info(name, options, standby):
+            self.assertTrue(standby)
+            return None if name == "ata-disk2" else data
+
+        with patch(
+            "storageadmin.views.smart_history_helpers.all_info", side_effect=all_info
+        ):
+            collect_smart_history.call_local()
+        h = SMARTHistory.objects.get(disk=self.disk, aid=5)
+        self.assertEqual(h.last_raw, 8)
+        self.assertFalse(SMARTHistory.objects.filter(disk=standby).exists())
+        self.assertEqual(self.huey.get(TREND_ALERTS_KEY, peek=True), [])
+
+    def test_rollup_smart_history(self):
+        now = datetime.now(timezone.utc)
+        for age in (60, 45, 40):
+            si = SMARTInfo.objects.create(disk=self.disk)
+            SMARTInfo.objects.filter(id=si.id).update(toc=now - timedelta(days=age))
+            SMARTAttribute.objects.create(
+                info=si, aid=5, name="Reallocated_Sector_Ct", raw_value=str(age)
+            )
+        # History past our retention: trimmed.
+        old = int((now - timedelta(days=800)).timestamp())
+        record_history(self.disk, old, [(5, "Reallocated_Sector_Ct", "100")])
+        rollup_smart_history.call_local()
+        # The latest tree of a disk is kept, however old.
+        self.assertEqual(SMARTInfo.objects.count(), 1)
+        h = SMARTHistory.objects.get(disk=self.disk, aid=5)
+        self.assertEqual([s[1] for s in history_samples(h)], [60, 45])
+        self.assertEqual(h.count, 2)
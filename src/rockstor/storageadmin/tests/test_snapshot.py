@@ -18,6 +18,7 @@ along with this program. If not, see <https://www.gnu.org/licenses/>.
 from rest_framework import status
 from unittest.mock import patch
 
+from storageadmin.models import Share, Snapshot
 from storageadmin.tests.test_api import APITestMixin
 
 """
@@ -107,6 +108,49 @@ class SnapshotTests(APITestMixin):
         response = self.client.get("/api/snapshots")
         self.assertEqual(response.status_code, status.HTTP_200_OK, msg=response.data)
 
+    def test_get_sorted(self):
+        """
+        Sorted (db order_by), keyset paginated, and field selected snapshots.
+        """
+        share = Share.objects.get(name="share1")
+        for i, size in enumerate([30, 10, 50, 20, 40]):
+            Snapshot.objects.create(
+                share=share,
+                name="s{}".format(i),
+                qgroup="0/{}".format(300 + i),
+                size=size,
+            )
+        url = "{}/{}/snapshots".format(self.BASE_URL, share.id)
+        response = self.client.get(url, {"sortby": "size", "reverse": "yes"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK, msg=response.data)
+        sizes = [s["size"] for s in response.data["results"]]
+        self.assertEqual(sizes, sorted(sizes, reverse=True))
+        # Keyset pages, following the next links.
+        names = []
+        params = {"sortby": "name", "cursor": "", "page_size": 2, "fields": "name"}
+        response = self.client.get(url, params)
+        while True:
+            self.assertEqual(
+                response.status_code, status.HTTP_200_OK, msg=response.data
+            )
+            self.assertLessEqual(len(response.data["results"]), 2)
+            names.extend(s["name"] for s in response.data["results"])
+            if response.data["next"] is None:
+                break
+            response = self.client.get(response.data["next"])
+        self.assertEqual(
+            names,
+            sorted(Snapshot.objects.filter(share=share).values_list("name", flat=True)),
+        )
+        self.assertEqual(list(response.data["results"][0]), ["name"])
+        # Unsupported sort column.
+        response = self.client.get(url, {"sortby": "real_name"})
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_500_INTERNAL_SERVER_ERROR,
+            msg=response.data,
+        )
+
     def test_post_requests_1(self):
         """
         invalid snapshot post operation via invalid share name
@@ -16,11 +16,17 @@ along with this program. If not, see <http://www.gnu.org/licenses/>.
 """
 
 from django.urls import re_path
-from storageadmin.views import DiskListView, DiskDetailView, DiskSMARTDetailView
+from storageadmin.views import (
+    DiskListView,
+    DiskDetailView,
+    DiskSMARTDetailView,
+    DiskSMARTRefreshView,
+)
 
 disk_regex = "[A-Za-z0-9]+[A-Za-z0-9:_-]*"
 
 urlpatterns = [
+    re_path(r"^smart/refresh$", DiskSMARTRefreshView.as_view()),
     re_path(r"^smart/(?P<command>.+)/(?P<did>\d+)$", DiskSMARTDetailView.as_view()),
     re_path(r"^(?P<command>scan)$", DiskListView.as_view()),
     re_path(r"^(?P<did>\d+)$", DiskDetailView.as_view()),
@@ -22,6 +22,7 @@ from storageadmin.views.share import ShareListView, ShareDetailView, PoolShareLi
 from storageadmin.views.disk import DiskMixin, DiskListView, DiskDetailView  # noqa F401
 from storageadmin.views.pool import PoolListView, PoolDetailView, get_usage_bound  # noqa F401
 from storageadmin.views.command import CommandView  # noqa F401
+from storageadmin.views.batch import BatchView  # noqa F401
 from storageadmin.views.appliances import ApplianceListView, ApplianceDetailView  # noqa F401
 from storageadmin.views.login import LoginView  # noqa F401
 from storageadmin.views.user import UserListView, UserDetailView  # noqa F401
@@ -46,6 +47,7 @@ from storageadmin.views.sftp import SFTPListView, SFTPDetailView  # noqa F401
 from storageadmin.views.oauth_app import OauthAppView  # noqa F401
 from storageadmin.views.group import GroupListView, GroupDetailView  # noqa F401
 from storageadmin.views.pool_balance import PoolBalanceView  # noqa F401
+from storageadmin.views.job import JobListView, JobDetailView  # noqa F401
 from storageadmin.views.tls_certificate import TLSCertificateView  # noqa F401
 from storageadmin.views.rockon import RockOnView  # noqa F401
 from storageadmin.views.rockon_id import RockOnIdView  # noqa F401
@@ -57,7 +59,10 @@ from storageadmin.views.rockon_environment import RockOnEnvironmentView  # noqa
 from storageadmin.views.rockon_device import RockOnDeviceView  # noqa F401
 from storageadmin.views.rockon_labels import RockOnLabelView  # noqa F401
 from storageadmin.views.rockon_networks import RockOnNetworkView  # noqa F401
-from storageadmin.views.disk_smart import DiskSMARTDetailView  # noqa F401
+from storageadmin.views.disk_smart import (  # noqa F401
+    DiskSMARTDetailView,
+    DiskSMARTRefreshView,
+)
 from storageadmin.views.config_backup import (
     ConfigBackupListView,
     ConfigBackupDetailView,  # noqa F401
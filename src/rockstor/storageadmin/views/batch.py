@@ -0,0 +1,121 @@
+"""
+Copyright (joint work) 2024 The Rockstor Project <https://rockstor.com>
+
+Rockstor is free software; you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published
+by the Free Software Foundation; either version 2 of the License,
+or (at your option) any later version.
+
+Rockstor is distributed in the hope that it will be useful, but
+WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program. If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import io
+import json
+
+from django.core.handlers.wsgi import WSGIRequest
+from django.urls import resolve, Resolver404
+from rest_framework.authentication import BasicAuthentication, SessionAuthentication
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from rest_framework_custom.oauth_wrapper import RockstorOAuth2Authentication
+from storageadmin.auth import DigestAuthentication
+from storageadmin.util import handle_exception
+from system.cache import invalidate_all
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def sub_request(request, method, url, data=None) -> WSGIRequest:
+    """
+    :param request: our authenticated (rest framework) batch request.
+    :return: request for api url (e.g. "disks/scan") by method, with data as
+    its json body, pre-authenticated as the user of request.
+    """
+    path, _, query = url.partition("?")
+    body = b"" if data is None else json.dumps(data).encode("utf-8")
+    environ = request._request.META.copy()
+    environ.update(
+        {
+            "REQUEST_METHOD": method.upper(),
+            "SCRIPT_NAME": "",
+            "PATH_INFO": "/api/{}".format(path),
+            "QUERY_STRING": query,
+            "CONTENT_TYPE": "application/json",
+            "CONTENT_LENGTH": str(len(body)),
+            "wsgi.input": io.BytesIO(body),
+        }
+    )
+    sub = WSGIRequest(environ)
+    if hasattr(request._request, "session"):
+        sub.session = request._request.session
+    # Rest framework's forced authentication: as already authenticated.
+    sub._force_auth_user = request.user
+    sub._force_auth_token = request.auth
+    return sub
+
+
+class BatchView(APIView):
+    """
+    Several api calls in one round trip: run in the given order, each as if
+    requested on its own. POST {"calls": [{"url": "disks/scan", "method":
+    "post", "data": {...}}, ...]} returns [{"url": url, "status": status,
+    "data": data}, ...]. A failing call does not stop those that follow.
+    """
+
+    authentication_classes = (
+        DigestAuthentication,
+        SessionAuthentication,
+        BasicAuthentication,
+        RockstorOAuth2Authentication,
+    )
+    permission_classes = (IsAuthenticated,)
+
+    def post(self, request):
+        calls = request.data.get("calls", None)
+        if not isinstance(calls, list):
+            e_msg = "Expected a list of calls, got ({}).".format(calls)
+            handle_exception(Exception(e_msg), request)
+        results = []
+        for call in calls:
+            results.append(self._run(request, call))
+        return Response(results)
+
+    @staticmethod
+    def _run(request, call) -> dict:
+        url = call.get("url", "")
+        result = {"url": url}
+        try:
+            if url.partition("?")[0] == "batch":
+                raise Exception("Nested batch calls are not supported.")
+            sub = sub_request(request, call.get("method", "get"), url, call.get("data"))
+            try:
+                match = resolve(sub.path_info)
+            except Resolver404:
+                result.update(status=404, data={"detail": "Not found."})
+                return result
+            # Each call reads system state afresh: see SystemCacheMiddleware.
+            invalidate_all()
+            response = match.func(sub, *match.args, **match.kwargs)
+            if hasattr(response, "render"):
+                response.render()
+            result["status"] = response.status_code
+            result["data"] = None
+            if response.content:
+                try:
+                    result["data"] = json.loads(response.content)
+                except ValueError:
+                    result["data"] = response.content.decode("utf-8", "replace")
+        except Exception as e:
+            logger.exception(e)
+            result.update(status=500, data={"detail": e.__str__()})
+        return result
@@ -23,7 +23,7 @@ from rest_framework.permissions import IsAuthenticated
 from storageadmin.views import DiskMixin
 from system.osi import uptime, kernel_info, get_device_mapper_map
 from fs.btrfs import mount_share, mount_root, get_dev_pool_info, get_pool_raid_levels, mount_snap, \
-    get_pool_raid_profile
+    get_pool_raid_profile, pool_qgroup_usage, pool_snaps_info
 from system.ssh import sftp_mount_map, sftp_mount
 from system.osi import (
     system_shutdown,
@@ -54,10 +54,15 @@ from system.pkg_mgmt import (
     auto_update_status,
 )
 from storageadmin.views.nfs_exports import NFSExportMixin
+from system.task_graph import TaskGraph
+from huey.contrib.djhuey import HUEY
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Huey storage key of our last bootstrap's per stage timings.
+BOOTSTRAP_TIMINGS_KEY = "bootstrap-timings"
+
 
 class CommandView(DiskMixin, NFSExportMixin, APIView):
     authentication_classes = (
@@ -76,162 +81,245 @@ class CommandView(DiskMixin, NFSExportMixin, APIView):
         # Get temp_names (kernel names) to btrfs pool info for attached devs.
         dev_pool_info = get_dev_pool_info()
         for p in Pool.objects.all():
-            # If our pool has no disks, detached included, then delete it.
-            # We leave pools with all detached members in place intentionally.
-            if p.disk_set.count() == 0:
-                p.delete()
-                continue
-            # Log if no attached members are found, ie all devs are detached.
-            if p.disk_set.attached().count() == 0:
-                logger.error(
-                    "Skipping Pool ({}) mount as there "
-                    "are no attached devices. Moving on.".format(p.name)
+            CommandView._refresh_pool(p, mapped_devs, dev_pool_info)
+
+    @staticmethod
+    @transaction.atomic
+    def _refresh_pool(p, mapped_devs, dev_pool_info):
+        # If our pool has no disks, detached included, then delete it.
+        # We leave pools with all detached members in place intentionally.
+        if p.disk_set.count() == 0:
+            p.delete()
+            return
+        # Log if no attached members are found, ie all devs are detached.
+        if p.disk_set.attached().count() == 0:
+            logger.error(
+                "Skipping Pool ({}) mount as there "
+                "are no attached devices. Moving on.".format(p.name)
+            )
+            return
+        # If pool has no missing remove all detached disk pool associations.
+        # Accounts for 'end of run' clean-up in removing a detached disk and for cli
+        # maintenance re pool returned to no missing dev status. Also re-establishes
+        # pool info as source of truth re missing.
+        if not p.has_missing_dev:
+            for disk in p.disk_set.filter(name__startswith="detached-"):
+                logger.info(
+                    "Removing detached disk from Pool {}: no missing "
+                    "devices found.".format(p.name)
                 )
-                continue
-            # If pool has no missing remove all detached disk pool associations.
-            # Accounts for 'end of run' clean-up in removing a detached disk and for cli
-            # maintenance re pool returned to no missing dev status. Also re-establishes
-            # pool info as source of truth re missing.
-            if not p.has_missing_dev:
-                for disk in p.disk_set.filter(name__startswith="detached-"):
-                    logger.info(
-                        "Removing detached disk from Pool {}: no missing "
-                        "devices found.".format(p.name)
-                    )
-                    disk.pool = None
-                    disk.save()
-            try:
-                # Get and save what info we can prior to mount.
-                first_dev = p.disk_set.attached().first()
-                # Use target_name to account for redirect role.
-                if first_dev.target_name == first_dev.temp_name:
-                    logger.error(
-                        "Skipping pool ({}) mount as attached disk "
-                        "({}) has no by-id name (no serial # ?)".format(
-                            p.name, first_dev.target_name
-                        )
-                    )
-                    continue
-                if first_dev.temp_name in mapped_devs:
-                    dev_tmp_name = "/dev/mapper/{}".format(
-                        mapped_devs[first_dev.temp_name]
-                    )
-                else:
-                    dev_tmp_name = "/dev/{}".format(first_dev.temp_name)
-                # For now we call get_dev_pool_info() once for each pool.
-                pool_info = dev_pool_info[dev_tmp_name]
-                p.name = pool_info.label
-                p.uuid = pool_info.uuid
-                p.save()
-                mount_root(p)
-                pool_raid_info = get_pool_raid_levels(p.mnt_pt)
-                p.raid = get_pool_raid_profile(pool_raid_info)
-                p.size = p.usage_bound()
-                # Consider using mount_status() parse to update root pool db on
-                # active (fstab initiated) compression setting.
-                p.save()
-            except Exception as e:
+                disk.pool = None
+                disk.save()
+        try:
+            # Get and save what info we can prior to mount.
+            first_dev = p.disk_set.attached().first()
+            # Use target_name to account for redirect role.
+            if first_dev.target_name == first_dev.temp_name:
                 logger.error(
-                    "Exception while refreshing state for "
-                    "Pool({}). Moving on: {}".format(p.name, e.__str__())
+                    "Skipping pool ({}) mount as attached disk "
+                    "({}) has no by-id name (no serial # ?)".format(
+                        p.name, first_dev.target_name
+                    )
                 )
-                logger.exception(e)
-
-    @transaction.atomic
-    def post(self, request, command, rtcepoch=None):
-        if command == "bootstrap":
-            self._update_disk_state()
-            self._refresh_pool_state()
+                return
+            if first_dev.temp_name in mapped_devs:
+                dev_tmp_name = "/dev/mapper/{}".format(mapped_devs[first_dev.temp_name])
+            else:
+                dev_tmp_name = "/dev/{}".format(first_dev.temp_name)
+            # For now we call get_dev_pool_info() once for each pool.
+            pool_info = dev_pool_info[dev_tmp_name]
+            p.name = pool_info.label
+            p.uuid = pool_info.uuid
+            p.save()
+            mount_root(p)
+            pool_raid_info = get_pool_raid_levels(p.mnt_pt)
+            p.raid = get_pool_raid_profile(pool_raid_info)
+            p.size = p.usage_bound()
+            # Consider using mount_status() parse to update root pool db on
+            # active (fstab initiated) compression setting.
+            p.save()
+        except Exception as e:
+            logger.error(
+                "Exception while refreshing state for "
+                "Pool({}). Moving on: {}".format(p.name, e.__str__())
+            )
+            logger.exception(e)
+
+    def _bootstrap(self, request) -> dict:
+        """
+        Bring up pools, shares, snapshots and their exports, as a TaskGraph
+        of BOOTSTRAP["workers"] threads: pools in parallel, and once a pool
+        is mounted its shares in parallel. NFS and SFTP exports follow all
+        share mounts, ahead of the far longer snapshot import and mounts.
+        :return: per stage timings, as also kept for bootstrap-timings.
+        """
+        self._update_disk_state()
+        graph = TaskGraph(settings.BOOTSTRAP["workers"])
+        try:
+            mapped_devs = get_device_mapper_map()
+            dev_pool_info = get_dev_pool_info()
+            for p in Pool.objects.all():
+                pool_task = graph.add(
+                    "pools", self._refresh_pool, p, mapped_devs, dev_pool_info
+                )
+                graph.add(
+                    "shares",
+                    self._bootstrap_shares,
+                    graph,
+                    p,
+                    request,
+                    after=(pool_task,),
+                )
+            # All shares mounted, with their db counterparts updated.
+            graph.join()
+            sftp_task = graph.add("sftp", self._bootstrap_sftp)
+            graph.add("nfs", self._bootstrap_nfs, request)
+            sftp_shares = set(SFTP.objects.values_list("share_id", flat=True))
             for p in Pool.objects.all():
-                if p.disk_set.attached().count() == 0:
+                if p.disk_set.attached().count() == 0 or not p.is_mounted:
                     continue
-                if not p.is_mounted:
-                    # Prior _refresh_pool_state() should have ensure a mount.
-                    logger.error(
-                        "Skipping import/update of prior known "
-                        "shares for pool ({}) as it is not mounted. "
-                        "(see previous errors)"
-                        ".".format(p.name)
+                index_task = graph.add(
+                    "snapshot-index", self._pool_snaps_index, p, priority=1
+                )
+                for share in Share.objects.filter(pool=p):
+                    import_task = graph.add(
+                        "snapshots",
+                        self._bootstrap_snapshots,
+                        share,
+                        index_task,
+                        after=(index_task,),
+                        priority=1,
                     )
-                    continue
-                # Import / update db shares counterpart for managed pool.
-                import_shares(p, request)
-
-            for share in Share.objects.all():
-                if share.pool.disk_set.attached().count() == 0:
-                    continue
-                if not share.pool.is_mounted:
-                    logger.error(
-                        "Skipping mount of share ({}) as pool () is "
-                        "not mounted (see previous errors)"
-                        ".".format(share.name, share.pool.name)
+                    graph.add(
+                        "snapshot-mounts",
+                        self._mount_snaps,
+                        share,
+                        after=(import_task,),
+                        priority=2,
                     )
-                    continue
-                try:
-                    if not share.is_mounted:
-                        # System mounted shares i.e. home will already be mounted.
-                        mnt_pt = "{}{}".format(settings.MNT_PT, share.name)
-                        mount_share(share, mnt_pt)
-                except Exception as e:
-                    e_msg = (
-                        "Exception while mounting a share ({}) during "
-                        "bootstrap: ({})."
-                    ).format(share.name, e.__str__())
-                    logger.error(e_msg)
-                    logger.exception(e)
+                    if share.id in sftp_shares:
+                        graph.add(
+                            "sftp-snapshots",
+                            sftp_snap_toggle,
+                            share,
+                            after=(import_task, sftp_task),
+                            priority=2,
+                        )
+        finally:
+            timings = graph.close()
+        logger.info("Bootstrap stage timings: {}".format(timings))
+        try:
+            HUEY.put(BOOTSTRAP_TIMINGS_KEY, timings)
+        except Exception as e:
+            logger.error("Failed to store bootstrap timings: {}".format(e.__str__()))
+        return timings
 
-                try:
-                    import_snapshots(share)
-                except Exception as e:
-                    e_msg = (
-                        "Exception while importing snapshots of share ({}): ({})."
-                    ).format(share.name, e.__str__())
-                    logger.error(e_msg)
-                    logger.exception(e)
-
-            for snap in Snapshot.objects.all():
-                if snap.uvisible:
-                    try:
-                        mount_snap(snap.share, snap.real_name, snap.qgroup)
-                    except Exception as e:
-                        e_msg = (
-                            "Failed to make the snapshot ({}) visible. "
-                            "Exception: ({})."
-                        ).format(snap.real_name, e.__str__())
-                        logger.error(e_msg)
-
-            mnt_map = sftp_mount_map(settings.SFTP_MNT_ROOT)
-            for sftpo in SFTP.objects.all():
-                # The following may be buggy when used with system mounted (fstab) /home
-                # but we currently don't allow /home to be exported.
-                try:
-                    sftp_mount(
-                        sftpo.share,
-                        settings.MNT_PT,
-                        settings.SFTP_MNT_ROOT,
-                        mnt_map,
-                        sftpo.editable,
-                    )
-                    sftp_snap_toggle(sftpo.share)
-                except Exception as e:
-                    e_msg = (
-                        "Exception while exporting a SFTP share during "
-                        "bootstrap: ({})."
-                    ).format(e.__str__())
-                    logger.error(e_msg)
+    @staticmethod
+    def _bootstrap_shares(graph, p, request):
+        """Import the shares of a mounted pool, then mount each in parallel."""
+        if p.disk_set.attached().count() == 0:
+            return
+        if not p.is_mounted:
+            # Prior _refresh_pool() should have ensured a mount.
+            logger.error(
+                "Skipping import/update of prior known "
+                "shares for pool ({}) as it is not mounted. "
+                "(see previous errors)"
+                ".".format(p.name)
+            )
+            return
+        # Import / update db shares counterpart for managed pool.
+        import_shares(p, request)
+        for share in Share.objects.filter(pool=p):
+            graph.add("share-mounts", CommandView._mount_share, share)
 
+    @staticmethod
+    def _mount_share(share):
+        try:
+            if not share.is_mounted:
+                # System mounted shares i.e. home will already be mounted.
+                mnt_pt = "{}{}".format(settings.MNT_PT, share.name)
+                mount_share(share, mnt_pt)
+        except Exception as e:
+            e_msg = (
+                "Exception while mounting a share ({}) during bootstrap: ({})."
+            ).format(share.name, e.__str__())
+            logger.error(e_msg)
+            logger.exception(e)
+
+    def _bootstrap_nfs(self, request):
+        try:
+            adv_entries = [a.export_str for a in AdvancedNFSExport.objects.all()]
+            exports_d = self.create_adv_nfs_export_input(adv_entries, request)
+            exports = self.create_nfs_export_input(NFSExport.objects.all())
+            exports.update(exports_d)
+            self.refresh_wrapper(exports, request, logger)
+        except Exception as e:
+            e_msg = ("Exception while bootstrapping NFS: ({}).").format(e.__str__())
+            logger.error(e_msg)
+
+    @staticmethod
+    def _bootstrap_sftp():
+        mnt_map = sftp_mount_map(settings.SFTP_MNT_ROOT)
+        for sftpo in SFTP.objects.all():
+            # The following may be buggy when used with system mounted (fstab) /home
+            # but we currently don't allow /home to be exported.
             try:
-                adv_entries = [a.export_str for a in AdvancedNFSExport.objects.all()]
-                exports_d = self.create_adv_nfs_export_input(adv_entries, request)
-                exports = self.create_nfs_export_input(NFSExport.objects.all())
-                exports.update(exports_d)
-                self.refresh_wrapper(exports, request, logger)
+                sftp_mount(
+                    sftpo.share,
+                    settings.MNT_PT,
+                    settings.SFTP_MNT_ROOT,
+                    mnt_map,
+                    sftpo.editable,
+                )
             except Exception as e:
-                e_msg = ("Exception while bootstrapping NFS: ({}).").format(e.__str__())
+                e_msg = (
+                    "Exception while exporting a SFTP share during bootstrap: ({})."
+                ).format(e.__str__())
                 logger.error(e_msg)
 
-            logger.debug("Bootstrap operations completed")
-            return Response()
+    @staticmethod
+    def _pool_snaps_index(p) -> tuple:
+        """
+        :return: pool wide qgroup usage and snapshots, shared by all shares
+        of the pool.
+        """
+        return pool_qgroup_usage(p), pool_snaps_info(p.mnt_pt)
+
+    @staticmethod
+    def _bootstrap_snapshots(share, index_task):
+        try:
+            usage_map, snaps_index = index_task.result()
+            import_snapshots(share, usage_map, snaps_index)
+        except Exception as e:
+            e_msg = ("Exception while importing snapshots of share ({}): ({}).").format(
+                share.name, e.__str__()
+            )
+            logger.error(e_msg)
+            logger.exception(e)
+
+    @staticmethod
+    def _mount_snaps(share):
+        for snap in Snapshot.objects.filter(share=share, uvisible=True):
+            try:
+                mount_snap(snap.share, snap.real_name, snap.qgroup)
+            except Exception as e:
+                e_msg = (
+                    "Failed to make the snapshot ({}) visible. Exception: ({})."
+                ).format(snap.real_name, e.__str__())
+                logger.error(e_msg)
+
+    def post(self, request, command, rtcepoch=None):
+        if command == "bootstrap":
+            # Not atomic: our bootstrap tasks each commit on their own thread's
+            # db connection, and must see the disk state committed before them.
+            return Response(self._bootstrap(request))
+        return self._command(request, command, rtcepoch)
+
+    @transaction.atomic
+    def _command(self, request, command, rtcepoch=None):
+        if command == "bootstrap-timings":
+            return Response(HUEY.get(BOOTSTRAP_TIMINGS_KEY, peek=True))
 
         if command == "utcnow":
             return Response(datetime.utcnow().replace(tzinfo=timezone.utc))
@@ -393,6 +481,13 @@ class CommandView(DiskMixin, NFSExportMixin, APIView):
             return Response()
 
         if command == "refresh-snapshot-state":
+            usage_maps = {}
+            snaps_indexes = {}
             for share in Share.objects.all():
-                import_snapshots(share)
+                if share.pool.id not in usage_maps:
+                    usage_maps[share.pool.id] = pool_qgroup_usage(share.pool)
+                    snaps_indexes[share.pool.id] = pool_snaps_info(share.pool.mnt_pt)
+                import_snapshots(
+                    share, usage_maps[share.pool.id], snaps_indexes[share.pool.id]
+                )
             return Response()
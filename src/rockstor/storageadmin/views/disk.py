@@ -18,6 +18,7 @@ import os
 import re
 from rest_framework.response import Response
 from django.db import transaction
+from django.db.models import Q
 from storageadmin.models import Disk, Pool, Share
 from fs.btrfs import (
     enable_quota,
@@ -28,6 +29,8 @@ from fs.btrfs import (
     set_pool_label,
     get_devid_usage,
     get_pool_raid_profile,
+    pool_qgroup_usage,
+    pool_snaps_info,
 )
 from storageadmin.serializers import DiskInfoSerializer
 from storageadmin.util import handle_exception
@@ -57,7 +60,6 @@ from system.osi import (
     systemd_name_escape,
 )
 from system.services import systemctl
-from copy import deepcopy
 import uuid
 import json
 import logging
@@ -90,6 +92,23 @@ SCAN_DISKS_KNOWN_ROLES = [
     "LVM2member",
 ]
 WHOLE_DISK_FORMAT_ROLES = ["LUKS", "bcache", "bcachecdev", "LVM2member"]
+# Disk fields maintained by _update_disk_state(), written back in bulk.
+DISK_SCAN_FIELDS = [
+    "name",
+    "size",
+    "parted",
+    "offline",
+    "model",
+    "transport",
+    "vendor",
+    "btrfs_uuid",
+    "devid",
+    "allocated",
+    "role",
+    "pool",
+    "smart_available",
+    "smart_enabled",
+]
 
 
 class DiskMixin(object):
@@ -97,7 +116,7 @@ class DiskMixin(object):
 
     @staticmethod
     @transaction.atomic
-    def _update_disk_state():
+    def _update_disk_state(devices: list[str] | None = None):
         """
         A DB atomic method to update the database from attached disks / drives.
         Works only on device serial for drive identification.
@@ -109,41 +128,59 @@ class DiskMixin(object):
         marked as offline. All offline drives have their SMART availability and
         activation status removed and all attached drives have their SMART
         availability assessed and activated if available.
+        Incremental mode: when devices (udev event) names are passed only
+        attached drives matching those names (or their partitions), or not yet
+        known as attached, and known attached drives now missing, are updated.
+        :param devices: optional list of changed device names e.g. /dev/sda.
         :return: serialized models of attached and missing disks via serial num
         """
         attached_disks = scan_disks(MIN_DISK_SIZE)
-        all_attached_serials: list[str] = [d.serial for d in attached_disks]
+        all_attached_serials: set[str] = {d.serial for d in attached_disks}
+        db_disks = Disk.objects.select_related("pool")
+        if devices is not None:
+            changed = set(devices)
+            online_serials = set(
+                Disk.objects.filter(offline=False).values_list("serial", flat=True)
+            )
+            attached_disks = [
+                d
+                for d in attached_disks
+                if d.name in changed
+                or not changed.isdisjoint(d.partitions)
+                or d.serial not in online_serials
+            ]
+            db_disks = db_disks.filter(
+                Q(serial__in=[d.serial for d in attached_disks])
+                | (Q(offline=False) & ~Q(serial__in=all_attached_serials))
+            )
         # Acquire a list of uuid's for currently unlocked LUKS containers.
         # Although we could tally these as we go by noting fstype crypt_LUKS
         # and then loop through our DB Disks again updating all matching
         # base device entries, this approach helps to abstract this component
         # and to localise role based DB manipulations to our second loop.
         unlocked_luks_containers_uuids = get_unlocked_luks_containers_uuids()
-        db_serial_numbers_seen = []
         # Acquire a dictionary of crypttab entries, dev uuid as indexed.
         dev_uuids_in_crypttab = get_crypttab_entries()
         # Acquire a dictionary of temp_names (no path) to /dev/disk/by-id names
         byid_name_map = get_byid_name_map()
-        # Make sane our DB entries in view of attached_disks.
+        # Make sane our DB entries in view of attached_disks. All DB reads are
+        # done up-front, and all DB writes in bulk at the end, so a rescan
+        # costs a constant number of queries regardless of drive count.
         # Device serial is only-known external unique entity, scan_disks()
         # retrieves & reports these where possible, but otherwise substitutes a
         # fake-serial-* as a flag for the WebUI to indicate an un-trackable disk.
         # 1) Replace all device names with detached-uuid4: until established otherwise.
         # 2) Mark all offline disks as such via DB flag.
         # 3) Mark all offline disks smart available and enabled flags as False.
-        for db_disk in Disk.objects.all():
-            # Replace all device names with a unique placeholder on each scan.
-            # N.B. do not optimize by re-using uuid index as this could lead
-            # to a non-refreshed WebUi acting upon an entry that is different
-            # from that shown to the user.
-            db_disk.name = "detached-" + str(uuid.uuid4()).replace("-", "")
-            db_disk.save(update_fields=["name"])
+        db_by_serial: dict[str, Disk] = {}
+        delete_ids: list[int] = []
+        for db_disk in db_disks:
             # Delete duplicate or fake by serial DB disk entries.
             # It makes no sense to save DB entries with fake serials between scans
             # as on each scan the serial is re-generated (fake) anyway.
             # Serials beginning with 'fake-serial-' are from scan_disks().
             if (
-                (db_disk.serial in db_serial_numbers_seen)
+                (db_disk.serial in db_by_serial)
                 or (db_disk.serial is None)
                 or (re.match("fake-serial-", db_disk.serial) is not None)
             ):
@@ -151,17 +188,31 @@ class DiskMixin(object):
                     "Deleting duplicate or fake (by serial) disk DB entry. "
                     f"Serial = ({db_disk.serial})."
                 )
-                db_disk.delete()
+                delete_ids.append(db_disk.id)
                 continue
-            db_serial_numbers_seen.append(deepcopy(db_disk.serial))
+            # Replace all device names with a unique placeholder on each scan.
+            # N.B. do not optimize by re-using uuid index as this could lead
+            # to a non-refreshed WebUi acting upon an entry that is different
+            # from that shown to the user.
+            db_disk.name = "detached-" + str(uuid.uuid4()).replace("-", "")
             if db_disk.serial not in all_attached_serials:
                 db_disk.offline = True
                 db_disk.smart_available = db_disk.smart_enabled = False
-            db_disk.save()  # make sure all updates are flushed to DB
+            db_by_serial[db_disk.serial] = db_disk
+        if delete_ids:
+            Disk.objects.filter(id__in=delete_ids).delete()
+        # Flush placeholder names first: attached drives may swap names below,
+        # and Disk.name is unique.
+        Disk.objects.bulk_update(
+            db_by_serial.values(),
+            ["name", "offline", "smart_available", "smart_enabled"],
+        )
         # Our DB now has no device name info: all dev names are detached-uuid4 placeholders.
-        # Iterate over attached drives to update the DB accordingly.
+        # Iterate over attached drives to update our in memory DB entries accordingly.
         # Get temp_name (kernel dev names) to btrfs pool info for all attached.
         dev_pool_info = get_dev_pool_info()
+        pools_by_name = {p.name: p for p in Pool.objects.all()}
+        new_disks: list[Disk] = []
         for attached in attached_disks:
             pool_name = None  # Until we find otherwise.
             non_scan_disks_roles = {}
@@ -171,12 +222,13 @@ class DiskMixin(object):
             # Note path is removed as we store, ideally, byid in DB Disk.name.
             byid_disk_name, is_byid = get_dev_byid_name(attached.name, remove_path=True)
             # Use an existing DB entry if attached serial match exists.
-            if Disk.objects.filter(serial=attached.serial).exists():
-                dob = Disk.objects.get(serial=attached.serial)
+            dob = db_by_serial.get(attached.serial)
+            if dob is not None:
                 dob.name = byid_disk_name
-                dob.save(update_fields=["name"])
             else:
                 dob = Disk(name=byid_disk_name, serial=attached.serial, role=None)
+                db_by_serial[attached.serial] = dob
+                new_disks.append(dob)
             dob.size = attached.size
             dob.parted = attached.parted
             dob.offline = False  # as we are iterating over attached devices
@@ -224,7 +276,6 @@ class DiskMixin(object):
                 dob.devid = pool_info.devid
                 dob.size = pool_info.size
                 dob.allocated = pool_info.allocated
-            dob.save()
 
             # ### BEGINNING OF ROLE FIELD UPDATE ###
             # Update the role field with scan_disks() findings.
@@ -332,19 +383,17 @@ class DiskMixin(object):
                 dob.role = json.dumps(combined_roles)
             else:
                 dob.role = None
-            dob.save(update_fields=["role"])
             # ### END OF ROLE FIELD UPDATE ###
 
             # Does our existing DB know of this disks' established pool association?
-            # Quick 'not None' test first to avoid redundant lengthy DB filter.
-            if pool_name is not None and Pool.objects.filter(name=pool_name).exists():
+            if pool_name is not None and pool_name in pools_by_name:
                 # update the Disk DB object's pool field accordingly.
-                dob.pool = Pool.objects.get(name=pool_name)
+                dob.pool = pools_by_name[pool_name]
                 # this is for backwards compatibility. root pools created
                 # before the pool.role migration need this. It can safely be
                 # removed a few versions after 3.8-11 or when we reset
                 # migrations.
-                if attached.root is True:
+                if attached.root is True and dob.pool.role != "root":
                     dob.pool.role = "root"
                     dob.pool.save()
             else:  # DB Disk not member of Rockstor Managed Pool via get_dev_pool_info()
@@ -352,9 +401,9 @@ class DiskMixin(object):
                 dob.devid = 0
                 dob.allocated = 0
                 dob.pool = None
-            dob.save()
         # Update online DB entries with S.M.A.R.T availability and status.
-        for db_disk in Disk.objects.all():
+        devid_usage_by_pool = {}  # Detached disks' pool devid usage, by pool id.
+        for db_disk in db_by_serial.values():
             if not db_disk.offline:
                 if (re.match("fake-serial-", db_disk.serial) is not None) or (
                     re.match("virtio-|md-|mmc-|dm-name-luks-|bcache|nbd", db_disk.name)
@@ -384,23 +433,37 @@ class DiskMixin(object):
                 # otherwise remove missing / detached fails with:
                 # "no missing devices found to remove".
                 # Suspect this will be fixed in future btrfs variants.
-                if db_disk.pool is not None and db_disk.pool.is_mounted:
-                    mnt_pt = f"{settings.MNT_PT}{db_disk.pool.name}"
-                    devid_usage = get_devid_usage(mnt_pt)
-                    if db_disk.devid in devid_usage:
-                        dev_info = devid_usage[db_disk.devid]
-                        db_disk.size = dev_info.size
-                        db_disk.allocated = dev_info.allocated
-                    else:
-                        # Our device has likely been removed from this pool:
-                        # its devid no longer shows up in its associated pool.
-                        # Reset all btrfs related elements for disk DB object:
-                        db_disk.pool = None
-                        db_disk.btrfs_uuid = None
-                        db_disk.devid = 0  # DB default and int flag for None.
-                        db_disk.allocated = 0  # No devid_usage = no allocation.
-            db_disk.save()
-        ds = DiskInfoSerializer(Disk.objects.all().order_by("name"), many=True)
+                if db_disk.pool is None:
+                    continue
+                if db_disk.pool.id not in devid_usage_by_pool:
+                    devid_usage_by_pool[db_disk.pool.id] = (
+                        get_devid_usage(f"{settings.MNT_PT}{db_disk.pool.name}")
+                        if db_disk.pool.is_mounted
+                        else None
+                    )
+                devid_usage = devid_usage_by_pool[db_disk.pool.id]
+                if devid_usage is None:
+                    continue
+                if db_disk.devid in devid_usage:
+                    dev_info = devid_usage[db_disk.devid]
+                    db_disk.size = dev_info.size
+                    db_disk.allocated = dev_info.allocated
+                else:
+                    # Our device has likely been removed from this pool:
+                    # its devid no longer shows up in its associated pool.
+                    # Reset all btrfs related elements for disk DB object:
+                    db_disk.pool = None
+                    db_disk.btrfs_uuid = None
+                    db_disk.devid = 0  # DB default and int flag for None.
+                    db_disk.allocated = 0  # No devid_usage = no allocation.
+        Disk.objects.bulk_update(
+            [d for d in db_by_serial.values() if d.pk is not None],
+            DISK_SCAN_FIELDS,
+        )
+        Disk.objects.bulk_create(new_disks)
+        ds = DiskInfoSerializer(
+            Disk.objects.select_related("pool").order_by("name"), many=True
+        )
         return Response(ds.data)
 
 
@@ -414,7 +477,7 @@ class DiskListView(DiskMixin, rfc.GenericView):
     def post(self, request, command, did=None):
         with self._handle_exception(request):
             if command == "scan":
-                return self._update_disk_state()
+                return self._update_disk_state(devices=request.data.get("devices"))
 
         e_msg = "Unsupported command ({}).".format(command)
         handle_exception(Exception(e_msg), request)
@@ -797,8 +860,10 @@ class DiskDetailView(rfc.GenericView):
             po.save()
             enable_quota(po)
             import_shares(po, request)
+            usage_map = pool_qgroup_usage(po)
+            snaps_index = pool_snaps_info(po.mnt_pt)
             for share in Share.objects.filter(pool=po):
-                import_snapshots(share)
+                import_snapshots(share, usage_map, snaps_index)
             return Response(DiskInfoSerializer(disk).data)
         except Exception as e:
             e_msg = (
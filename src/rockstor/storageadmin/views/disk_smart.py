@@ -28,59 +28,70 @@ from storageadmin.models import (
     SMARTTestLog,
     SMARTTestLogDetail,
     SMARTIdentity,
+    SMARTHistory,
 )
 from storageadmin.serializers import SMARTInfoSerializer
 from storageadmin.util import handle_exception
+from storageadmin.views.smart_history_helpers import record_history, history_samples
+from storageadmin.views.job_helpers import (
+    job_type,
+    job_poll,
+    submit_job,
+    disk_target,
+    JobCancelled,
+)
 import rest_framework_custom as rfc
 from system.smart import (
-    extended_info,
-    capabilities,
-    info,
-    error_logs,
-    test_logs,
+    all_info,
     run_test,
+    abort_test,
+    self_test_remaining,
 )
+from system.task_graph import TaskGraph
+from django.conf import settings
 from datetime import datetime, timezone
 
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Seconds between self-test progress checks: extended tests can take hours.
+SELF_TEST_POLL_INTERVAL = 60
 
-class DiskSMARTDetailView(rfc.GenericView):
-    serializer_class = SMARTInfoSerializer
 
-    @staticmethod
-    def _validate_disk(did, request):
-        try:
-            return Disk.objects.get(id=did)
-        except:
-            e_msg = "Disk id ({}) does not exist.".format(did)
-            handle_exception(Exception(e_msg), request)
+@job_type("smart_test")
+def smart_test_job(ctx, disk_id, test_type):
+    disk = Disk.objects.get(id=disk_id)
+    run_test(disk.name, test_type, disk.smart_options)
 
-    def get(self, *args, **kwargs):
-        with self._handle_exception(self.request):
-            disk = self._validate_disk(kwargs["did"], self.request)
-            try:
-                sinfo = SMARTInfo.objects.filter(disk=disk).order_by("-toc")[0]
-                return Response(SMARTInfoSerializer(sinfo).data)
-            except:
-                return Response()
 
-    @staticmethod
-    @transaction.atomic
-    def _info(disk):
-        attributes = extended_info(disk.name, disk.smart_options)
-        cap = capabilities(disk.name, disk.smart_options)
-        e_summary, e_lines = error_logs(disk.name, disk.smart_options)
-        smartid = info(disk.name, disk.smart_options)
-        test_d, log_lines = test_logs(disk.name, disk.smart_options)
-        ts = datetime.utcnow().replace(tzinfo=timezone.utc)
-        si = SMARTInfo(disk=disk, toc=ts)
-        si.save()
-        for k in sorted(attributes.keys(), reverse=True):
-            t = attributes[k]
-            sa = SMARTAttribute(
+@job_poll("smart_test", interval=SELF_TEST_POLL_INTERVAL)
+def smart_test_poll(ctx, disk_id, test_type):
+    disk = Disk.objects.get(id=disk_id)
+    if ctx.cancelled():
+        abort_test(disk.name, disk.smart_options)
+        raise JobCancelled()
+    remaining = self_test_remaining(disk.name, disk.smart_options)
+    if remaining is None:
+        return True
+    ctx.progress(100 - remaining)
+    return False
+
+
+@transaction.atomic
+def save_smart_info(disk, data) -> SMARTInfo:
+    """
+    Persist one all_info() result for disk, as a new SMARTInfo with one bulk
+    insert per related model.
+    :param data: system.smart.SMARTData
+    """
+    ts = datetime.utcnow().replace(tzinfo=timezone.utc)
+    si = SMARTInfo(disk=disk, toc=ts)
+    si.save()
+    attributes = data.attributes
+    SMARTAttribute.objects.bulk_create(
+        [
+            SMARTAttribute(
                 info=si,
                 aid=t[0],
                 name=t[1],
@@ -93,32 +104,45 @@ class DiskSMARTDetailView(rfc.GenericView):
                 failed=t[8],
                 raw_value=t[9],
             )
-            sa.save()
-        for c in sorted(cap.keys(), reverse=True):
-            t = cap[c]
-            SMARTCapability(info=si, name=c, flag=t[0], capabilities=t[1]).save()
-        for enum in sorted(e_summary.keys(), key=int, reverse=True):
-            l = e_summary[enum]
+            for t in [attributes[k] for k in sorted(attributes.keys(), reverse=True)]
+        ]
+    )
+    cap = data.capabilities
+    SMARTCapability.objects.bulk_create(
+        [
+            SMARTCapability(info=si, name=c, flag=cap[c][0], capabilities=cap[c][1])
+            for c in sorted(cap.keys(), reverse=True)
+        ]
+    )
+    e_summary = data.error_summary
+    SMARTErrorLogSummary.objects.bulk_create(
+        [
             SMARTErrorLogSummary(
                 info=si,
                 error_num=enum,
-                lifetime_hours=l[0],
-                state=l[1],
-                etype=l[2],
-                details=l[3],
-            ).save()
-        for l in e_lines:
-            SMARTErrorLog(info=si, line=l).save()
-        for tnum in sorted(test_d.keys()):
-            t = test_d[tnum]
-            tlen = len(t)
-            if tlen < 5:
-                [t.append("") for i in range(tlen, 5)]
-            for i in range(2, 4):
-                try:
-                    t[i] = int(t[i])
-                except:
-                    t[i] = -1
+                lifetime_hours=e_summary[enum][0],
+                state=e_summary[enum][1],
+                etype=e_summary[enum][2],
+                details=e_summary[enum][3],
+            )
+            for enum in sorted(e_summary.keys(), key=int, reverse=True)
+        ]
+    )
+    SMARTErrorLog.objects.bulk_create(
+        [SMARTErrorLog(info=si, line=l[:128]) for l in data.error_lines]
+    )
+    test_logs = []
+    for tnum in sorted(data.tests.keys()):
+        t = data.tests[tnum]
+        tlen = len(t)
+        if tlen < 5:
+            [t.append("") for i in range(tlen, 5)]
+        for i in range(2, 4):
+            try:
+                t[i] = int(t[i])
+            except:
+                t[i] = -1
+        test_logs.append(
             SMARTTestLog(
                 info=si,
                 test_num=tnum,
@@ -127,29 +151,70 @@ class DiskSMARTDetailView(rfc.GenericView):
                 pct_completed=t[2],
                 lifetime_hours=t[3],
                 lba_of_first_error=t[4],
-            ).save()
-        for l in log_lines:
-            SMARTTestLogDetail(info=si, line=l).save()
-
-        SMARTIdentity(
-            info=si,
-            model_family=smartid[0],
-            device_model=smartid[1],
-            serial_number=smartid[2],
-            world_wide_name=smartid[3],
-            firmware_version=smartid[4],
-            capacity=smartid[5],
-            sector_size=smartid[6],
-            rotation_rate=smartid[7],
-            in_smartdb=smartid[8],
-            ata_version=smartid[9],
-            sata_version=smartid[10],
-            scanned_on=smartid[11],
-            supported=smartid[12],
-            enabled=smartid[13],
-            version=smartid[14],
-            assessment=smartid[15],
-        ).save()
+            )
+        )
+    SMARTTestLog.objects.bulk_create(test_logs)
+    SMARTTestLogDetail.objects.bulk_create(
+        [SMARTTestLogDetail(info=si, line=l[:128]) for l in data.test_lines]
+    )
+    smartid = data.identity
+    SMARTIdentity(
+        info=si,
+        model_family=smartid[0],
+        device_model=smartid[1],
+        serial_number=smartid[2],
+        world_wide_name=smartid[3],
+        firmware_version=smartid[4],
+        capacity=smartid[5],
+        sector_size=smartid[6],
+        rotation_rate=smartid[7],
+        in_smartdb=smartid[8],
+        ata_version=smartid[9],
+        sata_version=smartid[10],
+        scanned_on=smartid[11],
+        supported=smartid[12],
+        enabled=smartid[13],
+        version=smartid[14],
+        assessment=smartid[15],
+    ).save()
+    record_history(
+        disk,
+        int(si.toc.timestamp()),
+        [(t[0], t[1], t[9]) for t in attributes.values()],
+    )
+    return si
+
+
+class DiskSMARTDetailView(rfc.GenericView):
+    serializer_class = SMARTInfoSerializer
+
+    @staticmethod
+    def _validate_disk(did, request):
+        try:
+            return Disk.objects.get(id=did)
+        except:
+            e_msg = "Disk id ({}) does not exist.".format(did)
+            handle_exception(Exception(e_msg), request)
+
+    def get(self, *args, **kwargs):
+        with self._handle_exception(self.request):
+            disk = self._validate_disk(kwargs["did"], self.request)
+            if kwargs["command"] == "history":
+                return Response(
+                    [
+                        {"aid": h.aid, "name": h.name, "samples": history_samples(h)}
+                        for h in SMARTHistory.objects.filter(disk=disk).order_by("aid")
+                    ]
+                )
+            try:
+                sinfo = SMARTInfo.objects.filter(disk=disk).order_by("-toc")[0]
+                return Response(SMARTInfoSerializer(sinfo).data)
+            except:
+                return Response()
+
+    @staticmethod
+    def _info(disk):
+        si = save_smart_info(disk, all_info(disk.name, disk.smart_options))
         return Response(SMARTInfoSerializer(si).data)
 
     def post(self, request, did, command):
@@ -171,10 +236,50 @@ class DiskSMARTDetailView(rfc.GenericView):
                     test_type = "conveyance"
                 else:
                     raise Exception(("Unsupported Self-Test: ({}).").format(test_type))
-                run_test(disk.name, test_type, disk.smart_options)
+                # The device runs the test: our job tracks its progress.
+                submit_job(
+                    "smart_test",
+                    [disk_target(disk)],
+                    disk_id=disk.id,
+                    test_type=test_type,
+                )
                 return self._info(disk)
 
             e_msg = (
                 "Unknown command: ({}). The only valid commands are info and test."
             ).format(command)
             handle_exception(Exception(e_msg), request)
+
+
+class DiskSMARTRefreshView(rfc.GenericView):
+    """
+    Refresh SMART info of all attached, SMART enabled, disks: smartctl runs
+    fan out over SMART_REFRESH["workers"] threads, with each result then
+    saved as for a single disk's info command. POST {"skip_standby": true}
+    skips, rather than spins up, disks in a low power mode.
+    """
+
+    def post(self, request):
+        with self._handle_exception(request):
+            standby = request.data.get("skip_standby", False)
+            disks = Disk.objects.filter(
+                smart_available=True, smart_enabled=True, offline=False
+            ).exclude(name__startswith="detached-")
+            graph = TaskGraph(settings.SMART_REFRESH["workers"])
+            tasks = []
+            for disk in disks:
+                task = graph.add(
+                    "smart", all_info, disk.name, disk.smart_options, standby
+                )
+                tasks.append((disk, task))
+            graph.close()
+            result = {"refreshed": [], "standby": [], "failed": {}}
+            for disk, task in tasks:
+                if task.exception() is not None:
+                    result["failed"][disk.name] = task.exception().__str__()
+                elif task.result() is None:
+                    result["standby"].append(disk.name)
+                else:
+                    save_smart_info(disk, task.result())
+                    result["refreshed"].append(disk.name)
+            return Response(result)
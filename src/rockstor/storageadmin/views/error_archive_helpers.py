@@ -0,0 +1,121 @@
+"""
+Copyright (joint work) 2024 The Rockstor Project <https://rockstor.com>
+
+Rockstor is free software; you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published
+by the Free Software Foundation; either version 2 of the License,
+or (at your option) any later version.
+
+Rockstor is distributed in the hope that it will be useful, but
+WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program. If not, see <https://www.gnu.org/licenses/>.
+"""
+
+"""
+Error log archive (logs/error.tgz) as requested by ProdExceptionMiddleware on
+each request exception. Built by our Huey workers, off-request: requests
+arriving while an archive is pending are coalesced into it, and archives are
+at most one per ERROR_ARCHIVE["interval"] seconds. Each archive holds only
+log files changed since the prior archive, newest first up to
+ERROR_ARCHIVE["max_size"] bytes (uncompressed).
+"""
+
+import os
+import tarfile
+import time
+from tempfile import mkstemp
+
+from django.conf import settings
+from huey.contrib.djhuey import task, HUEY
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Huey storage keys, shared by all our gunicorn and Huey worker processes.
+ARCHIVE_PENDING_KEY = "error-archive-pending"
+ARCHIVE_LAST_KEY = "error-archive-last"
+
+
+def error_archive_path() -> str:
+    return "{}src/rockstor/logs/error.tgz".format(settings.ROOT_DIR)
+
+
+def request_error_archive():
+    """
+    Schedule an error log archive, unless one is already pending: no sooner
+    than ERROR_ARCHIVE["interval"] seconds after the last.
+    """
+    try:
+        if not HUEY.put_if_empty(ARCHIVE_PENDING_KEY, True):
+            return
+        last = HUEY.get(ARCHIVE_LAST_KEY, peek=True) or 0
+        delay = max(0, last + settings.ERROR_ARCHIVE["interval"] - time.time())
+        archive_error_logs.schedule(delay=delay)
+    except Exception as e:
+        # Never fail the already failing request on our account.
+        logger.error("Failed to schedule error log archive: {}".format(e))
+
+
+def changed_logs(log_dir, since, max_size):
+    """
+    :return: paths of files in log_dir modified after since (epoch), newest
+    first, up to a total of max_size bytes.
+    """
+    candidates = []
+    for root, dirs, files in os.walk(log_dir):
+        for f in files:
+            path = os.path.join(root, f)
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:  # rotated meanwhile
+                continue
+            if st.st_mtime > since:
+                candidates.append((st.st_mtime, st.st_size, path))
+    selected = []
+    total = 0
+    for mtime, size, path in sorted(candidates, reverse=True):
+        if total + size > max_size:
+            logger.debug("Error log archive size cap, skipping ({}).".format(path))
+            continue
+        total += size
+        selected.append(path)
+    return selected
+
+
+def build_error_archive(since):
+    """
+    Replace our error log archive with one of logs changed since (epoch).
+    :return: number of files archived, existing archive left as is if 0.
+    """
+    log_dir = "{}var/log".format(settings.ROOT_DIR)
+    paths = changed_logs(log_dir, since, settings.ERROR_ARCHIVE["max_size"])
+    if not paths:
+        return 0
+    archive = error_archive_path()
+    os.makedirs(os.path.dirname(archive), exist_ok=True)
+    fh, npath = mkstemp(dir=os.path.dirname(archive))
+    with os.fdopen(fh, "wb") as fo, tarfile.open(fileobj=fo, mode="w:gz") as tar:
+        for path in paths:
+            try:
+                tar.add(path, arcname=os.path.relpath(path, settings.ROOT_DIR))
+            except OSError as e:
+                logger.error("Failed to archive ({}): {}".format(path, e))
+    os.chmod(npath, 0o644)
+    os.replace(npath, archive)
+    return len(paths)
+
+
+@task()
+def archive_error_logs():
+    # Cleared first: errors from here on request another (later) archive.
+    HUEY.delete(ARCHIVE_PENDING_KEY)
+    since = HUEY.get(ARCHIVE_LAST_KEY, peek=True) or 0
+    started = time.time()
+    num_files = build_error_archive(since)
+    HUEY.put(ARCHIVE_LAST_KEY, started)
+    logger.debug("Error log archive of ({}) changed files.".format(num_files))
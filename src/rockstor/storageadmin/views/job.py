@@ -0,0 +1,81 @@
+"""
+Copyright (joint work) 2024 The Rockstor Project <https://rockstor.com>
+
+Rockstor is free software; you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published
+by the Free Software Foundation; either version 2 of the License,
+or (at your option) any later version.
+
+Rockstor is distributed in the hope that it will be useful, but
+WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program. If not, see <https://www.gnu.org/licenses/>.
+"""
+
+from rest_framework.response import Response
+from django.db import transaction
+from storageadmin.models import Job
+from storageadmin.models.job import ACTIVE_JOB_STATES
+from storageadmin.serializers import JobSerializer
+from storageadmin.util import handle_exception
+from storageadmin.views.job_helpers import cancel_job
+import rest_framework_custom as rfc
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class JobListView(rfc.GenericView):
+    """
+    GET jobs: all jobs, most recent first; ?active=yes for queued/running only,
+    ?name=scrub for a given job type.
+    """
+
+    serializer_class = JobSerializer
+
+    def get_queryset(self, *args, **kwargs):
+        with self._handle_exception(self.request):
+            jobs = Job.objects.all()
+            if self.request.query_params.get("active", "no") == "yes":
+                jobs = jobs.filter(status__in=ACTIVE_JOB_STATES)
+            name = self.request.query_params.get("name", None)
+            if name is not None:
+                jobs = jobs.filter(name=name)
+            return jobs
+
+
+class JobDetailView(rfc.GenericView):
+    serializer_class = JobSerializer
+
+    @staticmethod
+    def _validate_job(jid, request):
+        try:
+            return Job.objects.get(id=jid)
+        except Job.DoesNotExist:
+            e_msg = "Job id ({}) does not exist.".format(jid)
+            handle_exception(Exception(e_msg), request, status_code=404)
+
+    def get(self, *args, **kwargs):
+        with self._handle_exception(self.request):
+            job = self._validate_job(self.kwargs["jid"], self.request)
+            return Response(JobSerializer(job).data)
+
+    @transaction.atomic
+    def post(self, request, jid, command):
+        with self._handle_exception(request):
+            job = self._validate_job(jid, request)
+            if command != "cancel":
+                e_msg = (
+                    "Unknown job command: ({}). The only valid command is cancel."
+                ).format(command)
+                handle_exception(Exception(e_msg), request)
+            try:
+                cancel_job(job)
+            except Exception as e:
+                handle_exception(e, request, status_code=400)
+            job.refresh_from_db()
+            return Response(JobSerializer(job).data)
@@ -0,0 +1,298 @@
+"""
+Copyright (joint work) 2024 The Rockstor Project <https://rockstor.com>
+
+Rockstor is free software; you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published
+by the Free Software Foundation; either version 2 of the License,
+or (at your option) any later version.
+
+Rockstor is distributed in the hope that it will be useful, but
+WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program. If not, see <https://www.gnu.org/licenses/>.
+"""
+
+"""
+Job engine for long-running storage commands, e.g. scrub and SMART self-tests.
+Jobs are persisted as storageadmin.models.Job and executed by our Huey consumer
+workers, keeping API workers free. A job declares the resources it uses
+(targets), e.g. "pool:2" or "disk:<by-id name>"; only one running job may
+hold a given target, others wait (re-scheduled) until it is released.
+Progress and cancellation are via the Job record: see JobContext, and the
+data_collector "/jobs" namespace for streamed progress.
+
+Job types are registered via the @job_type("name") decorator on a function
+accepting a JobContext and the keyword arguments given to submit_job().
+Operations that run in the background once started (scrub, SMART self-tests)
+are detached job types: see @job_poll("name"). They hold their targets, but
+not one of our few Huey workers, for the duration of the operation.
+Modules defining job types must be imported by storageadmin/tasks.py.
+"""
+
+import json
+import os
+import subprocess
+import threading
+from functools import partial
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from huey.contrib.djhuey import db_task, HUEY
+
+from storageadmin.models import Job
+from system.exceptions import CommandException
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+# job name: job function
+JOB_TYPES = {}
+# job name: (poll function, seconds between polls) of detached job types.
+JOB_POLLS = {}
+# Serialises target checks between the threads of our Huey consumer.
+targets_lock = threading.Lock()
+
+
+class JobCancelled(Exception):
+    pass
+
+
+def job_type(name):
+    """Decorator: register a job function under the given job name."""
+
+    def decorator(func):
+        JOB_TYPES[name] = func
+        return func
+
+    return decorator
+
+
+def job_poll(name, interval=None):
+    """
+    Decorator: register the poll function of a detached job type, whose job
+    function starts a background operation and returns. poll_job() then
+    calls the poll function, with the same arguments, every interval seconds
+    (default JOBS["poll_interval"]) until it returns True. Poll functions
+    handle their own cancellation: see JobContext.cancelled().
+    """
+
+    def decorator(func):
+        JOB_POLLS[name] = (func, interval)
+        return func
+
+    return decorator
+
+
+def pool_target(pool) -> str:
+    return "pool:{}".format(pool.id)
+
+
+def disk_target(disk) -> str:
+    return "disk:{}".format(disk.name)
+
+
+def submit_job(name, targets, **kwargs):
+    """
+    Create a queued Job and schedule it on our Huey workers once the
+    current transaction (if any) commits.
+    :param name: registered job type.
+    :param targets: list of resource strings, see pool_target(), disk_target().
+    :param kwargs: json serializable keyword arguments for the job function.
+    :return: Job instance.
+    """
+    if name not in JOB_TYPES:
+        raise Exception("Unknown job type ({}).".format(name))
+    job = Job.objects.create(
+        name=name, targets=" ".join(sorted(set(targets))), args=json.dumps(kwargs)
+    )
+    transaction.on_commit(partial(enqueue_job, job.id))
+    return job
+
+
+def enqueue_job(job_id, delay=None):
+    task_result_handle = run_job.schedule(args=(job_id,), delay=delay)
+    Job.objects.filter(id=job_id).update(tid=task_result_handle.id)
+
+
+def enqueue_poll(job):
+    interval = JOB_POLLS[job.name][1]
+    if interval is None:
+        interval = settings.JOBS["poll_interval"]
+    poll_job.schedule(args=(job.id,), delay=interval)
+
+
+def cancel_job(job):
+    """
+    Cancel a queued job outright, or flag a running job as cancelling: its
+    JobContext then stops the job at the next opportunity.
+    :param job: Job instance.
+    :return: resulting job status.
+    """
+    if Job.objects.filter(id=job.id, status="queued").update(
+        status="cancelled", end_time=timezone.now()
+    ):
+        if job.tid is not None:
+            HUEY.revoke_by_id(job.tid)
+        return "cancelled"
+    if Job.objects.filter(id=job.id, status="running").update(status="cancelling"):
+        return "cancelling"
+    raise Exception(
+        "Job ({}) is not active, its status is ({}).".format(
+            job.id, Job.objects.get(id=job.id).status
+        )
+    )
+
+
+def busy_targets(exclude_id=None) -> set:
+    """
+    :return: targets held by running jobs. Jobs recorded as running by a
+    prior consumer process were interrupted, e.g. by a service restart, and
+    are marked as failed rather than holding their targets indefinitely.
+    """
+    busy = set()
+    running = Job.objects.filter(status__in=("running", "cancelling"))
+    for job in running.exclude(id=exclude_id):
+        if job.pid != os.getpid():
+            Job.objects.filter(id=job.id).update(
+                status="failed", message="Interrupted.", end_time=timezone.now()
+            )
+            continue
+        busy.update(job.targets.split())
+    return busy
+
+
+class JobContext(object):
+    """Handed to job functions for progress reporting and cancellation."""
+
+    def __init__(self, job_id):
+        self.job_id = job_id
+
+    def progress(self, percent_done=None, message=None):
+        fields = {}
+        if percent_done is not None:
+            fields["percent_done"] = max(0, min(100, int(percent_done)))
+        if message is not None:
+            fields["message"] = message[:1024]
+        if fields:
+            Job.objects.filter(id=self.job_id).update(**fields)
+
+    def cancelled(self) -> bool:
+        return Job.objects.filter(id=self.job_id, status="cancelling").exists()
+
+    def check_cancelled(self):
+        if self.cancelled():
+            raise JobCancelled()
+
+    def run(self, cmd, poll=None, on_start=None, on_cancel=None, interval=None):
+        """
+        Run cmd to completion, calling poll() every interval seconds, e.g. to
+        report progress, and on_start(Popen) once started. On cancellation
+        on_cancel() is called if given, otherwise the command is terminated,
+        and JobCancelled is raised.
+        :return: out, err, rc as per system.osi.run_command()
+        :raises CommandException: on non zero return code.
+        """
+        if interval is None:
+            interval = settings.JOBS["poll_interval"]
+        p = subprocess.Popen(
+            cmd,
+            shell=False,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            universal_newlines=True,
+        )
+        if on_start is not None:
+            on_start(p)
+        while True:
+            try:
+                out, err = p.communicate(timeout=interval)
+                break
+            except subprocess.TimeoutExpired:
+                pass
+            if self.cancelled():
+                if on_cancel is not None:
+                    on_cancel()
+                else:
+                    p.terminate()
+                p.communicate()
+                raise JobCancelled()
+            if poll is not None:
+                poll()
+        out, err, rc = out.split("\n"), err.split("\n"), p.returncode
+        if rc != 0:
+            raise CommandException(cmd, out, err, rc)
+        return out, err, rc
+
+
+@db_task()
+def run_job(job_id):
+    """
+    Huey entry point for all job types: waits (re-schedules) while any of our
+    targets are held by another running job.
+    """
+    with targets_lock:
+        try:
+            job = Job.objects.get(id=job_id)
+        except Job.DoesNotExist:
+            return
+        if job.status != "queued":
+            # E.g. cancelled while queued.
+            return
+        if busy_targets(exclude_id=job_id).intersection(job.targets.split()):
+            Job.objects.filter(id=job_id).update(
+                message="Waiting for another job on ({}).".format(job.targets)
+            )
+            enqueue_job(job_id, delay=settings.JOBS["retry_delay"])
+            return
+        if not Job.objects.filter(id=job_id, status="queued").update(
+            status="running", start_time=timezone.now(), message=None, pid=os.getpid()
+        ):
+            return
+    logger.info("Job ({}) [{}] on ({}) started.".format(job.id, job.name, job.targets))
+    run_step(job, JOB_TYPES[job.name])
+
+
+@db_task()
+def poll_job(job_id):
+    """
+    Huey entry point for the polls of detached jobs, see job_poll(): each a
+    short task, re-scheduled until our job ends.
+    """
+    try:
+        job = Job.objects.get(id=job_id)
+    except Job.DoesNotExist:
+        return
+    if not job.active:
+        # E.g. failed as interrupted, see busy_targets().
+        return
+    Job.objects.filter(id=job_id).update(pid=os.getpid())
+    run_step(job, JOB_POLLS[job.name][0])
+
+
+def run_step(job, func):
+    """
+    Run func, a job function or the poll function of a detached job, and end
+    our job accordingly: unless detached and func did not return True, in
+    which case our next poll is scheduled.
+    """
+    try:
+        done = func(JobContext(job.id), **json.loads(job.args))
+    except JobCancelled:
+        status = "cancelled"
+    except Exception as e:
+        logger.exception(e)
+        status = "failed"
+        Job.objects.filter(id=job.id).update(message=e.__str__()[:1024])
+    else:
+        if job.name in JOB_POLLS and done is not True:
+            enqueue_poll(job)
+            return
+        status = "finished"
+        Job.objects.filter(id=job.id).update(percent_done=100)
+    Job.objects.filter(id=job.id).update(status=status, end_time=timezone.now())
+    logger.info("Job ({}) [{}] {}.".format(job.id, job.name, status))
@@ -362,18 +362,32 @@ class PoolMixin(object):
 
 
 class PoolListView(PoolMixin, rfc.GenericView):
+    sort_fields = {
+        "id": "id",
+        "name": "name",
+        "size": "size",
+        "raid": "raid",
+        "compression": "compression",
+        "role": "role",
+        "toc": "toc",
+    }
+
     def get_queryset(self, *args, **kwargs):
+        pools = self.eager_load(Pool.objects.all())
         sort_col = self.request.query_params.get("sortby", None)
         if sort_col is not None and sort_col == "usage":
+            # Pool usage is not in our db: sorted here, from the same cached
+            # per pool values as our serializer's "free" field.
+            if "cursor" in self.request.query_params:
+                e_msg = "Sorting by usage does not support cursor pagination."
+                handle_exception(Exception(e_msg), self.request)
             reverse = self.request.query_params.get("reverse", "no")
             if reverse == "yes":
                 reverse = True
             else:
                 reverse = False
-            return sorted(
-                Pool.objects.all(), key=lambda u: u.cur_usage(), reverse=reverse
-            )
-        return Pool.objects.all()
+            return sorted(pools, key=lambda u: u.cur_usage(), reverse=reverse)
+        return pools.order_by(*self.get_ordering())
 
     @transaction.atomic
     def post(self, request):
@@ -20,8 +20,23 @@ from django.db import transaction
 from storageadmin.util import handle_exception
 from storageadmin.serializers import PoolScrubSerializer
 from storageadmin.models import Pool, PoolScrub
+from storageadmin.views.job_helpers import (
+    job_type,
+    job_poll,
+    submit_job,
+    pool_target,
+)
+from scripts.scheduled_tasks.pool_scrub import scrub_ended
 import rest_framework_custom as rfc
-from fs.btrfs import scrub_start, scrub_status, btrfsprogs_legacy
+from fs.btrfs import (
+    scrub_start_cmd,
+    scrub_cancel,
+    scrub_status,
+    btrfsprogs_legacy,
+    mount_root,
+    pool_usage,
+)
+from system.osi import run_command
 from datetime import timedelta
 
 import logging
@@ -29,6 +44,70 @@ import logging
 logger = logging.getLogger(__name__)
 
 
+def scrub_start(pool, scrub, force=False):
+    """
+    Submit a scrub job for the given pool: queued until no other job is
+    using this pool or its member disks.
+    :param pool: Pool object.
+    :param scrub: PoolScrub object recording this scrub.
+    :param force: passed to scrub_start_cmd().
+    :return: Job object.
+    """
+    targets = [pool_target(pool)] + [
+        "disk:{}".format(name)
+        for name in pool.disk_set.attached().values_list("name", flat=True)
+    ]
+    job = submit_job("scrub", targets, scrub_id=scrub.id, force=force)
+    PoolScrub.objects.filter(id=scrub.id).update(job=job)
+    return job
+
+
+def update_scrub_status(pool, scrub):
+    """
+    Update scrub (PoolScrub) from our pool's current btrfs scrub status.
+    :return: current btrfs scrub status dictionary.
+    """
+    cur_status = scrub_status(pool, btrfsprogs_legacy())
+    if cur_status["status"] in ("finished", "halted", "cancelled"):
+        duration = int(cur_status["duration"])
+        cur_status["end_time"] = scrub.start_time + timedelta(seconds=duration)
+    cur_status.pop("duration", None)
+    PoolScrub.objects.filter(id=scrub.id).update(**cur_status)
+    return cur_status
+
+
+@job_type("scrub")
+def scrub_job(ctx, scrub_id, force=False):
+    scrub = PoolScrub.objects.get(id=scrub_id)
+    pool = scrub.pool
+    try:
+        run_command(scrub_start_cmd(mount_root(pool), force))
+    except Exception:
+        scrub_ended(pool.id, "error")
+        raise
+    PoolScrub.objects.filter(id=scrub.id).update(status="running")
+
+
+@job_poll("scrub")
+def scrub_poll(ctx, scrub_id, force=False):
+    scrub = PoolScrub.objects.get(id=scrub_id)
+    pool = scrub.pool
+    mnt_pt = mount_root(pool)
+    if ctx.cancelled():
+        scrub_cancel(mnt_pt)
+    cur_status = update_scrub_status(pool, scrub)
+    if cur_status["status"] != "running":
+        scrub_ended(pool.id, cur_status["status"])
+        ctx.check_cancelled()
+        return True
+    ctx.check_cancelled()
+    used_kb = pool_usage(mnt_pt, pool.uuid)
+    # N.B. kb_scrubbed is in bytes: see scrub_status_raw().
+    if used_kb > 0 and cur_status.get("kb_scrubbed") is not None:
+        ctx.progress(cur_status["kb_scrubbed"] * 100 / (used_kb * 1024))
+    return False
+
+
 class PoolScrubView(rfc.GenericView):
     serializer_class = PoolScrubSerializer
 
@@ -54,17 +133,13 @@ class PoolScrubView(rfc.GenericView):
             ps = PoolScrub.objects.filter(pool=pool).order_by("-id")[0]
         except:
             return Response()
-        if ps.status == "started" or ps.status == "running":
-            cur_status = scrub_status(pool, btrfsprogs_legacy())
-            if (
-                cur_status["status"] == "finished"
-                or cur_status["status"] == "halted"
-                or cur_status["status"] == "cancelled"
-            ):
-                duration = int(cur_status["duration"])
-                cur_status["end_time"] = ps.start_time + timedelta(seconds=duration)
-                del cur_status["duration"]
-            PoolScrub.objects.filter(id=ps.id).update(**cur_status)
+        if ps.status == "started" and ps.job is not None and not ps.job.active:
+            # Our job ended (e.g. cancelled) before our scrub started.
+            PoolScrub.objects.filter(id=ps.id).update(
+                status=ps.job.status, end_time=ps.job.end_time
+            )
+        elif ps.status == "running":
+            update_scrub_status(pool, ps)
         return ps
 
     @transaction.atomic
@@ -97,7 +172,8 @@ class PoolScrubView(rfc.GenericView):
                     ).format(pool.name)
                     handle_exception(Exception(e_msg), request)
 
-            scrub_pid = scrub_start(pool, force=force)
-            ps = PoolScrub(pool=pool, pid=scrub_pid)
+            # Our scrub job updates status on start, see scrub_job().
+            ps = PoolScrub(pool=pool, pid=0)
             ps.save()
+            scrub_start(pool, ps, force=force)
             return Response(PoolScrubSerializer(ps).data)
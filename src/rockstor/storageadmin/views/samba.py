@@ -32,7 +32,7 @@ from storageadmin.views.ug_helpers import combined_users
 from system.samba import (
     refresh_smb_config,
     status,
-    restart_samba,
+    reload_samba,
     refresh_smb_discovery,
 )
 from system.users import ifp_get_properties_from_name_or_id
@@ -55,10 +55,10 @@ class SambaMixin(object):
     BOOL_OPTS = ("yes", "no")
 
     @staticmethod
-    def _restart_samba():
+    def _reload_samba():
         out = status()
         if out[2] == 0:
-            restart_samba(hard=True)
+            reload_samba()
 
     @classmethod
     def _validate_input(cls, rdata, smbo=None):
@@ -175,9 +175,9 @@ class SambaListView(SambaMixin, ShareMixin, rfc.GenericView):
                 smb_share = self.create_samba_share(se)
         else:
             smb_share = self.create_samba_share(request.data)
-        refresh_smb_config(list(SambaShare.objects.all()))
+        if refresh_smb_config(list(SambaShare.objects.all())):
+            self._reload_samba()
         refresh_smb_discovery(list(SambaShare.objects.all()))
-        self._restart_samba()
         return Response(SambaShareSerializer(smb_share).data)
 
     def create_samba_share(self, rdata):
@@ -236,9 +236,9 @@ class SambaDetailView(SambaMixin, rfc.GenericView):
             handle_exception(Exception(e_msg), request)
 
         with self._handle_exception(request):
-            refresh_smb_config(list(SambaShare.objects.all()))
+            if refresh_smb_config(list(SambaShare.objects.all())):
+                self._reload_samba()
             refresh_smb_discovery(list(SambaShare.objects.all()))
-            self._restart_samba()
             return Response()
 
     @transaction.atomic
@@ -284,7 +284,7 @@ class SambaDetailView(SambaMixin, rfc.GenericView):
                             ).format(smb_o.share.name)
                             handle_exception(Exception(e_msg), request)
 
-            refresh_smb_config(list(SambaShare.objects.all()))
+            if refresh_smb_config(list(SambaShare.objects.all())):
+                self._reload_samba()
             refresh_smb_discovery(list(SambaShare.objects.all()))
-            self._restart_samba()
             return Response(SambaShareSerializer(smbo).data)
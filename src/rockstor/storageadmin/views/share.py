@@ -100,23 +100,25 @@ class ShareMixin(object):
 
 class ShareListView(ShareMixin, rfc.GenericView):
     serializer_class = ShareSerializer
+    sort_fields = {
+        "id": "id",
+        "name": "name",
+        "size": "size",
+        "usage": "rusage",
+        "rusage": "rusage",
+        "eusage": "eusage",
+        "owner": "owner",
+        "group": "group",
+        "perms": "perms",
+        "compression_algo": "compression_algo",
+        "toc": "toc",
+    }
 
     def get_queryset(self, *args, **kwargs):
         with self._handle_exception(self.request):
-            sort_col = self.request.query_params.get("sortby", None)
-            if sort_col is not None:
-                reverse = self.request.query_params.get("reverse", "no")
-                if reverse == "yes":
-                    reverse = True
-                else:
-                    reverse = False
-                if sort_col == "usage":
-                    sort_col = "rusage"
-                return sorted(
-                    Share.objects.all(),
-                    key=lambda u: getattr(u, sort_col),
-                    reverse=reverse,
-                )
+            shares = self.eager_load(Share.objects.all())
+            if "sortby" in self.request.query_params:
+                return shares.order_by(*self.get_ordering())
             # If this box is receiving replication backups, the first full-send
             # is interpreted as a Share(because it does not have a parent
             # subvol/snapshot) It is a transient subvolume that gets rolled
@@ -125,9 +127,9 @@ class ShareListView(ShareMixin, rfc.GenericView):
             # for cosmetic and UX reasons.
             # TODO: This currently fails to work, needs investigating, leaving
             # TODO: for now as good for indicting the initial rep phases.
-            return Share.objects.exclude(
+            return shares.exclude(
                 name__regex=r"^\.snapshots/.*/.*_replication_"
-            ).order_by("-id")
+            ).order_by(*self.ordering)
 
     @transaction.atomic
     def post(self, request):
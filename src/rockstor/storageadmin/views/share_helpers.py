@@ -26,6 +26,7 @@ from fs.btrfs import (
     umount_root,
     shares_info,
     volume_usage,
+    pool_qgroup_usage,
     snaps_info,
     qgroup_create,
     update_quota,
@@ -86,7 +87,7 @@ def toggle_sftp_visibility(share, snap_name, snap_qgroup, on=True):
         umount_root(mnt_pt)
 
 
-def import_shares(pool, request):
+def import_shares(pool, request, usage_map=None):
     # Establish known shares/subvols within our db for the given pool:
     shares_in_pool_db = [s.name for s in Share.objects.filter(pool=pool)]
     # Find the actual/current shares/subvols within the given pool:
@@ -96,6 +97,9 @@ def import_shares(pool, request):
     # All pqgroups are removed when quotas are disabled, combined with a part
     # refresh we could have duplicates within the db.
     share_pqgroups_used = []
+    # Pool wide qgroup usage: one "btrfs qgroup show" serves all shares.
+    if usage_map is None:
+        usage_map = pool_qgroup_usage(pool)
     # Delete db Share object if it is no longer found on disk.
     for s_in_pool_db in shares_in_pool_db:
         if s_in_pool_db not in shares_in_pool:
@@ -142,7 +146,7 @@ def import_shares(pool, request):
                 share.save()
             share.qgroup = shares_in_pool[s_in_pool]
             rusage, eusage, pqgroup_rusage, pqgroup_eusage = volume_usage(
-                pool, share.qgroup, pqgroup
+                pool, share.qgroup, pqgroup, usage_map=usage_map
             )
             if (
                 rusage != share.rusage
@@ -192,7 +196,9 @@ def import_shares(pool, request):
                     cshare.eusage,
                     cshare.pqgroup_rusage,
                     cshare.pqgroup_eusage,
-                ) = volume_usage(pool, cshare.qgroup, cshare.pqgroup)
+                ) = volume_usage(
+                    pool, cshare.qgroup, cshare.pqgroup, usage_map=usage_map
+                )
                 cshare.save()
                 update_shareusage_db(s_in_pool, cshare.rusage, cshare.eusage)
         except Share.DoesNotExist:
@@ -217,7 +223,7 @@ def import_shares(pool, request):
                 update_quota(pool, pqid, pool.size * 1024)
                 qgroup_assign(qid, pqid, pool.mnt_pt)
             rusage, eusage, pqgroup_rusage, pqgroup_eusage = volume_usage(
-                pool, qid, pqid
+                pool, qid, pqid, usage_map=usage_map
             )
             nso = Share(
                 pool=pool,
@@ -237,8 +243,23 @@ def import_shares(pool, request):
             mount_share(nso, "{}{}".format(settings.MNT_PT, s_in_pool))
 
 
-def import_snapshots(share):
-    snaps_d = snaps_info(share.pool.mnt_pt, share.name)
+def import_snapshots(share, usage_map=None, snaps_index=None):
+    """
+    Import / update db Snapshot entries for the given share from those found
+    on disk.
+    :param share: Share object
+    :param usage_map: optional pool_qgroup_usage() result for share.pool.
+    Callers iterating over several shares of a pool should pass a shared
+    map to avoid a "btrfs qgroup show" per share.
+    :param snaps_index: optional pool_snaps_info() result for share.pool,
+    likewise shared to discover the pool's snapshots only once.
+    """
+    if usage_map is None:
+        usage_map = pool_qgroup_usage(share.pool)
+    if snaps_index is None:
+        snaps_d = snaps_info(share.pool.mnt_pt, share.name)
+    else:
+        snaps_d = snaps_index.get(share.name, {})
     snaps = [s.name for s in Snapshot.objects.filter(share=share)]
     for s in snaps:
         if s not in snaps_d:
@@ -262,7 +283,7 @@ def import_snapshots(share):
                 writable=snaps_d[s][1],
                 qgroup=snaps_d[s][0],
             )
-        rusage, eusage = volume_usage(share.pool, snaps_d[s][0])
+        rusage, eusage = volume_usage(share.pool, snaps_d[s][0], usage_map=usage_map)
         if rusage != so.rusage or eusage != so.eusage:
             so.rusage = rusage
             so.eusage = eusage
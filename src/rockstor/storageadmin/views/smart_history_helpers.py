@@ -0,0 +1,272 @@
+"""
+Copyright (joint work) 2024 The Rockstor Project <https://rockstor.com>
+
+Rockstor is free software; you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published
+by the Free Software Foundation; either version 2 of the License,
+or (at your option) any later version.
+
+Rockstor is distributed in the hope that it will be useful, but
+WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program. If not, see <https://www.gnu.org/licenses/>.
+"""
+
+"""
+SMART attribute history: one SMARTHistory row per disk and attribute of
+delta encoded raw values. Fed by every saved SMART refresh and by an hourly
+low priority Huey collector that leaves sleeping disks asleep. After each
+collection our trend evaluator flags disks whose failure predicting
+attributes (TREND_ATTRIBUTES) are growing faster than before: kept in Huey
+storage for our data_collector's SysinfoNamespace to push to the Web-UI.
+SMARTInfo trees older than SMART_HISTORY["info_retention"] days are daily
+rolled up into this history, and history older than
+SMART_HISTORY["retention"] days dropped.
+"""
+
+import time
+from bisect import bisect_right
+from datetime import datetime, timedelta, timezone
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max
+from huey import crontab
+from huey.contrib.djhuey import db_periodic_task, HUEY
+
+from storageadmin.models import Disk, SMARTAttribute, SMARTHistory, SMARTInfo
+from system.smart import all_info
+from system.task_graph import TaskGraph
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Huey storage key of our latest trend alerts.
+TREND_ALERTS_KEY = "smart-trend-alerts"
+
+# ATA attributes whose growth predicts failure: Reallocated_Sector_Ct,
+# Reported_Uncorrect, Current_Pending_Sector and Offline_Uncorrectable.
+TREND_ATTRIBUTES = (5, 187, 197, 198)
+
+
+def _put_varint(out: bytearray, n: int):
+    # zigzag: small negative and positive values alike in few bytes.
+    n = (n << 1) ^ (n >> 63)
+    while n > 0x7F:
+        out.append((n & 0x7F) | 0x80)
+        n >>= 7
+    out.append(n)
+
+
+def pack_deltas(deltas) -> bytes:
+    """:param deltas: [(seconds since prior sample, raw value change), ...]"""
+    out = bytearray()
+    for dt, draw in deltas:
+        _put_varint(out, dt)
+        _put_varint(out, draw)
+    return bytes(out)
+
+
+def unpack_deltas(data: bytes) -> list[tuple[int, int]]:
+    values = []
+    n = shift = 0
+    for byte in data:
+        n |= (byte & 0x7F) << shift
+        shift += 7
+        if not byte & 0x80:
+            values.append((n >> 1) ^ -(n & 1))
+            n = shift = 0
+    return list(zip(values[::2], values[1::2]))
+
+
+def history_samples(h: SMARTHistory) -> list[tuple[int, int]]:
+    """:return: [(epoch seconds, raw value), ...] of h, in time order."""
+    ts, raw = h.first_ts, h.first_raw
+    samples = [(ts, raw)]
+    for dt, draw in unpack_deltas(bytes(h.samples)):
+        ts += dt
+        raw += draw
+        samples.append((ts, raw))
+    return samples
+
+
+def set_history_samples(h: SMARTHistory, samples: list[tuple[int, int]]):
+    """:param samples: non empty [(epoch seconds, raw value), ...], in time order."""
+    h.first_ts, h.first_raw = samples[0]
+    h.last_ts, h.last_raw = samples[-1]
+    h.count = len(samples)
+    h.samples = pack_deltas(
+        (t - pt, r - pr) for (pt, pr), (t, r) in zip(samples, samples[1:])
+    )
+
+
+def raw_int(raw_value: str) -> int | None:
+    """:return: leading integer of a raw value, e.g. 36 of "36 (Min/Max 20/45)"."""
+    try:
+        return int(raw_value.split()[0])
+    except (IndexError, ValueError):
+        return None
+
+
+@transaction.atomic
+def record_history(disk, ts: int, attributes):
+    """
+    Add one sample per attribute to disk's history. Samples older than an
+    attribute's last are merged in place, and those at an existing
+    timestamp ignored.
+    :param attributes: [(aid, name, raw value string), ...]
+    """
+    histories = {h.aid: h for h in SMARTHistory.objects.filter(disk=disk)}
+    new = []
+    changed = []
+    for aid, name, raw_value in attributes:
+        raw = raw_int(raw_value)
+        if raw is None:
+            continue
+        h = histories.get(aid)
+        if h is None:
+            h = SMARTHistory(disk=disk, aid=aid, name=name)
+            set_history_samples(h, [(ts, raw)])
+            histories[aid] = h
+            new.append(h)
+        elif ts > h.last_ts:
+            h.samples = bytes(h.samples) + pack_deltas(
+                [(ts - h.last_ts, raw - h.last_raw)]
+            )
+            h.last_ts, h.last_raw = ts, raw
+            h.count += 1
+            changed.append(h)
+        else:
+            samples = dict(history_samples(h))
+            if ts in samples:
+                continue
+            samples[ts] = raw
+            set_history_samples(h, sorted(samples.items()))
+            changed.append(h)
+    SMARTHistory.objects.bulk_create(new)
+    SMARTHistory.objects.bulk_update(
+        changed,
+        ["first_ts", "first_raw", "last_ts", "last_raw", "count", "samples"],
+    )
+
+
+def trend_alerts(now=None) -> list[dict]:
+    """
+    Our trend evaluator: over the last SMART_HISTORY["trend_days"] days, a
+    TREND_ATTRIBUTES raw value that grew in the latter half by more than
+    SMART_HISTORY["trend_factor"] times its growth in the former half. All
+    disks' histories are fetched in one query and evaluated in one pass.
+    :return: [{"disk", "aid", "name", "raw", "previous", "recent"}, ...] with
+    previous and recent the growth of raw in each half.
+    """
+    now = now or int(time.time())
+    window = settings.SMART_HISTORY["trend_days"] * 86400
+    start, mid = now - window, now - window // 2
+    alerts = []
+    for h in SMARTHistory.objects.filter(
+        aid__in=TREND_ATTRIBUTES, last_ts__gte=mid
+    ).select_related("disk"):
+        samples = history_samples(h)
+        times = [s[0] for s in samples]
+        # Raw value as at start, mid and now: that of the last sample by then.
+        start_raw, mid_raw = (
+            samples[max(bisect_right(times, t) - 1, 0)][1] for t in (start, mid)
+        )
+        previous = mid_raw - start_raw
+        recent = h.last_raw - mid_raw
+        if recent > 0 and recent > previous * settings.SMART_HISTORY["trend_factor"]:
+            alerts.append(
+                {
+                    "disk": h.disk.name,
+                    "aid": h.aid,
+                    "name": h.name,
+                    "raw": h.last_raw,
+                    "previous": previous,
+                    "recent": recent,
+                }
+            )
+    return alerts
+
+
+def evaluate_trends():
+    alerts = trend_alerts()
+    for a in alerts:
+        logger.error(
+            "Disk ({disk}) SMART attribute {aid} ({name}) is accelerating: "
+            "raw value {raw}, up {recent} from {previous} before.".format(**a)
+        )
+    HUEY.put(TREND_ALERTS_KEY, alerts)
+
+
+# Low priority: behind all other Huey tasks queued meanwhile.
+@db_periodic_task(crontab(minute="17"), priority=-10)
+def collect_smart_history():
+    """
+    Hourly: sample SMART attributes of all attached, SMART enabled, disks
+    bar those in a low power mode, then evaluate trends.
+    """
+    disks = Disk.objects.filter(
+        smart_available=True, smart_enabled=True, offline=False
+    ).exclude(name__startswith="detached-")
+    graph = TaskGraph(settings.SMART_HISTORY["workers"])
+    tasks = []
+    for disk in disks:
+        task = graph.add("smart", all_info, disk.name, disk.smart_options, True)
+        tasks.append((disk, task))
+    graph.close()
+    ts = int(time.time())
+    for disk, task in tasks:
+        if task.exception() is not None or task.result() is None:
+            # Failed (logged by our graph), or in standby.
+            continue
+        record_history(
+            disk, ts, [(t[0], t[1], t[9]) for t in task.result().attributes.values()]
+        )
+    evaluate_trends()
+
+
+@db_periodic_task(crontab(hour="3", minute="41"))
+def rollup_smart_history():
+    """
+    Daily: fold SMARTInfo trees older than SMART_HISTORY["info_retention"]
+    days, bar the latest of each disk, into our history then delete them.
+    Drop history older than SMART_HISTORY["retention"] days.
+    """
+    now = datetime.now(timezone.utc)
+    cutoff = now - timedelta(days=settings.SMART_HISTORY["info_retention"])
+    latest = SMARTInfo.objects.values("disk").annotate(latest=Max("id"))
+    old = (
+        SMARTInfo.objects.filter(toc__lt=cutoff)
+        .exclude(id__in=[i["latest"] for i in latest])
+        .select_related("disk")
+        .order_by("toc")
+    )
+    rows = {}
+    for aid, name, raw_value, info in SMARTAttribute.objects.filter(
+        info__in=old
+    ).values_list("aid", "name", "raw_value", "info"):
+        rows.setdefault(info, []).append((aid, name, raw_value))
+    for si in old:
+        record_history(si.disk, int(si.toc.timestamp()), rows.get(si.id, []))
+    deleted = old.delete()[0]
+    history_cutoff = int(now.timestamp()) - settings.SMART_HISTORY["retention"] * 86400
+    trimmed = []
+    for h in SMARTHistory.objects.filter(first_ts__lt=history_cutoff):
+        samples = [s for s in history_samples(h) if s[0] >= history_cutoff]
+        if samples:
+            set_history_samples(h, samples)
+            trimmed.append(h)
+        else:
+            h.delete()
+    SMARTHistory.objects.bulk_update(
+        trimmed, ["first_ts", "first_raw", "last_ts", "last_raw", "count", "samples"]
+    )
+    logger.debug(
+        "SMART rollup: {} old rows deleted, {} histories trimmed.".format(
+            deleted, len(trimmed)
+        )
+    )
@@ -49,6 +49,18 @@ logger = logging.getLogger(__name__)
 
 class SnapshotView(NFSExportMixin, rfc.GenericView):
     serializer_class = SnapshotSerializer
+    sort_fields = {
+        "id": "id",
+        "name": "name",
+        "size": "size",
+        "usage": "rusage",
+        "rusage": "rusage",
+        "eusage": "eusage",
+        "toc": "toc",
+        "snap_type": "snap_type",
+        "writable": "writable",
+        "uvisible": "uvisible",
+    }
 
     def get_queryset(self, *args, **kwargs):
         with self._handle_exception(self.request):
@@ -56,7 +68,7 @@ class SnapshotView(NFSExportMixin, rfc.GenericView):
                 share = Share.objects.get(id=self.kwargs["sid"])
             except:
                 if "sid" not in self.kwargs:
-                    return Snapshot.objects.filter().order_by("-id")
+                    return Snapshot.objects.order_by(*self.get_ordering())
 
                 e_msg = ("Share id ({}) does not exist.").format(self.kwargs["sid"])
                 handle_exception(Exception(e_msg), self.request)
@@ -71,12 +83,10 @@ class SnapshotView(NFSExportMixin, rfc.GenericView):
                     return []
 
             snap_type = self.request.query_params.get("snap_type", None)
+            snapshots = Snapshot.objects.filter(share=share)
             if snap_type is not None and snap_type != "":
-                return Snapshot.objects.filter(
-                    share=share, snap_type=snap_type
-                ).order_by("-id")
-
-            return Snapshot.objects.filter(share=share).order_by("-id")
+                snapshots = snapshots.filter(snap_type=snap_type)
+            return snapshots.order_by(*self.get_ordering())
 
     @transaction.atomic
     def _toggle_visibility(self, share, snap_name, snap_qgroup, on=True):
@@ -0,0 +1,90 @@
+"""
+Copyright (joint work) 2024 The Rockstor Project <https://rockstor.com>
+
+Rockstor is free software; you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published
+by the Free Software Foundation; either version 2 of the License,
+or (at your option) any later version.
+
+Rockstor is distributed in the hope that it will be useful, but
+WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program. If not, see <https://www.gnu.org/licenses/>.
+"""
+
+"""
+Short-lived, explicitly invalidated, in-process caches for system state
+lookups that run commands or parse /proc, e.g. those behind our Pool, Share,
+and Disk model properties. Serializing a list of models then costs one lookup
+per object (pool, device) per ttl window rather than one per row and property.
+
+Each cache is registered against one or more tags (e.g. "quotas") so that
+code changing that state (e.g. quota operations) can invalidate all related
+caches within its process. Mount state needs none of this: see
+system.osi.MountTable. Across processes staleness is bounded by
+the short ttl, and for the API by clearing all caches at the start of each
+request (storageadmin.middleware.SystemCacheMiddleware).
+"""
+
+import threading
+import time
+from functools import wraps
+
+# tag: [cached function, ...]
+_registry: dict[str, list] = {}
+# All cached functions, tagged or not.
+_all: list = []
+
+
+def ttl_cache(ttl: float, tags: tuple[str, ...] = ()):
+    """
+    Decorator: cache the return value of a function, per positional
+    arguments, for ttl seconds. Exceptions are not cached.
+    The wrapped function gains a cache_clear() method.
+    :param ttl: seconds a cached value remains valid.
+    :param tags: invalidate() tags that clear this cache.
+    """
+
+    def decorator(func):
+        cache = {}
+        lock = threading.Lock()
+
+        @wraps(func)
+        def wrapper(*args):
+            now = time.monotonic()
+            with lock:
+                entry = cache.get(args)
+            if entry is not None and now - entry[0] < ttl:
+                return entry[1]
+            value = func(*args)
+            with lock:
+                cache[args] = (now, value)
+            return value
+
+        def cache_clear():
+            with lock:
+                cache.clear()
+
+        wrapper.cache_clear = cache_clear
+        _all.append(wrapper)
+        for tag in tags:
+            _registry.setdefault(tag, []).append(wrapper)
+        return wrapper
+
+    return decorator
+
+
+def invalidate(*tags: str):
+    """Clear all caches registered against any of the given tags."""
+    for tag in tags:
+        for cached_func in _registry.get(tag, []):
+            cached_func.cache_clear()
+
+
+def invalidate_all():
+    """Clear all caches, e.g. at the start of each API request."""
+    for cached_func in _all:
+        cached_func.cache_clear()
@@ -21,9 +21,11 @@ import logging
 import os
 import re
 import shutil
+import select
 import signal
 import stat
 import subprocess  # TODO: consider drop in replacement of subprocess32 module
+import threading
 import time
 import uuid
 from socket import inet_ntoa
@@ -34,6 +36,7 @@ from typing import AnyStr, IO
 
 from django.conf import settings
 
+from system.cache import invalidate
 from system.exceptions import CommandException, NonBTRFSRootException
 from system.constants import (
     SYSTEMCTL,
@@ -54,6 +57,8 @@ CHATTR = "/usr/bin/chattr"
 DD = "/usr/bin/dd"
 DNSDOMAIN = "/usr/bin/dnsdomainname"
 EXPORTFS = "/usr/sbin/exportfs"
+NFS_ETAB = "/var/lib/nfs/etab"
+NFS_EXPORTS = "/etc/exports"
 GRUBBY = "/usr/sbin/grubby"
 HDPARM = "/usr/sbin/hdparm"
 HDPARM_SERVICE_NAME = "rockstor-hdparm.service"
@@ -67,6 +72,7 @@ SYSTEMD_DIR = "/usr/lib/systemd/system"
 WIPEFS = "/usr/sbin/wipefs"
 RTC_WAKE_FILE = "/sys/class/rtc/rtc0/wakealarm"
 PING = "/usr/bin/ping"
+MOUNTINFO = "/proc/self/mountinfo"
 RETURN_BOOLEAN = True
 EXCLUDED_MOUNT_DEVS = [
     "sysfs",
@@ -131,6 +137,21 @@ Disk = collections.namedtuple(
     defaults=[False, False, {}],
 )
 
+# MountTable entry, options as per /proc/mounts.
+MountEntry = collections.namedtuple(
+    "MountEntry", ["source", "mnt_pt", "fstype", "options"]
+)
+# Superblock flags listed, in /proc/mounts, ahead of the per mount flags.
+SB_MOUNT_FLAGS = ("sync", "dirsync", "mand", "lazytime")
+
+try:
+    # gevent's monkey patched poll() (data_collector) ignores POLLPRI.
+    from gevent.monkey import get_original
+
+    _poll = get_original("select", "poll")
+except ImportError:
+    _poll = select.poll
+
 
 # List of tuples to identify a partitions parent via
 # re.fullmatch(base_dev_pattern, partition_dev.name, re.ASCII).
@@ -572,6 +593,135 @@ def bind_mount(mnt_pt, export_pt):
     return True
 
 
+# exportfs(8) flag options as mutually exclusive pairs: default first.
+NFS_EXPORT_FLAGS = (
+    ("ro", "rw"),
+    ("sync", "async"),
+    ("secure", "insecure"),
+    ("wdelay", "no_wdelay"),
+    ("hide", "nohide"),
+    ("nocrossmnt", "crossmnt"),
+    ("no_subtree_check", "subtree_check"),
+    ("secure_locks", "insecure_locks"),
+    ("root_squash", "no_root_squash"),
+    ("no_all_squash", "all_squash"),
+    ("acl", "no_acl"),
+    ("no_pnfs", "pnfs"),
+)
+NFS_EXPORT_ALIASES = {"auth_nlm": "secure_locks", "no_auth_nlm": "insecure_locks"}
+# exportfs(8) "key=value" option defaults.
+NFS_EXPORT_VALUES = {"sec": "sys", "anonuid": "65534", "anongid": "65534"}
+
+
+def nfs_export_options(options) -> dict:
+    """
+    Export options expanded to include all exportfs defaults, so that our
+    option_list and an etab entry compare equal only if in full effect alike:
+    e.g. "rw,async" and "rw,async,no_root_squash" do not.
+    :param options: list of options, e.g. ["rw", "async"]: the last of a
+    mutually exclusive pair, or of a key, wins.
+    :return: {flag pair default or key: option or value}, e.g.
+    {"ro": "rw", "root_squash": "root_squash", "sec": "sys", ...}
+    """
+    expanded = {pair[0]: pair[0] for pair in NFS_EXPORT_FLAGS}
+    expanded.update(NFS_EXPORT_VALUES)
+    for o in options:
+        if o == "":
+            continue
+        o = NFS_EXPORT_ALIASES.get(o, o)
+        if "=" in o:
+            key, value = o.split("=", 1)
+            expanded[key] = value
+            continue
+        for pair in NFS_EXPORT_FLAGS:
+            if o in pair:
+                expanded[pair[0]] = o
+                break
+        else:
+            # Unknown flag: as its own key.
+            expanded[o] = o
+    return expanded
+
+
+def nfs_export_table():
+    """
+    Current kernel NFS export table, as maintained by exportfs in etab: one
+    "export_point<tab>client(options)" line per exported client, with options
+    expanded to include all defaults.
+    :return: {(client_str, export_point): options as per nfs_export_options()}
+    """
+    table = {}
+    try:
+        with open(NFS_ETAB) as efo:
+            lines = efo.readlines()
+    except FileNotFoundError:  # nfs-utils never run.
+        return table
+    for line in lines:
+        fields = line.strip().split("\t", 1)
+        if len(fields) != 2 or "(" not in fields[1]:
+            continue
+        client_str, options = fields[1].rsplit("(", 1)
+        if client_str == "<world>":
+            client_str = "*"
+        table[(client_str, fields[0])] = nfs_export_options(
+            options.rstrip(")").split(",")
+        )
+    return table
+
+
+def nfs_exports_diff(current, wanted, managed):
+    """
+    Minimal set of changes to take the current kernel export table to wanted.
+    An export is unchanged if the kernel's options, defaults included, are
+    exactly our requested options plus defaults: an option we no longer
+    request, e.g. no_root_squash, is re-exported without.
+    :param current: as per nfs_export_table()
+    :param wanted: {(client_str, export_point): option_list string}
+    :param managed: function returning True for export points we manage:
+    others, e.g. from /etc/exports.d, are left as is.
+    :return: (unexport list of (client_str, export_point),
+    export {option_list: [(client_str, export_point), ]})
+    """
+    unexport = sorted(k for k in current if k not in wanted and managed(k[1]))
+    export = {}
+    for k, option_list in wanted.items():
+        if k in current and nfs_export_options(option_list.split(",")) == current[k]:
+            continue
+        export.setdefault(option_list, []).append(k)
+    return unexport, export
+
+
+def write_exports(export_lines):
+    """
+    Atomically replace /etc/exports, if changed, with the given lines.
+    :return: True if /etc/exports was changed.
+    """
+    content = "".join(export_lines)
+    try:
+        with open(NFS_EXPORTS) as efo:
+            if efo.read() == content:
+                return False
+    except FileNotFoundError:
+        pass
+    fo, npath = mkstemp(dir=os.path.dirname(NFS_EXPORTS))
+    with os.fdopen(fo, "w") as efo:
+        efo.write(content)
+        efo.flush()
+        os.fsync(efo.fileno())
+    os.chmod(npath, 0o644)
+    os.replace(npath, NFS_EXPORTS)
+    return True
+
+
+def exports_file_points() -> set:
+    """Export points in /etc/exports: i.e. those we wrote last time."""
+    try:
+        with open(NFS_EXPORTS) as efo:
+            return {l.split()[0] for l in efo if l.strip() and l[0] != "#"}
+    except FileNotFoundError:
+        return set()
+
+
 def refresh_nfs_exports(exports):
     """
     input format:
@@ -582,55 +732,63 @@ def refresh_nfs_exports(exports):
                        ...}
 
     if 'clients' is an empty list, then unmount and cleanup.
-    """
-    fo, npath = mkstemp()
-    with open(npath, "w") as efo:
-        shares = []
-        for e in exports.keys():
-            if len(exports[e]) == 0:
-                #  do share tear down at the end, only snaps here
-                if len(e.split("/")) == 4:
-                    nfs4_mount_teardown(e)
-                else:
-                    shares.append(e)
-                continue
 
-            if not is_mounted(e):
-                bind_mount(exports[e][0]["mnt_pt"], e)
-            client_str = ""
-            admin_host = None
-            for c in exports[e]:
-                run_command(
-                    [
-                        EXPORTFS,
-                        "-i",
-                        "-o",
-                        c["option_list"],
-                        "{}:{}".format(c["client_str"], e),
-                    ]
-                )
-                client_str = "{}{}({}) ".format(
-                    client_str, c["client_str"], c["option_list"]
-                )
-                if "admin_host" in c:
-                    admin_host = c["admin_host"]
-            if admin_host is not None:
-                run_command(
-                    [
-                        EXPORTFS,
-                        "-i",
-                        "-o",
-                        "rw,no_root_squash",
-                        "{}:{}".format(admin_host, e),
-                    ]
-                )
-                client_str = "{} {}(rw,no_root_squash)".format(client_str, admin_host)
-            export_str = "{} {}\n".format(e, client_str)
-            efo.write(export_str)
-        for s in shares:
-            nfs4_mount_teardown(s)
-    shutil.move(npath, "/etc/exports")
-    return run_command([EXPORTFS, "-ra"])
+    Only the differences between the kernel's current export table and our
+    input are applied, see nfs_exports_diff(): existing unchanged exports are
+    not touched, and at most one exportfs call is made per distinct
+    option_list, plus one for all removals. /etc/exports is then rewritten
+    atomically to persist our input across reboots.
+    """
+    wanted = {}
+    export_lines = []
+    teardown_snaps = []
+    teardown_shares = []
+    for e in exports.keys():
+        if len(exports[e]) == 0:
+            #  do share tear down at the end, only snaps here
+            if len(e.split("/")) == 4:
+                teardown_snaps.append(e)
+            else:
+                teardown_shares.append(e)
+            continue
+
+        if not is_mounted(e):
+            bind_mount(exports[e][0]["mnt_pt"], e)
+        client_str = ""
+        admin_host = None
+        for c in exports[e]:
+            wanted[(c["client_str"], e)] = c["option_list"]
+            client_str = "{}{}({}) ".format(
+                client_str, c["client_str"], c["option_list"]
+            )
+            if "admin_host" in c:
+                admin_host = c["admin_host"]
+        if admin_host is not None:
+            wanted[(admin_host, e)] = "rw,no_root_squash"
+            client_str = "{} {}(rw,no_root_squash)".format(client_str, admin_host)
+        export_lines.append("{} {}\n".format(e, client_str))
+
+    ours = exports_file_points().union(exports.keys())
+
+    def managed(export_pt):
+        return export_pt in ours or export_pt.startswith(settings.NFS_EXPORT_ROOT)
+
+    unexport, export = nfs_exports_diff(nfs_export_table(), wanted, managed)
+    out, err, rc = [""], [""], 0
+    if unexport:
+        out, err, rc = run_command(
+            [EXPORTFS, "-u"] + ["{}:{}".format(c, e) for c, e in unexport]
+        )
+    for e in teardown_snaps + teardown_shares:
+        nfs4_mount_teardown(e)
+    for option_list, clients in export.items():
+        out, err, rc = run_command(
+            [EXPORTFS, "-i", "-o", option_list]
+            + ["{}:{}".format(c, e) for c, e in clients]
+        )
+    if write_exports(export_lines):
+        logger.debug("Updated {}.".format(NFS_EXPORTS))
+    return out, err, rc
 
 
 def config_network_device(
@@ -816,63 +974,152 @@ def is_mounted(mnt_pt):
     return mount_status(mnt_pt, RETURN_BOOLEAN)
 
 
+class MountTable(object):
+    """
+    Process wide view of /proc/self/mountinfo, indexed by mount point and by
+    source device, skipping EXCLUDED_MOUNT_DEVS. Our mountinfo fd is kept
+    open: the kernel flags it (POLLPRI) on any mount or umount in our mount
+    namespace, so a zero timeout poll() per lookup tells us when to re-read.
+    Lookups otherwise cost a dict access, however many mounts there are.
+    Where a mount point is stacked the first listed wins.
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self.fd = None
+        self.pid = None
+        self.poller = None
+        self.lock = threading.Lock()
+        self.by_mnt_pt = {}
+        self.by_source = {}
+
+    def invalidate(self):
+        """Re-read on next lookup, e.g. for a path that cannot be polled."""
+        with self.lock:
+            self._close()
+
+    def _close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+        self.fd = None
+
+    def _changed(self) -> bool:
+        if self.fd is None or self.pid != os.getpid():
+            # Not yet read, or forked: the fd (and its event) is our parent's.
+            self._close()
+            self.fd = os.open(self.path or MOUNTINFO, os.O_RDONLY)
+            self.pid = os.getpid()
+            self.poller = _poll()
+            self.poller.register(self.fd, select.POLLPRI)
+            return True
+        return any(ev & select.POLLPRI for fd, ev in self.poller.poll(0))
+
+    def _read(self):
+        os.lseek(self.fd, 0, os.SEEK_SET)
+        chunks = []
+        while True:
+            chunk = os.read(self.fd, 65536)
+            if not chunk:
+                break
+            chunks.append(chunk)
+        by_mnt_pt = {}
+        by_source = {}
+        for line in b"".join(chunks).decode("utf-8", "replace").splitlines():
+            entry = parse_mountinfo_line(line)
+            if entry is None or entry.source in EXCLUDED_MOUNT_DEVS:
+                continue
+            by_mnt_pt.setdefault(entry.mnt_pt, entry)
+            by_source.setdefault(entry.source, []).append(entry)
+        self.by_mnt_pt = by_mnt_pt
+        self.by_source = by_source
+
+    def refresh(self):
+        with self.lock:
+            if self._changed():
+                self._read()
+
+    def get(self, mnt_pt):
+        """:return: MountEntry of mnt_pt, or None if not mounted."""
+        self.refresh()
+        return self.by_mnt_pt.get(mnt_pt)
+
+    def mounts_of(self, source) -> list:
+        """:return: MountEntry list of source (e.g. /dev/sda), in mount order."""
+        self.refresh()
+        return self.by_source.get(source, [])
+
+    def entries(self):
+        self.refresh()
+        return self.by_mnt_pt
+
+
+def parse_mountinfo_line(line):
+    """
+    :param line: /proc/self/mountinfo line, e.g.:
+    "36 35 98:0 / /mnt2/p rw,noatime - btrfs /dev/sda rw,space_cache=v2"
+    :return: MountEntry with /proc/mounts style options, or None if invalid.
+    """
+    fields = line.split()
+    try:
+        sep = fields.index("-", 6)
+        mnt_pt, mnt_opts = fields[4], fields[5].split(",")
+        fstype, source, super_opts = fields[sep + 1 : sep + 4]
+    except ValueError:
+        return None
+    super_opts = super_opts.split(",")
+    # As /proc/mounts: ro if either is, superblock flags, per mount flags,
+    # then the filesystem's own options.
+    access = "ro" if "ro" in (mnt_opts[0], super_opts[0]) else "rw"
+    sb_flags = [o for o in super_opts[1:] if o in SB_MOUNT_FLAGS]
+    fs_opts = [o for o in super_opts[1:] if o not in SB_MOUNT_FLAGS]
+    options = ",".join([access] + sb_flags + mnt_opts[1:] + fs_opts)
+    return MountEntry(source, mnt_pt, fstype, options)
+
+
+# Process wide instance behind our mount helpers below.
+mounts = MountTable()
+
+
+def mount_table():
+    """
+    :return: {mnt_pt: mount_options, ...} of all current mounts, see
+    MountTable.
+    """
+    return {mnt_pt: e.options for mnt_pt, e in mounts.entries().items()}
+
+
 def mount_status(mnt_pt, return_boolean=False):
     """
-    Parses /proc/mounts to extract the status of a given mount point.
-    Line fields are as follows:
-    dev_name mount_point fstype mount_options dummy_value dummy_value
-    In either mode this function typically takes around 0.05ms without GC.
-    It should be kept light as it is called frequently by Pool and Share
-    models via their mount_status and is_mounted properties.
+    Status of a given mount point, from our process wide MountTable: a dict
+    lookup, refreshed only when the kernel signals a mount change. It is
+    called frequently by Pool and Share models via their mount_status and
+    is_mounted properties.
     :param mnt_pt: pool (volume) or subvolume mount point (with full path).
     :param return_boolean: If set to 'True' only a boolean is returned,
     otherwise a string of current mount options, or 'unmounted', is returned.
     :return: if return_boolean then True or False depending on mount state.
     If return_boolean=False (default) then a string is returned of the current
-    mount options, or 'unmounted' if no relevant /proc/mounts entry was found.
-    """
-    with open("/proc/mounts") as pfo:
-        # See in-developemnt test_mount_status() re the following line:
-        # for each_line in pfo.read().splitlines():
-        for each_line in pfo.readlines():
-            line_fields = each_line.split()
-            if len(line_fields) < 4:
-                # Avoid index issues as we expect >= 4 columns.
-                continue
-            if line_fields[0] in EXCLUDED_MOUNT_DEVS:
-                # Skip excluded/special mount devices ie sysfs, proc, etc.
-                continue
-            if line_fields[1] == mnt_pt:
-                # We have an active mount, return according to personality.
-                if return_boolean:
-                    return True
-                return line_fields[3]
+    mount options (as per /proc/mounts), or 'unmounted' if not mounted.
+    """
+    entry = mounts.get(mnt_pt)
     if return_boolean:
-        return False
-    return "unmounted"
+        return entry is not None
+    return "unmounted" if entry is None else entry.options
 
 
 def dev_mount_point(dev_temp_name):
     """
-    Parses /proc/mounts to return the first associated mount point for a given
-    device temp name (ie /dev/sda).
+    Returns the first associated mount point for a given device temp name
+    (ie /dev/sda), from our process wide MountTable.
     Note this is trivially different from mount_status() but intended initially
     for use by set_pool_label.
     :param dev_temp_name: /dev/sda3 or /dev/bcache0, or /dev/mapper/luks-...
     :return: None if note device match found or first associated mount point.
     """
-    with open("/proc/mounts") as pfo:
-        for each_line in pfo.readlines():
-            line_fields = each_line.split()
-            if len(line_fields) < 4:
-                # Avoid index issues as we expect >= 4 columns.
-                continue
-            if line_fields[0] in EXCLUDED_MOUNT_DEVS:
-                # Skip excluded/special mount devices ie sysfs, proc, etc.
-                continue
-            if line_fields[0] == dev_temp_name:
-                logger.debug("dev_mount_point returning {}".format(line_fields[1]))
-                return line_fields[1]
+    entries = mounts.mounts_of(dev_temp_name)
+    if entries:
+        logger.debug("dev_mount_point returning {}".format(entries[0].mnt_pt))
+        return entries[0].mnt_pt
     logger.debug("dev_mount_point() returning None")
     return None
 
@@ -1643,6 +1890,7 @@ def set_disk_spindown(
     )
     # hdparm ran without issues or we are about to remove this devices setting
     # so attempt to edit rockstor-hdparm.service with the same entry
+    invalidate("disks")
     if update_hdparm_service(hdparm_command, spindown_message) is not True:
         return False
     return True
@@ -2206,7 +2454,9 @@ def enter_standby(dev_byid):
     """
     # TODO: candidate for move to system/hdparm
     hdparm_command = [HDPARM, "-q", "-y", get_device_path(dev_byid)]
-    return run_command(hdparm_command)
+    out = run_command(hdparm_command)
+    invalidate("disks")
+    return out
 
 
 def hostid():
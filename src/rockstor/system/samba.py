@@ -21,16 +21,17 @@ import shutil
 from tempfile import mkstemp
 
 from django.conf import settings
+from django.db.models import prefetch_related_objects
 
 from system.osi import run_command
 from system.services import service_status, define_avahi_service
-from storageadmin.models import SambaCustomConfig
 
 TESTPARM = "/usr/bin/testparm"
 SMB_CONFIG = "/etc/samba/smb.conf"
 TM_CONFIG = "/etc/avahi/services/timemachine.service"
 SYSTEMCTL = "/usr/bin/systemctl"
 CHMOD = "/usr/bin/chmod"
+SMBCONTROL = "/usr/bin/smbcontrol"
 RS_SHARES_HEADER = "####BEGIN: Rockstor SAMBA CONFIG####"
 RS_SHARES_FOOTER = "####END: Rockstor SAMBA CONFIG####"
 RS_AD_HEADER = "####BEGIN: Rockstor ACTIVE DIRECTORY CONFIG####"
@@ -47,66 +48,98 @@ def test_parm(config="/etc/samba/smb.conf"):
     return True
 
 
-def rockstor_smb_config(fo, exports):
-    mnt_helper = "poetry run mnt-share"
-    fo.write("{}\n".format(RS_SHARES_HEADER))
+# Rockstor section share templates, see rockstor_smb_config().
+# root preexec requires `poetry run` in ROOT_DIR to gain .env defined environment.
+SHARE_TEMPLATE = """[{name}]
+    root preexec = sh -c "cd {root_dir} && poetry run mnt-share {name}"
+    root preexec close = yes
+    comment = {comment}
+    path = {path}
+    browseable = {browsable}
+    read only = {read_only}
+    guest ok = {guest_ok}
+"""
+SHADOW_COPY_TEMPLATE = """    shadow:format = .{prefix}_%Y%m%d%H%M
+    shadow:basedir = {path}
+    shadow:snapdir = ./
+    shadow:sort = desc
+    shadow:localtime = yes
+    vfs objects = shadow_copy2
+    veto files = /.{prefix}*/
+"""
+TIME_MACHINE_TEMPLATE = """    vfs objects = catia fruit streams_xattr
+    fruit:time machine = yes
+    fruit:metadata = stream
+    fruit:veto_appledouble = no
+    fruit:posix_rename = no
+    fruit:wipe_intentionally_left_blank_rfork = yes
+    fruit:delete_empty_adfiles = yes
+    fruit:encoding = private
+    fruit:locking = none
+    fruit:resource = file
+"""
+
+
+def rockstor_smb_config(exports):
+    """
+    Render our smb.conf section for the given SambaShares: related shares,
+    admin users, and custom config are fetched in one query each for all
+    exports, rather than per export.
+    :param exports: list of SambaShare
+    :return: Rockstor section as string, header and footer included.
+    """
+    prefetch_related_objects(exports, "share", "admin_users", "sambacustomconfig_set")
+    section = ["{}\n".format(RS_SHARES_HEADER)]
     for e in exports:
-        admin_users = ""
-        for au in e.admin_users.all():
-            admin_users = "{}{} ".format(admin_users, au.username)
-        fo.write("[{}]\n".format(e.share.name))
-        # Requires `poetry run` in ROOT_DIR to gain .env defined environment.
-        fo.write(f"    root preexec = sh -c \"cd {settings.ROOT_DIR} && {mnt_helper} {e.share.name}\"\n")
-        fo.write("    root preexec close = yes\n")
-        fo.write("    comment = {}\n".format(e.comment.encode("utf-8")))
-        fo.write("    path = {}\n".format(e.path))
-        fo.write("    browseable = {}\n".format(e.browsable))
-        fo.write("    read only = {}\n".format(e.read_only))
-        fo.write("    guest ok = {}\n".format(e.guest_ok))
+        section.append(
+            SHARE_TEMPLATE.format(
+                name=e.share.name,
+                root_dir=settings.ROOT_DIR,
+                comment=e.comment,
+                path=e.path,
+                browsable=e.browsable,
+                read_only=e.read_only,
+                guest_ok=e.guest_ok,
+            )
+        )
+        admin_users = "".join("{} ".format(au.username) for au in e.admin_users.all())
         if len(admin_users) > 0:
-            fo.write("    admin users = {}\n".format(admin_users))
+            section.append("    admin users = {}\n".format(admin_users))
         if e.shadow_copy:
-            fo.write(
-                "    shadow:format = ." + e.snapshot_prefix + "_%Y%m%d%H%M\n"
-            )  # noqa E501
-            fo.write("    shadow:basedir = {}\n".format(e.path))
-            fo.write("    shadow:snapdir = ./\n")
-            fo.write("    shadow:sort = desc\n")
-            fo.write("    shadow:localtime = yes\n")
-            fo.write("    vfs objects = shadow_copy2\n")
-            fo.write("    veto files = /.{}*/\n".format(e.snapshot_prefix))
+            section.append(
+                SHADOW_COPY_TEMPLATE.format(prefix=e.snapshot_prefix, path=e.path)
+            )
         elif e.time_machine:
-            fo.write("    vfs objects = catia fruit streams_xattr\n")
-            fo.write("    fruit:time machine = yes\n")
-            fo.write("    fruit:metadata = stream\n")
-            fo.write("    fruit:veto_appledouble = no\n")
-            fo.write("    fruit:posix_rename = no\n")
-            fo.write("    fruit:wipe_intentionally_left_blank_rfork = yes\n")
-            fo.write("    fruit:delete_empty_adfiles = yes\n")
-            fo.write("    fruit:encoding = private\n")
-            fo.write("    fruit:locking = none\n")
-            fo.write("    fruit:resource = file\n")
-        for cco in SambaCustomConfig.objects.filter(smb_share=e):
+            section.append(TIME_MACHINE_TEMPLATE)
+        for cco in e.sambacustomconfig_set.all():
             if cco.custom_config.strip():
-                fo.write("    {}\n".format(cco.custom_config))
-    fo.write("{}\n".format(RS_SHARES_FOOTER))
+                section.append("    {}\n".format(cco.custom_config))
+    section.append("{}\n".format(RS_SHARES_FOOTER))
+    return "".join(section)
 
 
 def refresh_smb_config(exports):
+    """
+    Re-write the Rockstor section of smb.conf for the given SambaShares,
+    leaving the preceding [global] section as is. Skipped if the resulting
+    config is unchanged.
+    :param exports: list of SambaShare
+    :return: True if smb.conf was changed: see reload_samba().
+    """
+    with open(SMB_CONFIG) as sfo:
+        cur_config = sfo.read()
+    header = cur_config.find(RS_SHARES_HEADER)
+    if header == -1:
+        header = len(cur_config)
+    new_config = cur_config[:header] + rockstor_smb_config(exports)
+    if new_config == cur_config:
+        return False
     fh, npath = mkstemp()
-    with open(SMB_CONFIG) as sfo, open(npath, "w") as tfo:
-        rockstor_section = False
-        for line in sfo.readlines():
-            if re.match(RS_SHARES_HEADER, line) is not None:
-                rockstor_section = True
-                rockstor_smb_config(tfo, exports)
-                break
-            else:
-                tfo.write(line)
-        if rockstor_section is False:
-            rockstor_smb_config(tfo, exports)
+    with open(npath, "w") as tfo:
+        tfo.write(new_config)
     test_parm(npath)
     shutil.move(npath, SMB_CONFIG)
+    return True
 
 
 # write out new [global] section and re-write the existing rockstor section.
@@ -227,6 +260,14 @@ def restart_samba(hard=False):
     return run_command([SYSTEMCTL, mode, "nmb"], log=True)
 
 
+def reload_samba():
+    """
+    Have running smbd and nmbd re-read smb.conf: unlike restart_samba() this
+    keeps established client sessions. Sufficient for share (section) changes.
+    """
+    return run_command([SMBCONTROL, "all", "reload-config"], log=True)
+
+
 def refresh_smb_discovery(exports):
     """
     This function is designed to identify the list of shares
@@ -15,6 +15,8 @@ You should have received a copy of the GNU General Public License
 along with this program. If not, see <http://www.gnu.org/licenses/>.
 """
 
+import collections
+import json
 import logging
 import re
 from shutil import move
@@ -35,6 +37,24 @@ CAT = "/usr/bin/cat"
 # default setting = False
 TESTMODE = False
 
+# ATA error log error codes, as given by smartctl.
+ERROR_CODES = {
+    "ABRT": "Command ABoRTed",
+    "AMNF": "Address Mark Not Found",
+    "CCTO": "Command Completion Timed Out",
+    "EOM": "End Of Media",
+    "ICRC": "Interface Cyclic Redundancy Code (CRC) error",
+    "IDNF": "IDentity Not Found",
+    "ILI": "(packet command-set specific)",
+    "MC": "Media Changed",
+    "MCR": "Media Change Request",
+    "NM": "No Media",
+    "obs": "obsolete",
+    "TK0NF": "TracK 0 Not Found",
+    "UNC": "UNCorrectable Error in Data",
+    "WP": "Media is Write Protected",
+}
+
 
 def info(device, custom_options="", test_mode=TESTMODE):
     """
@@ -196,22 +216,6 @@ def error_logs(device, custom_options="", test_mode=TESTMODE):
         "the Error logs tab for this device." % local_base_dev
     )
     screen_return_codes(e_msg, overide_rc, o, e, rc, smart_command)
-    ecode_map = {
-        "ABRT": "Command ABoRTed",
-        "AMNF": "Address Mark Not Found",
-        "CCTO": "Command Completion Timed Out",
-        "EOM": "End Of Media",
-        "ICRC": "Interface Cyclic Redundancy Code (CRC) error",
-        "IDNF": "IDentity Not Found",
-        "ILI": "(packet command-set specific)",
-        "MC": "Media Changed",
-        "MCR": "Media Change Request",
-        "NM": "No Media",
-        "obs": "obsolete",
-        "TK0NF": "TracK 0 Not Found",
-        "UNC": "UNCorrectable Error in Data",
-        "WP": "Media is Write Protected",
-    }
     summary = {}
     log_l = []
     for i in range(len(o)):
@@ -241,8 +245,8 @@ def error_logs(device, custom_options="", test_mode=TESTMODE):
                     e_substr = o[j].split("Error: ")[1]
                     e_fields = e_substr.split()
                     etype = e_fields[0]
-                    if etype in ecode_map:
-                        etype = ecode_map[etype]
+                    if etype in ERROR_CODES:
+                        etype = ERROR_CODES[etype]
                     details = (
                         " ".join(e_fields[1:])
                         if (len(e_fields) > 1)
@@ -319,11 +323,385 @@ def test_logs(device, custom_options="", test_mode=TESTMODE):
     return (test_d, log_l)
 
 
+# smartctl --json "when_failed" to our (smartctl -a text) WHEN_FAILED column.
+WHEN_FAILED = {"": "-", "now": "FAILING_NOW", "past": "In_the_past"}
+
+# All of info(), extended_info(), capabilities(), error_logs() and test_logs()
+# in their return formats, from one smartctl -x --json run: see all_info().
+SMARTData = collections.namedtuple(
+    "SMARTData",
+    "identity attributes capabilities error_summary error_lines tests test_lines",
+)
+
+
+def all_info(device, custom_options="", standby=False, test_mode=TESTMODE):
+    """
+    Retrieve all our SMART info from a single smartctl -x --json run, rather
+    than one smartctl run, parsed from text, per info type.
+    :param device: disk device name
+    :param standby: True to skip (via -n standby) a device in a low power
+    mode rather than spin it up.
+    :param test_mode: True causes cat from file rather than smartctl command
+    :return: SMARTData, or None if skipped as in a low power mode.
+    """
+    local_base_dev = get_dev_options(device, custom_options)
+    smart_command = [SMART, "-x", "--json"]
+    if standby:
+        smart_command += ["-n", "standby"]
+    smart_command += local_base_dev
+    if not test_mode:
+        o, e, rc = run_command(smart_command, throw=False)
+    else:  # we are testing so use a smartctl -x --json file dump instead
+        o, e, rc = run_command([CAT, "/root/smartdumps/smart-x-json.out"])
+    try:
+        data = json.loads("\n".join(o))
+    except ValueError:
+        data = {}
+    if standby and rc & 2:
+        for message in data.get("smartctl", {}).get("messages", []):
+            if re.match("Device is in .* mode", message.get("string", "")):
+                return None
+    # smartctl exit status bits: 0 command line, 1 device open (or low
+    # power mode), 2 some command failed (common with -x), 3 to 7 disk status
+    # as reported in the output itself.
+    if rc & 3:
+        e_msg = "non-zero code(%d) returned by command: %s output: %s error: %s" % (
+            rc,
+            smart_command,
+            o,
+            e,
+        )
+        logger.error(e_msg)
+        raise CommandException(("%s" % smart_command), o, e, rc)
+    if rc & 64:
+        # As for error_logs(): the error log contains errors.
+        e_msg = (
+            "Drive %s has logged S.M.A.R.T errors. Please view "
+            "the Error logs tab for this device." % local_base_dev
+        )
+        logger.error(e_msg)
+        email_root("S.M.A.R.T error", e_msg)
+    error_summary, error_lines = _json_error_logs(data)
+    tests, test_lines = _json_test_logs(data)
+    return SMARTData(
+        _json_identity(data),
+        _json_attributes(data),
+        _json_capabilities(data),
+        error_summary,
+        error_lines,
+        tests,
+        test_lines,
+    )
+
+
+def _json_identity(data):
+    """:return: smartctl --json data as per info()"""
+    wwn = data.get("wwn")
+    if wwn is not None:
+        wwn = "{:x} {:06x} {:09x}".format(wwn["naa"], wwn["oui"], wwn["id"])
+    else:
+        wwn = data.get("logical_unit_id", "")
+    capacity = ""
+    user_capacity = data.get("user_capacity", {}).get("bytes")
+    if user_capacity:
+        size = float(user_capacity)
+        for unit in ("bytes", "KB", "MB", "GB", "TB", "PB"):
+            if size < 1000:
+                break
+            size /= 1000
+        capacity = "{:,} bytes [{:.2f} {}]".format(user_capacity, size, unit)
+    sector_size = ""
+    if "logical_block_size" in data:
+        sector_size = "{} bytes logical".format(data["logical_block_size"])
+        if "physical_block_size" in data:
+            sector_size += ", {} bytes physical".format(data["physical_block_size"])
+    rotation_rate = data.get("rotation_rate")
+    if rotation_rate is not None:
+        rotation_rate = (
+            "Solid State Device"
+            if rotation_rate == 0
+            else "{} rpm".format(rotation_rate)
+        )
+    in_smartdb = data.get("in_smartctl_database")
+    if in_smartdb is not None:
+        in_smartdb = (
+            "In smartctl database [for details use: -P show]"
+            if in_smartdb
+            else "Not in smartctl database [for details use: -P showall]"
+        )
+    support = data.get("smart_support", {})
+    supported = enabled = ""
+    if support.get("available"):
+        supported = "Available - device has SMART capability."
+    if "enabled" in support:
+        enabled = "Enabled" if support["enabled"] else "Disabled"
+    smartctl = data.get("smartctl", {})
+    version = ""
+    if "version" in smartctl:
+        version = ".".join(str(v) for v in smartctl["version"])
+        if "svn_revision" in smartctl:
+            version += " r{}".format(smartctl["svn_revision"])
+    assessment = ""
+    if "passed" in data.get("smart_status", {}):
+        assessment = "PASSED" if data["smart_status"]["passed"] else "FAILED!"
+    res = [
+        data.get("model_family") or data.get("scsi_vendor"),
+        data.get("model_name") or data.get("scsi_product"),
+        data.get("serial_number"),
+        wwn,
+        data.get("firmware_version") or data.get("scsi_revision"),
+        capacity,
+        sector_size,
+        rotation_rate,
+        in_smartdb,
+        data.get("ata_version", {}).get("string"),
+        data.get("sata_version", {}).get("string"),
+        data.get("local_time", {}).get("asctime"),
+        supported,
+        enabled,
+        version,
+        assessment,
+    ]
+    # Limit to 64 chars for db, as info().
+    return [("" if r is None else str(r))[:64] for r in res]
+
+
+def _json_attributes(data):
+    """:return: smartctl --json data as per extended_info()"""
+    attributes = {}
+    for a in data.get("ata_smart_attributes", {}).get("table", []):
+        flags = a.get("flags", {})
+        attributes[a["name"]] = [
+            a["id"],
+            a["name"],
+            "0x{:04x}".format(flags.get("value", 0)),
+            a.get("value", 0),
+            a.get("worst", 0),
+            a.get("thresh", 999),
+            "Pre-fail" if flags.get("prefailure") else "Old_age",
+            "Always" if flags.get("updated_online") else "Offline",
+            WHEN_FAILED.get(a.get("when_failed", ""), a.get("when_failed")),
+            a.get("raw", {}).get("string", ""),
+        ]
+    return attributes
+
+
+def _json_capabilities(data):
+    """:return: smartctl --json data as per capabilities(), ATA / SATA only"""
+    smart_data = data.get("ata_smart_data", {})
+    cap_d = {}
+    offline = smart_data.get("offline_data_collection", {})
+    if "status" in offline:
+        cap_d["Offline data collection status"] = [
+            "0x{:02x}".format(offline["status"]["value"]),
+            "Offline data collection activity\n{}.".format(
+                offline["status"].get("string", "")
+            ),
+        ]
+    self_test = smart_data.get("self_test", {})
+    if "status" in self_test:
+        cap_d["Self-test execution status"] = [
+            str(self_test["status"]["value"]),
+            self_test["status"].get("string", ""),
+        ]
+    if "completion_seconds" in offline:
+        cap_d["Total time to complete Offline data collection"] = [
+            "",
+            "{} seconds.".format(offline["completion_seconds"]),
+        ]
+    capabilities_d = smart_data.get("capabilities", {})
+    values = capabilities_d.get("values", [])
+    if len(values) > 0:
+        lines = []
+        for key, yes, no in (
+            (
+                "exec_offline_immediate_supported",
+                "SMART execute Offline immediate.",
+                "No SMART execute Offline immediate.",
+            ),
+            (
+                "offline_is_aborted_upon_new_cmd",
+                "Abort Offline collection upon new command.",
+                "Suspend Offline collection upon new command.",
+            ),
+            (
+                "offline_surface_scan_supported",
+                "Offline surface scan supported.",
+                "No Offline surface scan supported.",
+            ),
+            (
+                "self_tests_supported",
+                "Self-test supported.",
+                "No Self-test supported.",
+            ),
+            (
+                "conveyance_self_test_supported",
+                "Conveyance Self-test supported.",
+                "No Conveyance Self-test supported.",
+            ),
+            (
+                "selective_self_test_supported",
+                "Selective Self-test supported.",
+                "No Selective Self-test supported.",
+            ),
+        ):
+            if key in capabilities_d:
+                lines.append(yes if capabilities_d[key] else no)
+        cap_d["Offline data collection capabilities"] = [
+            "0x{:02x}".format(values[0]),
+            "\n".join(lines),
+        ]
+    if len(values) > 1:
+        lines = [
+            (
+                "Saves SMART data before entering power-saving mode."
+                if values[1] & 1
+                else "Does not save SMART data before entering power-saving mode."
+            )
+        ]
+        if values[1] & 2:
+            lines.append("Supports SMART auto save timer.")
+        cap_d["SMART capabilities"] = ["0x{:04x}".format(values[1]), "\n".join(lines)]
+    if "error_logging_supported" in capabilities_d:
+        lines = [
+            (
+                "Error logging supported."
+                if capabilities_d["error_logging_supported"]
+                else "Error logging NOT supported."
+            )
+        ]
+        if capabilities_d.get("gp_logging_supported"):
+            lines.append("General Purpose Logging supported.")
+        cap_d["Error logging capability"] = [
+            "0x{:02x}".format(int(capabilities_d["error_logging_supported"])),
+            "\n".join(lines),
+        ]
+    polling = self_test.get("polling_minutes", {})
+    for key, name in (
+        ("short", "Short self-test routine recommended polling time"),
+        ("extended", "Extended self-test routine recommended polling time"),
+        ("conveyance", "Conveyance self-test routine recommended polling time"),
+    ):
+        if key in polling:
+            cap_d[name] = ["", "{} minutes.".format(polling[key])]
+    sct = data.get("ata_sct_capabilities")
+    if sct is not None:
+        lines = ["SCT Status supported."]
+        for key, line in (
+            (
+                "error_recovery_control_supported",
+                "SCT Error Recovery Control supported.",
+            ),
+            ("feature_control_supported", "SCT Feature Control supported."),
+            ("data_table_supported", "SCT Data Table supported."),
+        ):
+            if sct.get(key):
+                lines.append(line)
+        cap_d["SCT capabilities"] = ["0x{:04x}".format(sct["value"]), "\n".join(lines)]
+    return cap_d
+
+
+def _json_error_logs(data):
+    """:return: smartctl --json data as per error_logs(), ATA / SATA only"""
+    error_log = data.get("ata_smart_error_log", {})
+    log = error_log.get("extended") or error_log.get("summary") or {}
+    summary = {}
+    log_l = []
+    if "count" in log:
+        log_l.append("ATA Error Count: {}".format(log["count"]))
+    for entry in log.get("table", []):
+        err_num = str(entry.get("error_number"))
+        lifetime_hours = entry.get("lifetime_hours")
+        state = entry.get("device_state", {}).get("string")
+        description = entry.get("error_description", "")
+        e_fields = description.split("Error: ")[-1].split()
+        etype = ERROR_CODES.get(e_fields[0], e_fields[0]) if e_fields else None
+        details = (
+            " ".join(e_fields[1:])
+            if (len(e_fields) > 1)
+            else "No Sector Details Available"
+        )
+        summary[err_num] = list([lifetime_hours, state, etype, details])
+        log_l.append(
+            "Error {} occurred at disk power-on lifetime: {} hours".format(
+                err_num, lifetime_hours
+            )
+        )
+        if state is not None:
+            log_l.append(
+                "  When the command that caused the error occurred, the device "
+                "was {}.".format(state)
+            )
+        log_l.append("  {}".format(description))
+    return (summary, log_l)
+
+
+def _json_test_logs(data):
+    """:return: smartctl --json data as per test_logs(), ATA / SATA only"""
+    test_log = data.get("ata_smart_self_test_log", {})
+    log = test_log.get("extended") or test_log.get("standard") or {}
+    test_d = {}
+    log_l = []
+    if "revision" in log:
+        log_l.append(
+            "SMART Self-test log structure revision number {}".format(log["revision"])
+        )
+    for num, entry in enumerate(log.get("table", []), start=1):
+        status = entry.get("status", {})
+        test_d[str(num)] = [
+            entry.get("type", {}).get("string", ""),
+            status.get("string", ""),
+            100 - status.get("remaining_percent", 0),
+            entry.get("lifetime_hours", -1),
+            str(entry["lba"]) if "lba" in entry else "-",
+        ]
+    selective = data.get("ata_smart_selective_self_test_log", {})
+    if selective.get("table"):
+        log_l.append(" SPAN  MIN_LBA  MAX_LBA  CURRENT_TEST_STATUS")
+        for span, entry in enumerate(selective["table"], start=1):
+            log_l.append(
+                "{:>5}  {:>7}  {:>7}  {}".format(
+                    span,
+                    entry.get("lba_min", 0),
+                    entry.get("lba_max", 0),
+                    entry.get("status", {}).get("string", ""),
+                )
+            )
+    return (test_d, log_l)
+
+
 def run_test(device, test, custom_options=""):
     # start a smart test(short, long or conveyance)
     return run_command([SMART, "-t", test] + get_dev_options(device, custom_options))
 
 
+def abort_test(device, custom_options=""):
+    # abort a running smart test
+    return run_command([SMART, "-X"] + get_dev_options(device, custom_options))
+
+
+def self_test_remaining(device, custom_options="", test_mode=TESTMODE):
+    """
+    Parses the "Self-test execution status" capability, e.g.:
+    Self-test execution status:      ( 249) Self-test routine in progress...
+                                        90% of test remaining.
+    Whose value's high nibble is 15 while a test is in progress, and low
+    nibble the remaining tenths of the test. ATA / SATA only.
+    :return: percent of the running self-test remaining, or None if no
+    self-test is in progress (or the status is unavailable).
+    """
+    cap = capabilities(device, custom_options, test_mode).get(
+        "Self-test execution status"
+    )
+    try:
+        value = int(cap[0])
+    except (TypeError, ValueError):
+        return None
+    if value >> 4 != 15:
+        return None
+    return (value & 15) * 10
+
+
 def available(device, custom_options="", test_mode=TESTMODE):
     """
     Returns boolean pair: true if SMART support is available on the device and
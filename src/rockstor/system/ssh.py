@@ -26,7 +26,7 @@ from tempfile import mkstemp
 import distro
 from django.conf import settings
 
-from system.osi import run_command, get_libs
+from system.osi import run_command, get_libs, mount_table
 from system.constants import (
     MKDIR,
     MOUNT,
@@ -196,13 +196,10 @@ def toggle_sftp_service(switch=True):
 
 def sftp_mount_map(mnt_prefix):
     mnt_map = {}
-    with open("/proc/mounts") as pfo:
-        for line in pfo.readlines():
-            if re.search(" " + mnt_prefix, line) is not None:
-                fields = line.split()
-                sname = fields[1].split("/")[-1]
-                editable = fields[3][:2]
-                mnt_map[sname] = editable
+    for mnt_pt, mnt_options in mount_table().items():
+        if mnt_pt.startswith(mnt_prefix):
+            sname = mnt_pt.split("/")[-1]
+            mnt_map[sname] = mnt_options[:2]
     return mnt_map
 
 
@@ -0,0 +1,141 @@
+"""
+Copyright (joint work) 2024 The Rockstor Project <https://rockstor.com>
+
+Rockstor is free software; you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published
+by the Free Software Foundation; either version 2 of the License,
+or (at your option) any later version.
+
+Rockstor is distributed in the hope that it will be useful, but
+WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program. If not, see <https://www.gnu.org/licenses/>.
+"""
+
+"""
+A bounded pool of worker threads running a graph of tasks: each task once
+all those it is added "after" are done, and of those ready the lowest
+priority value first. Tasks may add further tasks, e.g. one per share found
+by a pool's task. Used by our bootstrap (see CommandView) to mount pools,
+and the shares of each pool, in parallel and to serve exports ahead of
+snapshot visibility.
+
+A failed task is logged, and its dependants run regardless: as in a serial
+loop that logs and moves on. Their own checks (e.g. pool.is_mounted) apply.
+"""
+
+import itertools
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from django import db
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class TaskGraph(object):
+    def __init__(self, workers: int):
+        self.queue = queue.PriorityQueue()
+        self.seq = itertools.count()
+        self.lock = threading.Lock()
+        self.idle = threading.Condition(self.lock)
+        self.pending = 0
+        self.start = time.monotonic()
+        # stage: {"tasks": n, "failed": n, "busy": s, "first": s, "last": s}
+        self.timings = {}
+        self.threads = [
+            threading.Thread(target=self._work, daemon=True) for i in range(workers)
+        ]
+        for t in self.threads:
+            t.start()
+
+    def add(self, stage: str, func, *args, after=(), priority=0) -> Future:
+        """
+        Run func(*args) once every future in after is done.
+        :param stage: name under which this task's timing is recorded.
+        :param priority: lower values run first among ready tasks.
+        :return: Future of func's return value.
+        """
+        future = Future()
+        waiting = [len(after)]
+        with self.lock:
+            self.pending += 1
+
+        def dep_done(_):
+            with self.lock:
+                waiting[0] -= 1
+                ready = waiting[0] == 0
+            if ready:
+                self.queue.put((priority, next(self.seq), stage, future, func, args))
+
+        if not after:
+            self.queue.put((priority, next(self.seq), stage, future, func, args))
+        for dep in after:
+            dep.add_done_callback(dep_done)
+        return future
+
+    def _work(self):
+        try:
+            while True:
+                priority, seq, stage, future, func, args = self.queue.get()
+                if future is None:
+                    break
+                future.set_running_or_notify_cancel()
+                started = time.monotonic()
+                try:
+                    future.set_result(func(*args))
+                except Exception as e:
+                    logger.error(
+                        "Exception in ({}) task {}: {}".format(stage, args, e.__str__())
+                    )
+                    logger.exception(e)
+                    future.set_exception(e)
+                self._record(stage, started, time.monotonic(), future.exception())
+        finally:
+            # Django opens a db connection per thread: close ours.
+            db.connections.close_all()
+
+    def _record(self, stage, started, ended, exception):
+        with self.lock:
+            timing = self.timings.setdefault(
+                stage,
+                {"tasks": 0, "failed": 0, "busy": 0.0, "first": None, "last": 0.0},
+            )
+            timing["tasks"] += 1
+            timing["failed"] += exception is not None
+            timing["busy"] += ended - started
+            if timing["first"] is None:
+                timing["first"] = started - self.start
+            timing["last"] = max(timing["last"], ended - self.start)
+            self.pending -= 1
+            if self.pending == 0:
+                self.idle.notify_all()
+
+    def join(self):
+        """Wait for all tasks, including those added meanwhile, to finish."""
+        with self.lock:
+            self.idle.wait_for(lambda: self.pending == 0)
+
+    def close(self) -> dict:
+        """
+        Wait for all tasks then stop our workers.
+        :return: per stage timings: task count, failed count, total busy
+        seconds, and seconds since our start of the first task start and the
+        last task end.
+        """
+        self.join()
+        for t in self.threads:
+            self.queue.put((float("inf"), next(self.seq), None, None, None, ()))
+        for t in self.threads:
+            t.join()
+        return {
+            stage: {k: v if type(v) is int else round(v, 3) for k, v in t.items()}
+            for stage, t in self.timings.items()
+        }
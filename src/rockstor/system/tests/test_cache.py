@@ -0,0 +1,146 @@
+"""
+Copyright (joint work) 2024 The Rockstor Project <https://rockstor.com>
+
+Rockstor is free software; you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published
+by the Free Software Foundation; either version 2 of the License,
+or (at your option) any later version.
+
+Rockstor is distributed in the hope that it will be useful, but
+WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program. If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import os
+import tempfile
+import unittest
+from unittest.mock import patch, MagicMock
+
+from django.test import TestCase
+
+from system.cache import ttl_cache, invalidate, invalidate_all
+from system.osi import MountTable
+
+MOUNTINFO = (
+    "29 1 0:26 /@ / rw,relatime shared:1 - btrfs /dev/sda3 rw,subvol=/@\n"
+    "95 29 0:40 / /mnt2/rock-pool rw,relatime - btrfs /dev/sdb rw,subvol=/\n"
+    "97 29 0:40 /share-1 /mnt2/share-1 rw - btrfs /dev/sdb rw,subvol=/share-1\n"
+)
+
+
+class TTLCacheTests(unittest.TestCase):
+    """
+    The tests in this suite can be run via the following command:
+    cd /opt/rockstor/src/rockstor
+    export DJANGO_SETTINGS_MODULE=settings
+    poetry run django-admin test -p test_cache.py -v 2
+    """
+
+    def test_ttl_cache(self):
+        source = MagicMock(side_effect=lambda arg: arg * 2)
+        cached = ttl_cache(10, tags=("test-tag",))(source)
+        with patch("system.cache.time.monotonic", return_value=100):
+            self.assertEqual(cached(1), 2)
+            self.assertEqual(cached(1), 2)
+            self.assertEqual(cached(2), 4)
+            self.assertEqual(source.call_count, 2)
+        # Expired.
+        with patch("system.cache.time.monotonic", return_value=110):
+            cached(1)
+            self.assertEqual(source.call_count, 3)
+            # Tagged, and global, invalidation.
+            invalidate("other-tag")
+            cached(1)
+            self.assertEqual(source.call_count, 3)
+            invalidate("test-tag")
+            cached(1)
+            self.assertEqual(source.call_count, 4)
+            invalidate_all()
+            cached(1)
+            self.assertEqual(source.call_count, 5)
+
+    def test_exceptions_not_cached(self):
+        source = MagicMock(side_effect=[Exception("busy"), "ok"])
+        cached = ttl_cache(10)(source)
+        with self.assertRaises(Exception):
+            cached()
+        self.assertEqual(cached(), "ok")
+        self.assertEqual(cached(), "ok")
+        self.assertEqual(source.call_count, 2)
+
+
+class ModelPropertyCacheTests(TestCase):
+    """
+    Serializing many shares costs one lookup per pool, not per share.
+    """
+
+    databases = "__all__"
+
+    def setUp(self):
+        from storageadmin.models import Pool, Share
+
+        invalidate_all()
+        self.patches = {
+            name: patch(name)
+            for name in (
+                "storageadmin.models.pool.pool_missing_dev_count",
+                "storageadmin.models.pool.dev_stats_zero",
+                "storageadmin.models.pool.pool_usage",
+                "storageadmin.models.pool.are_quotas_enabled",
+                "storageadmin.models.share.qgroup_ids",
+            )
+        }
+        self.mocks = {name: p.start() for name, p in self.patches.items()}
+        fh, self.mountinfo = tempfile.mkstemp()
+        with os.fdopen(fh, "w") as mfo:
+            mfo.write(MOUNTINFO)
+        self.patch_mounts = patch("system.osi.mounts", MountTable(self.mountinfo))
+        self.patch_mounts.start()
+        self.mocks["storageadmin.models.pool.pool_missing_dev_count"].return_value = 0
+        self.mocks["storageadmin.models.pool.pool_usage"].return_value = 1024
+        self.mocks["storageadmin.models.share.qgroup_ids"].return_value = [
+            "0/5",
+            "2015/1",
+        ]
+        pool = Pool.objects.create(name="rock-pool", raid="single", size=2048)
+        for n in range(20):
+            Share.objects.create(
+                pool=pool,
+                name=f"share-{n}",
+                qgroup=f"0/{257 + n}",
+                pqgroup="2015/1" if n % 2 else "2015/99",
+                size=1024,
+            )
+
+    def tearDown(self):
+        for p in self.patches.values():
+            p.stop()
+        self.patch_mounts.stop()
+        os.remove(self.mountinfo)
+        invalidate_all()
+
+    def test_share_serialization(self):
+        from storageadmin.models import Share
+        from storageadmin.serializers import ShareSerializer
+
+        invalidate_all()
+        for mock in self.mocks.values():
+            mock.reset_mock(return_value=False, side_effect=False)
+        data = ShareSerializer(
+            Share.objects.select_related("pool").order_by("id"), many=True
+        ).data
+        self.assertEqual(len(data), 20)
+        self.assertTrue(data[1]["is_mounted"])
+        self.assertFalse(data[2]["is_mounted"])
+        self.assertEqual([s["pqgroup_exist"] for s in data[:2]], [False, True])
+        for name, mock in self.mocks.items():
+            self.assertLessEqual(mock.call_count, 1, msg=name)
+            mock.reset_mock()
+        # Within the ttl a repeat costs no lookups at all.
+        ShareSerializer(Share.objects.select_related("pool"), many=True).data
+        for name, mock in self.mocks.items():
+            self.assertEqual(mock.call_count, 0, msg=name)
@@ -15,6 +15,10 @@ You should have received a copy of the GNU General Public License
 along with this program. If not, see <https://www.gnu.org/licenses/>.
 """
 import operator
+import os
+import shutil
+import tempfile
+import time
 import unittest
 from unittest.mock import patch, mock_open, call
 
@@ -28,6 +32,13 @@ from system.osi import (
     replace_pattern_inline,
     root_disk,
     get_libs,
+    refresh_nfs_exports,
+    EXPORTFS,
+    MountTable,
+    parse_mountinfo_line,
+    mount_status,
+    mount_table,
+    dev_mount_point,
 )
 
 
@@ -4059,3 +4070,285 @@ class OSITests(unittest.TestCase):
             returned = get_libs(p)
             self.maxDiff = None
             self.assertListEqual(returned, expected)
+
+
+class NFSExportsTests(unittest.TestCase):
+    """
+    The tests in this suite can be run via the following:
+    cd /opt/rockstor/src/rockstor
+    poetry run django-admin test -v 2 -p test_osi*
+    """
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.etab = os.path.join(self.tmp_dir, "etab")
+        self.exports = os.path.join(self.tmp_dir, "exports")
+        patch("system.osi.NFS_ETAB", self.etab).start()
+        patch("system.osi.NFS_EXPORTS", self.exports).start()
+        self.mock_run_command = patch("system.osi.run_command").start()
+        self.mock_run_command.return_value = [""], [""], 0
+        patch("system.osi.is_mounted", return_value=True).start()
+        self.mock_teardown = patch("system.osi.nfs4_mount_teardown").start()
+
+    def tearDown(self):
+        patch.stopall()
+        shutil.rmtree(self.tmp_dir)
+
+    def write_etab(self, lines):
+        with open(self.etab, "w") as efo:
+            efo.writelines(lines)
+
+    @staticmethod
+    def etab_line(export_pt, client_str, option_list):
+        # As per exportfs: all defaults, as overridden by our options.
+        return (
+            "{}\t{}(ro,sync,wdelay,hide,nocrossmnt,secure,root_squash,"
+            "no_all_squash,no_subtree_check,secure_locks,acl,no_pnfs,"
+            "anonuid=65534,anongid=65534,sec=sys,{})\n".format(
+                export_pt, client_str, option_list
+            )
+        )
+
+    def test_refresh_nfs_exports(self):
+        self.write_etab(
+            [
+                self.etab_line("/export/share1", "*", "ro,async,insecure"),
+                self.etab_line("/export/share2", "192.168.1.0/24", "rw,sync,secure"),
+                self.etab_line("/export/gone", "*", "ro,async,insecure"),
+                # Not ours, e.g. from /etc/exports.d
+                self.etab_line("/srv/other", "*", "rw,sync,secure"),
+            ]
+        )
+        mnt = {"mnt_pt": "/mnt2/share"}
+        exports = {
+            "/export/share1": [
+                dict(mnt, client_str="*", option_list="ro,async,insecure")
+            ],
+            "/export/share2": [
+                dict(mnt, client_str="192.168.1.0/24", option_list="ro,async,insecure")
+            ],
+            "/export/share3": [
+                dict(
+                    mnt,
+                    client_str="*",
+                    option_list="ro,async,insecure",
+                    admin_host="admin",
+                )
+            ],
+            "/export/empty": [],
+        }
+        refresh_nfs_exports(exports)
+        self.assertEqual(
+            self.mock_run_command.call_args_list,
+            [
+                call([EXPORTFS, "-u", "*:/export/gone"]),
+                call(
+                    [
+                        EXPORTFS,
+                        "-i",
+                        "-o",
+                        "ro,async,insecure",
+                        "192.168.1.0/24:/export/share2",
+                        "*:/export/share3",
+                    ]
+                ),
+                call(
+                    [EXPORTFS, "-i", "-o", "rw,no_root_squash", "admin:/export/share3"]
+                ),
+            ],
+        )
+        self.mock_teardown.assert_called_once_with("/export/empty")
+        with open(self.exports) as efo:
+            self.assertEqual(
+                efo.read(),
+                "/export/share1 *(ro,async,insecure) \n"
+                "/export/share2 192.168.1.0/24(ro,async,insecure) \n"
+                "/export/share3 *(ro,async,insecure)  admin(rw,no_root_squash)\n",
+            )
+        # Once applied, nothing left to do.
+        self.write_etab(
+            [
+                self.etab_line("/export/share1", "*", "ro,async,insecure"),
+                self.etab_line("/export/share2", "192.168.1.0/24", "ro,async,insecure"),
+                self.etab_line("/export/share3", "*", "ro,async,insecure"),
+                self.etab_line("/export/share3", "admin", "rw,no_root_squash"),
+                self.etab_line("/srv/other", "*", "rw,sync,secure"),
+            ]
+        )
+        self.mock_run_command.reset_mock()
+        mtime = os.stat(self.exports).st_mtime_ns
+        refresh_nfs_exports(exports)
+        self.mock_run_command.assert_not_called()
+        self.assertEqual(os.stat(self.exports).st_mtime_ns, mtime)
+
+    def test_refresh_nfs_exports_removed_option(self):
+        # Options dropped from a client, not just added, are applied.
+        self.write_etab(
+            [
+                self.etab_line("/export/share1", "*", "rw,no_root_squash,async"),
+                self.etab_line("/export/share2", "*", "rw,nohide,async"),
+            ]
+        )
+        mnt = {"mnt_pt": "/mnt2/share"}
+        exports = {
+            "/export/share1": [dict(mnt, client_str="*", option_list="rw,async")],
+            "/export/share2": [dict(mnt, client_str="*", option_list="rw,async")],
+        }
+        refresh_nfs_exports(exports)
+        self.mock_run_command.assert_called_once_with(
+            [
+                EXPORTFS,
+                "-i",
+                "-o",
+                "rw,async",
+                "*:/export/share1",
+                "*:/export/share2",
+            ]
+        )
+        # Defaults, explicit or not, are no change.
+        self.write_etab(
+            [
+                self.etab_line("/export/share1", "*", "rw,async"),
+                self.etab_line("/export/share2", "*", "rw,async,hide,sec=sys"),
+            ]
+        )
+        self.mock_run_command.reset_mock()
+        refresh_nfs_exports(exports)
+        self.mock_run_command.assert_not_called()
+
+    def test_refresh_nfs_exports_1000(self):
+        """
+        Benchmark: a single client change within 1,000 exports with 2 clients
+        each. Previously 2,001 exportfs calls, the last re-exporting all.
+        """
+        exports = {}
+        etab = []
+        for i in range(1000):
+            export_pt = "/export/share{}".format(i)
+            exports[export_pt] = []
+            for client_str in ("*", "10.0.{}.0/24".format(i % 256)):
+                exports[export_pt].append(
+                    {
+                        "client_str": client_str,
+                        "option_list": "ro,async,insecure",
+                        "mnt_pt": "/mnt2/share{}".format(i),
+                    }
+                )
+                etab.append(self.etab_line(export_pt, client_str, "ro,async,insecure"))
+        self.write_etab(etab)
+        exports["/export/share500"][1]["option_list"] = "rw,async,insecure"
+        start = time.monotonic()
+        refresh_nfs_exports(exports)
+        elapsed = time.monotonic() - start
+        self.mock_run_command.assert_called_once_with(
+            [
+                EXPORTFS,
+                "-i",
+                "-o",
+                "rw,async,insecure",
+                "10.0.244.0/24:/export/share500",
+            ]
+        )
+        self.assertLess(elapsed, 2.0)
+
+
+MOUNTINFO = (
+    "22 1 0:21 / /sys rw,nosuid,nodev,noexec,relatime shared:2 - sysfs sysfs rw\n"
+    "29 1 0:26 /@ / rw,relatime shared:1 - btrfs /dev/sda3 "
+    "rw,space_cache,subvolid=258,subvol=/@\n"
+    "95 29 0:40 / /mnt2/rock-pool rw,noatime shared:50 - btrfs /dev/sdb "
+    "rw,compress=lzo,space_cache,subvolid=5,subvol=/\n"
+    "97 29 0:40 /share-1 /mnt2/share-1 ro,relatime shared:52 - btrfs /dev/sdb "
+    "rw,space_cache,subvolid=257,subvol=/share-1\n"
+    "98 29 0:41 / /mnt2/share-1 rw,relatime shared:53 - btrfs /dev/sdc "
+    "rw,subvolid=5,subvol=/\n"
+)
+
+
+class MountTableTests(unittest.TestCase):
+    """
+    The tests in this suite can be run via the following command:
+    cd /opt/rockstor/src/rockstor
+    export DJANGO_SETTINGS_MODULE=settings
+    poetry run django-admin test -p test_osi.py -v 2
+    """
+
+    def setUp(self):
+        fh, self.path = tempfile.mkstemp()
+        os.close(fh)
+        self.write_mountinfo(MOUNTINFO)
+        self.mounts = MountTable(self.path)
+        patch("system.osi.mounts", self.mounts).start()
+
+    def tearDown(self):
+        patch.stopall()
+        self.mounts.invalidate()
+        os.remove(self.path)
+
+    def write_mountinfo(self, content):
+        with open(self.path, "w") as mfo:
+            mfo.write(content)
+
+    def test_parse_mountinfo_line(self):
+        # As /proc/mounts: superblock flags, then per mount, then fs options.
+        entry = parse_mountinfo_line(MOUNTINFO.splitlines()[2])
+        self.assertEqual(entry.source, "/dev/sdb")
+        self.assertEqual(entry.mnt_pt, "/mnt2/rock-pool")
+        self.assertEqual(entry.fstype, "btrfs")
+        self.assertEqual(
+            entry.options, "rw,noatime,compress=lzo,space_cache,subvolid=5,subvol=/"
+        )
+        # Read only per mount, on a read write superblock.
+        entry = parse_mountinfo_line(MOUNTINFO.splitlines()[3])
+        self.assertTrue(entry.options.startswith("ro,relatime,"))
+        # Optional fields (none here) before the separator.
+        entry = parse_mountinfo_line(
+            "30 29 0:27 / /boot ro - vfat /dev/sda1 ro,sync,fmask=0022"
+        )
+        self.assertEqual(entry.options, "ro,sync,fmask=0022")
+        self.assertIsNone(parse_mountinfo_line("garbage"))
+
+    def test_mount_table(self):
+        self.assertEqual(
+            mount_table(),
+            {
+                "/": "rw,relatime,space_cache,subvolid=258,subvol=/@",
+                "/mnt2/rock-pool": (
+                    "rw,noatime,compress=lzo,space_cache,subvolid=5,subvol=/"
+                ),
+                # Stacked mount point: the first listed wins.
+                "/mnt2/share-1": (
+                    "ro,relatime,space_cache,subvolid=257,subvol=/share-1"
+                ),
+            },
+        )
+        self.assertTrue(mount_status("/mnt2/rock-pool", return_boolean=True))
+        self.assertFalse(mount_status("/sys", return_boolean=True))  # excluded.
+        self.assertFalse(mount_status("/mnt2/share-2", return_boolean=True))
+        self.assertEqual(mount_status("/mnt2/share-2"), "unmounted")
+        self.assertEqual(dev_mount_point("/dev/sdb"), "/mnt2/rock-pool")
+        self.assertEqual(dev_mount_point("/dev/sdc"), "/mnt2/share-1")
+        self.assertIsNone(dev_mount_point("/dev/sdd"))
+
+    def test_refresh(self):
+        self.assertTrue(mount_status("/mnt2/rock-pool", return_boolean=True))
+        # A regular file never signals a change: no re-read until invalidated.
+        self.write_mountinfo(MOUNTINFO.splitlines(True)[1])
+        self.assertTrue(mount_status("/mnt2/rock-pool", return_boolean=True))
+        self.mounts.invalidate()
+        self.assertFalse(mount_status("/mnt2/rock-pool", return_boolean=True))
+        self.assertEqual(list(mount_table()), ["/"])
+
+    def test_change_notification(self):
+        # Our own mount namespace: read once, then only on a signalled change.
+        mounts = MountTable()
+        with patch.object(mounts, "_read", wraps=mounts._read) as mock_read:
+            self.assertIn("/", mounts.entries())
+            for i in range(1000):
+                mounts.get("/")
+            self.assertEqual(mock_read.call_count, 1)
+            with patch("system.osi.os.getpid", return_value=-1):
+                # As after a fork: our own fd, so re-read.
+                mounts.get("/")
+            self.assertEqual(mock_read.call_count, 2)
+        mounts.invalidate()
@@ -0,0 +1,281 @@
+"""
+Copyright (joint work) 2024 The Rockstor Project <https://rockstor.com>
+
+Rockstor is free software; you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published
+by the Free Software Foundation; either version 2 of the License,
+or (at your option) any later version.
+
+Rockstor is distributed in the hope that it will be useful, but
+WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program. If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import json
+import unittest
+from unittest.mock import patch
+
+from system.exceptions import CommandException
+from system.smart import all_info, SMART
+
+# Abridged smartctl -x --json output of a SATA disk.
+SMARTCTL_X_JSON = {
+    "smartctl": {"version": [7, 2], "svn_revision": "5155", "exit_status": 64},
+    "device": {"name": "/dev/sda", "type": "sat", "protocol": "ATA"},
+    "model_family": "Western Digital Red",
+    "model_name": "WDC WD40EFRX-68N32N0",
+    "serial_number": "WD-WCC7K1234567",
+    "wwn": {"naa": 5, "oui": 5358, "id": 12345678901},
+    "firmware_version": "82.00A82",
+    "user_capacity": {"blocks": 7814037168, "bytes": 4000787030016},
+    "logical_block_size": 512,
+    "physical_block_size": 4096,
+    "rotation_rate": 5400,
+    "in_smartctl_database": True,
+    "ata_version": {"string": "ACS-3 T13/2161-D revision 5", "major_value": 2040},
+    "sata_version": {"string": "SATA 3.1, 6.0 Gb/s (current: 6.0 Gb/s)"},
+    "local_time": {"time_t": 1700000000, "asctime": "Tue Nov 14 22:13:20 2023 GMT"},
+    "smart_support": {"available": True, "enabled": True},
+    "smart_status": {"passed": True},
+    "ata_smart_data": {
+        "offline_data_collection": {
+            "status": {"value": 0, "string": "was never started"},
+            "completion_seconds": 44400,
+        },
+        "self_test": {
+            "status": {
+                "value": 249,
+                "string": "in progress, 90% remaining",
+                "remaining_percent": 90,
+            },
+            "polling_minutes": {"short": 2, "extended": 470, "conveyance": 5},
+        },
+        "capabilities": {
+            "values": [123, 3],
+            "exec_offline_immediate_supported": True,
+            "offline_is_aborted_upon_new_cmd": False,
+            "offline_surface_scan_supported": True,
+            "self_tests_supported": True,
+            "conveyance_self_test_supported": True,
+            "selective_self_test_supported": True,
+            "attribute_autosave_enabled": True,
+            "error_logging_supported": True,
+            "gp_logging_supported": True,
+        },
+    },
+    "ata_sct_capabilities": {
+        "value": 12349,
+        "error_recovery_control_supported": True,
+        "feature_control_supported": True,
+        "data_table_supported": True,
+    },
+    "ata_smart_attributes": {
+        "revision": 16,
+        "table": [
+            {
+                "id": 1,
+                "name": "Raw_Read_Error_Rate",
+                "value": 200,
+                "worst": 200,
+                "thresh": 51,
+                "when_failed": "",
+                "flags": {"value": 47, "prefailure": True, "updated_online": True},
+                "raw": {"value": 0, "string": "0"},
+            },
+            {
+                "id": 194,
+                "name": "Temperature_Celsius",
+                "value": 114,
+                "worst": 102,
+                "thresh": 0,
+                "when_failed": "past",
+                "flags": {"value": 34, "prefailure": False, "updated_online": True},
+                "raw": {"value": 36, "string": "36"},
+            },
+        ],
+    },
+    "ata_smart_error_log": {
+        "extended": {
+            "revision": 1,
+            "count": 2,
+            "table": [
+                {
+                    "error_number": 2,
+                    "lifetime_hours": 4201,
+                    "device_state": {"value": 1, "string": "active or idle"},
+                    "error_description": "Error: UNC at LBA = 0x0fffffff = 268435455",
+                },
+                {
+                    "error_number": 1,
+                    "lifetime_hours": 4200,
+                    "error_description": "Error: ABRT",
+                },
+            ],
+        }
+    },
+    "ata_smart_self_test_log": {
+        "extended": {
+            "revision": 1,
+            "table": [
+                {
+                    "type": {"value": 1, "string": "Short offline"},
+                    "status": {"value": 0, "string": "Completed without error"},
+                    "lifetime_hours": 4210,
+                },
+                {
+                    "type": {"value": 2, "string": "Extended offline"},
+                    "status": {
+                        "value": 121,
+                        "string": "Completed: read failure",
+                        "remaining_percent": 10,
+                    },
+                    "lifetime_hours": 4100,
+                    "lba": 268435455,
+                },
+            ],
+        }
+    },
+    "ata_smart_selective_self_test_log": {
+        "table": [
+            {"lba_min": 0, "lba_max": 0, "status": {"string": "Not_testing"}},
+        ]
+    },
+}
+
+
+class SMARTTests(unittest.TestCase):
+    """
+    The tests in this suite can be run via the following command:
+    cd /opt/rockstor/src/rockstor
+    export DJANGO_SETTINGS_MODULE=settings
+    poetry run django-admin test -p test_smart.py -v 2
+    """
+
+    def setUp(self):
+        self.patch_run_command = patch("system.smart.run_command")
+        self.mock_run_command = self.patch_run_command.start()
+        self.patch_email_root = patch("system.smart.email_root")
+        self.mock_email_root = self.patch_email_root.start()
+        self.patch_dev_options = patch(
+            "system.smart.get_dev_options", return_value=["/dev/sda"]
+        )
+        self.patch_dev_options.start()
+
+    def tearDown(self):
+        patch.stopall()
+
+    def smartctl(self, data, rc=0):
+        out = json.dumps(data, indent=2).split("\n")
+        self.mock_run_command.return_value = out, [""], rc
+
+    def test_all_info(self):
+        self.smartctl(SMARTCTL_X_JSON, rc=64)
+        data = all_info("ata-WDC_WD40EFRX-68N32N0_WD-WCC7K1234567")
+        # One smartctl run for all our info.
+        self.mock_run_command.assert_called_once_with(
+            [SMART, "-x", "--json", "/dev/sda"], throw=False
+        )
+        # Error log entries: as error_logs(), root is emailed.
+        self.mock_email_root.assert_called_once()
+        self.assertEqual(
+            data.identity,
+            [
+                "Western Digital Red",
+                "WDC WD40EFRX-68N32N0",
+                "WD-WCC7K1234567",
+                "5 0014ee 2dfdc1c35",
+                "82.00A82",
+                "4,000,787,030,016 bytes [4.00 TB]",
+                "512 bytes logical, 4096 bytes physical",
+                "5400 rpm",
+                "In smartctl database [for details use: -P show]",
+                "ACS-3 T13/2161-D revision 5",
+                "SATA 3.1, 6.0 Gb/s (current: 6.0 Gb/s)",
+                "Tue Nov 14 22:13:20 2023 GMT",
+                "Available - device has SMART capability.",
+                "Enabled",
+                "7.2 r5155",
+                "PASSED",
+            ],
+        )
+        self.assertEqual(
+            data.attributes["Temperature_Celsius"],
+            [194, "Temperature_Celsius", "0x0022", 114, 102, 0]
+            + ["Old_age", "Always", "In_the_past", "36"],
+        )
+        self.assertEqual(
+            data.attributes["Raw_Read_Error_Rate"][6:9], ["Pre-fail", "Always", "-"]
+        )
+        self.assertEqual(data.capabilities["Self-test execution status"][0], "249")
+        self.assertEqual(
+            data.capabilities["Extended self-test routine recommended polling time"],
+            ["", "470 minutes."],
+        )
+        self.assertEqual(
+            data.capabilities["SMART capabilities"],
+            [
+                "0x0003",
+                "Saves SMART data before entering power-saving mode.\n"
+                "Supports SMART auto save timer.",
+            ],
+        )
+        self.assertIn(
+            "Suspend Offline collection upon new command.",
+            data.capabilities["Offline data collection capabilities"][1],
+        )
+        self.assertEqual(
+            data.error_summary,
+            {
+                "2": [4201, "active or idle", "UNCorrectable Error in Data"]
+                + ["at LBA = 0x0fffffff = 268435455"],
+                "1": [4200, None, "Command ABoRTed", "No Sector Details Available"],
+            },
+        )
+        self.assertEqual(data.error_lines[0], "ATA Error Count: 2")
+        self.assertEqual(
+            data.tests,
+            {
+                "1": ["Short offline", "Completed without error", 100, 4210, "-"],
+                "2": ["Extended offline", "Completed: read failure", 90, 4100]
+                + ["268435455"],
+            },
+        )
+        self.assertEqual(
+            data.test_lines[0], "SMART Self-test log structure revision number 1"
+        )
+
+    def test_all_info_standby(self):
+        standby = {
+            "smartctl": {
+                "version": [7, 2],
+                "messages": [
+                    {
+                        "string": "Device is in STANDBY mode, exit(2)",
+                        "severity": "information",
+                    }
+                ],
+                "exit_status": 2,
+            }
+        }
+        self.smartctl(standby, rc=2)
+        self.assertIsNone(all_info("ata-disk", standby=True))
+        self.mock_run_command.assert_called_once_with(
+            [SMART, "-x", "--json", "-n", "standby", "/dev/sda"], throw=False
+        )
+        # Otherwise: a device open failure.
+        with self.assertRaises(CommandException):
+            all_info("ata-disk")
+
+    def test_all_info_no_smart_data(self):
+        # e.g. a USB bridge without SAT passthrough, or non json output.
+        self.smartctl({"smartctl": {"exit_status": 4}}, rc=4)
+        data = all_info("usb-disk")
+        self.assertEqual(data.identity, [""] * 16)
+        self.assertEqual(data.attributes, {})
+        self.assertEqual(data.tests, {})
+        self.mock_run_command.return_value = [""], [""], 0
+        self.assertEqual(all_info("usb-disk").capabilities, {})
@@ -0,0 +1,99 @@
+"""
+Copyright (joint work) 2024 The Rockstor Project <https://rockstor.com>
+
+Rockstor is free software; you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published
+by the Free Software Foundation; either version 2 of the License,
+or (at your option) any later version.
+
+Rockstor is distributed in the hope that it will be useful, but
+WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program. If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import threading
+import time
+import unittest
+
+from system.task_graph import TaskGraph
+
+
+class TaskGraphTests(unittest.TestCase):
+    """
+    The tests in this suite can be run via the following command:
+    cd /opt/rockstor/src/rockstor
+    export DJANGO_SETTINGS_MODULE=settings
+    poetry run django-admin test -p test_task_graph.py -v 2
+    """
+
+    def setUp(self):
+        self.lock = threading.Lock()
+        self.ran = []
+        self.running = 0
+        self.max_running = 0
+
+    def task(self, name, duration=0.01):
+        with self.lock:
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+        time.sleep(duration)
+        with self.lock:
+            self.running -= 1
+            self.ran.append(name)
+        return name
+
+    def test_dependencies(self):
+        graph = TaskGraph(4)
+        pools = [graph.add("pools", self.task, "pool{}".format(i)) for i in range(3)]
+
+        def import_shares(i):
+            # Tasks adding tasks: one per share of this pool.
+            for j in range(2):
+                graph.add("shares", self.task, "share{}-{}".format(i, j))
+
+        for i, pool in enumerate(pools):
+            graph.add("import", import_shares, i, after=(pool,))
+        graph.join()
+        self.assertEqual(len(self.ran), 9)
+        export = graph.add("exports", self.task, "exports")
+        self.assertEqual(export.result(), "exports")
+        timings = graph.close()
+        for name in self.ran:
+            if name.startswith("share"):
+                pool_name = "pool{}".format(name[5])
+                self.assertLess(self.ran.index(pool_name), self.ran.index(name))
+        self.assertEqual(timings["pools"]["tasks"], 3)
+        self.assertEqual(timings["shares"]["tasks"], 6)
+        self.assertEqual(timings["exports"]["failed"], 0)
+        self.assertGreaterEqual(timings["exports"]["first"], timings["shares"]["last"])
+        self.assertGreater(self.max_running, 1)
+        self.assertLessEqual(self.max_running, 4)
+
+    def test_priority(self):
+        graph = TaskGraph(1)
+        gate = graph.add("gate", self.task, "gate", 0.1)
+        # Queued while our only worker is busy: lowest priority value first.
+        for i in range(3):
+            graph.add("snapshots", self.task, "snap{}".format(i), priority=1)
+        graph.add("exports", self.task, "nfs")
+        graph.close()
+        self.assertTrue(gate.done())
+        self.assertEqual(self.ran, ["gate", "nfs", "snap0", "snap1", "snap2"])
+
+    def test_failure(self):
+        graph = TaskGraph(2)
+
+        def fail():
+            raise Exception("mount failed")
+
+        failed = graph.add("pools", fail)
+        dependant = graph.add("shares", self.task, "share", after=(failed,))
+        timings = graph.close()
+        self.assertEqual(str(failed.exception()), "mount failed")
+        # Dependants still run: as in a serial loop that logs and moves on.
+        self.assertEqual(dependant.result(), "share")
+        self.assertEqual(timings["pools"]["failed"], 1)
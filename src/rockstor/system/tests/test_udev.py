@@ -0,0 +1,92 @@
+"""
+Copyright (joint work) 2024 The Rockstor Project <https://rockstor.com>
+
+Rockstor is free software; you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published
+by the Free Software Foundation; either version 2 of the License,
+or (at your option) any later version.
+
+Rockstor is distributed in the hope that it will be useful, but
+WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program. If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import struct
+import unittest
+
+from system.udev import parse_uevent, block_event_devices, UDEV_MAGIC
+
+
+def libudev_message(properties: list[str]) -> bytes:
+    body = b"\0".join(p.encode() for p in properties) + b"\0"
+    header_size = 40
+    header = b"libudev\0" + struct.pack(">I", UDEV_MAGIC)
+    header += struct.pack("=IIIIIII", header_size, header_size, len(body), 0, 0, 0, 0)
+    return header + body
+
+
+class UdevTests(unittest.TestCase):
+    """
+    The tests in this suite can be run via the following command:
+    cd /opt/rockstor/src/rockstor
+    export DJANGO_SETTINGS_MODULE=settings
+    poetry run django-admin test -p test_udev.py -v 2
+    """
+
+    def test_parse_uevent(self):
+        add_sdb = [
+            "ACTION=add",
+            "DEVPATH=/devices/pci0000:00/0000:00:1f.2/ata2/host1/target1:0:0/"
+            "1:0:0:0/block/sdb",
+            "SUBSYSTEM=block",
+            "DEVNAME=/dev/sdb",
+            "DEVTYPE=disk",
+            "ID_SERIAL=WDC_WD40EFRX-68N32N0_WD-WCC7K0XXXXXX",
+            "DEVLINKS=/dev/disk/by-id/ata-WDC_WD40EFRX-68N32N0_WD-WCC7K0XXXXXX "
+            "/dev/disk/by-path/pci-0000:00:1f.2-ata-2",
+        ]
+        event = parse_uevent(libudev_message(add_sdb))
+        self.assertEqual(event["ACTION"], "add")
+        self.assertEqual(event["DEVNAME"], "/dev/sdb")
+        self.assertEqual(
+            block_event_devices(event),
+            [
+                "/dev/sdb",
+                "/dev/disk/by-id/ata-WDC_WD40EFRX-68N32N0_WD-WCC7K0XXXXXX",
+                "/dev/disk/by-path/pci-0000:00:1f.2-ata-2",
+            ],
+        )
+        # Kernel format: short DEVNAME.
+        kernel = b"remove@/block/sdb/sdb1\0ACTION=remove\0SUBSYSTEM=block\0"
+        kernel += b"DEVNAME=sdb1\0DEVTYPE=partition\0"
+        event = parse_uevent(kernel)
+        self.assertEqual(block_event_devices(event), ["/dev/sdb1"])
+        # Unknown messages, bad magic.
+        self.assertIsNone(parse_uevent(b"garbage"))
+        bad_magic = bytearray(libudev_message(add_sdb))
+        bad_magic[8] = 0
+        self.assertIsNone(parse_uevent(bytes(bad_magic)))
+
+    def test_block_event_devices_filter(self):
+        self.assertEqual(
+            block_event_devices(
+                {"ACTION": "add", "SUBSYSTEM": "net", "DEVTYPE": "disk"}
+            ),
+            [],
+        )
+        # Loop/dm "bind" and similar actions are of no interest.
+        self.assertEqual(
+            block_event_devices(
+                {
+                    "ACTION": "bind",
+                    "SUBSYSTEM": "block",
+                    "DEVTYPE": "disk",
+                    "DEVNAME": "/dev/sda",
+                }
+            ),
+            [],
+        )
@@ -0,0 +1,111 @@
+"""
+Copyright (joint work) 2024 The Rockstor Project <https://rockstor.com>
+
+Rockstor is free software; you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published
+by the Free Software Foundation; either version 2 of the License,
+or (at your option) any later version.
+
+Rockstor is distributed in the hope that it will be useful, but
+WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program. If not, see <https://www.gnu.org/licenses/>.
+"""
+
+"""
+Minimal udev event monitor via the kobject uevent netlink socket: as used by
+libudev/pyudev, but without the added dependency. We listen on the udev
+multicast group so events arrive only once udev has finished processing,
+i.e. once /dev/disk/by-id names are in place.
+"""
+
+import logging
+import socket
+import struct
+
+logger = logging.getLogger(__name__)
+
+NETLINK_KOBJECT_UEVENT = 15
+# Multicast groups: 1 = raw kernel events, 2 = udev processed events.
+KERNEL_GROUP = 1
+UDEV_GROUP = 2
+UDEV_MAGIC = 0xFEEDCAFE
+BLOCK_ACTIONS = ("add", "remove", "change")
+BLOCK_DEVTYPES = ("disk", "partition")
+
+
+def parse_uevent(data: bytes) -> dict | None:
+    """
+    Parse a netlink uevent message, in either libudev or kernel format, into
+    a dictionary of its properties.
+    :param data: raw message as received from the netlink socket.
+    :return: dict of uevent properties e.g. ACTION, DEVNAME, SUBSYSTEM, or
+    None if the message is not understood.
+    """
+    if data.startswith(b"libudev\0"):
+        # struct udev_monitor_netlink_header: prefix[8], magic (big-endian),
+        # header_size, properties_off, properties_len, ... (native endian).
+        if len(data) < 24 or struct.unpack_from(">I", data, 8)[0] != UDEV_MAGIC:
+            return None
+        properties_off, properties_len = struct.unpack_from("=II", data, 16)
+        fields = data[properties_off : properties_off + properties_len].split(b"\0")
+    elif b"@" in data.split(b"\0", 1)[0]:
+        # Kernel format: "ACTION@DEVPATH\0KEY=VALUE\0..."
+        fields = data.split(b"\0")[1:]
+    else:
+        return None
+    event = {}
+    for field in fields:
+        key, sep, value = field.decode("utf-8", errors="replace").partition("=")
+        if sep:
+            event[key] = value
+    return event
+
+
+def block_event_devices(event: dict) -> list[str]:
+    """
+    :param event: parse_uevent() dictionary.
+    :return: device names of interest to our Disk model for a block disk or
+    partition add/remove/change event: DEVNAME (e.g. /dev/sda) and DEVLINKS
+    (e.g. /dev/mapper/luks-*), or an empty list for all other events.
+    """
+    if (
+        event.get("SUBSYSTEM") != "block"
+        or event.get("ACTION") not in BLOCK_ACTIONS
+        or event.get("DEVTYPE") not in BLOCK_DEVTYPES
+    ):
+        return []
+    devices = []
+    if "DEVNAME" in event:
+        devname = event["DEVNAME"]
+        devices.append(devname if devname.startswith("/") else f"/dev/{devname}")
+    devices.extend(event.get("DEVLINKS", "").split())
+    return devices
+
+
+class UdevMonitor(object):
+    """
+    Blocking receiver of udev events; gevent cooperative once socket is
+    monkey patched. Requires root (CAP_NET_ADMIN) for the udev group.
+    """
+
+    def __init__(self, group: int = UDEV_GROUP):
+        self.sock = socket.socket(
+            socket.AF_NETLINK, socket.SOCK_DGRAM, NETLINK_KOBJECT_UEVENT
+        )
+        # Bursts of events (e.g. a JBOD shelf powering on) must not be dropped.
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 1024 * 1024)
+        self.sock.bind((0, group))
+
+    def receive(self) -> dict:
+        """:return: the next understood event's parse_uevent() dictionary."""
+        while True:
+            event = parse_uevent(self.sock.recv(65536))
+            if event is not None:
+                return event
+
+    def close(self):
+        self.sock.close()
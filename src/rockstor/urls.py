@@ -51,6 +51,8 @@ from storageadmin.views import (
     PoolListView,
     ApplianceListView,
     ApplianceDetailView,
+    JobListView,
+    JobDetailView,
     DiskListView,
     NetworkStateView,
     UserListView,
@@ -60,6 +62,7 @@ from storageadmin.views import (
     PincardView,
     UpdateSubscriptionListView,
     RockOnView,
+    BatchView,
 )
 import os.path
 
@@ -89,6 +92,10 @@ urlpatterns = [
     re_path(r"^api/appliances$", ApplianceListView.as_view()),
     re_path(r"^api/appliances/(?P<appid>\d+)$", ApplianceDetailView.as_view()),
     re_path(r"^api/commands/", include("storageadmin.urls.commands")),
+    re_path(r"^api/batch$", BatchView.as_view()),
+    re_path(r"^api/jobs$", JobListView.as_view()),
+    re_path(r"^api/jobs/(?P<jid>\d+)$", JobDetailView.as_view()),
+    re_path(r"^api/jobs/(?P<jid>\d+)/(?P<command>.*)$", JobDetailView.as_view()),
     re_path(r"^api/disks$", DiskListView.as_view()),
     re_path(r"^api/disks/", include("storageadmin.urls.disks")),
     re_path(r"^api/network$", NetworkStateView.as_view()),